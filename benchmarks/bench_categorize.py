@@ -0,0 +1,94 @@
+"""
+Measure loading a large serialized API table and categorizing imports with it.
+
+Usage:
+    python -m benchmarks.bench_categorize [--entries 50000] [--files N] [--seed S]
+
+A synthetic catalog of `--entries` API names is built, saved with
+ApiDictionary.save() and loaded back; then generated import tables are
+categorized with a cold and a warm (memoized) dictionary.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from src.analyze import CATEGORY_DESCRIPTIONS
+from src.categorize import ApiDictionary, categorize_imports, load_api_dictionary
+
+CATEGORIES = sorted(set(CATEGORY_DESCRIPTIONS) - {"unknown"})
+
+
+def make_catalog(entries: int, rng: random.Random) -> Dict[str, object]:
+    catalog: Dict[str, object] = {}
+    for i in range(entries):
+        if i % 10 == 0:
+            catalog[f"synthapi{i}"] = rng.sample(CATEGORIES, 2)
+        else:
+            catalog[f"synthapi{i}"] = rng.choice(CATEGORIES)
+    return catalog
+
+
+def make_files(count: int, entries: int, rng: random.Random) -> List[Dict[str, List[str]]]:
+    files = []
+    for _ in range(count):
+        funcs = [f"SynthApi{rng.randrange(entries)}{rng.choice(['', 'A', 'W', 'ExW'])}" for _ in range(200)]
+        funcs += [f"Unlisted{rng.randrange(entries)}" for _ in range(50)]
+        files.append({"KERNEL32.DLL": funcs})
+    return files
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=50000, help="Catalog size.")
+    parser.add_argument("--files", type=int, default=1000, help="Number of generated files.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    dictionary = ApiDictionary(make_catalog(args.entries, rng), {"synthfamily*": "network"})
+    build_ms = (time.perf_counter() - start) * 1e3
+
+    fd, table_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        dictionary.save(table_path)
+        size = os.path.getsize(table_path)
+        start = time.perf_counter()
+        loaded = load_api_dictionary(table_path)
+        load_ms = (time.perf_counter() - start) * 1e3
+    finally:
+        os.unlink(table_path)
+
+    files = make_files(args.files, args.entries, rng)
+    imports_per_file = sum(len(f) for imports in files for f in imports.values()) / len(files)
+
+    start = time.perf_counter()
+    cold = [categorize_imports(imports, loaded) for imports in files]
+    cold_us = (time.perf_counter() - start) / len(files) * 1e6
+
+    start = time.perf_counter()
+    warm = [categorize_imports(imports, loaded) for imports in files]
+    warm_us = (time.perf_counter() - start) / len(files) * 1e6
+
+    if cold != warm or cold != [categorize_imports(imports, dictionary) for imports in files]:
+        print("[ERROR] Loaded and built dictionaries disagree.", file=sys.stderr)
+        return 1
+
+    print(f"entries: {len(loaded)}  table: {size / 1024:.0f} KiB  files: {len(files)}  "
+          f"imports/file: {imports_per_file:.0f}")
+    print(f"build from dict:       {build_ms:8.1f} ms")
+    print(f"load serialized table: {load_ms:8.1f} ms")
+    print(f"categorize (cold):     {cold_us:8.1f} us/file")
+    print(f"categorize (warm):     {warm_us:8.1f} us/file")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
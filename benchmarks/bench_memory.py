@@ -0,0 +1,110 @@
+"""
+Measure the memory held per analyzed file by pipeline-style nested dict
+results against model.FileResult, over synthetic import tables.
+
+Usage:
+    python -m benchmarks.bench_memory [--files 10000] [--dlls 2-6]
+                                      [--imports-per-dll 5-50] [--seed 0]
+                                      [--output FILE]
+
+Both representations are built for the same files and kept alive together
+with everything they reference; tracemalloc reports the bytes allocated
+while building them. The import tables themselves are parsed again per
+representation (as if read from disk), so shared strings only come from
+interning, not from the benchmark reusing its inputs.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import random
+import sys
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from src import __version__
+from src.analyze import compute_capabilities, detect_patterns
+from src.categorize import categorize_imports, default_api_dictionary
+from src.model import FileResult
+from src.synthetic import _int_range, random_imports
+
+
+def _tables(args: argparse.Namespace) -> List[str]:
+    """JSON-encoded import tables, decoded afresh for each representation."""
+    rng = random.Random(args.seed)
+    dlls, per_dll = _int_range(args.dlls), _int_range(args.imports_per_dll)
+    tables = []
+    for _ in range(args.files):
+        imports = random_imports(rng, rng.randint(*dlls), rng.randint(*per_dll))
+        tables.append(json.dumps({dll: [str(f) for f in funcs] for dll, funcs in imports.items()}))
+    return tables
+
+
+def _as_dicts(file: str, imports: Dict[str, List[str]]) -> Dict[str, object]:
+    categorized = categorize_imports(imports)
+    return {
+        "file": file,
+        "imports": imports,
+        "categorized": categorized,
+        "capabilities": compute_capabilities(categorized),
+        "pattern_ids": detect_patterns(categorized, imports),
+    }
+
+
+def _as_compact(file: str, imports: Dict[str, List[str]]) -> FileResult:
+    return FileResult.from_imports(file, imports, detect_patterns(categorize_imports(imports), imports))
+
+
+def measure(tables: List[str], build: Callable[[str, Dict[str, List[str]]], object]) -> Tuple[int, int]:
+    """(bytes still allocated, peak bytes) after building and keeping every result."""
+    gc.collect()
+    tracemalloc.start()
+    kept = [build(f"{i}.exe", json.loads(table)) for i, table in enumerate(tables)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current, peak
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=10000, help="Number of import tables (default: 10000).")
+    parser.add_argument("--dlls", default="2-6", help="DLLs per file, N or MIN-MAX (default: 2-6).")
+    parser.add_argument("--imports-per-dll", default="5-50", help="Imports per DLL, N or MIN-MAX (default: 5-50).")
+    parser.add_argument("--seed", type=int, default=0, help="Table seed (default: 0).")
+    parser.add_argument("--output", metavar="FILE", help="Write the results as JSON.")
+    args = parser.parse_args(argv)
+
+    tables = _tables(args)
+    # Built up front so neither measurement pays for the dictionary.
+    default_api_dictionary()
+    # Warm up interning and the category registry.
+    _as_compact("warmup.exe", json.loads(tables[0]))
+
+    results = {}
+    for label, build in (("dict", _as_dicts), ("compact", _as_compact)):
+        current, peak = measure(tables, build)
+        results[label] = {
+            "bytes": current,
+            "peak_bytes": peak,
+            "bytes_per_file": current / args.files,
+        }
+        print(f"{label:<8}{current / 2**20:>10.1f} MiB held{peak / 2**20:>10.1f} MiB peak"
+              f"{current / args.files:>10.0f} B/file")
+    ratio = results["dict"]["bytes"] / max(1, results["compact"]["bytes"])
+    print(f"compact results use {ratio:.1f}x less memory")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": __version__,
+                "python": sys.version.split()[0],
+                "parameters": vars(args),
+                "results": results,
+            }, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Compare the import-only fast parse path in `pe_parser.get_imports` (both the
+pefile and the raw backend) with a full `pefile.PE(path)` parse of every data
+directory.
+
+Usage:
+    python -m benchmarks.bench_parse PATH [PATH ...] [--repeat N]
+
+PATH may be a PE file or a directory (searched recursively for .exe/.dll/.sys).
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import pefile
+
+from src.pe_parser import PEParseError, get_imports
+
+PE_SUFFIXES = {".exe", ".dll", ".sys", ".ocx", ".cpl", ".scr"}
+
+
+def full_parse_imports(path: Path) -> Dict[str, List[str]]:
+    """The previous behaviour of get_imports: full load, then read imports."""
+    pe = pefile.PE(str(path))
+    imports: Dict[str, List[str]] = {}
+    for entry in getattr(pe, "DIRECTORY_ENTRY_IMPORT", ()):
+        dll_name = entry.dll.decode(errors="ignore").upper() if entry.dll else "UNKNOWN"
+        imports[dll_name] = [
+            imp.name.decode(errors="ignore") if imp.name else f"ORDINAL_{imp.ordinal}"
+            for imp in entry.imports
+        ]
+    pe.close()
+    return imports
+
+
+def collect_files(paths: List[str]) -> List[Path]:
+    files: List[Path] = []
+    for raw in paths:
+        p = Path(raw)
+        if p.is_dir():
+            files.extend(f for f in sorted(p.rglob("*")) if f.suffix.lower() in PE_SUFFIXES and f.is_file())
+        elif p.is_file():
+            files.append(p)
+    return files
+
+
+def time_per_file(func: Callable[[Path], object], files: List[Path], repeat: int) -> List[float]:
+    """Return the best-of-`repeat` wall time (seconds) for each file."""
+    timings: List[float] = []
+    for path in files:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            try:
+                func(path)
+            except (PEParseError, pefile.PEFormatError):
+                pass
+            best = min(best, time.perf_counter() - start)
+        timings.append(best)
+    return timings
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="PE files or directories to benchmark on.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per file; the best is kept.")
+    args = parser.parse_args(argv)
+
+    files = collect_files(args.paths)
+    if not files:
+        print("[ERROR] No PE files found.", file=sys.stderr)
+        return 1
+
+    modes = {
+        "full": full_parse_imports,
+        "fast": lambda path: get_imports(path, backend="pefile"),
+        "raw": lambda path: get_imports(path, backend="raw"),
+    }
+    results = {name: time_per_file(func, files, args.repeat) for name, func in modes.items()}
+
+    print(f"files: {len(files)}  repeat: {args.repeat}")
+    print(f"{'mode':<12}{'total ms':>12}{'mean ms':>12}{'median ms':>12}{'max ms':>12}{'speedup':>10}")
+    baseline = sum(results["full"])
+    for name, timings in results.items():
+        print(
+            f"{name:<12}{sum(timings) * 1e3:>12.2f}{statistics.mean(timings) * 1e3:>12.3f}"
+            f"{statistics.median(timings) * 1e3:>12.3f}{max(timings) * 1e3:>12.3f}"
+            f"{baseline / max(sum(timings), 1e-12):>9.2f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Measure per-file pattern-matching cost as the number of behavior rules grows,
+for the compiled RuleSet and for a naive evaluator that checks every rule.
+
+Usage:
+    python -m benchmarks.bench_rules [--rules 10 100 1000 10000] [--files N] [--seed S]
+
+Rules and files are generated from a fixed vocabulary of API names so the
+run is reproducible and needs no samples.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from typing import Dict, List
+
+from src.analyze import CATEGORY_DESCRIPTIONS
+from src.categorize import API_CATEGORIES, categorize_imports, normalize_api_name
+from src.rules import compile_rules
+
+VOCABULARY_SIZE = 20000
+CATEGORIES = sorted(set(CATEGORY_DESCRIPTIONS) - {"unknown"})
+
+
+def make_vocabulary(rng: random.Random) -> List[str]:
+    names = sorted(API_CATEGORIES)
+    names += [f"SynthApi{i}" for i in range(VOCABULARY_SIZE - len(names))]
+    rng.shuffle(names)
+    return names
+
+
+def make_rules(count: int, vocabulary: List[str], rng: random.Random) -> List[Dict[str, object]]:
+    rules: List[Dict[str, object]] = []
+    for i in range(count):
+        rule: Dict[str, object] = {"id": f"rule_{i}", "description": f"Synthetic rule {i}"}
+        kind = i % 4
+        if kind == 0:
+            rule["apis"] = rng.sample(vocabulary, rng.randint(2, 4))
+        elif kind == 1:
+            rule["apis"] = rng.sample(vocabulary, 1)
+            rule["categories"] = rng.sample(CATEGORIES, 1)
+        elif kind == 2:
+            rule["any_apis"] = rng.sample(vocabulary, 5)
+            rule["min_any"] = 2
+        else:
+            rule["categories"] = rng.sample(CATEGORIES, 2)
+            rule["apis"] = rng.sample(vocabulary, 1)
+            rule["min_imports"] = 20
+        rules.append(rule)
+    return rules
+
+
+def make_files(count: int, vocabulary: List[str], rng: random.Random) -> List[Dict[str, List[str]]]:
+    return [
+        {"KERNEL32.DLL": rng.sample(vocabulary, rng.randint(20, 300))}
+        for _ in range(count)
+    ]
+
+
+def naive_match(rules: List[Dict[str, object]], categorized: Dict[str, List[str]]) -> List[str]:
+    """Check every rule against freshly built name/category sets."""
+    apis = {normalize_api_name(f) for funcs in categorized.values() for f in funcs}
+    categories = {c for c, funcs in categorized.items() if funcs}
+    total = sum(len(funcs) for funcs in categorized.values())
+    matched = []
+    for rule in rules:
+        if not {normalize_api_name(a) for a in rule.get("apis", [])} <= apis:
+            continue
+        if not set(rule.get("categories", [])) <= categories:
+            continue
+        any_apis = {normalize_api_name(a) for a in rule.get("any_apis", [])}
+        if any_apis and len(any_apis & apis) < rule.get("min_any", 1):
+            continue
+        if total < rule.get("min_imports", 0):
+            continue
+        matched.append(rule["id"])
+    return matched
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--files", type=int, default=500, help="Number of generated files.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng)
+    files = [categorize_imports(imports) for imports in make_files(args.files, vocabulary, rng)]
+
+    print(f"files: {len(files)}  vocabulary: {len(vocabulary)}")
+    print(f"{'rules':>8}{'compile ms':>12}{'compiled us/file':>18}{'naive us/file':>16}{'matches':>10}")
+    for count in args.rules:
+        rules = make_rules(count, vocabulary, rng)
+
+        start = time.perf_counter()
+        ruleset = compile_rules(rules)
+        compile_ms = (time.perf_counter() - start) * 1e3
+
+        start = time.perf_counter()
+        compiled = [ruleset.match(categorized) for categorized in files]
+        compiled_us = (time.perf_counter() - start) / len(files) * 1e6
+
+        start = time.perf_counter()
+        naive = [naive_match(rules, categorized) for categorized in files]
+        naive_us = (time.perf_counter() - start) / len(files) * 1e6
+
+        if compiled != naive:
+            print(f"[ERROR] compiled and naive results differ for {count} rules", file=sys.stderr)
+            return 1
+        matches = sum(len(m) for m in compiled)
+        print(f"{count:>8}{compile_ms:>12.1f}{compiled_us:>18.1f}{naive_us:>16.1f}{matches:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Time each analysis stage (get_imports, categorize_imports,
+compute_capabilities, detect_patterns and the JSON/HTML/text report
+builders) over synthetic corpora of increasing size, and write the results
+to a JSON file so runs can be compared.
+
+Usage:
+    python -m benchmarks.bench_stages [--sizes 100,1000] [--output FILE]
+                                      [--compare FILE] [--corpus DIR]
+
+Corpora come from synthetic.generate_corpus (same seed -> same files);
+--corpus times an existing directory of samples instead. --compare prints
+each stage's change against an earlier --output file.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from src import __version__
+from src.analyze import compute_capabilities, describe_patterns, detect_patterns
+from src.batch import iter_input_files
+from src.categorize import categorize_imports, default_api_dictionary
+from src.pe_parser import BACKENDS, DEFAULT_BACKEND, PEParseError, get_imports
+from src.report import build_html_report, build_json_report, build_text_report
+from src.rules import default_ruleset
+from src.synthetic import generate_corpus
+
+STAGES = (
+    "get_imports",
+    "categorize_imports",
+    "compute_capabilities",
+    "detect_patterns",
+    "build_json_report",
+    "build_html_report",
+    "build_text_report",
+)
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    """Total/mean/percentiles (milliseconds) and throughput of per-file timings."""
+    ordered = sorted(timings)
+    total = sum(ordered)
+    return {
+        "total_ms": total * 1e3,
+        "mean_ms": statistics.mean(ordered) * 1e3,
+        "p50_ms": _percentile(ordered, 0.50) * 1e3,
+        "p95_ms": _percentile(ordered, 0.95) * 1e3,
+        "max_ms": ordered[-1] * 1e3,
+        "files_per_s": len(ordered) / total if total else 0.0,
+    }
+
+
+def time_stages(files: List[str], backend: str, repeat: int) -> Dict[str, object]:
+    """
+    Run every stage on every file, keeping each stage's best-of-`repeat`
+    time per file. Files the parser rejects only count towards get_imports.
+    """
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    rejected = 0
+
+    def best(func: Callable[[], object]) -> object:
+        fastest, result = float("inf"), None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            fastest = min(fastest, time.perf_counter() - start)
+        return fastest, result
+
+    for path in files:
+        start = time.perf_counter()
+        try:
+            elapsed, imports = best(lambda: get_imports(path, backend=backend))
+        except PEParseError:
+            timings["get_imports"].append(time.perf_counter() - start)
+            rejected += 1
+            continue
+        timings["get_imports"].append(elapsed)
+
+        elapsed, categorized = best(lambda: categorize_imports(imports))
+        timings["categorize_imports"].append(elapsed)
+        elapsed, capabilities = best(lambda: compute_capabilities(categorized))
+        timings["compute_capabilities"].append(elapsed)
+        elapsed, pattern_ids = best(lambda: detect_patterns(categorized, imports))
+        timings["detect_patterns"].append(elapsed)
+
+        patterns = describe_patterns(pattern_ids)
+        for stage, build in (
+            ("build_json_report", build_json_report),
+            ("build_html_report", build_html_report),
+            ("build_text_report", build_text_report),
+        ):
+            elapsed, _ = best(lambda: build(path, imports, capabilities, patterns))
+            timings[stage].append(elapsed)
+
+    return {
+        "files": len(files),
+        "rejected": rejected,
+        "stages": {stage: summarize(t) for stage, t in timings.items() if t},
+    }
+
+
+def print_run(label: str, run: Dict[str, object], baseline: Dict[str, object] | None) -> None:
+    print(f"{label}: {run['files']} files ({run['rejected']} rejected by the parser)")
+    print(f"  {'stage':<22}{'total ms':>11}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'files/s':>11}"
+          + ("   vs baseline" if baseline else ""))
+    for stage, s in run["stages"].items():
+        line = (f"  {stage:<22}{s['total_ms']:>11.2f}{s['mean_ms']:>10.4f}{s['p50_ms']:>10.4f}"
+                f"{s['p95_ms']:>10.4f}{s['files_per_s']:>11.0f}")
+        before = (baseline or {}).get("stages", {}).get(stage)
+        if before and before["mean_ms"]:
+            line += f"   {s['mean_ms'] / before['mean_ms']:.2f}x"
+        print(line)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000",
+                        help="Comma-separated corpus sizes to generate (default: 100,1000).")
+    parser.add_argument("--corpus", metavar="DIR", help="Benchmark the files in DIR instead of generating corpora.")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed (default: 0).")
+    parser.add_argument("--malformed-ratio", type=float, default=0.05,
+                        help="Fraction of malformed files in generated corpora (default: 0.05).")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND, help="Import parser backend.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per file and stage; the best is kept.")
+    parser.add_argument("--output", metavar="FILE", help="Write the results as JSON.")
+    parser.add_argument("--compare", metavar="FILE", help="Show each stage relative to an earlier --output file.")
+    args = parser.parse_args(argv)
+
+    baseline_runs: Dict[str, object] = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline_runs = json.load(f)["runs"]
+
+    # Load the API table and rules up front so the first file isn't charged for it.
+    default_api_dictionary()
+    default_ruleset()
+
+    runs: Dict[str, object] = {}
+    if args.corpus:
+        files = list(iter_input_files([args.corpus]))
+        if not files:
+            print(f"[ERROR] No files found in {args.corpus}", file=sys.stderr)
+            return 1
+        runs["corpus"] = time_stages(files, args.backend, args.repeat)
+    else:
+        sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+        with tempfile.TemporaryDirectory() as workdir:
+            for size in sizes:
+                records = generate_corpus(
+                    Path(workdir) / str(size), size, seed=args.seed, malformed_ratio=args.malformed_ratio
+                )
+                runs[str(size)] = time_stages([r["file"] for r in records], args.backend, args.repeat)
+
+    for label, run in runs.items():
+        print_run(label, run, baseline_runs.get(label))
+
+    if args.output:
+        result = {
+            "benchmark": "bench_stages",
+            "version": __version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "params": {
+                "backend": args.backend,
+                "repeat": args.repeat,
+                "seed": args.seed,
+                "malformed_ratio": args.malformed_ratio,
+                "corpus": args.corpus,
+            },
+            "runs": runs,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Track CLI cold-start cost: wall time of a fresh `python -m src.main` process
+and the cumulative `-X importtime` total for --help, text, --json and --html.
+
+Usage:
+    python -m benchmarks.bench_startup [PATH] [--repeat N] [--save FILE]
+                                       [--baseline FILE] [--max-regression PCT]
+
+PATH defaults to a generated sample (synthetic.build_pe). With --baseline,
+the run fails (exit 1) if any mode's median wall time grows by more than
+--max-regression percent over the saved numbers.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from src.synthetic import build_pe
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+MODES: Dict[str, List[str]] = {
+    "help": ["--help"],
+    "text": [],
+    "json": ["--json"],
+    "html": ["--html"],
+}
+
+
+def run_once(args: List[str], cwd: str) -> Tuple[float, Dict[str, int]]:
+    """
+    Run the CLI once with -X importtime.
+
+    Returns (wall seconds, {module: cumulative import microseconds}) for the
+    top-level imports.
+    """
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "src.main", *args],
+        cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"src.main {' '.join(args)} exited with {proc.returncode}")
+
+    imports: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        # "import time:  <self us> | <cumulative us> | <indent><module>", where
+        # nested imports are indented by two extra spaces per level.
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not name[1:].startswith(" "):
+            imports[name.strip()] = int(cumulative)
+    return elapsed, imports
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", nargs="?", help="PE file to analyze (default: a generated sample).")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per mode; the median is reported.")
+    parser.add_argument("--save", metavar="FILE", help="Write the results as JSON.")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare against results saved with --save.")
+    parser.add_argument("--max-regression", type=float, default=20.0, help="Allowed slowdown in percent.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        sample = args.path
+        if sample is None:
+            sample = os.path.join(workdir, "sample.exe")
+            with open(sample, "wb") as f:
+                f.write(build_pe({"KERNEL32.dll": ["CreateFileW", "ReadFile"], "WS2_32.dll": ["connect"]}))
+        sample = os.path.abspath(sample)
+
+        results: Dict[str, Dict[str, object]] = {}
+        for mode, flags in MODES.items():
+            cli_args = flags if mode == "help" else [sample, *flags]
+            walls: List[float] = []
+            import_totals: List[int] = []
+            modules: Dict[str, int] = {}
+            for _ in range(args.repeat):
+                wall, modules = run_once(cli_args, workdir)
+                walls.append(wall)
+                import_totals.append(sum(modules.values()))
+            slowest = sorted(modules.items(), key=lambda item: -item[1])[:5]
+            results[mode] = {
+                "wall_ms": statistics.median(walls) * 1e3,
+                "import_ms": statistics.median(import_totals) / 1e3,
+                "pefile_imported": "pefile" in modules,
+                "top_imports": {name: us / 1e3 for name, us in slowest},
+            }
+
+    print(f"{'mode':<8}{'wall ms':>10}{'import ms':>12}{'pefile':>8}  slowest top-level imports (ms)")
+    for mode, r in results.items():
+        top = ", ".join(f"{name} {ms:.1f}" for name, ms in r["top_imports"].items())
+        print(f"{mode:<8}{r['wall_ms']:>10.1f}{r['import_ms']:>12.1f}{'yes' if r['pefile_imported'] else 'no':>8}  {top}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        failed = False
+        for mode, r in results.items():
+            before = baseline.get(mode, {}).get("wall_ms")
+            if before and r["wall_ms"] > before * (1 + args.max_regression / 100):
+                print(
+                    f"[ERROR] {mode}: {r['wall_ms']:.1f} ms vs baseline {before:.1f} ms "
+                    f"(> {args.max_regression:.0f}% slower)",
+                    file=sys.stderr,
+                )
+                failed = True
+        if failed:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from .rules import RuleSet, default_ruleset
 
 # Human-readable descriptions for capability categories
 CATEGORY_DESCRIPTIONS: Dict[str, str] = {
@@ -13,20 +15,9 @@ CATEGORY_DESCRIPTIONS: Dict[str, str] = {
     "unknown": "Uses APIs that are not yet categorized.",
 }
 
-# Pattern IDs → human-readable text
-PATTERN_DESCRIPTIONS: Dict[str, str] = {
-    "process_injection_combo": (
-        "Process injection combo detected: uses OpenProcess, VirtualAllocEx, "
-        "and WriteProcessMemory (classic code injection pattern)."
-    ),
-    "network_and_file_io": (
-        "Has both networking and file I/O capabilities, which may allow downloading "
-        "or exfiltrating data."
-    ),
-    "registry_persistence": (
-        "Can modify the registry, which can be used for configuration or persistence."
-    ),
-}
+# Pattern IDs → human-readable text, from the behavior rules file
+# (see rules.py; patterns.json unless EXEPLAIN_RULES says otherwise).
+PATTERN_DESCRIPTIONS: Dict[str, str] = dict(default_ruleset().descriptions)
 
 
 def compute_capabilities(
@@ -69,44 +60,35 @@ def compute_capabilities(
     return capabilities
 
 
-def _flatten_apis(categorized: Dict[str, List[str]]) -> Set[str]:
-    """Get a set of all imported API names (original case)."""
-    apis: Set[str] = set()
-    for funcs in categorized.values():
-        apis.update(funcs)
-    return apis
-
-
-def detect_patterns(categorized: Dict[str, List[str]]) -> List[str]:
+def detect_patterns(
+    categorized: Dict[str, List[str]],
+    imports: Optional[Dict[str, List[str]]] = None,
+    ruleset: Optional[RuleSet] = None,
+) -> List[str]:
     """
     Return a list of pattern IDs that were detected based on the categorized imports.
 
+    Patterns are evaluated by a compiled RuleSet (default: the bundled rules
+    file). `imports` is only needed for rules that constrain the imported DLLs.
     Pattern IDs correspond to keys in PATTERN_DESCRIPTIONS.
     """
-    patterns: List[str] = []
-    all_apis = {name.lower() for name in _flatten_apis(categorized)}
-
-    # Process injection combo
-    if {"openprocess", "virtualallocex", "writeprocessmemory"} <= all_apis:
-        patterns.append("process_injection_combo")
+    if ruleset is None:
+        ruleset = default_ruleset()
+    return ruleset.match(categorized, imports)
 
-    # Network + file I/O both present
-    if categorized.get("network") and categorized.get("file_io"):
-        patterns.append("network_and_file_io")
 
-    # Registry modification
-    if categorized.get("registry"):
-        patterns.append("registry_persistence")
-
-    return patterns
-
-
-def describe_patterns(pattern_ids: List[str]) -> List[Tuple[str, str]]:
+def describe_patterns(
+    pattern_ids: List[str],
+    ruleset: Optional[RuleSet] = None,
+) -> List[Tuple[str, str]]:
     """
     Convert pattern IDs into (pattern_id, human_description) pairs.
+
+    Descriptions come from `ruleset` when given, else PATTERN_DESCRIPTIONS.
     """
+    descriptions = ruleset.descriptions if ruleset is not None else PATTERN_DESCRIPTIONS
     described: List[Tuple[str, str]] = []
     for pid in pattern_ids:
-        text = PATTERN_DESCRIPTIONS.get(pid, "")
+        text = descriptions.get(pid, "")
         described.append((pid, text))
     return described
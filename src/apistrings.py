@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .categorize import ApiDictionary, default_api_dictionary
+from .pe_parser import Buffer, PEParseError, _open_source
+from .pe_reader import _Image, _parse_headers
+
+# APIs resolved at run time (GetProcAddress("VirtualAllocEx")) never appear
+# in the import table, but their names sit in the file as NUL-terminated
+# string literals in section data (.rdata, .data). This stage finds them in
+# one pass over the raw data of the sections; the headers hold no such
+# strings, and an overlay holds appended payloads (installer archives,
+# signatures, other files) whose strings are not the program's own.
+#
+# Rather than an Aho-Corasick automaton over every catalog name, candidate
+# strings are cut out by one compiled regex per encoding: identifier-shaped
+# strings of 4-127 characters with a NUL on both sides, in ASCII and in
+# UTF-16LE. Each candidate is then resolved with a single ApiDictionary
+# hash lookup, so the scan is linear in the file size and does not grow
+# with the catalog. Resolving whole
+# strings also applies the dictionary's A/W/Ex suffix folding and wildcard
+# rules, which a literal automaton would not, and requiring NUL delimiters
+# keeps words inside ordinary text ("failed to send") from matching.
+
+STRING_DLL = "<string-referenced>"
+
+# The leading NUL(s) are a literal prefix the regex engine searches for
+# quickly; the terminator is a lookahead so it can also start the next string.
+_ASCII = re.compile(rb"\x00([A-Za-z_][A-Za-z0-9_]{3,126})(?=\x00)")
+_UTF16 = re.compile(rb"\x00\x00((?:[A-Za-z_]\x00)(?:[A-Za-z0-9_]\x00){3,126})(?=\x00\x00)")
+
+
+def scan_buffer(
+    data: Buffer,
+    dictionary: Optional[ApiDictionary] = None,
+    ranges: Optional[Sequence[Tuple[int, int]]] = None,
+) -> List[str]:
+    """
+    Names of categorized APIs that appear as NUL-terminated strings in
+    `data` (ASCII or UTF-16LE), each once: ASCII ones first, each group in
+    order of first appearance. With `ranges` ([(start, end), ...] file
+    offsets) only strings inside them are found.
+    """
+    if dictionary is None:
+        dictionary = default_api_dictionary()
+    resolve = dictionary.resolve
+    found: Dict[str, None] = {}
+    rejected = set()
+
+    def consider(name: str) -> None:
+        if name in found or name in rejected:
+            return
+        # resolve rather than lookup: candidates are mostly noise and would
+        # flood the dictionary's memo of import names.
+        if resolve(name):
+            found[name] = None
+        else:
+            rejected.add(name)
+
+    if ranges is None:
+        ranges = [(0, len(data))]
+    # The delimiters just outside a range still count, so a string at the
+    # very start or end of a section is found.
+    bounds = [(max(start - 2, 0), min(end + 2, len(data))) for start, end in ranges]
+    for start, end in bounds:
+        for match in _ASCII.finditer(data, start, end):
+            consider(match.group(1).decode("ascii"))
+    for start, end in bounds:
+        for match in _UTF16.finditer(data, start, end):
+            consider(match.group(1).decode("utf-16-le"))
+    return list(found)
+
+
+def section_ranges(image: _Image) -> List[Tuple[int, int]]:
+    """
+    The file ranges holding section raw data, sorted and merged, as
+    [(start, end), ...].
+    """
+    ranges: List[Tuple[int, int]] = []
+    for start, end in sorted((section[2], min(section[3], image.size)) for section in image.sections):
+        if start >= end:
+            continue
+        if ranges and start <= ranges[-1][1]:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def scan_api_strings(
+    source: str | Path | Buffer,
+    dictionary: Optional[ApiDictionary] = None,
+    exclude: Optional[Dict[str, List[str]]] = None,
+    image: Optional[_Image] = None,
+) -> List[str]:
+    """
+    scan_buffer over the section data of a file (memory-mapped) or
+    in-memory contents, leaving out the functions of `exclude` (the file's
+    own import table, whose name entries are strings too). `image` is the
+    file's already parsed headers, if the caller has them.
+
+    Raises:
+        FileNotFoundError: if the file does not exist.
+        PEParseError: if the file cannot be parsed as a PE.
+    """
+    with _open_source(source) as (data, name):
+        if image is None:
+            try:
+                image = _parse_headers(data)
+            except PEParseError as e:
+                raise PEParseError(f"Not a valid PE file: {name}") from e
+        names = scan_buffer(data, dictionary, section_ranges(image))
+    if exclude:
+        imported = {func for funcs in exclude.values() for func in funcs}
+        names = [name for name in names if name not in imported]
+    return names
+
+
+def with_string_apis(imports: Dict[str, List[str]], names: List[str]) -> Dict[str, List[str]]:
+    """
+    The import table plus string-referenced APIs as one pseudo-DLL,
+    STRING_DLL, for categorize_imports and detect_patterns.
+    """
+    if not names:
+        return imports
+    merged = dict(imports)
+    merged[STRING_DLL] = names
+    return merged
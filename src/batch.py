@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import errno
+import glob
+import multiprocessing
+import os
+import sys
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from .pe_parser import PEParseError
+from .analyze import describe_patterns
+from .cache import DEFAULT_MAX_BYTES, ResultCache, data_sha256
+from .containers import DEFAULT_MAX_MEMBER_BYTES, is_container, iter_container
+from .limits import AnalysisTimeout, SupervisedPool, WorkerCrashed, set_memory_limit
+from .pipeline import report_details, run_pipeline, warm_up
+from .profiling import ProfileAggregator, StageProfile
+from .report import RecordWriter, build_report_data
+
+GLOB_CHARS = set("*?[")
+
+
+def _is_glob(pattern: str) -> bool:
+    return any(ch in GLOB_CHARS for ch in pattern)
+
+
+def iter_input_files(
+    inputs: Iterable[str],
+    files_from: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Expand CLI inputs into individual file paths.
+
+    Each input may be a file, a directory (searched recursively) or a glob
+    pattern (`**` recurses). `files_from` names a file with one path per line,
+    or "-" for stdin. Paths that match nothing are yielded unchanged so the
+    missing file shows up as an error record instead of vanishing.
+    """
+    def expand(item: str) -> Iterator[str]:
+        if _is_glob(item):
+            for match in sorted(glob.iglob(item, recursive=True)):
+                yield from expand(match)
+        elif os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield item
+
+    for item in inputs:
+        yield from expand(item)
+
+    if files_from is not None:
+        stream = sys.stdin if files_from == "-" else open(files_from, encoding="utf-8")
+        try:
+            for line in stream:
+                line = line.strip()
+                if line:
+                    yield from expand(line)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+
+def analyze_file(
+    path: str,
+    cache: Optional[ResultCache] = None,
+    profile: bool = False,
+    **options: object,
+) -> Dict[str, object]:
+    """
+    Run the parse -> categorize -> analyze pipeline for one file.
+
+    Never raises: failures are returned as a record with an "error" key so a
+    single bad sample cannot abort a batch run. When a cache is used, the
+    record also says whether it was served from the cache. With `profile`,
+    the stage timings and counters (StageProfile.to_dict) are attached under
+    "_profile"; run_batch removes them before writing. A file that exhausts
+    the worker's memory limit becomes an error record too. `options` are
+    passed through to run_pipeline (including `data`, to analyze contents
+    held in memory).
+    """
+    stages = StageProfile() if profile else None
+    try:
+        result = run_pipeline(path, cache, profile=stages, **options)
+    except (FileNotFoundError, PEParseError) as e:
+        record = {"file": path, "error": {"type": type(e).__name__, "message": str(e)}}
+    except MemoryError:
+        record = {"file": path, "error": {"type": "MemoryError", "message": "Memory limit exceeded"}}
+    except OSError as e:
+        if e.errno == errno.ENOMEM:
+            # mmap under an address-space limit fails with ENOMEM
+            record = {"file": path, "error": {"type": "MemoryError", "message": "Memory limit exceeded"}}
+        else:
+            record = {"file": path, "error": {"type": type(e).__name__, "message": f"Unexpected error: {e}"}}
+    except Exception as e:
+        record = {"file": path, "error": {"type": type(e).__name__, "message": f"Unexpected error: {e}"}}
+    else:
+        start = time.perf_counter()
+        patterns = describe_patterns(result["pattern_ids"])
+        record = build_report_data(path, result["imports"], result["capabilities"], patterns, report_details(result))
+        if stages is not None:
+            stages.timings["report"] = time.perf_counter() - start
+        if result["truncated"]:
+            record["truncated"] = True
+            record["truncated_by"] = result["truncated_by"]
+        if cache is not None:
+            record["cached"] = result["cached"]
+
+    if stages is not None:
+        record["_profile"] = stages.to_dict()
+    return record
+
+
+def _analyze_hashed(
+    path: str,
+    cache: Optional[ResultCache] = None,
+    **options: object,
+) -> Dict[str, object]:
+    """analyze_file on contents read once, with their SHA-256 as "sha256"."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        return {"file": path, "error": {"type": type(e).__name__, "message": str(e)}}
+    record = analyze_file(path, cache, data=data, **options)
+    record["sha256"] = data_sha256(data)
+    return record
+
+
+def analyze_path(
+    path: str,
+    cache: Optional[ResultCache] = None,
+    archives: bool = False,
+    max_member_bytes: int = DEFAULT_MAX_MEMBER_BYTES,
+    content_hash: bool = False,
+    **options: object,
+) -> List[Dict[str, object]]:
+    """
+    Analyze one input path: a single record for a file or, with `archives`,
+    one record per PE member of a zip/tar archive (see
+    containers.iter_container), named "archive!member". Members are
+    analyzed from memory; unreadable or oversized ones become
+    "ContainerError" records. With `content_hash`, every analyzed file or
+    member's record carries the SHA-256 of its contents as "sha256".
+    `options` are passed through to analyze_file.
+    """
+    if not archives or not is_container(path):
+        if content_hash:
+            return [_analyze_hashed(path, cache, **options)]
+        return [analyze_file(path, cache, **options)]
+
+    records = []
+    for member in iter_container(path, max_member_bytes=max_member_bytes):
+        if member.error is not None:
+            records.append({"file": member.name, "error": {"type": "ContainerError", "message": member.error}})
+            continue
+        record = analyze_file(member.name, cache, data=member.data, **options)
+        if content_hash:
+            record["sha256"] = data_sha256(member.data)
+        records.append(record)
+    return records
+
+
+# Per-process state for pool workers, set up by _init_worker.
+_worker_cache: Optional[ResultCache] = None
+_worker_options: Dict[str, object] = {}
+_worker_analyze: Callable[..., List[Dict[str, object]]] = analyze_path
+
+
+def _init_worker(
+    cache_path: Optional[str],
+    cache_max_bytes: int,
+    options: Dict[str, object],
+    max_memory: Optional[int] = None,
+    analyze: Callable[..., List[Dict[str, object]]] = analyze_path,
+) -> None:
+    global _worker_cache, _worker_options, _worker_analyze
+    set_memory_limit(max_memory)
+    if cache_path is not None:
+        _worker_cache = ResultCache(cache_path, max_bytes=cache_max_bytes)
+    _worker_options = options
+    _worker_analyze = analyze
+
+
+def _analyze_in_worker(item: object) -> List[Dict[str, object]]:
+    return _worker_analyze(item, _worker_cache, **_worker_options)
+
+
+def failure_records(item: object, error: Dict[str, str]) -> List[Dict[str, object]]:
+    """
+    Default scan_files records for an item whose worker was killed or
+    died: one error record for its path (the first element of a tuple item).
+    """
+    path = item[0] if isinstance(item, tuple) else item
+    return [{"file": path, "error": error}]
+
+
+def scan_files(
+    paths: Iterable[str],
+    workers: Optional[int] = None,
+    chunksize: int = 8,
+    cache_path: Optional[str] = None,
+    cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    options: Optional[Dict[str, object]] = None,
+    max_memory: Optional[int] = None,
+    analyze: Callable[..., List[Dict[str, object]]] = analyze_path,
+    timeout: Optional[float] = None,
+    failed: Callable[[object, Dict[str, str]], List[Dict[str, object]]] = failure_records,
+) -> Iterator[Dict[str, object]]:
+    """
+    Analyze many files, yielding one record per file as soon as it finishes.
+
+    Records arrive in completion order, not input order. An archive (with
+    the `archives` option) is one unit of work and yields a record per PE
+    member.
+
+    Args:
+        paths: File paths to analyze.
+        workers: Number of worker processes (default: CPU count). 1 runs
+            everything in the current process.
+        chunksize: Number of paths handed to a worker at a time (without
+            a timeout or memory limit).
+        cache_path: Optional result cache database shared by all workers.
+        cache_max_bytes: Size bound for the result cache.
+        options: Keyword arguments for analyze_path / analyze_file /
+            run_pipeline (e.g. archives, backend, profile,
+            max_imports_per_dll).
+        max_memory: Address-space limit in bytes for each worker process
+            (see limits.set_memory_limit).
+        analyze: Called as analyze(item, cache, **options) for each item
+            of `paths` and returns its records; a module-level function so
+            workers can unpickle it (default: analyze_path).
+        timeout: Per-item wall-clock limit in seconds. A worker still busy
+            with an item after that long is killed and replaced.
+        failed: Called as failed(item, error) for an item whose worker was
+            killed or died, and returns its records in the same shape as
+            `analyze` would (default: failure_records).
+
+    With a timeout or memory limit, every item runs as its own task on a
+    limits.SupervisedPool (even for workers=1, so the caller is never
+    capped); its error has the type "AnalysisTimeout" or "WorkerCrashed".
+    """
+    workers = workers or os.cpu_count() or 1
+    options = options or {}
+
+    if workers == 1 and max_memory is None and timeout is None:
+        cache = ResultCache(cache_path, max_bytes=cache_max_bytes) if cache_path else None
+        try:
+            for path in paths:
+                yield from analyze(path, cache, **options)
+        finally:
+            if cache is not None:
+                cache.close()
+        return
+
+    if cache_path is not None:
+        # Create the schema once up front rather than racing in every worker.
+        ResultCache(cache_path, max_bytes=cache_max_bytes).close()
+
+    initargs = (cache_path, cache_max_bytes, options, max_memory, analyze)
+    if max_memory is None and timeout is None:
+        with multiprocessing.Pool(processes=workers, initializer=_init_worker, initargs=initargs) as pool:
+            for records in pool.imap_unordered(_analyze_in_worker, paths, chunksize=chunksize):
+                yield from records
+        return
+
+    with SupervisedPool(workers, timeout, initializer=_init_worker, initargs=initargs) as pool:
+        for item, future in pool.imap_unordered(_analyze_in_worker, paths):
+            try:
+                records = future.result()
+            except (AnalysisTimeout, WorkerCrashed) as e:
+                records = failed(item, {"type": type(e).__name__, "message": str(e)})
+            except Exception as e:
+                records = failed(item, {"type": type(e).__name__, "message": f"Unexpected error: {e}"})
+            yield from records
+
+
+def run_batch(
+    paths: Iterable[str],
+    writer: RecordWriter,
+    workers: Optional[int] = None,
+    chunksize: int = 8,
+    cache_path: Optional[str] = None,
+    cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    options: Optional[Dict[str, object]] = None,
+    profile: Optional[ProfileAggregator] = None,
+    max_memory: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, object]:
+    """
+    Stream each analyzed file's record to `writer` and return a run summary.
+
+    The writer (see report.NDJSONWriter, JSONArrayWriter, HTMLTableWriter)
+    receives records as they complete; the caller is responsible for
+    closing it. With a `profile` aggregator, every worker times its stages
+    and the per-file profiles (plus the time spent writing each record) are
+    added to it. `max_memory` and `timeout` are as for scan_files.
+    """
+    if profile is not None:
+        options = dict(options or {}, profile=True)
+        # Keep the one-time start-up costs out of the first files' timings
+        # (forked workers inherit the warm state).
+        warm_up(options.get("backend"))
+    start = time.perf_counter()
+    files = 0
+    errors = 0
+    cache_hits = 0
+    truncated = 0
+
+    records = scan_files(
+        paths,
+        workers=workers,
+        chunksize=chunksize,
+        cache_path=cache_path,
+        cache_max_bytes=cache_max_bytes,
+        options=options,
+        max_memory=max_memory,
+        timeout=timeout,
+    )
+    for record in records:
+        files += 1
+        if "error" in record:
+            errors += 1
+        elif record.get("cached"):
+            cache_hits += 1
+        truncated += bool(record.get("truncated"))
+        stages = record.pop("_profile", None)
+        if stages is None or profile is None:
+            writer.write(record)
+            continue
+        write_start = time.perf_counter()
+        writer.write(record)
+        stages["stages"]["write"] = (time.perf_counter() - write_start) * 1e3
+        profile.add(record["file"], stages)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "files": files,
+        "ok": files - errors,
+        "errors": errors,
+        "cache_hits": cache_hits,
+        "truncated": truncated,
+        "seconds": elapsed,
+        "files_per_second": files / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def format_summary(summary: Dict[str, object]) -> str:
+    """Render the run summary as one human-readable line."""
+    truncated = f", {summary['truncated']} truncated" if summary.get("truncated") else ""
+    return (
+        f"[INFO] Scanned {summary['files']} files ({summary['ok']} ok, "
+        f"{summary['errors']} errors, {summary['cache_hits']} from cache{truncated}) in {summary['seconds']:.2f}s "
+        f"({summary['files_per_second']:.1f} files/sec)."
+    )
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Optional
+
+from . import __version__
+from .categorize import API_CATEGORIES, API_PATTERNS, API_TABLE_PATH
+from .analyze import CATEGORY_DESCRIPTIONS
+from .rules import default_ruleset
+
+# Default upper bound on the total (compressed) payload size kept in the cache.
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_HASH_CHUNK = 1024 * 1024
+
+# Bumped when the table layout changes; older cache files are emptied on open.
+_SCHEMA_VERSION = 1
+
+
+def rules_fingerprint() -> str:
+    """
+    Fingerprint of everything that affects analysis results.
+
+    Any change to the rule tables, the behavior rules, the ordinal index
+    (or the package version) produces a new fingerprint, under which
+    entries cached with the old one are not found.
+    """
+    tables = {
+        "version": __version__,
+        "api_categories": API_CATEGORIES,
+        "api_patterns": API_PATTERNS,
+        "api_table": file_sha256(API_TABLE_PATH) if API_TABLE_PATH else None,
+        "category_descriptions": CATEGORY_DESCRIPTIONS,
+        "pattern_rules": default_ruleset().source,
+        "ordinal_index": _ordinal_index_fingerprint(),
+    }
+    blob = json.dumps(tables, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def _ordinal_index_fingerprint() -> Optional[str]:
+    from .ordinals import default_ordinal_index
+
+    index = default_ordinal_index()
+    return index.fingerprint() if index is not None else None
+
+
+def file_sha256(path: str | Path) -> str:
+    """
+    SHA-256 of a file's bytes, read in fixed-size chunks.
+
+    Raises:
+        FileNotFoundError: if the file does not exist.
+    """
+    path = Path(path)
+    if not path.is_file():
+        raise FileNotFoundError(f"File not found: {path}")
+
+    digest = hashlib.sha256()
+    buf = bytearray(_HASH_CHUNK)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+def data_sha256(data: bytes) -> str:
+    """SHA-256 of in-memory file contents (same key as file_sha256)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    """
+    Persistent SQLite cache of per-file analysis results.
+
+    Entries are keyed by the SHA-256 of the file contents together with
+    `rules_fingerprint()`, so runs with different rule tables can share one
+    cache file: each only sees its own entries, and entries nobody uses any
+    more age out. The total payload size is bounded by `max_bytes` with
+    least-recently-used eviction.
+
+    Stored values are the stage outputs of the pipeline:
+    {"imports": ..., "categorized": ..., "capabilities": ..., "pattern_ids": ...}
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.fingerprint = rules_fingerprint()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._conn = sqlite3.connect(str(self.path), timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+                # Dropping a table drops its triggers too.
+                self._conn.execute("DROP TABLE IF EXISTS results")
+                self._conn.execute("DROP TABLE IF EXISTS totals")
+                self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " sha256 TEXT NOT NULL,"
+                " fingerprint TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " payload BLOB NOT NULL,"
+                " PRIMARY KEY (sha256, fingerprint))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_lru ON results(last_used)")
+            # Running payload total, maintained by triggers so eviction checks
+            # don't have to scan the table.
+            self._conn.execute("CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY, bytes INTEGER NOT NULL)")
+            self._conn.execute(
+                "INSERT OR IGNORE INTO totals (id, bytes)"
+                " SELECT 0, COALESCE(SUM(size), 0) FROM results"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS results_add AFTER INSERT ON results"
+                " BEGIN UPDATE totals SET bytes = bytes + NEW.size WHERE id = 0; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS results_del AFTER DELETE ON results"
+                " BEGIN UPDATE totals SET bytes = bytes - OLD.size WHERE id = 0; END"
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def get(self, sha256: str) -> Optional[Dict[str, object]]:
+        """Return the cached stage outputs for a file hash, or None on a miss."""
+        row = self._conn.execute(
+            "SELECT payload FROM results WHERE sha256 = ? AND fingerprint = ?",
+            (sha256, self.fingerprint),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        with self._conn:
+            self._conn.execute(
+                "UPDATE results SET last_used = ? WHERE sha256 = ? AND fingerprint = ?",
+                (time.time(), sha256, self.fingerprint),
+            )
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, sha256: str, result: Dict[str, object]) -> None:
+        """Store stage outputs for a file hash, evicting old entries if needed."""
+        payload = zlib.compress(json.dumps(result, separators=(",", ":")).encode("utf-8"))
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM results WHERE sha256 = ? AND fingerprint = ?", (sha256, self.fingerprint)
+            )
+            self._conn.execute(
+                "INSERT INTO results (sha256, fingerprint, size, last_used, payload)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (sha256, self.fingerprint, len(payload), time.time(), payload),
+            )
+            self._evict()
+
+    def _total_bytes(self) -> int:
+        return self._conn.execute("SELECT bytes FROM totals WHERE id = 0").fetchone()[0]
+
+    def _evict(self) -> None:
+        """Delete least-recently-used entries until the size bound holds."""
+        total = self._total_bytes()
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for sha256, fingerprint, size in self._conn.execute(
+            "SELECT sha256, fingerprint, size FROM results ORDER BY last_used"
+        ):
+            victims.append((sha256, fingerprint))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM results WHERE sha256 = ? AND fingerprint = ?", victims)
+        self.evictions += len(victims)
+
+    def stats(self) -> Dict[str, object]:
+        """Hit/miss counters for this process plus the cache's current size."""
+        entries = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        size = self._total_bytes()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
@@ -1,20 +1,31 @@
 from __future__ import annotations
 
-from typing import Dict, List, DefaultDict
+import json
+import os
+import re
 from collections import defaultdict
+from fnmatch import translate
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, DefaultDict, Optional, Pattern, Tuple, Union
+
+# A category name, or several for APIs that belong to more than one.
+Categories = Union[str, List[str]]
 
 # Very small starter mapping.
 # You can expand this over time as part of the project.
-API_CATEGORIES: Dict[str, str] = {
+#
+# Keys are lowercase base names: "A"/"W" and "Ex" suffixes are folded at
+# lookup time, so "createfile" also covers CreateFileA, CreateFileW and
+# CreateFileExW. List a suffixed name explicitly when it means something
+# different from its base (VirtualAllocEx is not VirtualAlloc).
+API_CATEGORIES: Dict[str, Categories] = {
     # file I/O
-    "createfilew": "file_io",
-    "createfilea": "file_io",
+    "createfile": "file_io",
     "readfile": "file_io",
     "writefile": "file_io",
-    "deletefilew": "file_io",
-    "deletefilea": "file_io",
-    "copyfilew": "file_io",
-    "copyfilea": "file_io",
+    "deletefile": "file_io",
+    "copyfile": "file_io",
 
     # networking
     "socket": "network",
@@ -22,21 +33,15 @@ API_CATEGORIES: Dict[str, str] = {
     "send": "network",
     "recv": "network",
     "wsastartup": "network",
-    "internetopena": "network",
-    "internetopenw": "network",
-    "internetopenurla": "network",
-    "internetopenurlw": "network",
+    "internetopen": "network",
+    "internetopenurl": "network",
     "winhttpsendrequest": "network",
 
     # registry
-    "regopenkeyexa": "registry",
-    "regopenkeyexw": "registry",
-    "regcreatekeyexa": "registry",
-    "regcreatekeyexw": "registry",
-    "regsetvalueexa": "registry",
-    "regsetvalueexw": "registry",
-    "regdeletevaluea": "registry",
-    "regdeletevaluew": "registry",
+    "regopenkey": "registry",
+    "regcreatekey": "registry",
+    "regsetvalue": "registry",
+    "regdeletevalue": "registry",
 
     # process management / injection-ish
     "openprocess": "process_injection",
@@ -45,35 +50,228 @@ API_CATEGORIES: Dict[str, str] = {
     "createremotethread": "process_injection",
 
     # process / command execution
-    "createprocessa": "process_management",
-    "createprocessw": "process_management",
+    "createprocess": "process_management",
     "winexec": "process_management",
     "shell32.shell_executea": "process_management",  # sometimes appears as full name
 
     # crypto (example)
     "cryptencrypt": "crypto",
     "cryptdecrypt": "crypto",
-    "cryptacquirecontexta": "crypto",
-    "cryptacquirecontextw": "crypto",
+    "cryptacquirecontext": "crypto",
 }
 
+# Wildcard rules (fnmatch syntax, lowercase) for whole API families, e.g.
+# {"internet*": "network"}. They are only consulted when no exact or
+# suffix-folded entry matches. None are shipped by default.
+API_PATTERNS: Dict[str, Categories] = {}
+
+# Serialized dictionary to load instead of the tables above (see save()).
+API_TABLE_PATH = os.environ.get("EXEPLAIN_API_TABLE")
+
+_TABLE_FORMAT = "exeplain-api-table"
+_TABLE_VERSION = 1
 
+# Upper bound on memoized import names per dictionary; the memo is simply
+# dropped when it is reached.
+_MEMO_LIMIT = 1 << 20
+
+
+@lru_cache(maxsize=1 << 16)
 def normalize_api_name(name: str) -> str:
     """
     Normalize an API name for lookup:
     - lowercased
     - strip leading underscores
     """
-    name = name.strip()
-    while name.startswith("_"):
-        name = name[1:]
-    return name.lower()
+    return name.strip().lstrip("_").lower()
 
 
-def categorize_imports(imports: Dict[str, List[str]]) -> Dict[str, List[str]]:
+def _fold_suffixes(name: str) -> List[str]:
+    """
+    Candidate spellings of an import, most specific first:
+    CreateFileExW -> CreateFileExW, CreateFileEx, CreateFile.
+
+    Only an uppercase A/W after a lowercase letter or digit counts as a
+    charset suffix, so names like "recv" or "CreateWindow" are left alone.
+    """
+    forms = [name]
+    if len(name) > 2 and name[-1] in "AW" and (name[-2].islower() or name[-2].isdigit()):
+        name = name[:-1]
+        forms.append(name)
+    if len(name) > 2 and name.endswith("Ex"):
+        forms.append(name[:-2])
+    return forms
+
+
+def _as_list(categories: Categories) -> List[str]:
+    return [categories] if isinstance(categories, str) else list(categories)
+
+
+class ApiDictionary:
+    """
+    API name -> categories lookup with interned ids.
+
+    Every table entry and wildcard rule gets an integer id (0 is "unknown"),
+    and `categories[id]` is the tuple of categories for that id. Resolving a
+    raw import name (normalization, suffix folding, wildcards) happens once
+    per distinct name; after that, `lookup` is a single dict hit.
+    """
+
+    def __init__(
+        self,
+        entries: Dict[str, Categories],
+        patterns: Optional[Dict[str, Categories]] = None,
+    ):
+        self.names: List[str] = ["<unknown>"]
+        self.categories: List[Tuple[str, ...]] = [("unknown",)]
+        self._ids: Dict[str, int] = {}
+        for name, categories in entries.items():
+            self._ids[name.lower()] = self._intern(name.lower(), categories)
+
+        self._set_patterns(patterns or {})
+        self._memo: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.names) - 1
+
+    def _intern(self, name: str, categories: Categories) -> int:
+        self.names.append(name)
+        self.categories.append(tuple(_as_list(categories)))
+        return len(self.names) - 1
+
+    def _set_patterns(self, patterns: Dict[str, Categories]) -> None:
+        # All wildcards are compiled into one alternation; the named group
+        # that matched identifies the rule (first listed wins).
+        self.patterns: Dict[str, Categories] = {}
+        self._pattern_ids: List[int] = []
+        regexes = []
+        for pattern, categories in patterns.items():
+            pattern = pattern.lower()
+            self.patterns[pattern] = categories
+            self._pattern_ids.append(self._intern(pattern, categories))
+            regexes.append(f"(?P<p{len(regexes)}>{translate(pattern)})")
+        self._pattern_re: Optional[Pattern[str]] = re.compile("|".join(regexes)) if regexes else None
+
+    def lookup(self, name: str) -> int:
+        """Return the id for an imported API name (0 if uncategorized)."""
+        api_id = self._memo.get(name)
+        if api_id is None:
+            api_id = self.resolve(name)
+            if len(self._memo) >= _MEMO_LIMIT:
+                self._memo.clear()
+            self._memo[name] = api_id
+        return api_id
+
+    def resolve(self, name: str) -> int:
+        """
+        The id for an API name, like `lookup` but without remembering the
+        answer: for one-off candidates (e.g. strings found in a file) that
+        would otherwise crowd the memo of import names.
+        """
+        stripped = name.strip().lstrip("_")
+        for form in _fold_suffixes(stripped):
+            api_id = self._ids.get(form.lower())
+            if api_id is not None:
+                return api_id
+        if self._pattern_re is not None:
+            match = self._pattern_re.match(stripped.lower())
+            if match is not None:
+                return self._pattern_ids[int(match.lastgroup[1:])]
+        return 0
+
+    def categories_of(self, name: str) -> Tuple[str, ...]:
+        """Categories of an imported API name (("unknown",) if none)."""
+        return self.categories[self.lookup(name)]
+
+    def to_dict(self) -> Dict[str, object]:
+        """Compact serializable form: category names are stored once and referenced by index."""
+        category_names = sorted({c for cats in self.categories[1:] for c in cats})
+        index = {c: i for i, c in enumerate(category_names)}
+
+        def encode(cats: Tuple[str, ...]) -> Union[int, List[int]]:
+            return index[cats[0]] if len(cats) == 1 else [index[c] for c in cats]
+
+        entries = sorted(self._ids.items())
+        return {
+            "format": _TABLE_FORMAT,
+            "version": _TABLE_VERSION,
+            "categories": category_names,
+            "names": [name for name, _ in entries],
+            "members": [encode(self.categories[api_id]) for _, api_id in entries],
+            "patterns": [[p, encode(self.categories[i])] for p, i in zip(self.patterns, self._pattern_ids)],
+        }
+
+    def save(self, path: str | Path) -> None:
+        """Write the dictionary to a serialized table file."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+
+    @classmethod
+    def from_dict(cls, table: Dict[str, object]) -> "ApiDictionary":
+        """
+        Rebuild a dictionary from to_dict() output.
+
+        Raises:
+            ValueError: if the table has an unknown format or version.
+        """
+        if table.get("format") != _TABLE_FORMAT or table.get("version") != _TABLE_VERSION:
+            raise ValueError("Unsupported API table format")
+        category_names = table["categories"]
+        interned: Dict[object, Tuple[str, ...]] = {}
+
+        def decode(member: Union[int, List[int]]) -> Tuple[str, ...]:
+            key = member if isinstance(member, int) else tuple(member)
+            cats = interned.get(key)
+            if cats is None:
+                indexes = [member] if isinstance(member, int) else member
+                cats = interned[key] = tuple(category_names[i] for i in indexes)
+            return cats
+
+        self = cls.__new__(cls)
+        names = table["names"]
+        self.names = ["<unknown>"] + names
+        single = [(c,) for c in category_names]
+        self.categories = [("unknown",)] + [
+            single[m] if isinstance(m, int) else decode(m) for m in table["members"]
+        ]
+        self._ids = dict(zip(names, range(1, len(names) + 1)))
+        self._set_patterns({pattern: list(decode(member)) for pattern, member in table["patterns"]})
+        self._memo = {}
+        return self
+
+
+def load_api_dictionary(path: str | Path) -> ApiDictionary:
+    """
+    Load a serialized API table written by ApiDictionary.save().
+
+    Raises:
+        FileNotFoundError: if the file does not exist.
+        ValueError: if the file is not an API table.
+    """
+    path = Path(path)
+    if not path.is_file():
+        raise FileNotFoundError(f"API table not found: {path}")
+    with open(path, encoding="utf-8") as f:
+        return ApiDictionary.from_dict(json.load(f))
+
+
+@lru_cache(maxsize=None)
+def default_api_dictionary() -> ApiDictionary:
+    """The API dictionary used by categorize_imports, built once per process."""
+    if API_TABLE_PATH:
+        return load_api_dictionary(API_TABLE_PATH)
+    return ApiDictionary(API_CATEGORIES, API_PATTERNS)
+
+
+def categorize_imports(
+    imports: Dict[str, List[str]],
+    dictionary: Optional[ApiDictionary] = None,
+) -> Dict[str, List[str]]:
     """
     Take the raw imports dict and group functions by category.
 
+    A function that belongs to several categories is listed under each.
+
     Returns:
     {
         "file_io": ["CreateFileW", "ReadFile", ...],
@@ -82,12 +280,15 @@ def categorize_imports(imports: Dict[str, List[str]]) -> Dict[str, List[str]]:
         ...
     }
     """
+    if dictionary is None:
+        dictionary = default_api_dictionary()
+    lookup = dictionary.lookup
+    categories = dictionary.categories
     categorized: DefaultDict[str, List[str]] = defaultdict(list)
 
     for dll, funcs in imports.items():
         for func in funcs:
-            key = normalize_api_name(func)
-            category = API_CATEGORIES.get(key, "unknown")
-            categorized[category].append(func)
+            for category in categories[lookup(func)]:
+                categorized[category].append(func)
 
     return dict(categorized)
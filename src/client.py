@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import sys
+from typing import Dict, Optional, Tuple
+
+from .pe_parser import BACKENDS
+from .report import emit_report
+
+DEFAULT_SOCKET = "exeplain.sock"
+DEFAULT_TIMEOUT = 30.0
+
+
+def _connect(socket_path: Optional[str], server: Optional[str], timeout: float) -> socket.socket:
+    """
+    Open a connection to the server (TCP "host:port", else a Unix socket).
+
+    Raises:
+        ConnectionError: if nothing is listening there.
+    """
+    where = server or socket_path or DEFAULT_SOCKET
+    try:
+        if server:
+            host, _, port = server.rpartition(":")
+            return socket.create_connection((host or "127.0.0.1", int(port)), timeout=timeout)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(where)
+        return sock
+    except (OSError, ValueError) as e:
+        raise ConnectionError(f"cannot connect to {where}: {e}") from e
+
+
+def http_request(
+    sock: socket.socket,
+    method: str,
+    target: str,
+    body: bytes = b"",
+    headers: Optional[Dict[str, str]] = None,
+) -> Tuple[int, Dict[str, object]]:
+    """
+    Send one HTTP/1.1 request and read a JSON response (Content-Length framed).
+
+    Deliberately minimal (no http.client) to keep client start-up cheap.
+
+    Raises:
+        ConnectionError: if the server closes the connection early.
+        ValueError: if the response is malformed.
+    """
+    head = [f"{method} {target} HTTP/1.1", "Host: localhost", "Connection: close"]
+    if method == "POST":
+        head.append(f"Content-Length: {len(body)}")
+    head.extend(f"{k}: {v}" for k, v in (headers or {}).items())
+    sock.sendall(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+
+    stream = sock.makefile("rb")
+    status_line = stream.readline()
+    if not status_line:
+        raise ConnectionError("Server closed the connection")
+    status = int(status_line.split()[1])
+    length = None
+    for line in iter(stream.readline, b""):
+        if line in (b"\r\n", b"\n"):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        if key.strip().lower() == "content-length":
+            length = int(value)
+    data = stream.read(length) if length is not None else stream.read()
+    return status, json.loads(data)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.client",
+        description="Analyze a Windows executable through a running analysis server (python -m src.server).",
+    )
+    parser.add_argument("path", help="PE file (.exe or .dll) to analyze.")
+    parser.add_argument("--json", action="store_true", help="Output results in JSON format.")
+    parser.add_argument("--html", action="store_true", help="Generate HTML report file.")
+    parser.add_argument("--verbose", action="store_true", help="Enable detailed output with additional information.")
+    parser.add_argument("--backend", choices=BACKENDS, default=None, help="Import parser backend (default: the server's).")
+    parser.add_argument("--socket", metavar="PATH", help=f"Server Unix socket (default: {DEFAULT_SOCKET}).")
+    parser.add_argument("--server", metavar="HOST:PORT", help="Connect over TCP instead of a Unix socket.")
+    parser.add_argument("--upload", action="store_true",
+                        help="Send the file's bytes instead of its path (for servers that cannot see the file).")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT + 5, help="Seconds to wait for the server.")
+    return parser.parse_args(argv)
+
+
+def request_analysis(args: argparse.Namespace) -> Tuple[int, Dict[str, object]]:
+    """
+    Send one analysis request and return (HTTP status, decoded JSON body).
+
+    Raises:
+        FileNotFoundError: with --upload, if the file does not exist.
+        OSError: if the server cannot be reached or drops the connection.
+    """
+    if args.upload:
+        if not os.path.isfile(args.path):
+            raise FileNotFoundError(f"File not found: {args.path}")
+        with open(args.path, "rb") as f:
+            body = f.read()
+        target = "/analyze?include_imports=1" + (f"&backend={args.backend}" if args.backend else "")
+        headers = {"Content-Type": "application/octet-stream", "X-File-Name": args.path}
+    else:
+        request = {
+            "path": os.path.abspath(args.path),
+            "name": args.path,
+            "backend": args.backend,
+            "include_imports": True,
+        }
+        body = json.dumps(request).encode("utf-8")
+        target = "/analyze"
+        headers = {"Content-Type": "application/json"}
+
+    with _connect(args.socket, args.server, args.timeout) as sock:
+        return http_request(sock, "POST", target, body, headers)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    try:
+        status, data = request_analysis(args)
+    except FileNotFoundError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Could not reach analysis server: {e}", file=sys.stderr)
+        return 1
+
+    if status != 200:
+        error = data.get("error", {})
+        print(f"[ERROR] {error.get('message', f'Server returned HTTP {status}')}", file=sys.stderr)
+        return 1
+
+    imports = data.pop("imports", {})
+    cached = data.pop("cached", None)
+    capabilities = data["capabilities"]
+    descriptions = data["pattern_descriptions"]
+    patterns = [(pid, descriptions.get(pid, "")) for pid in data["detected_patterns"]]
+
+    if args.verbose:
+        print(f"[INFO] Parsed {len(imports)} DLLs with {sum(len(f) for f in imports.values())} total imports.")
+        print(f"[INFO] Detected {len(patterns)} behavior patterns.")
+        if cached is not None:
+            print(f"[INFO] Cache {'hit' if cached else 'miss'} (server).")
+        print()
+
+    output_format = "json" if args.json else "html" if args.html else "text"
+    emit_report(args.path, imports, capabilities, patterns, output_format, verbose=args.verbose)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
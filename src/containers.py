@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import io
+import tarfile
+import zipfile
+import zlib
+from typing import IO, Iterator, Optional
+
+# Archive traversal for batch scans: PE members of zip and tar archives
+# (tar optionally gzip/bzip2/xz compressed), including archives nested in
+# archives, are read into memory and analyzed without being extracted to
+# disk. Members are reported as "archive!member", nested ones as
+# "outer.zip!inner.tar!dir/member.exe".
+
+SEPARATOR = "!"
+
+DEFAULT_MAX_MEMBER_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_DEPTH = 4
+
+# Enough of a file to see the PE, zip, compression and ustar signatures.
+_PROBE_BYTES = 262
+
+_ZIP_MAGIC = (b"PK\x03\x04", b"PK\x05\x06")
+_COMPRESSED_MAGIC = (b"\x1f\x8b", b"BZh", b"\xfd7zXZ\x00")
+_TAR_MAGIC_OFFSET = 257
+
+# Failures reading an archive (or one zip member: encrypted, unsupported
+# compression, corrupt data).
+_READ_ERRORS = (
+    zipfile.BadZipFile, tarfile.TarError, zlib.error, EOFError, OSError,
+    RuntimeError, NotImplementedError,
+)
+
+
+class ContainerMember:
+    """
+    A PE candidate found in an archive: its "archive!member" name and either
+    its contents or, if it could not be read, an error message.
+    """
+
+    __slots__ = ("name", "data", "error")
+
+    def __init__(self, name: str, data: Optional[bytes] = None, error: Optional[str] = None):
+        self.name = name
+        self.data = data
+        self.error = error
+
+
+def is_pe_prefix(head: bytes) -> bool:
+    return head[:2] == b"MZ"
+
+
+def container_kind(head: bytes) -> Optional[str]:
+    """"zip" or "tar" from a file's first _PROBE_BYTES bytes, else None."""
+    if head[:4] in _ZIP_MAGIC:
+        return "zip"
+    if head.startswith(_COMPRESSED_MAGIC) or head[_TAR_MAGIC_OFFSET:_TAR_MAGIC_OFFSET + 5] == b"ustar":
+        # Compressed streams are assumed to be tarballs; tarfile says if not.
+        return "tar"
+    return None
+
+
+def is_container(path: str) -> bool:
+    """Whether the file at `path` starts like a zip or tar archive."""
+    try:
+        with open(path, "rb") as f:
+            return container_kind(f.read(_PROBE_BYTES)) is not None
+    except OSError:
+        return False
+
+
+def _read_limited(stream: IO[bytes], head: bytes, max_bytes: int) -> Optional[bytes]:
+    """The rest of `stream` after `head`, or None if it exceeds max_bytes."""
+    rest = stream.read(max_bytes - len(head) + 1)
+    if len(head) + len(rest) > max_bytes:
+        return None
+    return head + rest
+
+
+def _classify(
+    name: str,
+    stream: IO[bytes],
+    declared_size: int,
+    depth: int,
+    max_member_bytes: int,
+    max_depth: int,
+) -> Iterator[ContainerMember]:
+    """
+    Probe one member's first bytes and decompress the rest only if it is a
+    PE or a nested archive; everything else is skipped unread.
+    """
+    head = stream.read(_PROBE_BYTES)
+    pe = is_pe_prefix(head)
+    kind = None if pe else container_kind(head)
+    if not pe and (kind is None or depth >= max_depth):
+        return
+    # The declared size is checked first, the actual size while reading,
+    # since archive headers can lie.
+    data = None
+    if declared_size <= max_member_bytes:
+        data = _read_limited(stream, head, max_member_bytes)
+    if data is None:
+        if pe:
+            yield ContainerMember(name, error=f"Member larger than {max_member_bytes} bytes")
+        return
+    if pe:
+        yield ContainerMember(name, data)
+    else:
+        yield from _iter_archive(name, io.BytesIO(data), kind, depth + 1, max_member_bytes, max_depth)
+
+
+def _iter_archive(
+    name: str,
+    fileobj: IO[bytes],
+    kind: str,
+    depth: int,
+    max_member_bytes: int,
+    max_depth: int,
+) -> Iterator[ContainerMember]:
+    try:
+        if kind == "zip":
+            with zipfile.ZipFile(fileobj) as archive:
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    member = f"{name}{SEPARATOR}{info.filename}"
+                    try:
+                        with archive.open(info) as stream:
+                            yield from _classify(member, stream, info.file_size, depth, max_member_bytes, max_depth)
+                    except _READ_ERRORS as e:
+                        yield ContainerMember(member, error=f"Cannot read member: {e}")
+        else:
+            # Stream mode reads the tarball front to back exactly once.
+            with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+                for info in archive:
+                    if not info.isfile():
+                        continue
+                    stream = archive.extractfile(info)
+                    member = f"{name}{SEPARATOR}{info.name}"
+                    yield from _classify(member, stream, info.size, depth, max_member_bytes, max_depth)
+    except _READ_ERRORS as e:
+        # Members read before the damage have already been yielded.
+        yield ContainerMember(name, error=f"Cannot read {kind} archive: {e}")
+
+
+def iter_container(
+    path: str,
+    max_member_bytes: int = DEFAULT_MAX_MEMBER_BYTES,
+    max_depth: int = DEFAULT_MAX_DEPTH,
+) -> Iterator[ContainerMember]:
+    """
+    Yield the PE members of the archive at `path`, descending into nested
+    archives up to `max_depth` levels.
+
+    Only each member's first few bytes are decompressed to decide whether
+    it is a PE ("MZ") or a nested archive; other members are skipped.
+    Members (and nested archives) over `max_member_bytes` are not read: an
+    oversized PE is yielded with an error instead of data. An unreadable
+    or corrupt archive yields one member named after the archive with an
+    error.
+
+    Raises:
+        FileNotFoundError: if the file does not exist.
+    """
+    with open(path, "rb") as f:
+        kind = container_kind(f.read(_PROBE_BYTES))
+        if kind is None:
+            yield ContainerMember(path, error="Not a zip or tar archive")
+            return
+        f.seek(0)
+        yield from _iter_archive(path, f, kind, 0, max_member_bytes, max_depth)
+
+
+def find_member(
+    name: str,
+    max_member_bytes: int = DEFAULT_MAX_MEMBER_BYTES,
+    max_depth: int = DEFAULT_MAX_DEPTH,
+) -> Optional[ContainerMember]:
+    """
+    The member an "archive!member" name (as yielded by iter_container)
+    refers to, read again from its archive; None if the archive no longer
+    holds it.
+
+    Raises:
+        FileNotFoundError: if the archive does not exist.
+    """
+    archive = name.split(SEPARATOR, 1)[0]
+    for member in iter_container(archive, max_member_bytes=max_member_bytes, max_depth=max_depth):
+        if member.name == name:
+            return member
+    return None
@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .pe_parser import BACKENDS, PEParseError
+from .cache import DEFAULT_MAX_BYTES, ResultCache
+from .pipeline import run_pipeline
+from .similarity import _dll_stem
+
+# A corpus export is a directory holding a sparse file x API incidence
+# matrix twice, as CSR rows (file -> sorted API ids) and as CSC columns
+# (API -> sorted file ids), in .npy files that are memory-mapped on open:
+#
+#   meta.json           format version and sizes
+#   files.json          file names, by file id
+#   apis.json           "DLL!Function" names, by API id
+#   indptr.npy          int64[files + 1]; row i is indices[indptr[i]:indptr[i + 1]]
+#   indices.npy         int32[nnz]
+#   api_indptr.npy      int64[apis + 1]; column j is api_indices[api_indptr[j]:...]
+#   api_indices.npy     int32[nnz]
+#
+# Queries only slice these arrays and combine them with numpy set
+# operations, so their cost depends on posting-list lengths, not on the
+# number of files.
+
+FORMAT = "1"
+
+
+def api_name(dll: str, func: str) -> str:
+    """Column name of an import: DLL stem (uppercase, .dll dropped) + "!" + function."""
+    return f"{_dll_stem(dll).upper()}!{func}"
+
+
+class CorpusWriter:
+    """
+    Build a corpus export incrementally: add() one file's imports at a
+    time, then close() to write the CSR/CSC arrays.
+
+    Row data is spooled to a temporary file as it arrives, so memory holds
+    only the API name table and the row offsets.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.files: List[str] = []
+        self._api_ids: Dict[str, int] = {}
+        self._indptr = array("q", [0])
+        self._spool = tempfile.TemporaryFile(dir=self.path)
+
+    def add(self, file: str, imports: Dict[str, List[str]]) -> None:
+        intern = self._api_ids.setdefault
+        row = sorted({
+            intern(api_name(dll, func), len(self._api_ids))
+            for dll, funcs in imports.items()
+            for func in funcs
+        })
+        array("i", row).tofile(self._spool)
+        self._indptr.append(self._indptr[-1] + len(row))
+        self.files.append(file)
+
+    def close(self) -> Dict[str, int]:
+        """Write the export and return its sizes."""
+        self._spool.seek(0)
+        indices = np.fromfile(self._spool, dtype=np.int32)
+        self._spool.close()
+        indptr = np.frombuffer(self._indptr, dtype=np.int64)
+        n_apis = len(self._api_ids)
+
+        # Transpose: a stable sort by API id keeps each column's file ids sorted.
+        rows = np.repeat(np.arange(len(self.files), dtype=np.int32), np.diff(indptr))
+        order = np.argsort(indices, kind="stable")
+        api_indices = rows[order]
+        api_indptr = np.zeros(n_apis + 1, dtype=np.int64)
+        np.cumsum(np.bincount(indices, minlength=n_apis), out=api_indptr[1:])
+
+        np.save(self.path / "indptr.npy", indptr)
+        np.save(self.path / "indices.npy", indices)
+        np.save(self.path / "api_indptr.npy", api_indptr)
+        np.save(self.path / "api_indices.npy", api_indices)
+        apis = sorted(self._api_ids, key=self._api_ids.__getitem__)
+        with open(self.path / "files.json", "w", encoding="utf-8") as f:
+            json.dump(self.files, f)
+        with open(self.path / "apis.json", "w", encoding="utf-8") as f:
+            json.dump(apis, f)
+        meta = {"format": FORMAT, "files": len(self.files), "apis": n_apis, "nnz": int(len(indices))}
+        with open(self.path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        return meta
+
+    def __enter__(self) -> "CorpusWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._spool.close()
+
+
+class Corpus:
+    """
+    Read-only, memory-mapped view of a corpus export.
+
+    APIs are named "DLL!Function" ("WS2_32!connect"); lookups ignore case
+    and a ".dll" suffix, and a bare function name stands for that function
+    from any DLL.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        with open(self.path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT:
+            raise ValueError(f"Unsupported corpus format {meta.get('format')!r} in {self.path}")
+        with open(self.path / "files.json", encoding="utf-8") as f:
+            self.files: List[str] = json.load(f)
+        with open(self.path / "apis.json", encoding="utf-8") as f:
+            self.apis: List[str] = json.load(f)
+        self.indptr = np.load(self.path / "indptr.npy", mmap_mode="r")
+        self.indices = np.load(self.path / "indices.npy", mmap_mode="r")
+        self.api_indptr = np.load(self.path / "api_indptr.npy", mmap_mode="r")
+        self.api_indices = np.load(self.path / "api_indices.npy", mmap_mode="r")
+
+        self._by_name: Dict[str, List[int]] = {}
+        for api_id, name in enumerate(self.apis):
+            key = name.lower()
+            self._by_name.setdefault(key, []).append(api_id)
+            self._by_name.setdefault(key.partition("!")[2], []).append(api_id)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def api_ids(self, spec: str) -> List[int]:
+        """Ids of the APIs matching "DLL!Function" or a bare "Function"."""
+        dll, sep, func = spec.partition("!")
+        key = f"{_dll_stem(dll)}!{func}".lower() if sep else spec.lower()
+        return self._by_name.get(key, [])
+
+    def postings(self, spec: str) -> np.ndarray:
+        """Sorted ids of the files importing `spec` (any matching API)."""
+        ids = self.api_ids(spec)
+        if not ids:
+            return np.empty(0, dtype=np.int32)
+        lists = [self.api_indices[self.api_indptr[i]:self.api_indptr[i + 1]] for i in ids]
+        if len(lists) == 1:
+            return np.asarray(lists[0])
+        return np.unique(np.concatenate(lists))
+
+    def files_with_all(self, specs: Sequence[str], without: Sequence[str] = ()) -> np.ndarray:
+        """File ids importing every API in `specs` and none in `without`."""
+        # Intersect the shortest posting lists first.
+        lists = sorted((self.postings(spec) for spec in specs), key=len)
+        if not lists:
+            result = np.arange(len(self.files), dtype=np.int32)
+        else:
+            result = lists[0]
+            for other in lists[1:]:
+                if not len(result):
+                    break
+                result = np.intersect1d(result, other, assume_unique=True)
+        for spec in without:
+            result = np.setdiff1d(result, self.postings(spec), assume_unique=True)
+        return result
+
+    def frequencies(self) -> np.ndarray:
+        """Number of files importing each API, by API id."""
+        return np.diff(self.api_indptr)
+
+    def top_apis(
+        self,
+        k: int = 20,
+        category: Optional[str] = None,
+        dll: Optional[str] = None,
+        files: Optional[np.ndarray] = None,
+    ) -> List[Tuple[str, int]]:
+        """
+        The k APIs imported by the most files, as (name, file count).
+
+        `category` keeps only APIs that categorize_imports would put in that
+        category ("unknown" for uncategorized APIs), `dll` only APIs of
+        that DLL, and `files` counts within a subset of file ids only.
+        """
+        if files is None:
+            counts = self.frequencies()
+        else:
+            # Per column, count the postings that fall in the subset.
+            member = np.zeros(len(self.files), dtype=bool)
+            member[files] = True
+            hits = np.concatenate(([0], np.cumsum(member[self.api_indices])))
+            counts = hits[self.api_indptr[1:]] - hits[self.api_indptr[:-1]]
+        mask = np.ones(len(self.apis), dtype=bool)
+        if dll is not None:
+            prefix = _dll_stem(dll).upper() + "!"
+            mask &= np.fromiter((name.startswith(prefix) for name in self.apis), bool, len(self.apis))
+        if category is not None:
+            from .categorize import default_api_dictionary
+
+            dictionary = default_api_dictionary()
+            mask &= np.fromiter(
+                (category in dictionary.categories_of(name.partition("!")[2]) for name in self.apis),
+                bool,
+                len(self.apis),
+            )
+        counts = np.where(mask, counts, 0)
+        k = min(k, int(np.count_nonzero(counts)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-counts, k - 1)[:k]
+        top = top[np.lexsort((top, -counts[top]))]
+        return [(self.apis[i], int(counts[i])) for i in top]
+
+    def file_apis(self, file_id: int) -> List[str]:
+        """The APIs imported by one file."""
+        return [self.apis[i] for i in self.indices[self.indptr[file_id]:self.indptr[file_id + 1]]]
+
+
+def _imports_of(
+    path: str,
+    cache: Optional[ResultCache] = None,
+    **options: object,
+) -> List[Dict[str, object]]:
+    """scan_files worker for exports: one {"file", "imports"} or error record."""
+    try:
+        result = run_pipeline(path, cache, **options)
+    except (FileNotFoundError, PEParseError) as e:
+        return [{"file": path, "error": str(e)}]
+    except Exception as e:
+        return [{"file": path, "error": f"Unexpected error: {e}"}]
+    return [{"file": path, "imports": result["imports"]}]
+
+
+def export_files(
+    out: str | Path,
+    paths: Iterable[str],
+    workers: Optional[int] = None,
+    cache_path: Optional[str] = None,
+    cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    backend: Optional[str] = None,
+) -> Iterator[Dict[str, object]]:
+    """
+    Parse `paths` on the batch worker pool (reusing the result cache if
+    given) and write their imports as a corpus export to `out`. Yields the
+    error records of files that could not be parsed; the export is written
+    once the iterator is exhausted.
+    """
+    from .batch import scan_files
+
+    records = scan_files(
+        paths,
+        workers=workers,
+        cache_path=cache_path,
+        cache_max_bytes=cache_max_bytes,
+        options={"backend": backend},
+        analyze=_imports_of,
+    )
+    with CorpusWriter(out) as writer:
+        for record in records:
+            if "error" in record:
+                yield record
+            else:
+                writer.add(record["file"], record["imports"])
+
+
+def main(argv: List[str] | None = None) -> int:
+    from .batch import iter_input_files
+
+    parser = argparse.ArgumentParser(
+        prog="python -m src.corpus",
+        description="Export imports of many files as a sparse matrix and query it.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Parse files and write a corpus export directory.")
+    build.add_argument("corpus", help="Output directory.")
+    build.add_argument("paths", nargs="*", metavar="path", help="Files, directories or glob patterns.")
+    build.add_argument("--files-from", metavar="FILE", help="Read more paths from FILE ('-' for stdin).")
+    build.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    build.add_argument("--backend", choices=BACKENDS, default=None, help="Import parser backend.")
+    build.add_argument("--cache", metavar="DB", help="Reuse (and fill) this result cache.")
+
+    query = sub.add_parser("files", help="List files importing all of the given APIs.")
+    query.add_argument("corpus", help="Corpus export directory.")
+    query.add_argument("apis", nargs="+", metavar="api", help='"DLL!Function" or a bare function name.')
+    query.add_argument("--without", nargs="+", default=[], metavar="api", help="Exclude files importing these.")
+    query.add_argument("--count", action="store_true", help="Print only the number of matching files.")
+
+    top = sub.add_parser("top", help="Most frequently imported APIs.")
+    top.add_argument("corpus", help="Corpus export directory.")
+    top.add_argument("-k", "--top-k", type=int, default=20, help="Number of APIs (default: 20).")
+    top.add_argument("--category", help='Only APIs in this category (e.g. "unknown").')
+    top.add_argument("--dll", help="Only APIs imported from this DLL.")
+    top.add_argument("--among", nargs="+", default=[], metavar="api", help="Only count files importing these.")
+    top.add_argument("--json", action="store_true", help="Output results in JSON format.")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        if not args.paths and args.files_from is None:
+            parser.error("at least one path (or --files-from) is required")
+        errors = 0
+        paths = iter_input_files(args.paths, args.files_from)
+        for record in export_files(args.corpus, paths, args.workers, args.cache, backend=args.backend):
+            errors += 1
+            print(f"[ERROR] {record['error']}", file=sys.stderr)
+        corpus = Corpus(args.corpus)
+        print(
+            f"[INFO] Exported {len(corpus)} files x {len(corpus.apis)} APIs "
+            f"({len(corpus.indices)} entries, {errors} errors) to {args.corpus}.",
+            file=sys.stderr,
+        )
+        return 0
+
+    if not os.path.isfile(os.path.join(args.corpus, "meta.json")):
+        print(f"[ERROR] Corpus not found: {args.corpus}", file=sys.stderr)
+        return 1
+    corpus = Corpus(args.corpus)
+
+    if args.command == "files":
+        ids = corpus.files_with_all(args.apis, without=args.without)
+        if args.count:
+            print(len(ids))
+        else:
+            for i in ids:
+                print(corpus.files[i])
+        return 0
+
+    among = corpus.files_with_all(args.among) if args.among else None
+    ranked = corpus.top_apis(args.top_k, category=args.category, dll=args.dll, files=among)
+    if args.json:
+        print(json.dumps([{"api": name, "files": count} for name, count in ranked], indent=2))
+    else:
+        for name, count in ranked:
+            print(f"{count:>10}  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
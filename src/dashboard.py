@@ -0,0 +1,523 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import html
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .report import RecordWriter
+
+# A corpus dashboard is a directory that a static page browses without
+# ever loading the whole scan:
+#
+#   index.html              the page (no external assets)
+#   meta.json               totals, capability and pattern names, facet sizes
+#   data/all/00000.json.gz  compact rows, `page_rows` per page, in scan order
+#   data/c<i>/...           the same rows, only files with capability i
+#   data/p<i>/...           only files matching behavior pattern i
+#   data/errors/...         only files that failed to parse
+#   data/records/...        the full batch records, for the per-file view
+#
+# Each facet is written as its own sequence of pages while records stream
+# in, so a filter on one capability or pattern is one fetch per page and
+# the generator holds at most one unfinished page per facet. Filters on
+# several facets walk the smallest one and test the rest per row. A
+# compact row is [id, file, total imports, DLL count, [capability
+# indexes], [pattern indexes], error message or null]; `id` locates the
+# full record (page id // page_rows, entry id % page_rows).
+#
+# The page fetches its data, so serve the directory over HTTP
+# (python -m http.server -d DIR); browsers block fetch() from file:// URLs.
+
+FORMAT = "1"
+DEFAULT_PAGE_ROWS = 1000
+META_FILE = "meta.json"
+DATA_DIR = "data"
+
+# Facets with their own pages besides one per capability and pattern.
+ALL_FACET = "all"
+ERRORS_FACET = "errors"
+_RECORDS = "records"
+
+
+class DashboardError(Exception):
+    """An output directory that is not (and cannot become) a dashboard."""
+    pass
+
+
+def _write_page(path: Path, rows: List[object]) -> None:
+    blob = json.dumps(rows, separators=(",", ":")).encode("utf-8")
+    path.write_bytes(gzip.compress(blob, compresslevel=6, mtime=0))
+
+
+class _Pages:
+    """One facet (or the record store): rows buffered up to a page, then written."""
+
+    __slots__ = ("directory", "page_rows", "rows", "count", "pages")
+
+    def __init__(self, directory: Path, page_rows: int):
+        self.directory = directory
+        self.page_rows = page_rows
+        self.rows: List[object] = []
+        self.count = 0
+        self.pages = 0
+        directory.mkdir(parents=True)
+
+    def add(self, row: object) -> None:
+        self.rows.append(row)
+        self.count += 1
+        if len(self.rows) >= self.page_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.rows:
+            _write_page(self.directory / f"{self.pages:05d}.json.gz", self.rows)
+            self.pages += 1
+            self.rows = []
+
+
+def _is_dashboard(directory: Path) -> bool:
+    """Whether `directory` holds a meta.json written by this module."""
+    try:
+        with open(directory / META_FILE, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return isinstance(meta, dict) and meta.get("format") == FORMAT
+
+
+class DashboardWriter(RecordWriter):
+    """
+    Write batch records as a dashboard directory (see the layout above).
+
+    Memory stays bounded by one page of rows per facet, whatever the
+    number of records. meta.json and index.html are written on close, so
+    an interrupted run leaves no page that claims to be complete. An
+    existing dashboard in `directory` (one whose meta.json has this
+    FORMAT) is replaced.
+
+    Raises:
+        DashboardError: if `directory` exists, is not empty and is not a
+            dashboard.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        title: str = "PE Batch Analysis Dashboard",
+        page_rows: int = DEFAULT_PAGE_ROWS,
+    ):
+        super().__init__(None)  # type: ignore[arg-type]
+        if page_rows < 1:
+            raise ValueError("page_rows must be at least 1")
+        self.directory = Path(directory)
+        self.title = title
+        self.page_rows = page_rows
+        self.errors = 0
+        if self.directory.is_dir() and any(self.directory.iterdir()):
+            if not _is_dashboard(self.directory):
+                raise DashboardError(f"Not empty and not a dashboard: {self.directory}")
+            (self.directory / META_FILE).unlink()
+            shutil.rmtree(self.directory / DATA_DIR, ignore_errors=True)
+        self._data = self.directory / DATA_DIR
+        self._facets: Dict[str, _Pages] = {}
+        self._records = _Pages(self._data / _RECORDS, page_rows)
+        self._all = self._facet(ALL_FACET)
+        # Capability and pattern names -> index, in order of first appearance.
+        self._capabilities: Dict[str, int] = {}
+        self._patterns: Dict[str, int] = {}
+        self._descriptions: Dict[str, Dict[str, str]] = {"capabilities": {}, "patterns": {}}
+
+    def _facet(self, key: str) -> _Pages:
+        pages = self._facets.get(key)
+        if pages is None:
+            pages = self._facets[key] = _Pages(self._data / key, self.page_rows)
+        return pages
+
+    def _intern(self, names: Dict[str, int], name: str) -> int:
+        index = names.get(name)
+        if index is None:
+            index = names[name] = len(names)
+        return index
+
+    def write(self, record: Dict[str, object]) -> None:
+        row_id = self.count
+        error: Optional[Dict[str, str]] = record.get("error")  # type: ignore[assignment]
+        capabilities: List[int] = []
+        patterns: List[int] = []
+        if error:
+            self.errors += 1
+            message = f"{error.get('type', 'Error')}: {error.get('message', '')}"
+            row = [row_id, str(record.get("file", "")), 0, 0, capabilities, patterns, message]
+        else:
+            for category, info in record.get("capabilities", {}).items():  # type: ignore[union-attr]
+                if info.get("present"):
+                    capabilities.append(self._intern(self._capabilities, category))
+                    self._descriptions["capabilities"].setdefault(category, str(info.get("description", "")))
+            descriptions = record.get("pattern_descriptions", {})
+            for pid in record.get("detected_patterns", []):  # type: ignore[union-attr]
+                patterns.append(self._intern(self._patterns, pid))
+                self._descriptions["patterns"].setdefault(pid, str(descriptions.get(pid) or ""))  # type: ignore[union-attr]
+            row = [
+                row_id,
+                str(record.get("file", "")),
+                record.get("total_imports", 0),
+                len(record.get("imported_dlls", ())),  # type: ignore[arg-type]
+                capabilities,
+                patterns,
+                None,
+            ]
+
+        self._records.add(record)
+        self._all.add(row)
+        if error:
+            self._facet(ERRORS_FACET).add(row)
+        for index in capabilities:
+            self._facet(f"c{index}").add(row)
+        for index in patterns:
+            self._facet(f"p{index}").add(row)
+        self.count += 1
+
+    def meta(self) -> Dict[str, object]:
+        """The meta.json contents for the records written so far."""
+
+        def named(names: Dict[str, int], prefix: str, kind: str) -> List[Dict[str, object]]:
+            return [
+                {"name": name, "description": self._descriptions[kind][name], "files": self._facets[f"{prefix}{i}"].count}
+                for name, i in names.items()
+            ]
+
+        return {
+            "format": FORMAT,
+            "title": self.title,
+            "rows": self.count,
+            "errors": self.errors,
+            "page_rows": self.page_rows,
+            "capabilities": named(self._capabilities, "c", "capabilities"),
+            "patterns": named(self._patterns, "p", "patterns"),
+            "facets": {key: {"rows": pages.count, "pages": pages.pages} for key, pages in self._facets.items()},
+        }
+
+    def close(self) -> None:
+        for pages in self._facets.values():
+            pages.flush()
+        self._records.flush()
+        _replace_text(self.directory / "index.html", render_index(self.title))
+        _replace_text(self.directory / META_FILE, json.dumps(self.meta(), indent=1))
+
+
+def _replace_text(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def read_page(directory: str | Path, facet: str, page: int) -> List[object]:
+    """Rows of one data page (facet ALL_FACET, ERRORS_FACET, c<i>, p<i> or "records")."""
+    path = Path(directory) / DATA_DIR / facet / f"{page:05d}.json.gz"
+    return json.loads(gzip.decompress(path.read_bytes()))
+
+
+def write_dashboard(
+    directory: str | Path,
+    records: Iterable[Dict[str, object]],
+    title: str = "PE Batch Analysis Dashboard",
+    page_rows: int = DEFAULT_PAGE_ROWS,
+) -> Dict[str, object]:
+    """Write `records` as a dashboard and return its meta.json contents."""
+    writer = DashboardWriter(directory, title=title, page_rows=page_rows)
+    for record in records:
+        writer.write(record)
+    writer.close()
+    return writer.meta()
+
+
+def iter_ndjson(paths: List[str]) -> Iterator[Dict[str, object]]:
+    """
+    Records from NDJSON batch outputs ('-' for stdin), one line at a time.
+
+    Raises:
+        ValueError: on a line that is not a JSON object.
+    """
+    for path in paths:
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+        try:
+            for number, line in enumerate(stream, 1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError(f"{path}:{number}: not a batch record")
+                yield record
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+
+def render_index(title: str) -> str:
+    """The dashboard page; all data comes from meta.json and the data pages."""
+    return _INDEX_TEMPLATE.replace("{title}", html.escape(title))
+
+
+_INDEX_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset='utf-8'>
+<title>{title}</title>
+<style>
+body { font-family: Arial, sans-serif; margin: 20px; }
+h1 { color: #333; }
+.controls { margin: 10px 0; display: flex; flex-wrap: wrap; gap: 12px; align-items: center; }
+table { width: 100%; border-collapse: collapse; margin: 10px 0; }
+th, td { padding: 6px; text-align: left; border-bottom: 1px solid #ddd; vertical-align: top; }
+th { background-color: #f5f5f5; position: sticky; top: 0; }
+tbody tr { cursor: pointer; }
+tbody tr:hover { background-color: #eef5fc; }
+.error { color: #a00; }
+#detail { margin: 10px 0; padding: 10px; background-color: #f5f5f5; border-left: 4px solid #0078d4; }
+.capability { margin: 6px 0; }
+.pattern { margin: 6px 0; padding: 6px; background-color: #fff3cd; border-left: 4px solid #ffc107; }
+pre { white-space: pre-wrap; word-break: break-all; }
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p id="summary">Loading...</p>
+<div class="controls">
+<label>Capability <select id="capability"><option value="">(any)</option></select></label>
+<label>Pattern <select id="pattern"><option value="">(any)</option></select></label>
+<label><input type="checkbox" id="errors"> Errors only</label>
+<button id="prev">&larr; Previous</button>
+<label>Page <input id="page" type="number" min="1" value="1" style="width: 6em"></label>
+<span id="position"></span>
+<button id="next">Next &rarr;</button>
+</div>
+<div id="detail" hidden></div>
+<table>
+<thead><tr><th>#</th><th>File</th><th>Total Imports</th><th>DLLs</th><th>Capabilities</th><th>Detected Patterns</th></tr></thead>
+<tbody id="rows"></tbody>
+</table>
+<script>
+"use strict";
+const CACHED_PAGES = 64;
+const $ = (id) => document.getElementById(id);
+const cache = new Map();
+let meta = null;
+let page = 0;
+let scan = null;
+
+function el(tag, text, className) {
+  const node = document.createElement(tag);
+  if (text !== undefined) node.textContent = text;
+  if (className) node.className = className;
+  return node;
+}
+
+// Data pages are gzipped JSON; the most recently used ones stay in memory.
+function load(facet, number) {
+  const path = "data/" + facet + "/" + String(number).padStart(5, "0") + ".json.gz";
+  let value = cache.get(path);
+  if (value) {
+    cache.delete(path);
+  } else {
+    value = fetch(path).then((response) => {
+      if (!response.ok) throw new Error(path + ": HTTP " + response.status);
+      return new Response(response.body.pipeThrough(new DecompressionStream("gzip"))).json();
+    });
+    value.catch(() => cache.delete(path));
+  }
+  cache.set(path, value);
+  if (cache.size > CACHED_PAGES) cache.delete(cache.keys().next().value);
+  return value;
+}
+
+function filters() {
+  const keys = [];
+  if ($("capability").value !== "") keys.push("c" + $("capability").value);
+  if ($("pattern").value !== "") keys.push("p" + $("pattern").value);
+  if ($("errors").checked) keys.push("errors");
+  return keys;
+}
+
+function facetRows(key) {
+  return (meta.facets[key] || {rows: 0}).rows;
+}
+
+function matches(row, key) {
+  if (key === "errors") return row[6] !== null;
+  const index = Number(key.slice(1));
+  return (key[0] === "c" ? row[4] : row[5]).includes(index);
+}
+
+// One facet maps straight onto its pages. For several, walk the smallest
+// facet and test the others per row, as far as the page asked for. Only the
+// number of matches before each driver page is kept (counts[p]), so memory
+// does not grow with the matches; a page of results re-reads the few
+// driver pages that hold it, usually from the page cache.
+async function rowsOf(number) {
+  const keys = filters();
+  if (keys.length <= 1) {
+    const key = keys[0] || "all";
+    const total = facetRows(key);
+    const rows = number * meta.page_rows < total ? await load(key, number) : [];
+    return {rows: rows, total: total, exact: true};
+  }
+  const id = keys.join("&");
+  if (!scan || scan.id !== id) {
+    keys.sort((a, b) => facetRows(a) - facetRows(b));
+    scan = {id: id, driver: keys[0], rest: keys.slice(1), counts: [0]};
+  }
+  const current = scan;
+  const counts = current.counts;
+  const matching = async (p) =>
+    (await load(current.driver, p)).filter((row) => current.rest.every((key) => matches(row, key)));
+  const first = number * meta.page_rows;
+  const need = first + meta.page_rows;
+  const pages = Math.ceil(facetRows(current.driver) / meta.page_rows);
+  while (counts[counts.length - 1] < need && counts.length - 1 < pages) {
+    const p = counts.length - 1;
+    counts.push(counts[p] + (await matching(p)).length);
+  }
+  const scanned = counts.length - 1;
+  const rows = [];
+  let p = 0;
+  while (p < scanned && counts[p + 1] <= first) p++;
+  for (; p < scanned && counts[p] < need; p++) {
+    const found = await matching(p);
+    const from = Math.max(first - counts[p], 0);
+    rows.push(...found.slice(from, from + need - first - rows.length));
+  }
+  return {rows: rows, total: counts[scanned], exact: scanned >= pages};
+}
+
+function names(list, indexes) {
+  return indexes.map((i) => list[i].name).join(", ");
+}
+
+async function show(number) {
+  page = Math.max(0, number);
+  const result = await rowsOf(page);
+  const body = document.createDocumentFragment();
+  for (const row of result.rows) {
+    const tr = el("tr");
+    tr.append(el("td", String(row[0] + 1)), el("td", row[1]));
+    if (row[6] !== null) {
+      const td = el("td", row[6], "error");
+      td.colSpan = 4;
+      tr.append(td);
+    } else {
+      tr.append(el("td", String(row[2])), el("td", String(row[3])),
+                el("td", names(meta.capabilities, row[4]) || "None"),
+                el("td", names(meta.patterns, row[5]) || "None"));
+    }
+    tr.addEventListener("click", () => detail(row[0]));
+    body.append(tr);
+  }
+  $("rows").replaceChildren(body);
+  const pages = Math.max(1, Math.ceil(result.total / meta.page_rows));
+  $("page").value = page + 1;
+  $("position").textContent = "of " + (result.exact ? "" : "at least ") + pages +
+    " (" + (result.exact ? "" : "at least ") + result.total + " files)";
+  $("prev").disabled = page === 0;
+  $("next").disabled = result.exact && page + 1 >= pages;
+}
+
+async function detail(id) {
+  const records = await load("records", Math.floor(id / meta.page_rows));
+  const record = records[id % meta.page_rows];
+  const box = $("detail");
+  box.replaceChildren(el("h2", record.file));
+  if (record.error) {
+    box.append(el("p", record.error.type + ": " + record.error.message, "error"));
+  } else {
+    box.append(el("p", "Total Imported APIs: " + record.total_imports));
+    box.append(el("p", "Imported DLLs: " + ((record.imported_dlls || []).join(", ") || "None")));
+    box.append(el("h3", "Capability Summary"));
+    for (const [category, info] of Object.entries(record.capabilities || {})) {
+      if (!info.present) continue;
+      box.append(el("div", category + ": " + info.description + " (count=" + info.count +
+                    ", examples: " + ((info.examples || []).join(", ") || "N/A") + ")", "capability"));
+    }
+    box.append(el("h3", "Detected Behavior Patterns"));
+    for (const pid of record.detected_patterns || []) {
+      const text = (record.pattern_descriptions || {})[pid];
+      box.append(el("div", text ? pid + ": " + text : pid, "pattern"));
+    }
+    if (!(record.detected_patterns || []).length) box.append(el("p", "None detected."));
+  }
+  box.append(el("h3", "Record"), el("pre", JSON.stringify(record, null, 2)));
+  const close = el("button", "Close");
+  close.addEventListener("click", () => { box.hidden = true; });
+  box.append(close);
+  box.hidden = false;
+  box.scrollIntoView();
+}
+
+function fail(error) {
+  $("summary").replaceChildren(el("span", String(error) +
+    " (serve this directory over HTTP, e.g. python -m http.server -d DIR)", "error"));
+}
+
+async function main() {
+  const response = await fetch("meta.json");
+  if (!response.ok) throw new Error("meta.json: HTTP " + response.status);
+  meta = await response.json();
+  $("summary").textContent = meta.rows + " files, " + meta.errors + " errors.";
+  for (const [id, list] of [["capability", meta.capabilities], ["pattern", meta.patterns]]) {
+    list.forEach((entry, i) => {
+      const option = el("option", entry.name + " (" + entry.files + ")");
+      option.value = i;
+      option.title = entry.description;
+      $(id).append(option);
+    });
+  }
+  const refilter = () => show(0).catch(fail);
+  $("capability").addEventListener("change", refilter);
+  $("pattern").addEventListener("change", refilter);
+  $("errors").addEventListener("change", refilter);
+  $("prev").addEventListener("click", () => show(page - 1).catch(fail));
+  $("next").addEventListener("click", () => show(page + 1).catch(fail));
+  $("page").addEventListener("change", () => show(Number($("page").value) - 1).catch(fail));
+  await show(0);
+}
+
+main().catch(fail);
+</script>
+</body>
+</html>
+"""
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.dashboard",
+        description="Build a corpus dashboard from NDJSON batch results.",
+    )
+    parser.add_argument("directory", help="Output directory.")
+    parser.add_argument("results", nargs="+", help="NDJSON batch outputs ('-' for stdin).")
+    parser.add_argument("--title", default="PE Batch Analysis Dashboard", help="Page title.")
+    parser.add_argument("--page-rows", type=int, default=DEFAULT_PAGE_ROWS,
+                        help=f"Rows per data page (default: {DEFAULT_PAGE_ROWS}).")
+    args = parser.parse_args(argv)
+    if args.page_rows < 1:
+        parser.error("--page-rows must be at least 1")
+
+    try:
+        meta = write_dashboard(args.directory, iter_ndjson(args.results), title=args.title, page_rows=args.page_rows)
+    except (OSError, ValueError, DashboardError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    print(
+        f"[INFO] Wrote a dashboard of {meta['rows']} files ({meta['errors']} errors) to {args.directory}.",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
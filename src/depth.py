@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import struct
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from .pe_parser import Buffer, Imports, PEParseError, _open_source
+from .pe_reader import (
+    MAX_DLL_LENGTH,
+    _Image,
+    _SymbolBudget,
+    _parse_headers,
+    _read_exports,
+    _walk_descriptors,
+)
+from .profiling import StageProfile, stage_timer
+
+# Analysis depth: which data directories beyond the import table are read.
+#
+#   imports   the import table only (the default; same work as before)
+#   standard  + delay-load imports and the export table
+#   full      + bound imports and a resource summary
+#
+# Each analyzer declares the data directories it reads. The headers are
+# parsed once per file and an analyzer only runs when one of its
+# directories is present, so directories no selected analyzer declared are
+# never touched. In the pipeline the file is mapped and its headers parsed
+# once, by the import stage, whose parsed headers (pe_parser._read_imports)
+# the analyzers reuse with either backend. The analyzers themselves use the
+# struct-based reader (pe_reader): pefile would build an object tree for
+# the whole resource directory just to have it summarized. The delay-load
+# import table is held to the same --max-descriptors/--max-imports-per-dll
+# caps as the import table.
+
+EXPORT_DIRECTORY = 0
+RESOURCE_DIRECTORY = 2
+BOUND_IMPORT_DIRECTORY = 11
+DELAY_IMPORT_DIRECTORY = 13
+
+# Export names listed per file (the total is always reported).
+MAX_LISTED_EXPORTS = 100
+# Resource data entries visited per file, and the resource tree depth.
+MAX_RESOURCE_ENTRIES = 0x2000
+_RESOURCE_LEVELS = 3
+MAX_BOUND_IMPORTS = 0x400
+
+_RESOURCE_TYPES = {
+    1: "CURSOR", 2: "BITMAP", 3: "ICON", 4: "MENU", 5: "DIALOG", 6: "STRING",
+    7: "FONTDIR", 8: "FONT", 9: "ACCELERATOR", 10: "RCDATA", 11: "MESSAGETABLE",
+    12: "GROUP_CURSOR", 14: "GROUP_ICON", 16: "VERSION", 17: "DLGINCLUDE",
+    19: "PLUGPLAY", 20: "VXD", 21: "ANICURSOR", 22: "ANIICON", 23: "HTML", 24: "MANIFEST",
+}
+
+# (rva, size) of each declared directory the file has.
+Located = Dict[int, Tuple[int, int]]
+# (max_descriptors, max_imports_per_dll), as for get_imports.
+Caps = Tuple[Optional[int], Optional[int]]
+
+
+class Analyzer:
+    """A per-file analysis of some data directories, stored under `name`."""
+
+    __slots__ = ("name", "directories", "run")
+
+    def __init__(self, name: str, directories: Tuple[int, ...], run: Callable[[_Image, Located, Caps], object]):
+        self.name = name
+        self.directories = directories
+        self.run = run
+
+    def __repr__(self) -> str:
+        return f"Analyzer({self.name!r}, {self.directories!r})"
+
+
+def _analyze_exports(image: _Image, located: Located, caps: Caps) -> Dict[str, object]:
+    dll, exports = _read_exports(image)
+    exports.sort()
+    return {
+        "dll": dll,
+        "named": len(exports),
+        "names": [name for _ordinal, name in exports[:MAX_LISTED_EXPORTS]],
+        "truncated": len(exports) > MAX_LISTED_EXPORTS,
+    }
+
+
+def _analyze_delay_imports(image: _Image, located: Located, caps: Caps) -> Imports:
+    # An Imports, so a cut table keeps its truncated_by.
+    imports = Imports()
+    _walk_descriptors(image, located[DELAY_IMPORT_DIRECTORY][0], imports, _SymbolBudget(), True, *caps)
+    return imports
+
+
+def _analyze_bound_imports(image: _Image, located: Located, caps: Caps) -> List[Dict[str, object]]:
+    # IMAGE_BOUND_IMPORT_DESCRIPTORs (timestamp, module name offset,
+    # forwarder count), each followed by its forwarder refs (same size).
+    # Name offsets are relative to the start of the directory. The
+    # directory sits in the headers and, as in pefile, its "RVA" is read
+    # as a file offset.
+    data = image.data
+    start = off = located[BOUND_IMPORT_DIRECTORY][0]
+    limit = image.size
+
+    def name_at(offset: int) -> str:
+        at = start + offset
+        end = data.find(b"\0", at, min(at + MAX_DLL_LENGTH, limit))
+        return bytes(data[at:end if end >= 0 else min(at + MAX_DLL_LENGTH, limit)]).decode(errors="ignore")
+
+    bound: List[Dict[str, object]] = []
+    while off + 8 <= limit and len(bound) < MAX_BOUND_IMPORTS:
+        timestamp, name_offset, forwarder_count = struct.unpack_from("<IHH", data, off)
+        if not (timestamp or name_offset or forwarder_count):
+            break
+        off += 8
+        forwarders = []
+        for _ in range(forwarder_count):
+            if off + 8 > limit:
+                break
+            forwarders.append(name_at(struct.unpack_from("<IH", data, off)[1]))
+            off += 8
+        bound.append({"dll": name_at(name_offset), "timestamp": timestamp, "forwarders": forwarders})
+    return bound
+
+
+def _resource_type(image: _Image, base_off: int, limit: int, name: int) -> str:
+    if not name & 0x80000000:
+        return _RESOURCE_TYPES.get(name, str(name))
+    off = base_off + (name & 0x7FFFFFFF)
+    if off + 2 > limit:
+        return "?"
+    length, = struct.unpack_from("<H", image.data, off)
+    return bytes(image.data[off + 2:min(off + 2 + 2 * length, limit)]).decode("utf-16-le", errors="replace")
+
+
+def _analyze_resources(image: _Image, located: Located, caps: Caps) -> Dict[str, object]:
+    # Three levels (type, name, language) of IMAGE_RESOURCE_DIRECTORY
+    # tables; subdirectory offsets are relative to the resource directory.
+    data = image.data
+    base_off, limit = image.locate(located[RESOURCE_DIRECTORY][0])
+    types: Dict[str, Dict[str, int]] = {}
+    languages: Set[int] = set()
+    entries = total = embedded = 0
+    largest = (0, "")
+    seen: Set[int] = set()
+    # (directory offset, level, resource type), walked depth-first
+    stack: List[Tuple[int, int, str]] = [(base_off, 0, "")] if base_off >= 0 else []
+    while stack and entries < MAX_RESOURCE_ENTRIES:
+        off, level, rtype = stack.pop()
+        if off in seen or off + 16 > limit:
+            continue
+        seen.add(off)
+        named, numbered = struct.unpack_from("<HH", data, off + 12)
+        for i in range(min(named + numbered, (limit - off - 16) // 8)):
+            name, target = struct.unpack_from("<II", data, off + 16 + 8 * i)
+            if level == 0:
+                rtype = _resource_type(image, base_off, limit, name)
+            if target & 0x80000000:
+                if level + 1 < _RESOURCE_LEVELS:
+                    stack.append((base_off + (target & 0x7FFFFFFF), level + 1, rtype))
+                continue
+            if base_off + target + 16 > limit:
+                continue
+            data_rva, size = struct.unpack_from("<II", data, base_off + target)
+            if level == _RESOURCE_LEVELS - 1:
+                languages.add(name & 0xFFFF)
+            stats = types.setdefault(rtype, {"count": 0, "bytes": 0})
+            stats["count"] += 1
+            stats["bytes"] += size
+            total += size
+            largest = max(largest, (size, rtype))
+            data_off, data_limit = image.locate(data_rva)
+            if 0 <= data_off <= data_limit - 2 and data[data_off:data_off + 2] == b"MZ":
+                embedded += 1
+            entries += 1
+            if entries >= MAX_RESOURCE_ENTRIES:
+                break
+    return {
+        "entries": entries,
+        "bytes": total,
+        "types": types,
+        "languages": [f"0x{language:04x}" for language in sorted(languages)],
+        "largest": {"type": largest[1], "bytes": largest[0]} if entries else None,
+        "embedded_pe": embedded,
+        "truncated": entries >= MAX_RESOURCE_ENTRIES,
+    }
+
+
+ANALYZERS: Dict[str, Analyzer] = {
+    analyzer.name: analyzer
+    for analyzer in (
+        Analyzer("delay_imports", (DELAY_IMPORT_DIRECTORY,), _analyze_delay_imports),
+        Analyzer("exports", (EXPORT_DIRECTORY,), _analyze_exports),
+        Analyzer("bound_imports", (BOUND_IMPORT_DIRECTORY,), _analyze_bound_imports),
+        Analyzer("resources", (RESOURCE_DIRECTORY,), _analyze_resources),
+    )
+}
+
+DEPTHS: Dict[str, Tuple[str, ...]] = {
+    "imports": (),
+    "standard": ("delay_imports", "exports"),
+    "full": ("delay_imports", "exports", "bound_imports", "resources"),
+}
+DEFAULT_DEPTH = "imports"
+
+
+def analyzers_for(depth: str) -> List[Analyzer]:
+    """
+    The analyzers run at `depth` (one of DEPTHS).
+
+    Raises:
+        ValueError: for an unknown depth.
+    """
+    if depth not in DEPTHS:
+        raise ValueError(f"Unknown depth {depth!r}; expected one of {', '.join(DEPTHS)}")
+    return [ANALYZERS[name] for name in DEPTHS[depth]]
+
+
+def required_directories(analyzers: Sequence[Analyzer]) -> List[int]:
+    """The union of the data directories the analyzers declare."""
+    return sorted({index for analyzer in analyzers for index in analyzer.directories})
+
+
+def run_analyzers(
+    source: str | Path | Buffer,
+    analyzers: Sequence[Analyzer],
+    name: Optional[str] = None,
+    profile: Optional[StageProfile] = None,
+    max_descriptors: Optional[int] = None,
+    max_imports_per_dll: Optional[int] = None,
+) -> Dict[str, object]:
+    """
+    {analyzer name: output} for one file. The headers are parsed once
+    (the "headers" stage of `profile`), then the analyzers run as in
+    analyze_image.
+
+    Raises:
+        FileNotFoundError: if the file does not exist.
+        PEParseError: if the file cannot be parsed as a PE.
+    """
+    timed = stage_timer(profile)
+    with _open_source(source, name) as (data, name):
+        with timed("headers"):
+            try:
+                image = _parse_headers(data)
+            except PEParseError as e:
+                raise PEParseError(f"Not a valid PE file: {name}") from e
+        return analyze_image(image, analyzers, profile, max_descriptors, max_imports_per_dll)
+
+
+def analyze_image(
+    image: _Image,
+    analyzers: Sequence[Analyzer],
+    profile: Optional[StageProfile] = None,
+    max_descriptors: Optional[int] = None,
+    max_imports_per_dll: Optional[int] = None,
+) -> Dict[str, object]:
+    """
+    {analyzer name: output} for a file whose headers are already parsed
+    (and whose contents are still open). Each analyzer whose directories
+    are present runs as a stage of its own in `profile`; the others report
+    None. The delay-load imports are capped like get_imports.
+    """
+    timed = stage_timer(profile)
+    caps = (max_descriptors, max_imports_per_dll)
+    located: Located = {
+        index: image.directories[index]
+        for index in required_directories(analyzers)
+        if index < len(image.directories) and image.directories[index][0]
+    }
+    results: Dict[str, object] = {}
+    for analyzer in analyzers:
+        if not any(index in located for index in analyzer.directories):
+            results[analyzer.name] = None
+            continue
+        with timed(analyzer.name):
+            results[analyzer.name] = analyzer.run(image, located, caps)
+    return results
+
+
+def with_delay_imports(imports: Dict[str, List[str]], delay_imports: Optional[Dict[str, List[str]]]) -> Dict[str, List[str]]:
+    """
+    The import table plus delay-load imports, for categorize_imports and
+    detect_patterns (the delay-loaded functions are called all the same).
+    """
+    if not delay_imports:
+        return imports
+    merged = {dll: list(funcs) for dll, funcs in imports.items()}
+    for dll, funcs in delay_imports.items():
+        merged.setdefault(dll, []).extend(funcs)
+    return merged
+
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import collections
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+from typing import Callable, Deque, Iterable, Iterator, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Per-file guards for hostile inputs. The wall-clock deadline is enforced
+# from outside the analysis: SupervisedPool runs every file as its own task
+# in a worker process and kills (SIGKILL) and replaces a worker whose task
+# outlives the deadline, so a file stuck in C code or in the kernel cannot
+# hold a worker, and a worker that crashes only fails its own file. The
+# memory ceiling is an RLIMIT_AS address-space limit and is only ever
+# applied to worker processes, never to the caller's own process.
+
+
+class AnalysisTimeout(Exception):
+    """A file took longer than the per-file deadline to analyze."""
+    pass
+
+
+class WorkerCrashed(Exception):
+    """A worker process died (e.g. killed, or crashed in native code) while running a task."""
+    pass
+
+
+def set_memory_limit(max_bytes: Optional[int]) -> bool:
+    """
+    Cap this process's address space at `max_bytes`, so runaway allocations
+    fail with MemoryError instead of exhausting the machine. Returns whether
+    a limit was applied.
+
+    The cap is permanent for the process: call it only in worker processes.
+    """
+    if max_bytes is None or resource is None or not hasattr(resource, "RLIMIT_AS"):
+        return False
+    _soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        max_bytes = min(max_bytes, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (max_bytes, hard))
+    return True
+
+
+def _serve(conn, initializer: Optional[Callable[..., None]], initargs: tuple) -> None:
+    """Worker loop of a SupervisedPool: run (func, args) tasks until told to stop."""
+    # Ctrl-C is the parent's to handle; it stops the workers itself.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        func, args = task
+        try:
+            reply = (True, func(*args))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception as e:  # the result or exception does not pickle
+            conn.send((False, RuntimeError(f"Could not return the task's result: {e}")))
+
+
+class _Worker:
+    __slots__ = ("process", "conn", "future", "started")
+
+    def __init__(self, process: multiprocessing.Process, conn):
+        self.process = process
+        self.conn = conn
+        self.future: Optional[Future] = None
+        self.started = 0.0
+
+
+class SupervisedPool:
+    """
+    Worker processes that each run one task at a time under a hard deadline.
+
+    submit() returns a concurrent.futures.Future. A supervisor thread hands
+    queued tasks to idle workers and waits on their results, their process
+    sentinels and the earliest deadline. A task still running `timeout`
+    seconds after it started has its worker killed and replaced, and its
+    future fails with AnalysisTimeout; a worker that dies mid-task is
+    replaced and its future fails with WorkerCrashed. Either way the other
+    workers keep going.
+
+    `initializer(*initargs)` runs in every worker, including replacements.
+    Tasks and results must pickle; `func` must be a module-level function.
+    """
+
+    def __init__(
+        self,
+        processes: int,
+        timeout: Optional[float] = None,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: tuple = (),
+    ):
+        self.processes = processes
+        self.timeout = timeout
+        self._initializer = initializer
+        self._initargs = initargs
+        self._tasks: Deque[Tuple[Future, Callable[..., object], tuple]] = collections.deque()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._wake_r, self._wake_w = multiprocessing.Pipe(duplex=False)
+        self._workers = [self._spawn() for _ in range(processes)]
+        self._thread = threading.Thread(target=self._supervise, name="SupervisedPool", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "SupervisedPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    def submit(self, func: Callable[..., object], *args: object) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SupervisedPool is shut down")
+            self._tasks.append((future, func, args))
+            self._wake_w.send_bytes(b"")
+        return future
+
+    def imap_unordered(
+        self,
+        func: Callable[..., object],
+        items: Iterable[object],
+        window: Optional[int] = None,
+    ) -> Iterator[Tuple[object, Future]]:
+        """
+        Yield (item, finished future of func(item)) in completion order.
+        `items` is consumed lazily, keeping at most `window` tasks (default:
+        twice the number of workers) submitted at a time.
+        """
+        window = window or 2 * self.processes
+        finished: "queue.Queue[Tuple[object, Future]]" = queue.Queue()
+        items = iter(items)
+        pending = 0
+        exhausted = False
+        while True:
+            while not exhausted and pending < window:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                future = self.submit(func, item)
+                future.add_done_callback(lambda future, item=item: finished.put((item, future)))
+                pending += 1
+            if not pending:
+                return
+            yield finished.get()
+            pending -= 1
+
+    def shutdown(self) -> None:
+        """Kill the workers. Queued and running tasks fail with WorkerCrashed."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wake_w.send_bytes(b"")
+        self._thread.join()
+        for worker in self._workers:
+            worker.process.kill()
+            worker.process.join()
+            worker.conn.close()
+            if worker.future is not None:
+                worker.future.set_exception(WorkerCrashed("Worker pool shut down"))
+        while self._tasks:
+            future, _func, _args = self._tasks.popleft()
+            future.cancel()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def _spawn(self) -> _Worker:
+        conn, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=_serve, args=(child, self._initializer, self._initargs), daemon=True
+        )
+        process.start()
+        child.close()
+        return _Worker(process, conn)
+
+    def _replace(self, worker: _Worker, error: Exception) -> None:
+        worker.process.kill()
+        worker.process.join()
+        worker.conn.close()
+        if worker.future is not None:
+            worker.future.set_exception(error)
+        self._workers[self._workers.index(worker)] = self._spawn()
+
+    def _dispatch(self) -> None:
+        with self._lock:
+            for worker in self._workers:
+                while worker.future is None and self._tasks:
+                    future, func, args = self._tasks.popleft()
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        worker.conn.send((func, args))
+                    except Exception as e:  # the task does not pickle
+                        future.set_exception(e)
+                        continue
+                    worker.future = future
+                    worker.started = time.monotonic()
+
+    def _supervise(self) -> None:
+        while not self._closed:
+            self._dispatch()
+            busy = [worker for worker in self._workers if worker.future is not None]
+            timeout = None
+            if self.timeout is not None and busy:
+                timeout = max(0.0, min(worker.started for worker in busy) + self.timeout - time.monotonic())
+            ready = set(wait(
+                [self._wake_r]
+                + [worker.conn for worker in busy]
+                + [worker.process.sentinel for worker in self._workers],
+                timeout,
+            ))
+            if self._wake_r in ready:
+                while self._wake_r.poll():
+                    self._wake_r.recv_bytes()
+
+            now = time.monotonic()
+            for worker in list(self._workers):
+                if worker.conn in ready and worker.future is not None:
+                    try:
+                        ok, value = worker.conn.recv()
+                    except (EOFError, OSError):
+                        pass  # died mid-reply: handled as a crash below
+                    except Exception as e:  # the reply does not unpickle
+                        future, worker.future = worker.future, None
+                        future.set_exception(e)
+                    else:
+                        future, worker.future = worker.future, None
+                        if ok:
+                            future.set_result(value)
+                        else:
+                            future.set_exception(value)
+                if worker.process.sentinel in ready or not worker.process.is_alive():
+                    worker.process.join()
+                    self._replace(worker, WorkerCrashed(f"Worker exited with code {worker.process.exitcode}"))
+                elif (
+                    worker.future is not None
+                    and self.timeout is not None
+                    and now - worker.started >= self.timeout
+                ):
+                    self._replace(worker, AnalysisTimeout(f"Analysis exceeded {self.timeout:g}s"))
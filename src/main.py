@@ -1,14 +1,19 @@
 from __future__ import annotations
 
 import argparse
-import json
 import sys
 from pathlib import Path
 
-from .pe_parser import get_imports, PEParseError
-from .categorize import categorize_imports
-from .analyze import compute_capabilities, detect_patterns, describe_patterns
-from .report import build_text_report, build_json_report, build_html_report
+# Only light modules are imported up front; the analysis stack (pipeline,
+# rule tables, cache, batch/multiprocessing) is imported by the code path
+# that needs it, so --help and argument errors return immediately.
+from .pe_parser import BACKENDS, DEFAULT_BACKEND, PEParseError
+
+# Same bound as cache.DEFAULT_MAX_BYTES, without importing the cache module.
+DEFAULT_CACHE_MAX_MB = 256
+
+# The keys of depth.DEPTHS (default first), without importing the analyzers.
+DEPTHS = ("imports", "standard", "full")
 
 
 def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
@@ -16,8 +21,13 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         description="Analyze Windows executable imports and summarize capabilities."
     )
     parser.add_argument(
-        "path",
-        help="Path to the PE file (.exe or .dll) to analyze.",
+        "paths",
+        nargs="*",
+        metavar="path",
+        help=(
+            "PE file (.exe or .dll) to analyze. Several files, directories "
+            "(searched recursively) or glob patterns switch to batch mode."
+        ),
     )
     parser.add_argument(
         "--json",
@@ -34,51 +44,573 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         action="store_true",
         help="Enable detailed output with additional information.",
     )
-    return parser.parse_args(argv)
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default=None,
+        help=f"Import parser backend (default: {DEFAULT_BACKEND}, or $EXEPLAIN_BACKEND).",
+    )
+    parser.add_argument(
+        "--cache",
+        metavar="DB",
+        help="Reuse results from (and store new results in) this SQLite cache file.",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=DEFAULT_CACHE_MAX_MB,
+        help="Size bound for the result cache in MiB; least recently used entries are evicted.",
+    )
+    parser.add_argument(
+        "--scan-strings",
+        action="store_true",
+        help=(
+            "Also look for API names stored as strings in the file (e.g. resolved with "
+            "GetProcAddress) and count them towards capabilities and patterns."
+        ),
+    )
+    parser.add_argument(
+        "--packing",
+        action="store_true",
+        help=(
+            "Also measure per-section entropy and check packer heuristics, reported as a "
+            "'packed' capability."
+        ),
+    )
+    parser.add_argument(
+        "--depth",
+        choices=DEPTHS,
+        default=DEPTHS[0],
+        help=(
+            "Data directories to analyze: the import table only (default); standard adds "
+            "delay-load imports and exports; full adds bound imports and a resource summary."
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help=(
+            "Write per-stage timings (p50/p95/p99 in batch mode) and counters to FILE "
+            "('-' for stderr); CSV if FILE ends in .csv, JSON otherwise."
+        ),
+    )
+    parser.add_argument(
+        "--profile-slowest",
+        type=int,
+        default=0,
+        metavar="N",
+        help="With --profile, re-run the N slowest files under cProfile and tracemalloc.",
+    )
+
+    limits = parser.add_argument_group("resource limits")
+    limits.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Give up on a file after this many seconds of analysis; the worker analyzing it is killed.",
+    )
+    limits.add_argument(
+        "--max-memory-mb",
+        type=int,
+        default=None,
+        metavar="MB",
+        help="Address-space limit per analysis worker process (POSIX only).",
+    )
+    limits.add_argument(
+        "--max-descriptors",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Read at most N import descriptors (DLLs) per file; larger tables are marked truncated.",
+    )
+    limits.add_argument(
+        "--max-imports-per-dll",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Keep at most N imports per DLL; larger tables are marked truncated.",
+    )
+
+    batch = parser.add_argument_group("batch mode")
+    batch.add_argument(
+        "--archives",
+        action="store_true",
+        help=(
+            "Analyze PE files inside zip and tar archives (also nested and compressed) "
+            "from memory, reported as archive!member. Implies batch mode for an archive."
+        ),
+    )
+    batch.add_argument(
+        "--max-member-mb",
+        type=int,
+        default=256,
+        metavar="MB",
+        help="Skip archive members larger than this, recording an error for PE members (default: 256).",
+    )
+    batch.add_argument(
+        "--files-from",
+        metavar="FILE",
+        help="Read additional paths, one per line, from FILE ('-' for stdin). Implies batch mode.",
+    )
+    batch.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes for batch mode (default: CPU count).",
+    )
+    batch.add_argument(
+        "--chunksize",
+        type=int,
+        default=8,
+        help="Number of files handed to a worker at a time (default: 8).",
+    )
+    batch.add_argument(
+        "--output",
+        metavar="FILE",
+        help=(
+            "Write batch results to FILE instead of stdout. Records are one JSON "
+            "object per line by default, a JSON array with --json, or an HTML "
+            "table with --html."
+        ),
+    )
+    batch.add_argument(
+        "--dashboard",
+        metavar="DIR",
+        help=(
+            "Write batch results to DIR as a browsable dashboard (index.html plus "
+            "compressed data pages loaded on demand) instead of --output. Implies batch mode."
+        ),
+    )
+
+    rescans = parser.add_argument_group("incremental rescans")
+    rescans.add_argument(
+        "--manifest",
+        metavar="DB",
+        help=(
+            "Keep a manifest of analyzed files in DB; only new or changed files are "
+            "analyzed and the output is one capability/pattern diff per added, "
+            "modified or deleted file. Implies batch mode."
+        ),
+    )
+    rescans.add_argument(
+        "--watch",
+        action="store_true",
+        help="With --manifest, keep running and analyze files as they change (inotify, else polling).",
+    )
+    rescans.add_argument(
+        "--watch-interval",
+        type=float,
+        default=2.0,
+        metavar="SECONDS",
+        help="Polling interval for --watch without inotify (default: 2).",
+    )
+
+    shards = parser.add_argument_group("sharded scans")
+    shards.add_argument(
+        "--shard-dir",
+        metavar="DIR",
+        help=(
+            "Split the inputs into shards by path hash and write each shard's results to DIR, "
+            "which may be shared by several processes or machines; complete shards are "
+            "skipped and interrupted ones resumed."
+        ),
+    )
+    shards.add_argument(
+        "--shard-count",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Number of shards; required for a new --shard-dir, fixed afterwards.",
+    )
+    shards.add_argument(
+        "--shard",
+        type=int,
+        action="append",
+        metavar="I",
+        help="Only work on shard I (0-based; repeatable). Default: every shard not done or in progress.",
+    )
+    shards.add_argument(
+        "--shard-root",
+        metavar="DIR",
+        help=(
+            "Assign inputs to shards by their path relative to DIR (default: the current "
+            "directory), so nodes that mount the corpus at different places agree on the split."
+        ),
+    )
+    shards.add_argument(
+        "--merge-shards",
+        metavar="DIR",
+        help=(
+            "Combine the complete shards in DIR into one batch output (see --output, --json, "
+            "--html), dropping files with duplicate contents."
+        ),
+    )
+
+    args = parser.parse_args(argv)
+    if args.dashboard and (args.html or args.json or args.output or args.manifest or args.shard_dir):
+        parser.error("--dashboard cannot be combined with --html, --json, --output, --manifest or --shard-dir")
+    if args.merge_shards:
+        if args.paths or args.files_from is not None or args.shard_dir or args.manifest:
+            parser.error("--merge-shards takes no paths, --shard-dir or --manifest")
+        return args
+    if args.shard_dir and (args.manifest or args.profile or args.html or args.json or args.output):
+        parser.error("--shard-dir cannot be combined with --manifest, --profile, --html, --json or --output")
+    if (args.shard_count is not None or args.shard or args.shard_root) and not args.shard_dir:
+        parser.error("--shard-count, --shard and --shard-root require --shard-dir")
+    if args.shard_count is not None and args.shard_count < 1:
+        parser.error("--shard-count must be at least 1")
+    if not args.paths and args.files_from is None:
+        parser.error("at least one path (or --files-from) is required")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.chunksize < 1:
+        parser.error("--chunksize must be at least 1")
+    if args.timeout is not None and args.timeout <= 0:
+        parser.error("--timeout must be positive")
+    for option in ("max_memory_mb", "max_descriptors", "max_imports_per_dll"):
+        if getattr(args, option) is not None and getattr(args, option) < 1:
+            parser.error(f"--{option.replace('_', '-')} must be at least 1")
+    if args.watch and not args.manifest:
+        parser.error("--watch requires --manifest")
+    if args.manifest and (args.html or args.archives or args.profile):
+        parser.error("--manifest cannot be combined with --html, --archives or --profile")
+    if args.watch_interval <= 0:
+        parser.error("--watch-interval must be positive")
+    if args.max_member_mb < 1:
+        parser.error("--max-member-mb must be at least 1")
+    if args.profile_slowest < 0:
+        parser.error("--profile-slowest must not be negative")
+    if args.profile_slowest and not args.profile:
+        parser.error("--profile-slowest requires --profile")
+    return args
+
+
+def output_format(args: argparse.Namespace) -> str:
+    """The report format selected by --json/--html ("text" by default)."""
+    return "json" if args.json else "html" if args.html else "text"
+
+
+def is_batch(args: argparse.Namespace) -> bool:
+    """Whether the arguments ask for more than a single-file analysis."""
+    if args.files_from is not None or args.manifest or args.dashboard or len(args.paths) != 1:
+        return True
+    path = args.paths[0]
+    if Path(path).is_dir() or any(ch in path for ch in "*?["):
+        return True
+    if args.archives:
+        from .containers import is_container
+        return is_container(path)
+    return False
+
+
+# How the single-file warning names each Imports.truncated_by cause.
+_TRUNCATION_CAUSES = {
+    "max_descriptors": "--max-descriptors",
+    "max_imports_per_dll": "--max-imports-per-dll",
+    "symbol_limit": "the parser's limit on import entries",
+}
+
+
+def pipeline_options(args: argparse.Namespace) -> dict:
+    """The run_pipeline keyword arguments selected on the command line."""
+    return {
+        "backend": args.backend,
+        "max_descriptors": args.max_descriptors,
+        "max_imports_per_dll": args.max_imports_per_dll,
+        "scan_strings": args.scan_strings,
+        "packing": args.packing,
+        "depth": args.depth,
+    }
+
+
+def max_memory_bytes(args: argparse.Namespace) -> int | None:
+    return args.max_memory_mb * 1024 * 1024 if args.max_memory_mb else None
+
+
+def finish_profile(args: argparse.Namespace, aggregator) -> None:
+    """Write the --profile output, running the --profile-slowest hooks first."""
+    from .profiling import profile_files, save_profile
+
+    summary = aggregator.summary()
+    if args.profile_slowest:
+        summary["hooks"] = profile_files(
+            [entry["file"] for entry in summary["slowest"]],
+            max_member_bytes=args.max_member_mb * 1024 * 1024,
+            **pipeline_options(args),
+        )
+    try:
+        save_profile(summary, args.profile)
+    except OSError as e:
+        print(f"[ERROR] Could not write profile: {e}", file=sys.stderr)
+
+
+def open_writer(args: argparse.Namespace):
+    """
+    The batch record writer selected on the command line, and the stream it
+    writes to (sys.stdout, an --output file, or None for --dashboard).
+
+    Raises:
+        DashboardError: if the --dashboard directory cannot be used.
+    """
+    from .report import HTMLTableWriter, JSONArrayWriter, NDJSONWriter
+
+    if args.dashboard:
+        from .dashboard import DashboardWriter
+        return DashboardWriter(args.dashboard), None
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    if args.html:
+        return HTMLTableWriter(out), out
+    if args.json:
+        return JSONArrayWriter(out), out
+    return NDJSONWriter(out), out
+
+
+def run_batch_mode(args: argparse.Namespace) -> int:
+    from .batch import iter_input_files, run_batch, format_summary
+    from .dashboard import DashboardError
+
+    paths = iter_input_files(args.paths, args.files_from)
+    try:
+        writer, out = open_writer(args)
+    except DashboardError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    aggregator = None
+    if args.profile:
+        from .profiling import ProfileAggregator
+        aggregator = ProfileAggregator(keep_slowest=args.profile_slowest)
+    try:
+        summary = run_batch(
+            paths,
+            writer,
+            workers=args.workers,
+            chunksize=args.chunksize,
+            cache_path=args.cache,
+            cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+            options=dict(
+                pipeline_options(args),
+                archives=args.archives,
+                max_member_bytes=args.max_member_mb * 1024 * 1024,
+            ),
+            profile=aggregator,
+            max_memory=max_memory_bytes(args),
+            timeout=args.timeout,
+        )
+    finally:
+        writer.close()
+        if out not in (None, sys.stdout):
+            out.close()
+
+    print(format_summary(summary), file=sys.stderr)
+    if aggregator is not None:
+        finish_profile(args, aggregator)
+    if summary["files"] == 0:
+        print("[ERROR] No input files found.", file=sys.stderr)
+        return 1
+    return 0
+
+
+def run_rescan_mode(args: argparse.Namespace) -> int:
+    from .manifest import Manifest, format_rescan_summary, rescan, watch
+    from .report import JSONArrayWriter, NDJSONWriter
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    writer = JSONArrayWriter(out) if args.json else NDJSONWriter(out)
+    scan_options = {
+        "workers": args.workers,
+        "chunksize": args.chunksize,
+        "cache_path": args.cache,
+        "cache_max_bytes": args.cache_max_mb * 1024 * 1024,
+        "options": pipeline_options(args),
+        "max_memory": max_memory_bytes(args),
+        "timeout": args.timeout,
+    }
+
+    def report(summary):
+        print(format_rescan_summary(summary), file=sys.stderr)
+        out.flush()
+
+    try:
+        with Manifest(args.manifest) as manifest:
+            if args.watch:
+                try:
+                    watch(manifest, args.paths, writer, interval=args.watch_interval, on_summary=report, **scan_options)
+                except KeyboardInterrupt:
+                    pass
+            else:
+                report(rescan(manifest, args.paths, writer, files_from=args.files_from, **scan_options))
+    finally:
+        writer.close()
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def run_shard_mode(args: argparse.Namespace) -> int:
+    from .batch import iter_input_files
+    from .shards import ShardError, format_shard_summary, run_shards
+
+    try:
+        summaries = run_shards(
+            args.shard_dir,
+            iter_input_files(args.paths, args.files_from),
+            count=args.shard_count,
+            shards=args.shard,
+            workers=args.workers,
+            chunksize=args.chunksize,
+            cache_path=args.cache,
+            cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+            options=dict(
+                pipeline_options(args),
+                archives=args.archives,
+                max_member_bytes=args.max_member_mb * 1024 * 1024,
+            ),
+            max_memory=max_memory_bytes(args),
+            timeout=args.timeout,
+            root=args.shard_root,
+        )
+    except ShardError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    for summary in summaries:
+        print(format_shard_summary(summary), file=sys.stderr)
+    if not summaries:
+        print("[INFO] No shards left to run (all complete or in progress elsewhere).", file=sys.stderr)
+    return 0
+
+
+def run_merge_mode(args: argparse.Namespace) -> int:
+    from .batch import format_summary
+    from .dashboard import DashboardError
+    from .shards import ShardError, merge_shards
+
+    try:
+        writer, out = open_writer(args)
+    except DashboardError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    try:
+        summary = merge_shards(args.merge_shards, writer)
+    except ShardError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    finally:
+        writer.close()
+        if out not in (None, sys.stdout):
+            out.close()
+
+    print(format_summary(summary), file=sys.stderr)
+    if summary["duplicates"]:
+        print(f"[INFO] Dropped {summary['duplicates']} files with duplicate contents.", file=sys.stderr)
+    if summary["incomplete"]:
+        shards = ", ".join(str(index) for index in summary["incomplete"])
+        print(f"[ERROR] Shards not complete (not merged): {shards}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _analyze_single(
+    path: str,
+    cache_path: str | None,
+    cache_max_bytes: int,
+    profile: bool,
+    options: dict,
+) -> tuple:
+    """
+    Run the pipeline for single-file mode, in this process or a worker.
+    Returns (result, StageProfile or None, cache stats or None).
+    """
+    from .pipeline import run_pipeline
+
+    cache = None
+    if cache_path:
+        from .cache import ResultCache
+        cache = ResultCache(cache_path, max_bytes=cache_max_bytes)
+    stages = None
+    if profile:
+        from .profiling import StageProfile
+        stages = StageProfile()
+    try:
+        result = run_pipeline(path, cache, profile=stages, **options)
+        cache_stats = cache.stats() if cache is not None else None
+    finally:
+        if cache is not None:
+            cache.close()
+    return result, stages, cache_stats
 
 
 def main(argv: list[str] | None = None) -> int:
     args = parse_args(argv)
-    path = args.path
+    if args.merge_shards:
+        return run_merge_mode(args)
+    if args.shard_dir:
+        return run_shard_mode(args)
+    if args.manifest:
+        return run_rescan_mode(args)
+    if is_batch(args):
+        return run_batch_mode(args)
+    path = args.paths[0]
 
+    from .pipeline import report_details
+    from .analyze import describe_patterns
+    from .report import emit_report
+    from .limits import AnalysisTimeout, SupervisedPool, WorkerCrashed, set_memory_limit
+
+    task = (path, args.cache, args.cache_max_mb * 1024 * 1024, args.profile, pipeline_options(args))
     try:
-        imports = get_imports(path)
+        if args.timeout is None and args.max_memory_mb is None:
+            result, stages, cache_stats = _analyze_single(*task)
+        else:
+            # The limits apply to a worker process, never to the caller.
+            with SupervisedPool(
+                1, args.timeout, initializer=set_memory_limit, initargs=(max_memory_bytes(args),)
+            ) as pool:
+                result, stages, cache_stats = pool.submit(_analyze_single, *task).result()
     except FileNotFoundError as e:
         print(f"[ERROR] {e}", file=sys.stderr)
         return 1
-    except PEParseError as e:
+    except (PEParseError, AnalysisTimeout, WorkerCrashed) as e:
         print(f"[ERROR] {e}", file=sys.stderr)
         return 1
+    except MemoryError:
+        print(f"[ERROR] Memory limit exceeded while analyzing {path}", file=sys.stderr)
+        return 1
     except Exception as e:
         print(f"[ERROR] Unexpected error: {e}", file=sys.stderr)
         return 1
 
-    categorized = categorize_imports(imports)
-    capabilities = compute_capabilities(categorized)
-    pattern_ids = detect_patterns(categorized)
+    imports = result["imports"]
+    capabilities = result["capabilities"]
+    pattern_ids = result["pattern_ids"]
     patterns = describe_patterns(pattern_ids)
+    details = report_details(result)
+
+    if result["truncated"]:
+        causes = " and ".join(_TRUNCATION_CAUSES[cause] for cause in result["truncated_by"])
+        print(f"[WARN] Import table truncated by {causes}.", file=sys.stderr)
 
     if args.verbose:
         print(f"[INFO] Parsed {len(imports)} DLLs with {sum(len(f) for f in imports.values())} total imports.")
         print(f"[INFO] Detected {len(pattern_ids)} behavior patterns.")
+        if cache_stats is not None:
+            print(
+                f"[INFO] Cache {'hit' if result['cached'] else 'miss'} "
+                f"({cache_stats['entries']} entries, {cache_stats['bytes']} bytes)."
+            )
         print()
 
-    if args.json:
-        report = build_json_report(path, imports, capabilities, patterns)
-        print(report)
-    elif args.html:
-        html_report = build_html_report(path, imports, capabilities, patterns)
-        output_file = Path(path).stem + "_analysis.html"
-        with open(output_file, "w") as f:
-            f.write(html_report)
-        if args.verbose:
-            print(f"[INFO] HTML report saved to: {output_file}")
-        else:
-            print(f"HTML report saved to: {output_file}")
-    else:
-        report = build_text_report(path, imports, capabilities, patterns)
-        print(report)
+    if stages is None:
+        emit_report(path, imports, capabilities, patterns, output_format(args), verbose=args.verbose, details=details)
+        return 0
+
+    from .profiling import ProfileAggregator
 
+    with stages.stage("report"):
+        emit_report(path, imports, capabilities, patterns, output_format(args), verbose=args.verbose, details=details)
+    aggregator = ProfileAggregator(keep_slowest=args.profile_slowest)
+    aggregator.add(path, stages.to_dict())
+    finish_profile(args, aggregator)
     return 0
 
 
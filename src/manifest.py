@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import json
+import os
+import select
+import sqlite3
+import struct
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .batch import analyze_file, iter_input_files, scan_files
+from .cache import DEFAULT_MAX_BYTES, ResultCache, data_sha256, rules_fingerprint
+from .report import RecordWriter
+
+# (size, mtime in ns, inode): a file whose stat key is unchanged since the
+# last scan is assumed unchanged and is not read at all.
+StatKey = Tuple[int, int, int]
+
+
+def stat_key(st: os.stat_result) -> StatKey:
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+class Manifest:
+    """
+    Persistent SQLite record of the files seen by previous scans: path, stat
+    key, content hash and the batch record of the last analysis.
+
+    Each entry remembers the rules_fingerprint() it was analyzed under;
+    after the rule tables change, entries are analyzed again on their next
+    rescan (and still diffed against their previous record).
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.fingerprint = rules_fingerprint()
+
+        self._conn = sqlite3.connect(str(self.path), timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " path TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " inode INTEGER NOT NULL,"
+                " sha256 TEXT,"
+                " fingerprint TEXT NOT NULL,"
+                " record BLOB NOT NULL)"
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "Manifest":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def stat_keys(self) -> Dict[str, Optional[StatKey]]:
+        """
+        path -> stat key for every file in the manifest (one table scan).
+        The key is None for entries analyzed under other rule tables.
+        """
+        return {
+            path: (size, mtime_ns, inode) if fingerprint == self.fingerprint else None
+            for path, size, mtime_ns, inode, fingerprint in self._conn.execute(
+                "SELECT path, size, mtime_ns, inode, fingerprint FROM files"
+            )
+        }
+
+    def get(self, path: str) -> Optional[Tuple[Optional[str], Dict[str, object]]]:
+        """(content hash, record) stored for a path, or None."""
+        row = self._conn.execute("SELECT sha256, record FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(zlib.decompress(row[1]))
+
+    def put(self, path: str, key: StatKey, sha256: Optional[str], record: Dict[str, object]) -> None:
+        payload = zlib.compress(json.dumps(record, separators=(",", ":")).encode("utf-8"))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, inode, sha256, fingerprint, record)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, *key, sha256, self.fingerprint, payload),
+        )
+
+    def touch(self, path: str, key: StatKey) -> None:
+        """Update the stat key of a file whose contents did not change."""
+        self._conn.execute(
+            "UPDATE files SET size = ?, mtime_ns = ?, inode = ? WHERE path = ?", (*key, path)
+        )
+
+    def delete(self, path: str) -> None:
+        self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+
+def analyze_if_changed(
+    item: Tuple[str, Optional[str]],
+    cache: Optional[ResultCache] = None,
+    **options: object,
+) -> List[Dict[str, object]]:
+    """
+    scan_files worker for rescans: `item` is (path, previous content hash).
+
+    The file is read once, hashed, and analyzed from memory unless its
+    hash matches the previous one, in which case a {"file", "sha256",
+    "unchanged": True} stub is returned instead. Records carry "sha256".
+    """
+    path, previous = item
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        return [{"file": path, "error": {"type": type(e).__name__, "message": str(e)}}]
+    digest = data_sha256(data)
+    if digest == previous:
+        return [{"file": path, "sha256": digest, "unchanged": True}]
+    record = analyze_file(path, cache, data=data, **options)
+    record["sha256"] = digest
+    return [record]
+
+
+def _present(record: Optional[Dict[str, object]]) -> Tuple[Set[str], Set[str]]:
+    """(capabilities present, detected pattern ids) of a batch record."""
+    if not record or "error" in record:
+        return set(), set()
+    capabilities = {name for name, info in record["capabilities"].items() if info.get("present")}
+    return capabilities, set(record["detected_patterns"])
+
+
+def diff_records(
+    path: str,
+    change: str,
+    old: Optional[Dict[str, object]],
+    new: Optional[Dict[str, object]],
+) -> Dict[str, object]:
+    """
+    Describe what changed for one file between two scans:
+
+    {"file": ..., "change": "added" | "modified" | "deleted",
+     "capabilities": {"added": [...], "removed": [...]},
+     "patterns": {"added": [...], "removed": [...]},
+     "error": {...}}    # only if the new analysis failed
+    """
+    old_caps, old_patterns = _present(old)
+    new_caps, new_patterns = _present(new)
+    diff: Dict[str, object] = {
+        "file": path,
+        "change": change,
+        "capabilities": {"added": sorted(new_caps - old_caps), "removed": sorted(old_caps - new_caps)},
+        "patterns": {"added": sorted(new_patterns - old_patterns), "removed": sorted(old_patterns - new_patterns)},
+    }
+    if new is not None and "error" in new:
+        diff["error"] = new["error"]
+    return diff
+
+
+def _in_scope(path: str, roots: List[str]) -> bool:
+    """Whether a manifest path falls under one of the scanned inputs."""
+    for root in roots:
+        if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+            return True
+    return False
+
+
+def rescan(
+    manifest: Manifest,
+    inputs: Iterable[str],
+    writer: RecordWriter,
+    files_from: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunksize: int = 8,
+    cache_path: Optional[str] = None,
+    cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    options: Optional[Dict[str, object]] = None,
+    max_memory: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, object]:
+    """
+    Bring the manifest up to date with `inputs` and write a diff record
+    (see diff_records) to `writer` for every added, modified or deleted
+    file. Returns a run summary.
+
+    Every input file is stat()ed; only new files and files whose size,
+    mtime or inode changed are read and hashed, and only those whose
+    contents changed are analyzed on the batch worker pool. Entries from
+    older rule tables are always analyzed again. Manifest entries under an
+    input directory (or equal to an input path) that no longer exist are
+    reported as deleted; glob inputs are scanned but do not scope
+    deletions. `options` are passed to analyze_file; `max_memory` and
+    `timeout` are as for batch.scan_files.
+    """
+    inputs = list(inputs)
+    roots = [os.path.abspath(item) for item in inputs if not any(ch in item for ch in "*?[")]
+    start = time.perf_counter()
+    known = manifest.stat_keys()
+    seen: Set[str] = set()
+    keys: Dict[str, StatKey] = {}
+    counts = {"files": 0, "unchanged": 0, "touched": 0, "added": 0, "modified": 0, "deleted": 0, "errors": 0}
+
+    # Stat pass. The changed files (typically a small fraction) are listed
+    # up front so the manifest is only touched from this thread.
+    items: List[Tuple[str, Optional[str]]] = []
+    for path in iter_input_files(inputs, files_from):
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue  # gone: reported as deleted below if it was known
+        seen.add(path)
+        counts["files"] += 1
+        key = stat_key(st)
+        previous_key = known.get(path)
+        if previous_key == key:
+            counts["unchanged"] += 1
+            continue
+        keys[path] = key
+        previous = manifest.get(path) if previous_key is not None else None
+        items.append((path, previous[0] if previous else None))
+
+    records = scan_files(
+        items,
+        workers=workers,
+        chunksize=chunksize,
+        cache_path=cache_path,
+        cache_max_bytes=cache_max_bytes,
+        options=options,
+        max_memory=max_memory,
+        analyze=analyze_if_changed,
+        timeout=timeout,
+    )
+    for record in records:
+        path = record["file"]
+        key = keys.pop(path)
+        if record.get("unchanged"):
+            manifest.touch(path, key)
+            counts["touched"] += 1
+            continue
+        previous = manifest.get(path)
+        change = "added" if previous is None else "modified"
+        counts[change] += 1
+        counts["errors"] += "error" in record
+        writer.write(diff_records(path, change, previous[1] if previous else None, record))
+        manifest.put(path, key, record.pop("sha256", None), record)
+
+    for path in known:
+        if path not in seen and _in_scope(path, roots):
+            previous = manifest.get(path)
+            writer.write(diff_records(path, "deleted", previous[1] if previous else None, None))
+            manifest.delete(path)
+            counts["deleted"] += 1
+    manifest.commit()
+
+    counts["seconds"] = time.perf_counter() - start
+    return counts
+
+
+def format_rescan_summary(summary: Dict[str, object]) -> str:
+    """Render a rescan summary as one human-readable line."""
+    return (
+        f"[INFO] Rescanned {summary['files']} files in {summary['seconds']:.2f}s: "
+        f"{summary['added']} added, {summary['modified']} modified, {summary['deleted']} deleted, "
+        f"{summary['unchanged'] + summary['touched']} unchanged ({summary['errors']} errors)."
+    )
+
+
+class _Inotify:
+    """
+    Minimal recursive inotify watcher (Linux, via ctypes). Raises OSError
+    if inotify is unavailable.
+    """
+
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_ISDIR = 0x40000000
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, roots: Iterable[str]):
+        import ctypes
+        import ctypes.util
+
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, str] = {}
+        for root in roots:
+            self._add_tree(root)
+
+    def _add_tree(self, root: str) -> None:
+        for directory, _dirs, _files in os.walk(root):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK)
+            if wd >= 0:
+                self._dirs[wd] = directory
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+    def wait(self, timeout: float, settle: float = 0.2) -> Optional[Set[str]]:
+        """
+        Paths changed within `timeout` seconds (collecting further events
+        until `settle` seconds pass quietly), or None if the kernel queue
+        overflowed and a full rescan is needed.
+        """
+        changed: Set[str] = set()
+        while select.select([self._fd], [], [], timeout if not changed else settle)[0]:
+            buf = os.read(self._fd, 64 * 1024)
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _cookie, length = self._EVENT.unpack_from(buf, offset)
+                offset += self._EVENT.size
+                name = buf[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & self.IN_Q_OVERFLOW:
+                    return None
+                directory = self._dirs.get(wd)
+                if directory is None:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self._add_tree(path)
+                changed.add(path)
+        return changed
+
+
+def watch(
+    manifest: Manifest,
+    roots: List[str],
+    writer: RecordWriter,
+    interval: float = 2.0,
+    should_stop: Callable[[], bool] = lambda: False,
+    on_summary: Optional[Callable[[Dict[str, object]], None]] = None,
+    poll: bool = False,
+    **scan_options: object,
+) -> None:
+    """
+    Rescan `roots` (directories), then keep analyzing files as they are
+    created, changed or deleted until `should_stop()` returns true.
+
+    Uses inotify where available and `poll` is not set; otherwise, or if
+    the event queue overflows, the roots are rescanned every `interval`
+    seconds (cheap: unchanged files are only stat()ed). `scan_options` are
+    passed to rescan; `on_summary` gets each rescan's summary.
+    """
+    report = on_summary or (lambda summary: None)
+    report(rescan(manifest, roots, writer, **scan_options))
+    watcher = None
+    if not poll:
+        try:
+            watcher = _Inotify(roots)
+        except (OSError, AttributeError):
+            watcher = None
+    try:
+        while not should_stop():
+            if watcher is None:
+                time.sleep(interval)
+                changed = None
+            else:
+                changed = watcher.wait(interval)
+                if changed is not None and not changed:
+                    continue
+            report(rescan(manifest, roots if changed is None else sorted(changed), writer, **scan_options))
+    finally:
+        if watcher is not None:
+            watcher.close()
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import sys
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .analyze import compute_capabilities, describe_patterns
+from .apistrings import with_string_apis
+from .categorize import ApiDictionary, default_api_dictionary
+from .depth import with_delay_imports
+from .packing import packing_capability
+from .pipeline import report_details
+from .report import build_report_data
+
+# Compact per-file analysis results for callers that keep many of them in
+# memory. DLL, function, category and pattern names are interned with
+# sys.intern, so every file that imports CreateFileW shares one string;
+# each file then stores only flat tuples of references plus small arrays
+# (DLL offsets, per-function category bitmasks). The nested dicts the
+# report builders expect are rebuilt on demand and match the pipeline's
+# exactly. The outputs of optional stages (report_details) are small and
+# kept as they are.
+
+# Category name -> bit in FileResult.membership, shared by all results.
+_CATEGORY_BITS: Dict[str, int] = {}
+_CATEGORY_NAMES: List[str] = []
+
+
+def _category_bit(category: str) -> int:
+    bit = _CATEGORY_BITS.get(category)
+    if bit is None:
+        if len(_CATEGORY_NAMES) == 64:
+            raise ValueError("More than 64 capability categories")
+        bit = _CATEGORY_BITS[category] = len(_CATEGORY_NAMES)
+        _CATEGORY_NAMES.append(sys.intern(category))
+    return bit
+
+
+def _mask_typecode() -> str:
+    """Smallest unsigned array type holding a bit per known category."""
+    for typecode in ("B", "H", "I", "Q"):
+        if len(_CATEGORY_NAMES) <= array(typecode).itemsize * 8:
+            return typecode
+    return "Q"
+
+
+class FileResult:
+    """
+    One file's analysis result.
+
+    Attributes:
+        file: The path (or "archive!member" name) analyzed.
+        dlls: Imported DLL names, in import-table order.
+        funcs: Every imported function, flattened in import-table order.
+        offsets: funcs[offsets[i]:offsets[i + 1]] are dlls[i]'s functions.
+        referenced: The functions categorized, flattened in the order
+            categorize_imports saw them: `funcs` itself unless delay-load
+            imports or string-referenced APIs were added (see run_pipeline).
+        membership: Per function of `referenced`, a bitmask of its
+            categories.
+        category_order: Categories in the order categorize_imports first
+            meets them (the key order of its result).
+        pattern_ids: Detected behavior patterns.
+        truncated_by: What cut the import table short (see
+            pe_parser.Imports), empty if nothing did.
+        details: The optional-stage outputs (pipeline.report_details).
+    """
+
+    __slots__ = (
+        "file", "dlls", "funcs", "offsets", "referenced", "membership", "category_order", "pattern_ids",
+        "truncated_by", "details",
+    )
+
+    def __init__(
+        self,
+        file: str,
+        dlls: Tuple[str, ...],
+        funcs: Tuple[str, ...],
+        offsets: array,
+        referenced: Tuple[str, ...],
+        membership: array,
+        category_order: Tuple[str, ...],
+        pattern_ids: Tuple[str, ...],
+        truncated_by: Tuple[str, ...] = (),
+        details: Optional[Dict[str, object]] = None,
+    ):
+        self.file = file
+        self.dlls = dlls
+        self.funcs = funcs
+        self.offsets = offsets
+        self.referenced = referenced
+        self.membership = membership
+        self.category_order = category_order
+        self.pattern_ids = pattern_ids
+        self.truncated_by = truncated_by
+        self.details = details
+
+    @property
+    def truncated(self) -> bool:
+        return bool(self.truncated_by)
+
+    @classmethod
+    def from_imports(
+        cls,
+        file: str,
+        imports: Dict[str, List[str]],
+        pattern_ids: Sequence[str],
+        dictionary: Optional[ApiDictionary] = None,
+        truncated_by: Sequence[str] = (),
+        referenced: Optional[Dict[str, List[str]]] = None,
+        details: Optional[Dict[str, object]] = None,
+    ) -> "FileResult":
+        """
+        Categorize `referenced` (default: `imports`), like categorize_imports,
+        straight into the compact form.
+        """
+        if dictionary is None:
+            dictionary = default_api_dictionary()
+        lookup = dictionary.lookup
+        categories = dictionary.categories
+        intern = sys.intern
+
+        funcs: List[str] = []
+        offsets = array("I", [0])
+        for funcs_of_dll in imports.values():
+            funcs.extend(intern(func) for func in funcs_of_dll)
+            offsets.append(len(funcs))
+        funcs_tuple = tuple(funcs)
+
+        if referenced is None or referenced is imports:
+            referenced_funcs = funcs_tuple
+        else:
+            referenced_funcs = tuple(intern(func) for funcs_of_dll in referenced.values() for func in funcs_of_dll)
+        masks: List[int] = []
+        seen: Dict[str, None] = {}
+        for func in referenced_funcs:
+            mask = 0
+            for category in categories[lookup(func)]:
+                mask |= 1 << _category_bit(category)
+                seen.setdefault(category)
+            masks.append(mask)
+
+        return cls(
+            file,
+            tuple(intern(dll) for dll in imports),
+            funcs_tuple,
+            offsets,
+            referenced_funcs,
+            array(_mask_typecode(), masks),
+            tuple(intern(category) for category in seen),
+            tuple(intern(pid) for pid in pattern_ids),
+            tuple(truncated_by),
+            details or None,
+        )
+
+    @classmethod
+    def from_pipeline(cls, file: str, result: Dict[str, object]) -> "FileResult":
+        """Compact a run_pipeline result (its categorization is redone, not copied)."""
+        imports = result["imports"]
+        referenced = imports
+        if result.get("delay_imports"):
+            referenced = with_delay_imports(referenced, result["delay_imports"])
+        if result.get("string_apis"):
+            referenced = with_string_apis(referenced, result["string_apis"])
+        return cls.from_imports(
+            file,
+            imports,
+            result["pattern_ids"],
+            truncated_by=result.get("truncated_by", ()),
+            referenced=referenced,
+            details=report_details(result),
+        )
+
+    def imports(self) -> Dict[str, List[str]]:
+        """The get_imports dict."""
+        offsets, funcs = self.offsets, self.funcs
+        return {dll: list(funcs[offsets[i]:offsets[i + 1]]) for i, dll in enumerate(self.dlls)}
+
+    def total_imports(self) -> int:
+        return len(self.funcs)
+
+    def category_count(self, category: str) -> int:
+        """Number of imported functions in a category, without building lists."""
+        bit = _CATEGORY_BITS.get(category)
+        if bit is None:
+            return 0
+        flag = 1 << bit
+        return sum(1 for mask in self.membership if mask & flag)
+
+    def categorized(self) -> Dict[str, List[str]]:
+        """The categorize_imports dict."""
+        categorized: Dict[str, List[str]] = {}
+        for category in self.category_order:
+            flag = 1 << _CATEGORY_BITS[category]
+            categorized[category] = [func for func, mask in zip(self.referenced, self.membership) if mask & flag]
+        return categorized
+
+    def capabilities(self) -> Dict[str, Dict[str, object]]:
+        """The run_pipeline capabilities (compute_capabilities, plus "packed" with packing)."""
+        capabilities = compute_capabilities(self.categorized())
+        if self.details and "packing" in self.details:
+            capabilities["packed"] = packing_capability(self.details["packing"])
+        return capabilities
+
+    def report_data(self) -> Dict[str, object]:
+        """
+        The batch record of this result (batch.analyze_file without the
+        run's "cached" flag), as report.build_report_data builds it.
+        """
+        record = build_report_data(
+            self.file, self.imports(), self.capabilities(), describe_patterns(list(self.pattern_ids)), self.details
+        )
+        if self.truncated_by:
+            record["truncated"] = True
+            record["truncated_by"] = list(self.truncated_by)
+        return record
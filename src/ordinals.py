@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# get_imports reports an ordinal-only import it cannot name as
+# ORDINAL_<n>. This index maps (DLL, ordinal) to the exported name so such
+# imports can be categorized. It is a single file, memory-mapped on first
+# use: an open-addressing hash table of fixed-size slots plus a string
+# area, so a lookup is one hash and a probe or two over the mapping, and no
+# process ever rebuilds it. The bundled index is generated from the
+# ordinal tables pefile ships (WS2_32, WSOCK32, OLEAUT32); `build` extends
+# it from the export tables of any DLLs, e.g. the MFC runtimes:
+#
+#   python -m src.ordinals build my_ordinals.bin mfc140u.dll mfc42.dll
+#   EXEPLAIN_ORDINALS=my_ordinals.bin python -m src.main sample.exe
+#
+# Layout (little-endian):
+#   header   magic, dll count, slot count (a power of two), entry count,
+#            offsets of the DLL table, the slots and the strings
+#   DLLs     length-prefixed DLL name stems ("ws2_32"), in id order
+#   slots    (dll id + 1 or 0 for empty, ordinal, name offset) per slot
+#   strings  length-prefixed export names
+
+BUNDLED_INDEX = Path(__file__).with_name("ordinals.bin")
+
+# Index to load instead of the bundled one (see build_index).
+ORDINAL_INDEX_PATH = os.environ.get("EXEPLAIN_ORDINALS")
+
+ORDINAL_PREFIX = "ORDINAL_"
+
+_MAGIC = b"EXORD\x00\x01\x00"
+_HEADER = struct.Struct("<8s6I")
+_SLOT = struct.Struct("<HHI")
+
+# (dll stem, ordinal) -> name, as read from or written to an index.
+OrdinalTables = Dict[str, Dict[int, str]]
+
+
+def dll_key(dll: str) -> str:
+    """Lowercase DLL name without a .dll/.ocx/.sys/.drv extension."""
+    name = dll.lower()
+    stem, _, ext = name.rpartition(".")
+    return stem if stem and ext in ("dll", "ocx", "sys", "drv") else name
+
+
+def _slot_of(dll_id: int, ordinal: int, mask: int) -> int:
+    return ((dll_id * 0x9E3779B1) ^ (ordinal * 0x85EBCA6B)) & 0xFFFFFFFF & mask
+
+
+class OrdinalIndex:
+    """
+    Read-only (DLL, ordinal) -> name lookups over an index file written by
+    build_index. The file is opened and mapped on the first lookup.
+
+    Raises (on first use):
+        OSError: if the file cannot be read.
+        ValueError: if it is not an ordinal index.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._data: Optional[mmap.mmap] = None
+        self._dll_ids: Dict[str, int] = {}
+        self._mask = 0
+        self._slots = 0
+        self.entries = 0
+
+    def _open(self) -> mmap.mmap:
+        with open(self.path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(data) < _HEADER.size:
+            raise ValueError(f"Not an ordinal index: {self.path}")
+        magic, dll_count, slot_count, entries, dlls_at, slots_at, _strings_at = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC or slot_count & (slot_count - 1):
+            raise ValueError(f"Not an ordinal index: {self.path}")
+        at = dlls_at
+        for dll_id in range(dll_count):
+            length = data[at]
+            self._dll_ids[data[at + 1:at + 1 + length].decode("ascii")] = dll_id
+            at += 1 + length
+        self._mask = slot_count - 1
+        self._slots = slots_at
+        self.entries = entries
+        self._data = data
+        return data
+
+    def lookup(self, dll: str, ordinal: int) -> Optional[str]:
+        """The name `dll` exports under `ordinal`, or None if unknown."""
+        data = self._data if self._data is not None else self._open()
+        dll_id = self._dll_ids.get(dll_key(dll))
+        if dll_id is None:
+            return None
+        slot = _slot_of(dll_id, ordinal, self._mask)
+        while True:
+            tag, slot_ordinal, name_at = _SLOT.unpack_from(data, self._slots + slot * _SLOT.size)
+            if not tag:
+                return None
+            if tag == dll_id + 1 and slot_ordinal == ordinal:
+                return data[name_at + 1:name_at + 1 + data[name_at]].decode("ascii")
+            slot = (slot + 1) & self._mask
+
+    def resolve(self, dll: str, ordinal: int) -> Optional[str]:
+        """
+        lookup, but ord<n> for an ordinal missing from a DLL the index
+        covers (pefile's convention, so both backends and imphash agree).
+        """
+        name = self.lookup(dll, ordinal)
+        if name is None and dll_key(dll) in self._dll_ids:
+            return f"ord{ordinal}"
+        return name
+
+    def knows(self, dll: str) -> bool:
+        """Whether the index has any entries for `dll`."""
+        if self._data is None:
+            self._open()
+        return dll_key(dll) in self._dll_ids
+
+    def tables(self) -> OrdinalTables:
+        """Every entry, as {dll stem: {ordinal: name}}."""
+        data = self._data if self._data is not None else self._open()
+        names = {dll_id: dll for dll, dll_id in self._dll_ids.items()}
+        tables: OrdinalTables = {dll: {} for dll in self._dll_ids}
+        for slot in range(self._mask + 1):
+            tag, ordinal, name_at = _SLOT.unpack_from(data, self._slots + slot * _SLOT.size)
+            if tag:
+                tables[names[tag - 1]][ordinal] = data[name_at + 1:name_at + 1 + data[name_at]].decode("ascii")
+        return tables
+
+    def fingerprint(self) -> str:
+        """SHA-256 of the index file (part of the cache's rules fingerprint)."""
+        return hashlib.sha256(self.path.read_bytes()).hexdigest()
+
+
+def build_index(tables: OrdinalTables, out: str | Path) -> int:
+    """
+    Write `tables` ({dll: {ordinal: name}}) as an index file and return the
+    number of entries. DLL names are normalized with dll_key; DLL and export
+    names that are not ASCII or longer than 255 bytes are skipped.
+    """
+    merged: Dict[str, Dict[int, str]] = {}
+    for dll, table in tables.items():
+        merged.setdefault(dll_key(dll), {}).update(
+            (ordinal & 0xFFFF, name) for ordinal, name in table.items() if name.isascii() and len(name) < 256
+        )
+    dlls = sorted(dll for dll, table in merged.items() if table and dll.isascii() and len(dll) < 256)
+    if len(dlls) >= 0xFFFF:
+        raise ValueError("Too many DLLs for one ordinal index")
+    entries = sum(len(merged[dll]) for dll in dlls)
+    slot_count = 1
+    while slot_count < 2 * entries:
+        slot_count *= 2
+
+    dll_blob = b"".join(bytes([len(dll)]) + dll.encode("ascii") for dll in dlls)
+    dlls_at = _HEADER.size
+    slots_at = dlls_at + len(dll_blob)
+    strings_at = slots_at + slot_count * _SLOT.size
+    slots = bytearray(slot_count * _SLOT.size)
+    strings = bytearray()
+    offsets: Dict[str, int] = {}
+    mask = slot_count - 1
+    for dll_id, dll in enumerate(dlls):
+        for ordinal, name in sorted(merged[dll].items()):
+            name_at = offsets.get(name)
+            if name_at is None:
+                encoded = name.encode("ascii")
+                name_at = offsets[name] = strings_at + len(strings)
+                strings += bytes([len(encoded)]) + encoded
+            slot = _slot_of(dll_id, ordinal, mask)
+            while _SLOT.unpack_from(slots, slot * _SLOT.size)[0]:
+                slot = (slot + 1) & mask
+            _SLOT.pack_into(slots, slot * _SLOT.size, dll_id + 1, ordinal, name_at)
+
+    header = _HEADER.pack(_MAGIC, len(dlls), slot_count, entries, dlls_at, slots_at, strings_at)
+    tmp = Path(f"{out}.tmp")
+    tmp.write_bytes(header + dll_blob + bytes(slots) + bytes(strings))
+    os.replace(tmp, out)
+    return entries
+
+
+def tables_from_dlls(paths: List[str]) -> OrdinalTables:
+    """
+    {dll: {ordinal: name}} from the export tables of DLL files, keyed by
+    file name (the name importers use), falling back to the export
+    directory's own name.
+
+    Raises:
+        FileNotFoundError: if a file does not exist.
+        PEParseError: if a file is not a PE.
+    """
+    from .pe_parser import _open_source
+    from .pe_reader import read_exports
+
+    tables: OrdinalTables = {}
+    for path in paths:
+        with _open_source(path) as (data, _name):
+            export_name, exports = read_exports(data)
+        key = Path(path).name or export_name
+        tables.setdefault(key, {}).update(exports)
+    return tables
+
+
+@lru_cache(maxsize=None)
+def default_ordinal_index() -> Optional[OrdinalIndex]:
+    """The index used by get_imports ($EXEPLAIN_ORDINALS or the bundled one), or None if absent."""
+    path = Path(ORDINAL_INDEX_PATH) if ORDINAL_INDEX_PATH else BUNDLED_INDEX
+    return OrdinalIndex(path) if path.is_file() else None
+
+
+def resolve_ordinals(imports: Dict[str, List[str]], index: Optional[OrdinalIndex] = None) -> int:
+    """
+    Replace ORDINAL_<n> entries in a get_imports result, in place, with the
+    names the index knows. Returns the number resolved.
+    """
+    if index is None:
+        index = default_ordinal_index()
+        if index is None:
+            return 0
+    resolved = 0
+    for dll, funcs in imports.items():
+        for i, func in enumerate(funcs):
+            number = func[len(ORDINAL_PREFIX):]
+            if func.startswith(ORDINAL_PREFIX) and number.isdigit():
+                name = index.resolve(dll, int(number))
+                if name is not None:
+                    funcs[i] = name
+                    resolved += 1
+    return resolved
+
+
+def _ordlookup_tables() -> OrdinalTables:
+    """The ordinal tables bundled with pefile (used to generate ordinals.bin)."""
+    import ordlookup
+
+    return {
+        dll.decode(): {ordinal: name.decode() for ordinal, name in table.items()}
+        for dll, table in ordlookup.ords.items()
+    }
+
+
+def _iter_rows(tables: OrdinalTables) -> Iterator[Tuple[str, int, str]]:
+    for dll in sorted(tables):
+        for ordinal, name in sorted(tables[dll].items()):
+            yield dll, ordinal, name
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.ordinals",
+        description="Build and query the ordinal-to-name index used for ordinal-only imports.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Write an index from DLL export tables.")
+    build.add_argument("out", help="Index file to write.")
+    build.add_argument("dlls", nargs="*", metavar="DLL", help="DLLs whose named exports to add.")
+    base = build.add_mutually_exclusive_group()
+    base.add_argument("--base", metavar="INDEX", help="Start from this index (default: the bundled one).")
+    base.add_argument("--no-base", action="store_true", help="Start from an empty index.")
+    base.add_argument("--from-ordlookup", action="store_true",
+                      help="Start from pefile's ordinal tables (how the bundled index is made).")
+
+    lookup = commands.add_parser("lookup", help="Print the name for a DLL ordinal.")
+    lookup.add_argument("dll")
+    lookup.add_argument("ordinal", type=int)
+    lookup.add_argument("--index", metavar="INDEX", help="Index file (default: the active one).")
+
+    dump = commands.add_parser("dump", help="Print every entry as dll<TAB>ordinal<TAB>name.")
+    dump.add_argument("--index", metavar="INDEX", help="Index file (default: the active one).")
+
+    args = parser.parse_args(argv)
+    from .pe_parser import PEParseError
+
+    try:
+        if args.command == "build":
+            if args.no_base:
+                tables: OrdinalTables = {}
+            elif args.from_ordlookup:
+                tables = _ordlookup_tables()
+            else:
+                base_index = OrdinalIndex(args.base) if args.base else default_ordinal_index()
+                tables = base_index.tables() if base_index is not None else {}
+            for dll, table in tables_from_dlls(args.dlls).items():
+                tables.setdefault(dll_key(dll), {}).update(table)
+            entries = build_index(tables, args.out)
+            print(f"[INFO] Wrote {entries} entries for {sum(1 for t in tables.values() if t)} DLLs to {args.out}.",
+                  file=sys.stderr)
+            return 0
+
+        index = OrdinalIndex(args.index) if args.index else default_ordinal_index()
+        if index is None:
+            print("[ERROR] No ordinal index found.", file=sys.stderr)
+            return 1
+        if args.command == "lookup":
+            name = index.lookup(args.dll, args.ordinal)
+            if name is None:
+                print(f"[ERROR] {args.dll} ordinal {args.ordinal} is not in the index.", file=sys.stderr)
+                return 1
+            print(name)
+        else:
+            for row in _iter_rows(index.tables()):
+                print("\t".join(map(str, row)))
+    except (OSError, ValueError, PEParseError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .pe_parser import Buffer, PEParseError, _open_source
+
+# Packing analysis: Shannon entropy per section, over fixed-size windows
+# inside each section and over the overlay, combined with section-name,
+# section-flag, entry-point and import-count heuristics into a verdict.
+#
+# Byte histograms are computed by NumPy (np.bincount) over zero-copy views
+# of the memory-mapped file, one window at a time, and summed into one
+# histogram per range, so memory stays bounded by the window count of a
+# single range. Sections larger than max_windows windows are sampled
+# at evenly spaced windows, which bounds the time spent on very large
+# files as well.
+
+WINDOW_BYTES = 64 * 1024
+DEFAULT_MAX_WINDOWS = 256
+
+# Entropy (bits per byte) above which data is treated as compressed or
+# encrypted; machine code is typically 5.5-6.8.
+HIGH_ENTROPY = 7.2
+
+PACKED_DESCRIPTION = "Looks packed, compressed or encrypted; its imports may not show its real behavior."
+LIKELY_PACKED_DESCRIPTION = "May be packed, compressed or encrypted; its imports may not show its real behavior."
+
+# Section names written by common packers and protectors.
+PACKER_SECTIONS: Dict[str, str] = {
+    "UPX0": "UPX", "UPX1": "UPX", "UPX2": "UPX", "UPX!": "UPX",
+    ".aspack": "ASPack", ".adata": "ASPack",
+    ".MPRESS1": "MPRESS", ".MPRESS2": "MPRESS",
+    ".petite": "Petite",
+    ".nsp0": "NsPack", ".nsp1": "NsPack", ".nsp2": "NsPack",
+    ".themida": "Themida", ".winlice": "Themida",
+    ".vmp0": "VMProtect", ".vmp1": "VMProtect", ".vmp2": "VMProtect",
+    ".enigma1": "Enigma", ".enigma2": "Enigma",
+    "PEC2": "PECompact", "PEC2TO": "PECompact", "pec1": "PECompact",
+    ".packed": "RLPack", ".RLPack": "RLPack",
+    "kkrunchy": "kkrunchy",
+    ".yP": "Y0da", ".y0da": "Y0da",
+    "FSG!": "FSG",
+    "MEW": "MEW",
+    ".perplex": "Perplex",
+}
+
+_SCN_CODE = 0x00000020
+_SCN_MEM_EXECUTE = 0x20000000
+_SCN_MEM_READ = 0x40000000
+_SCN_MEM_WRITE = 0x80000000
+
+# Below this many imports, an executable is suspiciously import-poor.
+_FEW_IMPORTS = 8
+_LOADER_APIS = {"LoadLibraryA", "LoadLibraryW", "LoadLibraryExA", "LoadLibraryExW", "GetProcAddress"}
+
+
+class SectionHeader:
+    """One section table entry."""
+
+    __slots__ = ("name", "virtual_size", "virtual_address", "raw_size", "raw_offset", "characteristics")
+
+    def __init__(self, name, virtual_size, virtual_address, raw_size, raw_offset, characteristics):
+        self.name = name
+        self.virtual_size = virtual_size
+        self.virtual_address = virtual_address
+        self.raw_size = raw_size
+        self.raw_offset = raw_offset
+        self.characteristics = characteristics
+
+    @property
+    def executable(self) -> bool:
+        return bool(self.characteristics & (_SCN_MEM_EXECUTE | _SCN_CODE))
+
+    @property
+    def writable(self) -> bool:
+        return bool(self.characteristics & _SCN_MEM_WRITE)
+
+    def flags(self) -> str:
+        """"RWX"-style summary of the memory flags."""
+        return "".join(
+            flag if self.characteristics & bit else "-"
+            for flag, bit in (("R", _SCN_MEM_READ), ("W", _SCN_MEM_WRITE), ("X", _SCN_MEM_EXECUTE))
+        )
+
+
+def read_section_table(data: Buffer) -> Tuple[int, List[SectionHeader]]:
+    """
+    (entry point RVA, section headers) of a PE image.
+
+    Raises:
+        PEParseError: if the headers cannot be read.
+    """
+    size = len(data)
+    if size < 0x40 or data[0:2] != b"MZ":
+        raise PEParseError("DOS header magic not found")
+    pe_offset, = struct.unpack_from("<I", data, 0x3C)
+    if pe_offset + 24 > size or data[pe_offset:pe_offset + 4] != b"PE\0\0":
+        raise PEParseError("NT headers not found")
+    num_sections, optional_size = struct.unpack_from("<H12xH", data, pe_offset + 6)
+    opt = pe_offset + 24
+    entry_point = struct.unpack_from("<I", data, opt + 16)[0] if opt + 20 <= size else 0
+
+    sections = []
+    table = opt + optional_size
+    for i in range(min(num_sections, 96)):
+        at = table + i * 40
+        if at + 40 > size:
+            break
+        name = bytes(data[at:at + 8]).rstrip(b"\0").decode("latin-1")
+        virtual_size, virtual_address, raw_size, raw_offset = struct.unpack_from("<IIII", data, at + 8)
+        characteristics, = struct.unpack_from("<I", data, at + 36)
+        sections.append(SectionHeader(name, virtual_size, virtual_address, raw_size, raw_offset, characteristics))
+    return entry_point, sections
+
+
+def _entropies(histograms):
+    """Shannon entropy in bits per byte of each row of a 2-D array of byte histograms."""
+    import numpy as np
+
+    # H = log2(n) - sum(c * log2(c)) / n, with 0 * log2(0) = 1 * log2(1) = 0.
+    counts = histograms.astype(np.float64)
+    totals = counts.sum(axis=1)
+    weighted = (counts * np.log2(np.maximum(counts, 1.0))).sum(axis=1)
+    n = np.maximum(totals, 1.0)
+    return np.log2(n) - weighted / n
+
+
+def _window_starts(start: int, end: int, window: int, max_windows: int) -> Tuple[Sequence[int], bool]:
+    count = -(-(end - start) // window)
+    if count > max_windows:
+        return [start + (i * count // max_windows) * window for i in range(max_windows)], True
+    return range(start, end, window), False
+
+
+def range_stats(
+    data: Buffer,
+    ranges: Sequence[Tuple[int, int]],
+    window: int = WINDOW_BYTES,
+    max_windows: int = DEFAULT_MAX_WINDOWS,
+) -> Tuple[List[Tuple[float, float, bool]], float]:
+    """
+    Entropy of byte ranges of `data`: ([(entropy, highest window entropy,
+    sampled) per (start, end) range], entropy of all ranges together).
+
+    Each range is read in windows of `window` bytes; if it has more than
+    `max_windows` of them, only that many evenly spaced windows are read
+    and `sampled` is True. A range's window histograms share one reused
+    array, so the entropies take a fixed number of NumPy calls per range
+    and memory stays bounded by `max_windows`, not by the section count;
+    only the byte counts of each range are kept.
+    """
+    import numpy as np
+
+    windows = np.zeros((max_windows, 256), dtype=np.int64)
+    totals = np.zeros((len(ranges), 256), dtype=np.int64)
+    highest: List[float] = []
+    sampling: List[bool] = []
+    for i, (start, end) in enumerate(ranges):
+        end = min(end, len(data))
+        starts, sampled = _window_starts(start, end, window, max_windows) if end > start else ((), False)
+        rows = len(starts)
+        for row, at in enumerate(starts):
+            chunk = np.frombuffer(data, dtype=np.uint8, count=min(window, end - at), offset=at)
+            try:
+                windows[row] = np.bincount(chunk, minlength=256)
+            finally:
+                del chunk  # no view of the mapping may outlive it
+        if rows:
+            totals[i] = windows[:rows].sum(axis=0)
+            highest.append(float(_entropies(windows[:rows]).max()))
+        else:
+            highest.append(0.0)
+        sampling.append(sampled)
+    # One entropy computation for every range total and the whole.
+    values = _entropies(np.vstack([totals, totals.sum(axis=0, keepdims=True)])).tolist()
+    stats = [
+        (values[i] if totals[i].any() else 0.0, highest[i], sampling[i])
+        for i in range(len(ranges))
+    ]
+    return stats, values[-1]
+
+
+def range_entropy(
+    data: Buffer,
+    start: int,
+    end: int,
+    window: int = WINDOW_BYTES,
+    max_windows: int = DEFAULT_MAX_WINDOWS,
+) -> Tuple[float, float, bool]:
+    """(entropy, highest window entropy, sampled) of data[start:end]; see range_stats."""
+    return range_stats(data, [(start, end)], window, max_windows)[0][0]
+
+
+def _verdict(
+    entry_point: int,
+    sections: List[SectionHeader],
+    stats: List[Tuple[float, float, bool]],
+    imports: Optional[Dict[str, List[str]]],
+) -> Tuple[str, Optional[str], List[str]]:
+    """(verdict, packer name, indicators) from the collected measurements."""
+    strong: List[str] = []
+    weak: List[str] = []
+    packer = None
+
+    for section in sections:
+        if section.name in PACKER_SECTIONS:
+            packer = packer or PACKER_SECTIONS[section.name]
+            strong.append(f"{PACKER_SECTIONS[section.name]} section name {section.name!r}")
+
+    for section, (whole, _highest, _sampled) in zip(sections, stats):
+        if section.executable and whole >= HIGH_ENTROPY:
+            strong.append(f"high-entropy executable section {section.name!r} ({whole:.2f})")
+        elif whole >= HIGH_ENTROPY:
+            weak.append(f"high-entropy section {section.name!r} ({whole:.2f})")
+        if section.executable and section.writable:
+            weak.append(f"writable and executable section {section.name!r}")
+        if section.raw_size == 0 and section.virtual_size >= 0x10000 and section.executable:
+            weak.append(f"executable section {section.name!r} is empty on disk")
+
+    if sections:
+        entry = next(
+            (s for s in sections if s.virtual_address <= entry_point < s.virtual_address + max(s.virtual_size, s.raw_size)),
+            None,
+        )
+        if entry is None and entry_point:
+            weak.append("entry point outside every section")
+        elif entry is not None and entry is sections[-1] and len(sections) > 1:
+            weak.append(f"entry point in the last section {entry.name!r}")
+
+    if imports is not None and any(s.executable for s in sections):
+        funcs = [func for funcs in imports.values() for func in funcs]
+        if len(funcs) < _FEW_IMPORTS:
+            loader = " (mostly LoadLibrary/GetProcAddress)" if _LOADER_APIS & set(funcs) else ""
+            weak.append(f"only {len(funcs)} imports{loader}")
+
+    if strong and (packer or weak or len(strong) > 1):
+        verdict = "packed"
+    elif strong or len(weak) >= 2:
+        verdict = "likely_packed"
+    else:
+        verdict = "not_packed"
+    return verdict, packer, strong + weak
+
+
+def analyze_packing(
+    source: str | Path | Buffer,
+    imports: Optional[Dict[str, List[str]]] = None,
+    window: int = WINDOW_BYTES,
+    max_windows: int = DEFAULT_MAX_WINDOWS,
+    name: Optional[str] = None,
+) -> Dict[str, object]:
+    """
+    Measure entropy and packer indicators for a PE file (memory-mapped) or
+    in-memory contents. `imports` (get_imports output) adds the
+    import-count heuristic.
+
+    Returns:
+    {
+        "verdict": "packed" | "likely_packed" | "not_packed",
+        "packer": "UPX" | ... | None,      # from section names
+        "indicators": ["...", ...],        # strongest first
+        "entropy": 6.1,                    # whole file
+        "sections": [{"name", "flags", "raw_size", "virtual_size",
+                      "entropy", "max_window_entropy", "sampled"}, ...],
+        "overlay": {"offset", "size", "entropy"} or None,
+    }
+
+    Raises:
+        FileNotFoundError: if the file does not exist.
+        PEParseError: if the headers cannot be read.
+    """
+    with _open_source(source, name) as (data, _label):
+        entry_point, sections = read_section_table(data)
+        size = len(data)
+        # Every byte is read at most once: headers, each section, overlay.
+        start_of_sections = min((s.raw_offset for s in sections if s.raw_size), default=size)
+        end_of_sections = max((s.raw_offset + s.raw_size for s in sections if s.raw_size), default=size)
+        ranges = [(0, start_of_sections)]
+        ranges += [(s.raw_offset, s.raw_offset + s.raw_size) for s in sections]
+        ranges.append((end_of_sections, size))
+        stats, whole = range_stats(data, ranges, window, max_windows)
+        stats = stats[1:]
+        overlay_stats = stats.pop()
+        overlay = None
+        if end_of_sections < size:
+            overlay = {"offset": end_of_sections, "size": size - end_of_sections, "entropy": round(overlay_stats[0], 3)}
+
+    verdict, packer, indicators = _verdict(entry_point, sections, stats, imports)
+    return {
+        "verdict": verdict,
+        "packer": packer,
+        "indicators": indicators,
+        "entropy": round(whole, 3),
+        "sections": [
+            {
+                "name": s.name,
+                "flags": s.flags(),
+                "raw_size": s.raw_size,
+                "virtual_size": s.virtual_size,
+                "entropy": round(section_entropy, 3),
+                "max_window_entropy": round(highest, 3),
+                "sampled": sampled,
+            }
+            for s, (section_entropy, highest, sampled) in zip(sections, stats)
+        ],
+        "overlay": overlay,
+    }
+
+
+def packing_capability(packing: Dict[str, object]) -> Dict[str, object]:
+    """The "packed" capabilities entry for an analyze_packing result."""
+    present = packing["verdict"] != "not_packed"
+    return {
+        "present": present,
+        "count": len(packing["indicators"]) if present else 0,
+        "examples": list(packing["indicators"][:5]) if present else [],
+        "description": PACKED_DESCRIPTION if packing["verdict"] == "packed" else LIKELY_PACKED_DESCRIPTION,
+    }
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import mmap
+import os
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List
+from typing import TYPE_CHECKING, Iterator, List, Optional, Sequence, Tuple, Union
 
-import pefile
+if TYPE_CHECKING:
+    import pefile
+
+    from .pe_reader import _Image
 
 
 class PEParseError(Exception):
@@ -11,37 +17,230 @@ class PEParseError(Exception):
     pass
 
 
-def load_pe(path: str | Path) -> pefile.PE:
+class Imports(dict):
+    """
+    The {dll: [functions]} mapping returned by get_imports. `truncated_by`
+    names what cut the table short, if anything: the caller's
+    "max_descriptors" or "max_imports_per_dll" cap, or the parser's own
+    "symbol_limit" on the number of import entries read (pefile's
+    MAX_IMPORT_SYMBOLS).
+    """
+
+    truncated_by: Tuple[str, ...] = ()
+
+    @property
+    def truncated(self) -> bool:
+        return bool(self.truncated_by)
+
+    def truncate(self, cause: str) -> None:
+        """Record that `cause` cut the table short."""
+        if cause not in self.truncated_by:
+            self.truncated_by += (cause,)
+
+
+# Data directory indexes parsed by the import-only fast path
+# (pefile.DIRECTORY_ENTRY values, fixed by the PE format).
+IMPORT_DIRECTORY = 1
+DELAY_IMPORT_DIRECTORY = 13
+
+# pefile's warnings when it stops reading a table at MAX_IMPORT_SYMBOLS
+# (import directory, delay-import directory).
+_SYMBOL_LIMIT_WARNINGS = ("Excessive number of imports", "Error, too many imported symbols")
+
+# Import extraction backends:
+#   "pefile" - pefile's parser (headers + selected data directories)
+#   "raw"    - src.pe_reader, a struct-based reader that never imports pefile
+BACKENDS = ("pefile", "raw")
+DEFAULT_BACKEND = os.environ.get("EXEPLAIN_BACKEND", "pefile")
+
+
+def _pefile():
+    """Import pefile on first use so the raw backend never pays for it."""
+    import pefile
+
+    return pefile
+
+
+def _check_backend(backend: Optional[str]) -> str:
+    """
+    The backend to use for `backend` (DEFAULT_BACKEND if None).
+
+    Raises:
+        ValueError: for a name not in BACKENDS.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    return backend
+
+
+def _open_mapping(path: Path) -> mmap.mmap:
+    """
+    Memory-map a file read-only.
+
+    Raises:
+        FileNotFoundError: if the file does not exist.
+        PEParseError: if the file is empty.
+    """
+    if not path.is_file():
+        raise FileNotFoundError(f"File not found: {path}")
+
+    with open(path, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            # mmap refuses zero-length files
+            raise PEParseError(f"Not a valid PE file: {path}") from e
+
+
+@contextmanager
+def _map_file(path: Path) -> Iterator[mmap.mmap]:
+    """Memory-map a file read-only for the duration of the block."""
+    mapped = _open_mapping(path)
+    try:
+        yield mapped
+    finally:
+        mapped.close()
+
+
+# In-memory file contents accepted by get_imports in place of a path.
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+@contextmanager
+def _open_source(source: str | Path | Buffer, name: Optional[str] = None) -> Iterator[Tuple[Buffer, str]]:
+    """
+    Yield (file contents, name for error messages) for a path, which is
+    memory-mapped for the duration of the block, or an in-memory buffer
+    (including a mapping opened by the caller).
+    """
+    if isinstance(source, memoryview):
+        # Both parsers need bytes.find / slicing to bytes.
+        source = source.tobytes()
+    if isinstance(source, (bytes, bytearray, mmap.mmap)):
+        yield source, name or "<buffer>"
+        return
+    path = Path(source)
+    with _map_file(path) as data:
+        yield data, str(path)
+
+
+def _parse_pe(
+    data: Buffer,
+    path: Path | str,
+    directories: Optional[Sequence[int]],
+) -> pefile.PE:
+    """
+    Parse PE headers from `data`, then only the requested data directories.
+
+    `directories=None` parses every data directory (the old full-load behaviour).
+    """
+    pefile = _pefile()
+    try:
+        pe = pefile.PE(data=data, fast_load=True)
+        if directories is None:
+            pe.full_load()
+        elif directories:
+            pe.parse_data_directories(directories=list(directories))
+    except pefile.PEFormatError as e:
+        raise PEParseError(f"Not a valid PE file: {path}") from e
+    return pe
+
+
+def load_pe(
+    path: str | Path,
+    directories: Optional[Sequence[int]] = None,
+) -> pefile.PE:
     """
     Load and parse a PE file.
 
     Args:
         path: Path to the PE file.
+        directories: Data directory indexes to parse (see
+            `pefile.DIRECTORY_ENTRY`). Headers and sections are always parsed;
+            `None` parses every directory, an empty sequence parses none.
 
     Returns:
-        A pefile.PE object.
+        A pefile.PE object. It is backed by a read-only memory map of the file,
+        which stays open for as long as the object is alive.
 
     Raises:
         FileNotFoundError: if the file does not exist.
         PEParseError: if the file cannot be parsed as a PE.
     """
     path = Path(path)
+    return _parse_pe(_open_mapping(path), path, directories)
 
-    if not path.is_file():
-        raise FileNotFoundError(f"File not found: {path}")
 
-    try:
-        pe = pefile.PE(str(path))
-        return pe
-    except pefile.PEFormatError as e:
-        raise PEParseError(f"Not a valid PE file: {path}") from e
+def _collect_imports(
+    entries,
+    imports: Imports,
+    max_descriptors: Optional[int] = None,
+    max_imports_per_dll: Optional[int] = None,
+) -> None:
+    """
+    Append the (delay-)import descriptor entries to `imports` in place,
+    recording in imports.truncated_by when one of the caps is reached.
+    """
+    for index, entry in enumerate(entries):
+        if max_descriptors is not None and index >= max_descriptors:
+            imports.truncate("max_descriptors")
+            break
+        dll_name_bytes = entry.dll
+        dll_name = dll_name_bytes.decode(errors="ignore").upper() if dll_name_bytes else "UNKNOWN"
+
+        funcs: List[str] = imports.setdefault(dll_name, [])
+        entry_imports = entry.imports
+        if max_imports_per_dll is not None and len(entry_imports) > max_imports_per_dll:
+            entry_imports = entry_imports[:max_imports_per_dll]
+            imports.truncate("max_imports_per_dll")
+        for imp in entry_imports:
+            if imp.name:
+                func_name = imp.name.decode(errors="ignore")
+            else:
+                # Some imports may be by ordinal only
+                func_name = f"ORDINAL_{imp.ordinal}" if imp.ordinal is not None else "UNKNOWN"
+
+            funcs.append(func_name)
 
 
-def get_imports(path: str | Path) -> Dict[str, List[str]]:
+def get_imports(
+    path: str | Path | Buffer,
+    delay_imports: bool = False,
+    backend: Optional[str] = None,
+    max_descriptors: Optional[int] = None,
+    max_imports_per_dll: Optional[int] = None,
+    name: Optional[str] = None,
+) -> Imports:
     """
     Parse a PE file and return its imported DLLs and function names.
 
-    Returns a dict:
+    Only the PE headers and the import directory are parsed; every other data
+    directory (resources, relocations, debug, ...) is skipped.
+
+    Args:
+        path: Path to the PE file, or its contents as bytes, bytearray or
+            memoryview (e.g. a member read out of an archive).
+        delay_imports: Also parse the delay-load import directory and merge
+            its entries into the result.
+        backend: One of BACKENDS. Defaults to DEFAULT_BACKEND, which can be
+            set with the EXEPLAIN_BACKEND environment variable.
+        max_descriptors: Stop after this many import descriptors (DLL
+            entries) per directory.
+        max_imports_per_dll: Keep at most this many functions per descriptor.
+        name: What to call an in-memory `path` in error messages.
+
+    Ordinal-only imports are named from the ordinal index (see ordinals.py)
+    when it knows the DLL, and reported as ORDINAL_<n> otherwise.
+
+    When a cap is reached the partial table is returned with the cap named
+    in its `truncated_by`. The raw backend stops walking at the cap; pefile
+    always parses the whole directory (bounded by its own MAX_* limits), so
+    there the caps only bound the result. Tables longer than those limits
+    (MAX_IMPORT_SYMBOLS entries in all) are cut by both backends at the
+    same entry and marked "symbol_limit".
+
+    Returns an Imports dict:
     {
         "KERNEL32.DLL": ["CreateFileW", "ReadFile", ...],
         "WS2_32.DLL":   ["connect", "send", "recv", ...],
@@ -52,37 +251,65 @@ def get_imports(path: str | Path) -> Dict[str, List[str]]:
         FileNotFoundError: if the file does not exist.
         PEParseError: if the file cannot be parsed as a PE.
     """
-    path = Path(path)
+    backend = _check_backend(backend)
+    with _open_source(path, name) as (data, name):
+        imports, _image = _read_imports(
+            data,
+            name,
+            delay_imports=delay_imports,
+            backend=backend,
+            max_descriptors=max_descriptors,
+            max_imports_per_dll=max_imports_per_dll,
+        )
+    return imports
 
-    if not path.is_file():
-        raise FileNotFoundError(f"File not found: {path}")
 
-    try:
-        pe = pefile.PE(str(path))
-    except pefile.PEFormatError as e:
-        raise PEParseError(f"Not a valid PE file: {path}") from e
+def _read_imports(
+    data: Buffer | mmap.mmap,
+    name: str,
+    delay_imports: bool = False,
+    backend: Optional[str] = None,
+    max_descriptors: Optional[int] = None,
+    max_imports_per_dll: Optional[int] = None,
+) -> Tuple[Imports, _Image]:
+    """
+    get_imports over contents that are already open, plus the parsed
+    headers as a pe_reader._Image, so later stages (the depth analyzers)
+    resolve RVAs without mapping the file or parsing its headers again.
 
-    imports: Dict[str, List[str]] = {}
+    Raises:
+        PEParseError: if the file cannot be parsed as a PE.
+    """
+    from .pe_reader import _image_from_pefile, _parse_headers, _read_image_imports
 
-    # Some binaries may have no import table
-    directory = getattr(pe, "DIRECTORY_ENTRY_IMPORT", None)
-    if directory is None:
-        return imports
+    backend = _check_backend(backend)
 
-    for entry in directory:
-        dll_name_bytes = entry.dll
-        dll_name = dll_name_bytes.decode(errors="ignore").upper() if dll_name_bytes else "UNKNOWN"
+    if backend == "raw":
+        try:
+            image = _parse_headers(data)
+        except PEParseError as e:
+            raise PEParseError(f"Not a valid PE file: {name}") from e
+        return _read_image_imports(image, delay_imports, max_descriptors, max_imports_per_dll), image
 
-        funcs: List[str] = []
-        for imp in entry.imports:
-            if imp.name:
-                func_name = imp.name.decode(errors="ignore")
-            else:
-                # Some imports may be by ordinal only
-                func_name = f"ORDINAL_{imp.ordinal}" if imp.ordinal is not None else "UNKNOWN"
+    directories = [IMPORT_DIRECTORY]
+    if delay_imports:
+        directories.append(DELAY_IMPORT_DIRECTORY)
 
-            funcs.append(func_name)
+    imports = Imports()
+    caps = (max_descriptors, max_imports_per_dll)
 
-        imports[dll_name] = funcs
+    pe = _parse_pe(data, name, directories)
 
-    return imports
+    # Some binaries may have no import table
+    _collect_imports(getattr(pe, "DIRECTORY_ENTRY_IMPORT", ()), imports, *caps)
+    if delay_imports:
+        _collect_imports(getattr(pe, "DIRECTORY_ENTRY_DELAY_IMPORT", ()), imports, *caps)
+    if any(warning.startswith(_SYMBOL_LIMIT_WARNINGS) for warning in pe.get_warnings()):
+        imports.truncate("symbol_limit")
+
+    # pefile names ordinals only from its own tables; the ordinal index may
+    # have been extended with more DLLs.
+    from .ordinals import resolve_ordinals
+
+    resolve_ordinals(imports)
+    return imports, _image_from_pefile(pe, data)
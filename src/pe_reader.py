@@ -0,0 +1,495 @@
+from __future__ import annotations
+
+import itertools
+import string
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .pe_parser import Imports, PEParseError
+
+# A dependency-free import-table reader. It walks the headers, section table,
+# import descriptors and thunk arrays straight out of the file buffer with
+# struct.unpack_from and never builds per-structure objects. Its output (and
+# its tolerance for broken tables) follows pefile so both backends agree.
+
+MAX_IMPORT_SYMBOLS = 0x2000
+MAX_DLL_LENGTH = 0x200
+MAX_IMPORT_NAME_LENGTH = 0x200
+MAX_EXPORT_SYMBOLS = 0x10000
+
+_MAX_SECTIONS = 0x800
+
+_MAX_ADDRESS_SPREAD = 128 * 2**20
+_MAX_REPEATED_ADDRESSES = 15
+
+_OPTIONAL_MAGIC_PE32_PLUS = 0x20B
+
+_EXPORT_DIRECTORY = 0
+_IMPORT_DIRECTORY = 1
+_DELAY_IMPORT_DIRECTORY = 13
+
+_DLL_NAME_CHARS = frozenset(
+    (string.ascii_letters + string.digits + "!#$%&'()-@^_`{}~+,.;=[]:\\/").encode()
+)
+_FUNCTION_NAME_CHARS = frozenset(
+    (string.ascii_letters + string.digits + "._?@$()<>").encode()
+)
+
+# (adjusted VirtualAddress, end RVA, adjusted PointerToRawData, end of raw data)
+Section = Tuple[int, int, int, int]
+
+
+class _Image:
+    """Just enough of a parsed PE header to resolve RVAs."""
+
+    __slots__ = ("data", "size", "pe32_plus", "image_base", "sections", "directories", "_last")
+
+    def __init__(self, data, size, pe32_plus, image_base, sections, directories):
+        self.data = data
+        self.size = size
+        self.pe32_plus = pe32_plus
+        self.image_base = image_base
+        self.sections: Sequence[Section] = sections
+        self.directories: Sequence[Tuple[int, int]] = directories
+        self._last: Optional[Section] = None
+
+    def locate(self, rva: int) -> Tuple[int, int]:
+        """
+        Map an RVA to (file offset, end of readable data).
+
+        The offset is -1 if the RVA cannot be mapped at all. Reads inside a
+        section stop at the end of its raw data, so an RVA in a section whose
+        raw data is cut short yields no bytes rather than an error.
+        """
+        section = self._last
+        if section is None or not section[0] <= rva < section[1]:
+            for section in self.sections:
+                if section[0] <= rva < section[1]:
+                    self._last = section
+                    break
+            else:
+                # Outside every section: pefile falls back to treating the
+                # RVA as a file offset (headers, or section-less images).
+                return (rva, self.size) if rva < self.size else (-1, 0)
+        return rva - section[0] + section[2], min(section[3], self.size)
+
+    def string_at(self, rva: int, max_length: int) -> bytes:
+        """NUL-terminated string at an RVA (empty if there is no data there)."""
+        off, limit = self.locate(rva)
+        if off < 0 or off >= limit:
+            return b""
+        limit = min(off + max_length, limit)
+        end = self.data.find(b"\0", off, limit)
+        return bytes(self.data[off:end if end >= 0 else limit])
+
+
+def _parse_headers(data) -> _Image:
+    """
+    Validate the DOS/NT headers and build the RVA map. Header truncation and
+    padding rules follow pefile so the same files are accepted or rejected.
+    """
+    size = len(data)
+    if size < 0x40:
+        raise PEParseError("Unable to read the DOS header")
+    if data[0:2] != b"MZ":
+        raise PEParseError("DOS header magic not found")
+
+    pe_offset, = struct.unpack_from("<I", data, 0x3C)
+    if pe_offset > size or data[pe_offset:pe_offset + 4] != b"PE\0\0":
+        raise PEParseError("NT headers not found")
+    if pe_offset + 24 > size:
+        raise PEParseError("File header missing")
+
+    num_sections, = struct.unpack_from("<H", data, pe_offset + 6)
+    optional_size, = struct.unpack_from("<H", data, pe_offset + 20)
+    opt = pe_offset + 24
+
+    # Optional header without the data directories: 96 bytes (PE32) or
+    # 112 bytes (PE32+). A short header is zero-padded if enough of it exists.
+    header = bytes(data[opt:opt + 0x200])
+    if len(header) < 2:
+        raise PEParseError("No optional header found")
+    magic, = struct.unpack_from("<H", header, 0)
+    pe32_plus = magic == _OPTIONAL_MAGIC_PE32_PLUS
+    fixed_size, min_size = (112, 73) if pe32_plus else (96, 69)
+    if len(header) < fixed_size:
+        if len(header) < min_size:
+            raise PEParseError("No optional header found")
+        header += bytes(128)
+
+    if pe32_plus:
+        image_base, = struct.unpack_from("<Q", header, 24)
+    else:
+        image_base, = struct.unpack_from("<I", header, 28)
+    section_alignment, file_alignment = struct.unpack_from("<II", header, 32)
+    num_dirs, = struct.unpack_from("<I", header, fixed_size - 4)
+
+    directories: List[Tuple[int, int]] = []
+    dir_at = opt + fixed_size
+    for i in range(min(num_dirs & 0x7FFFFFFF, 16)):
+        entry = bytes(data[dir_at + i * 8:dir_at + i * 8 + 8])
+        if not entry:
+            break
+        directories.append(struct.unpack_from("<II", entry.ljust(8, b"\0")))
+
+    # Mirror pefile's alignment fix-ups so RVAs resolve to the same offsets.
+    va_alignment = section_alignment if section_alignment >= 0x1000 else file_alignment
+
+    def align_va(va: int) -> int:
+        if va_alignment and va % va_alignment:
+            return va_alignment * (va // va_alignment)
+        return va
+
+    raw: List[Tuple[int, int, int, int]] = []
+    table = opt + optional_size
+    for i in range(min(num_sections, _MAX_SECTIONS)):
+        entry = data[table + i * 40:table + i * 40 + 40]
+        if not entry or not any(entry):
+            break
+        if len(entry) < 40:
+            raise PEParseError("Section table is truncated")
+        virtual_size, virtual_address, raw_size, raw_ptr = struct.unpack_from("<IIII", entry, 8)
+
+        errors = 0
+        errors += raw_size + raw_ptr > size
+        errors += (raw_ptr & ~0x1FF) > size
+        errors += virtual_size > 0x10000000
+        errors += align_va(virtual_address) > 0x10000000
+        errors += bool(file_alignment and raw_ptr % file_alignment)
+        if errors >= 3:
+            break
+        raw.append((virtual_size, virtual_address, raw_size, raw_ptr))
+
+    raw.sort(key=lambda section: section[1])
+    sections: List[Section] = []
+    for i, (virtual_size, virtual_address, raw_size, raw_ptr) in enumerate(raw):
+        va_adj = align_va(virtual_address)
+        ptr_adj = raw_ptr & ~0x1FF
+        if section_alignment < 0x1000 and raw_ptr == virtual_address:
+            ptr_adj = virtual_address
+
+        if size - ptr_adj < raw_size:
+            length = virtual_size
+        else:
+            length = max(raw_size, virtual_size)
+        if i + 1 < len(raw):
+            next_va = raw[i + 1][1]
+            if next_va > virtual_address and va_adj + length > next_va:
+                length = next_va - va_adj
+        sections.append((va_adj, va_adj + length, ptr_adj, raw_ptr + raw_size))
+
+    return _Image(data, size, pe32_plus, image_base, sections, directories)
+
+
+def _image_from_pefile(pe, data) -> _Image:
+    """
+    The RVA map of headers pefile has already parsed, so the pefile
+    backend can share them with the readers here instead of parsing them
+    again. Section bounds follow pefile's SectionStructure.contains_rva,
+    which _parse_headers mirrors.
+    """
+    size = len(data)
+    sections: List[Section] = []
+    for section in pe.sections:
+        va_adj = section.get_VirtualAddress_adj()
+        ptr_adj = section.get_PointerToRawData_adj()
+        if size - ptr_adj < section.SizeOfRawData:
+            length = section.Misc_VirtualSize
+        else:
+            length = max(section.SizeOfRawData, section.Misc_VirtualSize)
+        next_va = section.next_section_virtual_address
+        if next_va is not None and next_va > section.VirtualAddress and va_adj + length > next_va:
+            length = next_va - va_adj
+        sections.append((va_adj, va_adj + length, ptr_adj, section.PointerToRawData + section.SizeOfRawData))
+
+    optional = pe.OPTIONAL_HEADER
+    return _Image(
+        data,
+        size,
+        optional.Magic == _OPTIONAL_MAGIC_PE32_PLUS,
+        optional.ImageBase,
+        sections,
+        [(entry.VirtualAddress, entry.Size) for entry in optional.DATA_DIRECTORY],
+    )
+
+
+class _SymbolBudget:
+    """
+    Import entries left to read across a file's descriptor tables, and
+    whether a thunk array was cut short because none were left.
+    """
+
+    __slots__ = ("left", "exhausted")
+
+    def __init__(self):
+        # pefile compares its running count with MAX_IMPORT_SYMBOLS before
+        # counting the next entry, so it reads one entry more than the limit.
+        self.left = MAX_IMPORT_SYMBOLS + 1
+        self.exhausted = False
+
+
+def _read_thunks(
+    image: _Image,
+    rva: int,
+    max_length: int,
+    budget: _SymbolBudget,
+    max_count: Optional[int] = None,
+) -> Optional[List[int]]:
+    """
+    Read a zero-terminated thunk array, stopping after `max_count` entries
+    or when the budget runs out. Returns None when the array cannot be read
+    at all and [] when it looks bogus.
+    """
+    data = image.data
+    if image.pe32_plus:
+        fmt, step, ordinal_flag = "<Q", 8, 1 << 63
+    else:
+        fmt, step, ordinal_flag = "<I", 4, 1 << 31
+
+    thunks: List[int] = []
+    seen: set = set()
+    repeated = 0
+    # [low, high] of the name RVAs seen, tracked separately below/above 4GB
+    spans: Dict[bool, List[int]] = {}
+    start = rva
+    while rva:
+        if rva >= start + max_length:
+            break
+        if budget.left <= 0:
+            budget.exhausted = True
+            break
+        if max_count is not None and len(thunks) >= max_count:
+            break
+        budget.left -= 1
+
+        if repeated >= _MAX_REPEATED_ADDRESSES:
+            return []
+        if any(high - low > _MAX_ADDRESS_SPREAD for low, high in spans.values()):
+            return []
+
+        off, limit = image.locate(rva)
+        if off < 0 or off + step > limit:
+            return None
+        value, = struct.unpack_from(fmt, data, off)
+
+        if start <= value <= rva:
+            # AddressOfData pointing back into the array itself
+            break
+        if value:
+            if value & ordinal_flag:
+                if value & 0x7FFFFFFF > 0xFFFF:
+                    return []
+            else:
+                if value in seen:
+                    repeated += 1
+                seen.add(value)
+                span = spans.setdefault(value >= 2**32, [value, value])
+                if value < span[0]:
+                    span[0] = value
+                elif value > span[1]:
+                    span[1] = value
+        else:
+            break
+
+        thunks.append(value)
+        rva += step
+    return thunks
+
+
+def _resolve_thunks(image: _Image, thunks: List[int], dll: bytes) -> List[str]:
+    """Turn thunk values into function names (or ORDINAL_<n>)."""
+    if image.pe32_plus:
+        ordinal_flag, mask = 1 << 63, 0x7FFFFFFFFFFFFFFF
+    else:
+        ordinal_flag, mask = 1 << 31, 0x7FFFFFFF
+
+    funcs: List[str] = []
+    for value in thunks:
+        if value & ordinal_flag:
+            ordinal = value & 0xFFFF
+            if not ordinal:
+                continue
+            name = _ordinal_name(dll, ordinal)
+            funcs.append(name if name else f"ORDINAL_{ordinal}")
+            continue
+
+        hint_rva = value & mask
+        if image.locate(hint_rva)[0] < 0:
+            # An unmappable hint/name entry invalidates the whole descriptor
+            return []
+        name_bytes = image.string_at(hint_rva + 2, MAX_IMPORT_NAME_LENGTH)
+        if not name_bytes or not _FUNCTION_NAME_CHARS.issuperset(name_bytes):
+            continue
+        funcs.append(name_bytes.decode(errors="ignore"))
+    return funcs
+
+
+def _ordinal_name(dll: bytes, ordinal: int) -> Optional[str]:
+    """Known ordinal names, from the ordinal index (see ordinals.py)."""
+    from .ordinals import default_ordinal_index
+
+    index = default_ordinal_index()
+    if index is None:
+        return None
+    return index.resolve(dll.decode(errors="ignore"), ordinal)
+
+
+def _walk_descriptors(
+    image: _Image,
+    rva: int,
+    imports: Imports,
+    budget: _SymbolBudget,
+    delay: bool = False,
+    max_descriptors: Optional[int] = None,
+    max_imports_per_dll: Optional[int] = None,
+) -> None:
+    """
+    Walk an (delay-)import descriptor array and add its entries to
+    `imports`, recording in imports.truncated_by when a caller-supplied cap
+    is hit or the symbol budget runs out.
+
+    Like pefile, there is no limit on the number of descriptors: each one
+    that yields imports uses up part of the budget, and after six that
+    yield none the walk stops.
+    """
+    data = image.data
+    desc_size = 32 if delay else 20
+    error_count = 0
+    # One thunk past the cap tells a capped table from one that fits exactly.
+    max_count = max_imports_per_dll + 1 if max_imports_per_dll is not None else None
+
+    for index in itertools.count():
+        off, limit = image.locate(rva)
+        if off < 0 or off + desc_size > limit:
+            break
+
+        if delay:
+            if not any(struct.unpack_from("<8I", data, off)):
+                break
+            attrs, name_rva, _hmod, iat_rva, int_rva = struct.unpack_from("<IIIII", data, off)
+            if not attrs & 1:
+                # Old-style descriptors hold VAs rather than RVAs
+                name_rva, iat_rva, int_rva = (
+                    v - image.image_base if v >= image.image_base else v
+                    for v in (name_rva, iat_rva, int_rva)
+                )
+            lookup_rva, first_thunk = int_rva, iat_rva
+        else:
+            lookup_rva, _ts, _chain, name_rva, first_thunk = struct.unpack_from("<IIIII", data, off)
+            if not (lookup_rva or _ts or _chain or name_rva or first_thunk):
+                break
+
+        if index == max_descriptors:
+            imports.truncate("max_descriptors")
+            break
+        rva += desc_size
+
+        max_length = image.size - off
+        if rva > lookup_rva or rva > first_thunk:
+            max_length = max(rva - lookup_rva, rva - first_thunk)
+
+        dll = image.string_at(name_rva, MAX_DLL_LENGTH)
+        # Sanitized before ordinal names are looked up under it, as in pefile
+        if not _DLL_NAME_CHARS.issuperset(dll):
+            dll = b"*invalid*"
+        funcs: List[str] = []
+        ilt = _read_thunks(image, lookup_rva, max_length, budget, max_count) if lookup_rva else None
+        iat = _read_thunks(image, first_thunk, max_length, budget, max_count) if first_thunk else None
+        table = ilt or iat
+        if table and max_count is not None and len(table) == max_count:
+            table = table[:max_imports_per_dll]
+            imports.truncate("max_imports_per_dll")
+        if budget.exhausted:
+            imports.truncate("symbol_limit")
+        if table:
+            funcs = _resolve_thunks(image, table, dll)
+
+        if error_count > 5:
+            break
+        if not funcs:
+            error_count += 1
+            continue
+
+        if dll:
+            imports.setdefault(dll.decode(errors="ignore").upper(), []).extend(funcs)
+
+
+def read_imports(
+    data,
+    delay_imports: bool = False,
+    max_descriptors: Optional[int] = None,
+    max_imports_per_dll: Optional[int] = None,
+) -> Imports:
+    """
+    Extract imports from PE file contents (bytes, mmap or memoryview).
+
+    Returns the same structure as `pe_parser.get_imports`, including its
+    descriptor and per-DLL caps.
+
+    Raises:
+        PEParseError: if the headers are not those of a PE file.
+    """
+    return _read_image_imports(_parse_headers(data), delay_imports, max_descriptors, max_imports_per_dll)
+
+
+def _read_image_imports(
+    image: _Image,
+    delay_imports: bool = False,
+    max_descriptors: Optional[int] = None,
+    max_imports_per_dll: Optional[int] = None,
+) -> Imports:
+    """read_imports over headers that are already parsed."""
+    imports = Imports()
+    budget = _SymbolBudget()
+    caps = (max_descriptors, max_imports_per_dll)
+
+    if len(image.directories) > _IMPORT_DIRECTORY:
+        rva, _size = image.directories[_IMPORT_DIRECTORY]
+        if rva:
+            _walk_descriptors(image, rva, imports, budget, False, *caps)
+
+    if delay_imports and len(image.directories) > _DELAY_IMPORT_DIRECTORY:
+        rva, _size = image.directories[_DELAY_IMPORT_DIRECTORY]
+        if rva:
+            _walk_descriptors(image, rva, imports, budget, True, *caps)
+
+    return imports
+
+
+def read_exports(data) -> Tuple[Optional[str], List[Tuple[int, str]]]:
+    """
+    (DLL name from the export directory, [(ordinal, name), ...]) of the
+    named exports in PE file contents; (None, []) without an export table.
+    Names that are not plain identifiers are skipped.
+
+    Raises:
+        PEParseError: if the headers are not those of a PE file.
+    """
+    return _read_exports(_parse_headers(data))
+
+
+def _read_exports(image: _Image) -> Tuple[Optional[str], List[Tuple[int, str]]]:
+    if len(image.directories) <= _EXPORT_DIRECTORY or not image.directories[_EXPORT_DIRECTORY][0]:
+        return None, []
+    data = image.data
+    off, limit = image.locate(image.directories[_EXPORT_DIRECTORY][0])
+    if off < 0 or off + 40 > limit:
+        return None, []
+    name_rva, base, _functions, num_names, _addresses, names_rva, ordinals_rva = (
+        struct.unpack_from("<7I", data, off + 12)
+    )
+    dll = image.string_at(name_rva, MAX_DLL_LENGTH)
+
+    exports: List[Tuple[int, str]] = []
+    names_off, names_limit = image.locate(names_rva)
+    ordinals_off, ordinals_limit = image.locate(ordinals_rva)
+    if names_off < 0 or ordinals_off < 0:
+        return dll.decode(errors="ignore") or None, exports
+    count = min(num_names, MAX_EXPORT_SYMBOLS, (names_limit - names_off) // 4, (ordinals_limit - ordinals_off) // 2)
+    for i in range(max(count, 0)):
+        symbol_rva, = struct.unpack_from("<I", data, names_off + 4 * i)
+        index, = struct.unpack_from("<H", data, ordinals_off + 2 * i)
+        name = image.string_at(symbol_rva, MAX_IMPORT_NAME_LENGTH)
+        if name and _FUNCTION_NAME_CHARS.issuperset(name):
+            exports.append(((base + index) & 0xFFFF, name.decode()))
+    return dll.decode(errors="ignore") or None, exports
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from .pe_parser import DEFAULT_BACKEND, _open_source, _pefile, _read_imports
+from .categorize import categorize_imports, default_api_dictionary
+from .analyze import compute_capabilities, detect_patterns
+from .apistrings import scan_api_strings, with_string_apis
+from .cache import ResultCache, data_sha256, file_sha256
+from .depth import ANALYZERS, DEFAULT_DEPTH, analyze_image, analyzers_for, with_delay_imports
+from .packing import analyze_packing, packing_capability
+from .profiling import StageProfile, stage_timer
+from .rules import default_ruleset
+
+
+def warm_up(backend: Optional[str] = None) -> None:
+    """
+    Pay the one-time costs (pefile import, API table, compiled rules) up
+    front, so they are not charged to the first file analyzed.
+    """
+    default_api_dictionary()
+    default_ruleset()
+    if (backend or DEFAULT_BACKEND) == "pefile":
+        _pefile()
+
+
+def _count_imports(profile: StageProfile, imports: Dict[str, list]) -> None:
+    profile.count("dlls", len(imports))
+    profile.count("imports", sum(len(funcs) for funcs in imports.values()))
+
+
+def run_pipeline(
+    path: str | Path,
+    cache: Optional[ResultCache] = None,
+    backend: Optional[str] = None,
+    profile: Optional[StageProfile] = None,
+    max_descriptors: Optional[int] = None,
+    max_imports_per_dll: Optional[int] = None,
+    data: Optional[bytes] = None,
+    scan_strings: bool = False,
+    packing: bool = False,
+    depth: str = DEFAULT_DEPTH,
+) -> Dict[str, object]:
+    """
+    Run parse -> categorize -> analyze for one file.
+
+    With a cache, the file is hashed first and the stored stage outputs are
+    reused when the contents (and rule tables) are unchanged. `backend`
+    selects the import parser (see pe_parser.BACKENDS). A `profile` records
+    the time spent in each stage plus file size, DLL/import and cache-hit
+    counters. `max_descriptors` and `max_imports_per_dll` cap the import
+    table (see get_imports); a table cut short by a cap or by the parser's
+    own limit is flagged "truncated", and "truncated_by" lists the causes
+    (see pe_parser.Imports). The caps are part of the cache key. With `data`
+    the file contents are analyzed from memory and `path` only names them
+    (e.g. "archive.zip!dir/member.exe"). With `scan_strings`, API names
+    found as strings in the section data (see apistrings.scan_api_strings)
+    are categorized and matched against the rules along with the imports,
+    and listed under "string_apis". With `packing`, the entropy and packer
+    heuristics of packing.analyze_packing are stored under "packing" and
+    summarized as a "packed" capability. A `depth` other than "imports"
+    runs the data-directory analyzers of depth.DEPTHS, each stored under
+    its name ("exports", "delay_imports", "bound_imports", "resources";
+    None when the file lacks that directory); delay-load imports are
+    capped like the imports, count towards "truncated", and are
+    categorized along with them.
+
+    Returns:
+    {
+        "imports": {...},        # get_imports
+        "categorized": {...},    # categorize_imports
+        "capabilities": {...},   # compute_capabilities
+        "pattern_ids": [...],    # detect_patterns
+        "truncated": bool,       # the import table was cut short
+        "truncated_by": [...],   # why (Imports.truncated_by)
+        "string_apis": [...],    # only with scan_strings
+        "packing": {...},        # only with packing
+        "exports": {...}, ...    # the analyzers of `depth`
+        "cached": bool,
+    }
+
+    Raises:
+        FileNotFoundError: if the file does not exist.
+        PEParseError: if the file cannot be parsed as a PE.
+    """
+    analyzers = analyzers_for(depth)
+    timed = stage_timer(profile)
+    if profile is not None:
+        if data is not None:
+            profile.count("file_bytes", len(data))
+        elif os.path.isfile(path):
+            profile.count("file_bytes", os.path.getsize(path))
+
+    digest = None
+    if cache is not None:
+        with timed("hash"):
+            digest = data_sha256(data) if data is not None else file_sha256(path)
+        # Results differ by backend, caps and optional stages, so each
+        # combination is cached separately.
+        digest += f"+{backend or DEFAULT_BACKEND}"
+        if max_descriptors is not None:
+            digest += f"+descriptors={max_descriptors}"
+        if max_imports_per_dll is not None:
+            digest += f"+imports={max_imports_per_dll}"
+        if scan_strings:
+            digest += "+strings"
+        if packing:
+            digest += "+packing"
+        if analyzers:
+            digest += f"+{depth}"
+        with timed("cache_get"):
+            hit = cache.get(digest)
+        if hit is not None:
+            hit.setdefault("truncated", False)
+            hit.setdefault("truncated_by", [])
+            if profile is not None:
+                profile.count("cache_hits")
+                _count_imports(profile, hit["imports"])
+            hit["cached"] = True
+            return hit
+
+    # One mapping and one header parse serve every stage below.
+    with _open_source(data if data is not None else path, str(path)) as (contents, name):
+        with timed("get_imports"):
+            imports, image = _read_imports(
+                contents,
+                name,
+                backend=backend,
+                max_descriptors=max_descriptors,
+                max_imports_per_dll=max_imports_per_dll,
+            )
+        referenced = imports
+        if analyzers:
+            directories = analyze_image(image, analyzers, profile, max_descriptors, max_imports_per_dll)
+            delay_imports = directories.get("delay_imports")
+            for cause in getattr(delay_imports, "truncated_by", ()):
+                imports.truncate(cause)
+            referenced = with_delay_imports(imports, delay_imports)
+        if scan_strings:
+            with timed("scan_strings"):
+                string_apis = scan_api_strings(contents, exclude=referenced, image=image)
+            referenced = with_string_apis(referenced, string_apis)
+        if packing:
+            with timed("packing"):
+                packing_result = analyze_packing(contents, imports, name=name)
+    with timed("categorize_imports"):
+        categorized = categorize_imports(referenced)
+    with timed("compute_capabilities"):
+        capabilities = compute_capabilities(categorized)
+    with timed("detect_patterns"):
+        pattern_ids = detect_patterns(categorized, referenced)
+    if packing:
+        capabilities["packed"] = packing_capability(packing_result)
+    result: Dict[str, object] = {
+        "imports": imports,
+        "categorized": categorized,
+        "capabilities": capabilities,
+        "pattern_ids": pattern_ids,
+        "truncated": imports.truncated,
+        "truncated_by": list(imports.truncated_by),
+    }
+    if scan_strings:
+        result["string_apis"] = string_apis
+    if packing:
+        result["packing"] = packing_result
+    if analyzers:
+        result.update(directories)
+    if profile is not None:
+        _count_imports(profile, imports)
+
+    if cache is not None:
+        with timed("cache_put"):
+            cache.put(digest, result)
+    result["cached"] = False
+    return result
+
+
+def report_details(result: Dict[str, object]) -> Dict[str, object]:
+    """
+    The outputs of optional stages in a run_pipeline result, keyed as they
+    appear in reports (see report.build_report_data). Single-file reports
+    and batch records use the same keys.
+    """
+    details: Dict[str, object] = {}
+    if "string_apis" in result:
+        details["string_referenced_apis"] = result["string_apis"]
+    if "packing" in result:
+        details["packing"] = result["packing"]
+    for name in ANALYZERS:
+        if name in result:
+            details[name] = result[name]
+    return details
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import csv
+import heapq
+import json
+import math
+import os
+import sys
+import time
+from array import array
+from contextlib import contextmanager, nullcontext
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional, TextIO, Tuple
+
+# Percentiles reported per stage by ProfileAggregator.summary().
+PERCENTILES = (50, 95, 99)
+
+
+class StageProfile:
+    """
+    Timers and counters for one analyzed file.
+
+    Stages are timed with perf_counter and accumulate if entered more than
+    once; counters are plain integers (bytes, DLLs, imports, cache hits).
+    """
+
+    __slots__ = ("timings", "counters")
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        """{"stages": {name: milliseconds}, "counters": {name: value}} (picklable)."""
+        return {
+            "stages": {name: seconds * 1e3 for name, seconds in self.timings.items()},
+            "counters": dict(self.counters),
+        }
+
+
+def stage_timer(profile: Optional[StageProfile]) -> Callable[[str], ContextManager[None]]:
+    """profile.stage, or a no-op context manager factory when not profiling."""
+    if profile is None:
+        return lambda name: nullcontext()
+    return profile.stage
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+class ProfileAggregator:
+    """
+    Combine per-file StageProfile dicts into run-wide statistics.
+
+    Stage times are kept in compact float arrays (8 bytes per file and
+    stage) so percentiles are exact; only the `keep_slowest` slowest files
+    are remembered by name.
+    """
+
+    def __init__(self, keep_slowest: int = 0):
+        self.keep_slowest = keep_slowest
+        self.files = 0
+        self._stages: Dict[str, array] = {}
+        self._counters: Dict[str, int] = {}
+        self._slowest: List[Tuple[float, str]] = []
+
+    def add(self, file: str, profile: Dict[str, Dict[str, float]]) -> None:
+        self.files += 1
+        total = 0.0
+        for name, ms in profile["stages"].items():
+            self._stages.setdefault(name, array("d")).append(ms)
+            total += ms
+        self._stages.setdefault("total", array("d")).append(total)
+        for name, value in profile["counters"].items():
+            self._counters[name] = self._counters.get(name, 0) + value
+
+        if self.keep_slowest:
+            item = (total, file)
+            if len(self._slowest) < self.keep_slowest:
+                heapq.heappush(self._slowest, item)
+            elif item > self._slowest[0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def slowest(self) -> List[Tuple[str, float]]:
+        """(file, total ms) of the slowest files, slowest first."""
+        return [(file, ms) for ms, file in sorted(self._slowest, reverse=True)]
+
+    def summary(self) -> Dict[str, object]:
+        """
+        Returns:
+        {
+            "files": 1000,
+            "stages": {"get_imports": {"count", "total_ms", "mean_ms",
+                       "p50_ms", "p95_ms", "p99_ms", "max_ms"}, ...,
+                       "total": {...}},
+            "counters": {"file_bytes": ..., "imports": ..., ...},
+            "slowest": [{"file": ..., "total_ms": ...}, ...],
+        }
+        """
+        stages: Dict[str, Dict[str, float]] = {}
+        for name in sorted(self._stages, key=lambda n: n == "total"):
+            ordered = sorted(self._stages[name])
+            stats = {
+                "count": len(ordered),
+                "total_ms": sum(ordered),
+                "mean_ms": sum(ordered) / len(ordered),
+            }
+            for pct in PERCENTILES:
+                stats[f"p{pct}_ms"] = _percentile(ordered, pct)
+            stats["max_ms"] = ordered[-1]
+            stages[name] = stats
+        return {
+            "files": self.files,
+            "stages": stages,
+            "counters": dict(self._counters),
+            "slowest": [{"file": file, "total_ms": ms} for file, ms in self.slowest()],
+        }
+
+
+def profile_files(
+    paths: List[str],
+    top: int = 15,
+    max_member_bytes: Optional[int] = None,
+    **options: object,
+) -> List[Dict[str, object]]:
+    """
+    Re-run the pipeline on each file under cProfile, then under tracemalloc
+    (separately, so neither skews the other), without the result cache.
+    `options` are passed to run_pipeline, so the profiled work is the same
+    as in the run being profiled. "archive!member" names are read again
+    from their archive (see containers.find_member).
+
+    Returns one record per file:
+    {"file", "top_functions": [{"function", "calls", "tottime_ms",
+     "cumtime_ms"}, ...], "peak_alloc_bytes", "top_allocations":
+     [{"location", "bytes", "count"}, ...]}
+    or, for a file that could not be analyzed, {"file", "error": {"type",
+    "message"}}.
+    """
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    from .analyze import describe_patterns
+    from .containers import DEFAULT_MAX_MEMBER_BYTES, SEPARATOR, find_member
+    from .pipeline import report_details, run_pipeline
+    from .report import build_report_data
+
+    def member_of(path: str):
+        """The archive member `path` names, None for a plain file."""
+        if SEPARATOR not in path or os.path.exists(path):
+            return None
+        member = find_member(path, max_member_bytes or DEFAULT_MAX_MEMBER_BYTES)
+        if member is None:
+            raise FileNotFoundError(f"File not found: {path}")
+        return member
+
+    def analyze(path: str, data: Optional[bytes]) -> None:
+        result = run_pipeline(path, data=data, **options)
+        patterns = describe_patterns(result["pattern_ids"])
+        build_report_data(path, result["imports"], result["capabilities"], patterns, report_details(result))
+
+    records: List[Dict[str, object]] = []
+    for path in paths:
+        profiler = cProfile.Profile()
+        try:
+            member = member_of(path)
+            if member is not None and member.error is not None:
+                records.append({"file": path, "error": {"type": "ContainerError", "message": member.error}})
+                continue
+            data = member.data if member is not None else None
+            profiler.runcall(analyze, path, data)
+        except Exception as e:
+            records.append({"file": path, "error": {"type": type(e).__name__, "message": str(e)}})
+            continue
+        stats = pstats.Stats(profiler)
+        ranked = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:top]
+        top_functions = [
+            {
+                "function": f"{filename}:{line}({name})",
+                "calls": calls,
+                "tottime_ms": tottime * 1e3,
+                "cumtime_ms": cumtime * 1e3,
+            }
+            for (filename, line, name), (_, calls, tottime, cumtime, _) in ranked
+        ]
+
+        tracemalloc.start()
+        try:
+            analyze(path, data)
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        top_allocations = [
+            {"location": str(stat.traceback[0]), "bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:top]
+        ]
+
+        records.append({
+            "file": path,
+            "top_functions": top_functions,
+            "peak_alloc_bytes": peak,
+            "top_allocations": top_allocations,
+        })
+    return records
+
+
+def _csv_rows(summary: Dict[str, object]) -> Iterator[Tuple[str, str, str, object]]:
+    """Flatten a profile summary into (scope, name, metric, value) rows."""
+    yield "run", "files", "count", summary["files"]
+    for name, stats in summary["stages"].items():
+        for metric, value in stats.items():
+            yield "stage", name, metric, value
+    for name, value in summary["counters"].items():
+        yield "counter", name, "total", value
+    for entry in summary["slowest"]:
+        yield "slowest", entry["file"], "total_ms", entry["total_ms"]
+    for hook in summary.get("hooks", []):
+        scope = f"file:{hook['file']}"
+        yield scope, "tracemalloc", "peak_alloc_bytes", hook["peak_alloc_bytes"]
+        for alloc in hook["top_allocations"]:
+            yield scope, alloc["location"], "alloc_bytes", alloc["bytes"]
+        for func in hook["top_functions"]:
+            yield scope, func["function"], "cumtime_ms", func["cumtime_ms"]
+
+
+def write_profile(summary: Dict[str, object], out: TextIO, fmt: str = "json") -> None:
+    """Write a profile summary as JSON, or as CSV rows of scope,name,metric,value."""
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(["scope", "name", "metric", "value"])
+        writer.writerows(_csv_rows(summary))
+    else:
+        json.dump(summary, out, indent=2)
+        out.write("\n")
+
+
+def save_profile(summary: Dict[str, object], target: str) -> None:
+    """
+    Write a profile summary to `target` ("-" for stderr). The format is CSV
+    when the file name ends in .csv and JSON otherwise.
+    """
+    fmt = "csv" if target.lower().endswith(".csv") else "json"
+    if target == "-":
+        write_profile(summary, sys.stderr, fmt)
+        return
+    with open(target, "w", encoding="utf-8", newline="") as f:
+        write_profile(summary, f, fmt)
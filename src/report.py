@@ -1,19 +1,26 @@
 from __future__ import annotations
 
+import html
 import json
-from typing import Dict, List, Tuple
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
 
 
-def build_json_report(
+def build_report_data(
     path: str,
     imports: Dict[str, List[str]],
     capabilities: Dict[str, Dict[str, object]],
     patterns: List[Tuple[str, str]],
-) -> str:
+    details: Optional[Dict[str, object]] = None,
+) -> Dict[str, object]:
     """
-    Build a JSON report.
+    Build the JSON-serializable report structure for one file.
+
+    `details` are the results of optional stages (see
+    pipeline.report_details), added as top-level keys.
     """
-    report_data = {
+    data = {
         "file": path,
         "total_imports": sum(len(funcs) for funcs in imports.values()),
         "imported_dlls": list(imports.keys()),
@@ -21,135 +28,463 @@ def build_json_report(
         "detected_patterns": [pid for pid, _ in patterns],
         "pattern_descriptions": {pid: text for pid, text in patterns},
     }
-    return json.dumps(report_data, indent=2)
+    if details:
+        data.update(details)
+    return data
 
 
-def build_html_report(
+def build_json_report(
     path: str,
     imports: Dict[str, List[str]],
     capabilities: Dict[str, Dict[str, object]],
     patterns: List[Tuple[str, str]],
+    details: Optional[Dict[str, object]] = None,
 ) -> str:
     """
-    Build an HTML report.
+    Build a JSON report.
     """
-    html_lines: List[str] = []
-    html_lines.append("<!DOCTYPE html>")
-    html_lines.append("<html>")
-    html_lines.append("<head>")
-    html_lines.append("<meta charset='utf-8'>")
-    html_lines.append("<title>PE Analysis Report</title>")
-    html_lines.append("<style>")
-    html_lines.append("body { font-family: Arial, sans-serif; margin: 20px; }")
-    html_lines.append("h1 { color: #333; }")
-    html_lines.append("h2 { color: #666; border-bottom: 2px solid #ddd; padding-bottom: 5px; }")
-    html_lines.append(".capability { margin: 10px 0; padding: 10px; background-color: #f5f5f5; border-left: 4px solid #0078d4; }")
-    html_lines.append(".pattern { margin: 10px 0; padding: 10px; background-color: #fff3cd; border-left: 4px solid #ffc107; }")
-    html_lines.append("table { width: 100%; border-collapse: collapse; margin: 10px 0; }")
-    html_lines.append("th, td { padding: 10px; text-align: left; border-bottom: 1px solid #ddd; }")
-    html_lines.append("th { background-color: #f5f5f5; }")
-    html_lines.append("</style>")
-    html_lines.append("</head>")
-    html_lines.append("<body>")
-    html_lines.append(f"<h1>PE Analysis Report</h1>")
-    html_lines.append(f"<p><strong>File:</strong> {path}</p>")
+    report_data = build_report_data(path, imports, capabilities, patterns, details)
+    return json.dumps(report_data, indent=2)
+
+
+# Section titles of the optional report details (other keys are title-cased).
+_DETAIL_TITLES = {
+    "string_referenced_apis": "String-Referenced APIs",
+    "packing": "Packing Analysis",
+    "exports": "Exports",
+    "delay_imports": "Delay-Load Imports",
+    "bound_imports": "Bound Imports",
+    "resources": "Resources",
+}
+
+
+def _detail_title(key: str) -> str:
+    return _DETAIL_TITLES.get(key, key.replace("_", " ").title())
+
+
+def _scalar(value: object) -> str:
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return "None" if value is None else str(value)
+
+
+def _is_flat(value: object) -> bool:
+    """A list of scalars, rendered on one line."""
+    return isinstance(value, list) and not any(isinstance(item, (dict, list)) for item in value)
+
+
+def _detail_lines(value: object, indent: str = "") -> Iterator[str]:
+    """Text lines for a details value: nested dicts and lists as indented bullets."""
+    if isinstance(value, dict):
+        if not value:
+            yield f"{indent}None"
+        for key, item in value.items():
+            if isinstance(item, (dict, list)) and not _is_flat(item):
+                yield f"{indent}- {key}:"
+                yield from _detail_lines(item, indent + "  ")
+            else:
+                yield f"{indent}- {key}: {_detail_line(item)}"
+    elif isinstance(value, list) and not _is_flat(value):
+        for item in value:
+            if isinstance(item, dict) and not any(isinstance(v, dict) for v in item.values()):
+                yield f"{indent}- " + ", ".join(f"{key}={_detail_line(v)}" for key, v in item.items())
+            else:
+                yield f"{indent}-"
+                yield from _detail_lines(item, indent + "  ")
+    else:
+        yield f"{indent}{_detail_line(value)}"
+
+
+def _detail_line(value: object) -> str:
+    if isinstance(value, list):
+        return ", ".join(map(_scalar, value)) or "None"
+    return _scalar(value)
+
+
+def _detail_html(value: object) -> Iterator[str]:
+    """HTML for a details value: nested dicts and lists as nested <ul>s."""
+    if isinstance(value, dict) or (isinstance(value, list) and not _is_flat(value)):
+        items = value.items() if isinstance(value, dict) else enumerate(value, 1)
+        yield "<ul>"
+        for key, item in items:
+            if isinstance(item, (dict, list)) and not _is_flat(item):
+                yield f"<li>{html.escape(str(key))}:"
+                yield from _detail_html(item)
+                yield "</li>"
+            else:
+                yield f"<li>{html.escape(str(key))}: {html.escape(_detail_line(item))}</li>"
+        yield "</ul>"
+    else:
+        yield f"<p>{html.escape(_detail_line(value))}</p>"
+
+
+def iter_html_report(
+    path: str,
+    imports: Dict[str, List[str]],
+    capabilities: Dict[str, Dict[str, object]],
+    patterns: List[Tuple[str, str]],
+    details: Optional[Dict[str, object]] = None,
+) -> Iterator[str]:
+    """
+    Yield the lines of an HTML report one at a time.
+    """
+    yield "<!DOCTYPE html>"
+    yield "<html>"
+    yield "<head>"
+    yield "<meta charset='utf-8'>"
+    yield "<title>PE Analysis Report</title>"
+    yield "<style>"
+    yield "body { font-family: Arial, sans-serif; margin: 20px; }"
+    yield "h1 { color: #333; }"
+    yield "h2 { color: #666; border-bottom: 2px solid #ddd; padding-bottom: 5px; }"
+    yield ".capability { margin: 10px 0; padding: 10px; background-color: #f5f5f5; border-left: 4px solid #0078d4; }"
+    yield ".pattern { margin: 10px 0; padding: 10px; background-color: #fff3cd; border-left: 4px solid #ffc107; }"
+    yield "table { width: 100%; border-collapse: collapse; margin: 10px 0; }"
+    yield "th, td { padding: 10px; text-align: left; border-bottom: 1px solid #ddd; }"
+    yield "th { background-color: #f5f5f5; }"
+    yield "</style>"
+    yield "</head>"
+    yield "<body>"
+    yield f"<h1>PE Analysis Report</h1>"
+    yield f"<p><strong>File:</strong> {path}</p>"
 
     total_imports = sum(len(funcs) for funcs in imports.values())
-    html_lines.append(f"<p><strong>Total Imported APIs:</strong> {total_imports}</p>")
-    html_lines.append(f"<p><strong>Imported DLLs:</strong> {', '.join(sorted(imports.keys())) or 'None'}</p>")
+    yield f"<p><strong>Total Imported APIs:</strong> {total_imports}</p>"
+    yield f"<p><strong>Imported DLLs:</strong> {', '.join(sorted(imports.keys())) or 'None'}</p>"
 
-    html_lines.append("<h2>Capability Summary</h2>")
+    yield "<h2>Capability Summary</h2>"
     for category, info in capabilities.items():
         if not info["present"]:
             continue
         examples = info["examples"]
         example_str = ", ".join(examples) if examples else "N/A"
-        html_lines.append(f"<div class='capability'>")
-        html_lines.append(f"<strong>{category}:</strong> {info['description']} ")
-        html_lines.append(f"(count={info['count']}, examples: {example_str})")
-        html_lines.append(f"</div>")
+        yield f"<div class='capability'>"
+        yield f"<strong>{category}:</strong> {info['description']} "
+        yield f"(count={info['count']}, examples: {example_str})"
+        yield f"</div>"
 
     if all(not info["present"] for info in capabilities.values()):
-        html_lines.append("<p>No categorized capabilities detected (all imports unknown).</p>")
+        yield "<p>No categorized capabilities detected (all imports unknown).</p>"
 
-    html_lines.append("<h2>Detected Behavior Patterns</h2>")
+    yield "<h2>Detected Behavior Patterns</h2>"
     if not patterns:
-        html_lines.append("<p>None detected (based on current heuristic rules).</p>")
+        yield "<p>None detected (based on current heuristic rules).</p>"
     else:
         for pid, text in patterns:
-            html_lines.append(f"<div class='pattern'>")
+            yield f"<div class='pattern'>"
             if text:
-                html_lines.append(f"<strong>{pid}:</strong> {text}")
+                yield f"<strong>{pid}:</strong> {text}"
             else:
-                html_lines.append(f"<strong>{pid}</strong>")
-            html_lines.append(f"</div>")
+                yield f"<strong>{pid}</strong>"
+            yield f"</div>"
 
-    html_lines.append("<h2>Imported DLLs and Functions</h2>")
-    html_lines.append("<table>")
-    html_lines.append("<tr><th>DLL</th><th>Functions</th></tr>")
+    yield "<h2>Imported DLLs and Functions</h2>"
+    yield "<table>"
+    yield "<tr><th>DLL</th><th>Functions</th></tr>"
     for dll, funcs in sorted(imports.items()):
-        html_lines.append(f"<tr><td>{dll}</td><td>{', '.join(sorted(funcs))}</td></tr>")
-    html_lines.append("</table>")
+        yield f"<tr><td>{dll}</td><td>{', '.join(sorted(funcs))}</td></tr>"
+    yield "</table>"
 
-    html_lines.append("<hr>")
-    html_lines.append("<p><em>This analysis is heuristic and based only on statically imported APIs. ")
-    html_lines.append("Dynamically resolved APIs or packed/obfuscated binaries may hide behavior.</em></p>")
-    html_lines.append("</body>")
-    html_lines.append("</html>")
+    for key, value in (details or {}).items():
+        yield f"<h2>{html.escape(_detail_title(key))}</h2>"
+        yield from _detail_html(value)
 
-    return "\n".join(html_lines)
+    yield "<hr>"
+    yield "<p><em>This analysis is heuristic and based only on statically imported APIs. "
+    yield "Dynamically resolved APIs or packed/obfuscated binaries may hide behavior.</em></p>"
+    yield "</body>"
+    yield "</html>"
 
 
-def build_text_report(
+def build_html_report(
     path: str,
     imports: Dict[str, List[str]],
     capabilities: Dict[str, Dict[str, object]],
     patterns: List[Tuple[str, str]],
+    details: Optional[Dict[str, object]] = None,
 ) -> str:
     """
-    Build a human-readable text report.
+    Build an HTML report.
     """
-    lines: List[str] = []
+    return "\n".join(iter_html_report(path, imports, capabilities, patterns, details))
 
-    lines.append(f"File: {path}")
-    lines.append("")
+
+def iter_text_report(
+    path: str,
+    imports: Dict[str, List[str]],
+    capabilities: Dict[str, Dict[str, object]],
+    patterns: List[Tuple[str, str]],
+    details: Optional[Dict[str, object]] = None,
+) -> Iterator[str]:
+    """
+    Yield the lines of a human-readable text report one at a time.
+    """
+    yield f"File: {path}"
+    yield ""
 
     total_imports = sum(len(funcs) for funcs in imports.values())
-    lines.append(f"Total imported APIs: {total_imports}")
-    lines.append(f"Imported DLLs: {', '.join(sorted(imports.keys())) or 'None'}")
-    lines.append("")
+    yield f"Total imported APIs: {total_imports}"
+    yield f"Imported DLLs: {', '.join(sorted(imports.keys())) or 'None'}"
+    yield ""
 
-    lines.append("== Capability Summary ==")
+    yield "== Capability Summary =="
     for category, info in capabilities.items():
         if not info["present"]:
             continue
         examples = info["examples"]
         example_str = ", ".join(examples) if examples else "N/A"
-        lines.append(
+        yield (
             f"- {category}: {info['description']} "
             f"(count={info['count']}, examples: {example_str})"
         )
 
     # Show if everything was unknown
     if all(not info["present"] for info in capabilities.values()):
-        lines.append("- No categorized capabilities detected (all imports unknown).")
+        yield "- No categorized capabilities detected (all imports unknown)."
 
-    lines.append("")
-    lines.append("== Detected Behavior Patterns ==")
+    yield ""
+    yield "== Detected Behavior Patterns =="
     if not patterns:
-        lines.append("None detected (based on current heuristic rules).")
+        yield "None detected (based on current heuristic rules)."
     else:
         for pid, text in patterns:
             if text:
-                lines.append(f"- {text}")
+                yield f"- {text}"
             else:
-                lines.append(f"- {pid}")
+                yield f"- {pid}"
 
-    lines.append("")
-    lines.append("== Notes ==")
-    lines.append(
+    for key, value in (details or {}).items():
+        yield ""
+        yield f"== {_detail_title(key)} =="
+        yield from _detail_lines(value)
+
+    yield ""
+    yield "== Notes =="
+    yield (
         "This analysis is heuristic and based only on statically imported APIs. "
         "Dynamically resolved APIs or packed/obfuscated binaries may hide behavior."
     )
 
-    return "\n".join(lines)
+
+def build_text_report(
+    path: str,
+    imports: Dict[str, List[str]],
+    capabilities: Dict[str, Dict[str, object]],
+    patterns: List[Tuple[str, str]],
+    details: Optional[Dict[str, object]] = None,
+) -> str:
+    """
+    Build a human-readable text report.
+    """
+    return "\n".join(iter_text_report(path, imports, capabilities, patterns, details))
+
+
+def write_lines(out: TextIO, lines: Iterable[str]) -> None:
+    """
+    Write report lines to `out` as they are produced, newline-separated
+    (the same text as "\n".join(lines), without holding it all in memory).
+    """
+    first = True
+    for line in lines:
+        if not first:
+            out.write("\n")
+        out.write(line)
+        first = False
+
+
+def write_json_report(
+    out: TextIO,
+    path: str,
+    imports: Dict[str, List[str]],
+    capabilities: Dict[str, Dict[str, object]],
+    patterns: List[Tuple[str, str]],
+    details: Optional[Dict[str, object]] = None,
+) -> None:
+    """
+    Stream the JSON report to `out` (same text as build_json_report).
+    """
+    json.dump(build_report_data(path, imports, capabilities, patterns, details), out, indent=2)
+
+
+def write_html_report(
+    out: TextIO,
+    path: str,
+    imports: Dict[str, List[str]],
+    capabilities: Dict[str, Dict[str, object]],
+    patterns: List[Tuple[str, str]],
+    details: Optional[Dict[str, object]] = None,
+) -> None:
+    """
+    Stream the HTML report to `out` (same text as build_html_report).
+    """
+    write_lines(out, iter_html_report(path, imports, capabilities, patterns, details))
+
+
+def write_text_report(
+    out: TextIO,
+    path: str,
+    imports: Dict[str, List[str]],
+    capabilities: Dict[str, Dict[str, object]],
+    patterns: List[Tuple[str, str]],
+    details: Optional[Dict[str, object]] = None,
+) -> None:
+    """
+    Stream the text report to `out` (same text as build_text_report).
+    """
+    write_lines(out, iter_text_report(path, imports, capabilities, patterns, details))
+
+
+def emit_report(
+    path: str,
+    imports: Dict[str, List[str]],
+    capabilities: Dict[str, Dict[str, object]],
+    patterns: List[Tuple[str, str]],
+    output_format: str = "text",
+    verbose: bool = False,
+    details: Optional[Dict[str, object]] = None,
+) -> None:
+    """
+    Write the single-file CLI report: text or JSON to stdout, or HTML to
+    "<stem>_analysis.html" in the current directory.
+    """
+    if output_format == "json":
+        write_json_report(sys.stdout, path, imports, capabilities, patterns, details)
+        print()
+    elif output_format == "html":
+        output_file = Path(path).stem + "_analysis.html"
+        with open(output_file, "w") as f:
+            write_html_report(f, path, imports, capabilities, patterns, details)
+        if verbose:
+            print(f"[INFO] HTML report saved to: {output_file}")
+        else:
+            print(f"HTML report saved to: {output_file}")
+    else:
+        write_text_report(sys.stdout, path, imports, capabilities, patterns, details)
+        print()
+
+
+class RecordWriter:
+    """
+    Base class for incremental multi-file writers.
+
+    Each record is a per-file dict as produced by build_report_data (or an
+    error record with an "error" key). Records are written as they arrive so
+    memory stays flat and readers can consume the output during the scan.
+    """
+
+    def __init__(self, out: TextIO):
+        self.out = out
+        self.count = 0
+
+    def write(self, record: Dict[str, object]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        self.out.flush()
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class NDJSONWriter(RecordWriter):
+    """One JSON object per line."""
+
+    def write(self, record: Dict[str, object]) -> None:
+        self.out.write(json.dumps(record))
+        self.out.write("\n")
+        self.out.flush()
+        self.count += 1
+
+
+class JSONArrayWriter(RecordWriter):
+    """A single JSON array, written one element at a time."""
+
+    def write(self, record: Dict[str, object]) -> None:
+        self.out.write("[\n" if self.count == 0 else ",\n")
+        self.out.write(json.dumps(record))
+        self.out.flush()
+        self.count += 1
+
+    def close(self) -> None:
+        self.out.write("[]\n" if self.count == 0 else "\n]\n")
+        super().close()
+
+
+class HTMLTableWriter(RecordWriter):
+    """
+    An HTML summary table with one row per file.
+
+    Rows are buffered and emitted in <tbody> chunks of `chunk_rows`, so the
+    page renders progressively and the buffer never grows past one chunk.
+    """
+
+    def __init__(self, out: TextIO, title: str = "PE Batch Analysis Report", chunk_rows: int = 500):
+        super().__init__(out)
+        self.chunk_rows = chunk_rows
+        self._rows: List[str] = []
+        self.errors = 0
+        write_lines(out, [
+            "<!DOCTYPE html>",
+            "<html>",
+            "<head>",
+            "<meta charset='utf-8'>",
+            f"<title>{html.escape(title)}</title>",
+            "<style>",
+            "body { font-family: Arial, sans-serif; margin: 20px; }",
+            "table { width: 100%; border-collapse: collapse; margin: 10px 0; }",
+            "th, td { padding: 6px; text-align: left; border-bottom: 1px solid #ddd; vertical-align: top; }",
+            "th { background-color: #f5f5f5; position: sticky; top: 0; }",
+            ".error { color: #a00; }",
+            "</style>",
+            "</head>",
+            "<body>",
+            f"<h1>{html.escape(title)}</h1>",
+            "<table>",
+            "<thead><tr><th>File</th><th>Total Imports</th><th>DLLs</th>"
+            "<th>Capabilities</th><th>Detected Patterns</th></tr></thead>",
+        ])
+        out.write("\n")
+
+    def write(self, record: Dict[str, object]) -> None:
+        file_cell = html.escape(str(record.get("file", "")))
+        error: Optional[Dict[str, str]] = record.get("error")  # type: ignore[assignment]
+        if error:
+            self.errors += 1
+            message = html.escape(f"{error.get('type', 'Error')}: {error.get('message', '')}")
+            row = f"<tr><td>{file_cell}</td><td colspan='4' class='error'>{message}</td></tr>"
+        else:
+            capabilities = record.get("capabilities", {})
+            present = [cat for cat, info in capabilities.items() if info.get("present")]
+            row = (
+                f"<tr><td>{file_cell}</td>"
+                f"<td>{record.get('total_imports', 0)}</td>"
+                f"<td>{html.escape(', '.join(sorted(record.get('imported_dlls', []))))}</td>"
+                f"<td>{html.escape(', '.join(present)) or 'None'}</td>"
+                f"<td>{html.escape(', '.join(record.get('detected_patterns', []))) or 'None'}</td></tr>"
+            )
+        self._rows.append(row)
+        self.count += 1
+        if len(self._rows) >= self.chunk_rows:
+            self._flush_rows()
+
+    def _flush_rows(self) -> None:
+        if self._rows:
+            self.out.write("<tbody>\n")
+            self.out.write("\n".join(self._rows))
+            self.out.write("\n</tbody>\n")
+            self._rows.clear()
+            self.out.flush()
+
+    def close(self) -> None:
+        self._flush_rows()
+        write_lines(self.out, [
+            "</table>",
+            f"<p>{self.count} files, {self.errors} errors.</p>",
+            "</body>",
+            "</html>",
+        ])
+        self.out.write("\n")
+        super().close()
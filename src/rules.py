@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from .categorize import normalize_api_name
+
+# Behavior rules shipped with the package; EXEPLAIN_RULES points at another file.
+BUNDLED_RULES_PATH = Path(__file__).with_name("patterns.json")
+DEFAULT_RULES_PATH = Path(os.environ.get("EXEPLAIN_RULES", BUNDLED_RULES_PATH))
+
+# Keys a rule may use. Every condition in a rule must hold for it to match:
+#   apis            - all of these APIs are imported
+#   categories      - all of these capability categories are present
+#   dlls            - all of these DLLs are imported (".dll" is optional)
+#   any_apis /
+#   any_categories  - at least `min_any` (default 1) of these are present
+#   min_counts      - {category: n}: at least n imports in the category
+#   min_imports     - at least this many imports in total
+RULE_KEYS = {
+    "id", "description", "apis", "categories", "dlls",
+    "any_apis", "any_categories", "min_any", "min_counts", "min_imports",
+}
+
+# Trigger preference when indexing a rule: specific APIs and DLLs select far
+# fewer files than categories, so they make better index keys.
+_KIND_RANK = {"api": 0, "dll": 1, "cat": 2}
+
+
+def _dll_key(name: str) -> str:
+    name = name.strip().lower()
+    return name[:-4] if name.endswith(".dll") else name
+
+
+def _string_list(rule: Dict[str, object], key: str) -> List[str]:
+    value = rule.get(key, [])
+    if not isinstance(value, list) or not all(isinstance(v, str) and v for v in value):
+        raise ValueError(f"Rule {rule.get('id')!r}: '{key}' must be a list of names")
+    return value
+
+
+def _count(rule: Dict[str, object], key: str, value: object) -> int:
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise ValueError(f"Rule {rule.get('id')!r}: '{key}' must be a non-negative integer")
+    return value
+
+
+class RuleSet:
+    """
+    A list of behavior rules compiled for fast matching.
+
+    Every API, category and DLL named by any rule is interned to an integer
+    id, and each rule becomes a set of required feature ids plus an optional
+    "any of" set and count thresholds. An inverted index maps a
+    single trigger feature of each rule to the rule, so a file only evaluates
+    the rules whose trigger it actually imports; per-file cost grows with the
+    file's imports and matching candidates, not with the size of the rule set.
+    """
+
+    def __init__(self, rules: List[Dict[str, object]]):
+        self.source = rules
+        self.ids: List[str] = []
+        self.descriptions: Dict[str, str] = {}
+
+        self._features: Dict[str, int] = {}
+        self._required: List[FrozenSet[int]] = []
+        self._any: List[FrozenSet[int]] = []
+        self._min_any: List[int] = []
+        self._min_counts: List[Dict[str, int]] = []
+        self._min_imports: List[int] = []
+        self._index: Dict[int, List[int]] = {}
+        self._always: List[int] = []
+        self._has_dll_rules = False
+
+        for rule in rules:
+            self._add(rule)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _feature(self, key: str) -> int:
+        fid = self._features.get(key)
+        if fid is None:
+            fid = self._features[key] = len(self._features)
+        return fid
+
+    def _add(self, rule: Dict[str, object]) -> None:
+        if not isinstance(rule, dict):
+            raise ValueError(f"Rules must be objects, got {type(rule).__name__}")
+        rule_id = rule.get("id")
+        if not isinstance(rule_id, str) or not rule_id:
+            raise ValueError("Every rule needs a non-empty string 'id'")
+        if rule_id in self.descriptions:
+            raise ValueError(f"Duplicate rule id {rule_id!r}")
+        unknown = set(rule) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"Rule {rule_id!r}: unknown keys {sorted(unknown)}")
+
+        min_counts = rule.get("min_counts", {})
+        if not isinstance(min_counts, dict):
+            raise ValueError(f"Rule {rule_id!r}: 'min_counts' must be an object")
+        min_counts = {cat: _count(rule, "min_counts", n) for cat, n in min_counts.items()}
+
+        required = (
+            [f"api:{normalize_api_name(n)}" for n in _string_list(rule, "apis")]
+            + [f"cat:{c}" for c in _string_list(rule, "categories")]
+            + [f"cat:{c}" for c, n in min_counts.items() if n > 0]
+            + [f"dll:{_dll_key(d)}" for d in _string_list(rule, "dlls")]
+        )
+        optional = (
+            [f"api:{normalize_api_name(n)}" for n in _string_list(rule, "any_apis")]
+            + [f"cat:{c}" for c in _string_list(rule, "any_categories")]
+        )
+        min_any = _count(rule, "min_any", rule.get("min_any", 1)) if optional else 0
+        min_imports = _count(rule, "min_imports", rule.get("min_imports", 0))
+        if not required and not optional and not min_imports:
+            raise ValueError(f"Rule {rule_id!r} has no conditions")
+        if min_any > len(set(optional)):
+            raise ValueError(f"Rule {rule_id!r}: 'min_any' exceeds the number of 'any_*' entries")
+
+        index = len(self.ids)
+        self.ids.append(rule_id)
+        self.descriptions[rule_id] = str(rule.get("description", ""))
+        self._required.append(frozenset(self._feature(k) for k in required))
+        self._any.append(frozenset(self._feature(k) for k in optional))
+        self._min_any.append(min_any)
+        self._min_counts.append({c: n for c, n in min_counts.items() if n > 1})
+        self._min_imports.append(min_imports)
+        self._has_dll_rules = self._has_dll_rules or bool(rule.get("dlls"))
+
+        # Index under one required feature (all of them must be present). With
+        # only "any" conditions, at least min_any of the n features must be
+        # present, so any n - min_any + 1 of them are enough as triggers.
+        def rank(key: str) -> Tuple[int, int]:
+            return (_KIND_RANK[key[:3]], len(self._index.get(self._features[key], ())))
+
+        if required:
+            triggers = [min(set(required), key=rank)]
+        elif min_any:
+            candidates = sorted(set(optional), key=rank)
+            triggers = candidates[:len(candidates) - min_any + 1]
+        else:
+            triggers = []
+        if triggers:
+            for key in triggers:
+                self._index.setdefault(self._features[key], []).append(index)
+        else:
+            self._always.append(index)
+
+    def match(
+        self,
+        categorized: Dict[str, List[str]],
+        imports: Optional[Dict[str, List[str]]] = None,
+    ) -> List[str]:
+        """
+        Return the ids of the rules matched by one file, in rule-file order.
+
+        `imports` (DLL -> functions) is only needed for rules with "dlls";
+        without it those rules never match.
+        """
+        features = self._features
+        present: Set[int] = set()
+        total = 0
+        for category, funcs in categorized.items():
+            if not funcs:
+                continue
+            total += len(funcs)
+            fid = features.get(f"cat:{category}")
+            if fid is not None:
+                present.add(fid)
+            for func in funcs:
+                fid = features.get(f"api:{normalize_api_name(func)}")
+                if fid is not None:
+                    present.add(fid)
+        if imports and self._has_dll_rules:
+            for dll in imports:
+                fid = features.get(f"dll:{_dll_key(dll)}")
+                if fid is not None:
+                    present.add(fid)
+
+        candidates: Set[int] = set(self._always)
+        for fid in present:
+            candidates.update(self._index.get(fid, ()))
+        if not candidates:
+            return []
+
+        matched: List[int] = []
+        for i in candidates:
+            if not self._required[i] <= present:
+                continue
+            if self._min_any[i] and len(self._any[i] & present) < self._min_any[i]:
+                continue
+            if total < self._min_imports[i]:
+                continue
+            if any(len(categorized.get(c, ())) < n for c, n in self._min_counts[i].items()):
+                continue
+            matched.append(i)
+
+        return [self.ids[i] for i in sorted(matched)]
+
+
+def load_rules(path: str | Path) -> List[Dict[str, object]]:
+    """
+    Read a rules file: a JSON list of rule objects (see RULE_KEYS).
+
+    Raises:
+        FileNotFoundError: if the file does not exist.
+        ValueError: if the file is not a JSON list.
+    """
+    path = Path(path)
+    if not path.is_file():
+        raise FileNotFoundError(f"Rules file not found: {path}")
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    if not isinstance(rules, list):
+        raise ValueError(f"Rules file must contain a JSON list: {path}")
+    return rules
+
+
+def compile_rules(rules: List[Dict[str, object]]) -> RuleSet:
+    """
+    Validate and compile rule objects into a RuleSet.
+
+    Raises:
+        ValueError: if a rule is malformed.
+    """
+    return RuleSet(rules)
+
+
+@lru_cache(maxsize=None)
+def default_ruleset() -> RuleSet:
+    """
+    The compiled rules from DEFAULT_RULES_PATH, loaded once per process.
+
+    Rules are compiled from the JSON on every run rather than cached on
+    disk; compiling the bundled rules takes well under a millisecond.
+    """
+    return compile_rules(load_rules(DEFAULT_RULES_PATH))
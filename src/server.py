@@ -0,0 +1,438 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .pe_parser import BACKENDS, PEParseError
+from .analyze import describe_patterns
+from .cache import DEFAULT_MAX_BYTES, ResultCache
+from .limits import AnalysisTimeout, SupervisedPool, WorkerCrashed
+from .pipeline import run_pipeline, warm_up
+from .report import build_report_data
+from .client import DEFAULT_SOCKET, DEFAULT_TIMEOUT
+
+DEFAULT_MAX_UPLOAD = 64 * 1024 * 1024
+# Seconds a client gets to send a request's headers and body (and an idle
+# connection to start its next request).
+DEFAULT_READ_TIMEOUT = 30.0
+
+_MAX_HEADER_LINES = 100
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    408: "Request Timeout",
+    411: "Length Required",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+class HTTPError(Exception):
+    """An error response: HTTP status plus message."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# Per-process state for pool workers, set up by _warm_worker.
+_worker_cache: Optional[ResultCache] = None
+_worker_backend: Optional[str] = None
+
+
+def _warm_up() -> None:
+    """Pay the one-time costs (pefile import, rule tables) before any request."""
+    warm_up(_worker_backend)
+
+
+def _warm_worker(cache_path: Optional[str], cache_max_bytes: int, backend: Optional[str]) -> None:
+    global _worker_cache, _worker_backend
+    if cache_path is not None:
+        _worker_cache = ResultCache(cache_path, max_bytes=cache_max_bytes)
+    _worker_backend = backend
+    _warm_up()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _analyze(
+    path: str,
+    name: str,
+    backend: Optional[str],
+    include_imports: bool,
+    remove_after: bool,
+) -> Tuple[int, Dict[str, object]]:
+    """
+    Run the pipeline for one file in a worker and build the JSON response.
+
+    Returns (HTTP status, body). Analysis failures are 422 responses with the
+    same error record shape as batch mode.
+    """
+    try:
+        result = run_pipeline(path, _worker_cache, backend=backend or _worker_backend)
+    except (FileNotFoundError, PEParseError) as e:
+        # Report uploads under their name, not the temporary file's.
+        message = str(e).replace(path, name)
+        return 422, {"file": name, "error": {"type": type(e).__name__, "message": message}}
+    except Exception as e:
+        return 422, {"file": name, "error": {"type": type(e).__name__, "message": f"Unexpected error: {e}"}}
+    finally:
+        if remove_after:
+            os.unlink(path)
+
+    patterns = describe_patterns(result["pattern_ids"])
+    body = build_report_data(name, result["imports"], result["capabilities"], patterns)
+    if result["truncated"]:
+        body["truncated"] = True
+        body["truncated_by"] = result["truncated_by"]
+    if include_imports:
+        body["imports"] = result["imports"]
+    if _worker_cache is not None:
+        body["cached"] = result["cached"]
+    return 200, body
+
+
+class AnalysisServer:
+    """
+    Local HTTP analysis endpoint backed by a pool of pre-warmed workers.
+
+    Endpoints:
+        POST /analyze   JSON body {"path": ..., "name"?, "backend"?, "include_imports"?}
+                        or raw file bytes (Content-Type: application/octet-stream,
+                        optional X-File-Name header and ?backend=&include_imports=1).
+                        Returns the JSON report (report.build_report_data).
+        GET  /health    Server counters.
+
+    At most `max_inflight` analyses run at once; up to `max_queue` more wait
+    for a slot, and further requests are turned away with 503 so callers
+    back off instead of piling up. A request whose analysis takes longer
+    than `timeout` seconds gets 504: its worker is killed and replaced
+    (see limits.SupervisedPool), which also frees its slot. A worker that
+    dies mid-analysis gives 500. A client that takes longer
+    than `read_timeout` seconds to send a request gets 408, and an idle
+    connection is closed after as long.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_inflight: Optional[int] = None,
+        max_queue: int = 64,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_upload: int = DEFAULT_MAX_UPLOAD,
+        cache_path: Optional[str] = None,
+        cache_max_bytes: int = DEFAULT_MAX_BYTES,
+        backend: Optional[str] = None,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_inflight = max_inflight or self.workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_upload = max_upload
+        self.cache_path = cache_path
+        self.cache_max_bytes = cache_max_bytes
+        self.backend = backend
+        self.read_timeout = read_timeout
+
+        self.stats = {"served": 0, "errors": 0, "rejected": 0, "timeouts": 0, "inflight": 0, "waiting": 0}
+        self._pool: Optional[SupervisedPool] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._started = time.monotonic()
+
+    async def start_pool(self) -> None:
+        """Create the worker pool and wait until every worker is warm."""
+        if self.cache_path is not None:
+            # Create the schema once up front rather than racing in every worker.
+            ResultCache(self.cache_path, max_bytes=self.cache_max_bytes).close()
+        _warm_up()  # forked workers inherit the parent's warm state
+        self._pool = SupervisedPool(
+            self.workers,
+            self.timeout,
+            initializer=_warm_worker,
+            initargs=(self.cache_path, self.cache_max_bytes, self.backend),
+        )
+        self._slots = asyncio.Semaphore(self.max_inflight)
+        await asyncio.gather(*(asyncio.wrap_future(self._pool.submit(_ping)) for _ in range(self.workers)))
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve HTTP/1.1 requests on one connection until it closes."""
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    await self._respond(writer, e.status, {"error": {"type": "HTTPError", "message": str(e)}}, close=True)
+                    return
+                if request is None:
+                    return
+                method, target, headers, body = request
+                status, payload = await self._dispatch(method, target, headers, body)
+                close = headers.get("connection", "").lower() == "close"
+                await self._respond(writer, status, payload, close=close)
+                if close:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.read_timeout)
+        except asyncio.TimeoutError:
+            return None  # idle connection
+        if not line:
+            return None
+        try:
+            method, target, _version = line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        try:
+            headers, body = await asyncio.wait_for(self._read_headers_and_body(reader, method), self.read_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(408, f"Request not received within {self.read_timeout:g}s")
+        return method, target, headers, body
+
+    async def _read_headers_and_body(self, reader: asyncio.StreamReader, method: str):
+        headers: Dict[str, str] = {}
+        for _ in range(_MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, sep, value = line.decode("latin-1").partition(":")
+            if not sep:
+                raise HTTPError(400, "Malformed header")
+            headers[key.strip().lower()] = value.strip()
+        else:
+            raise HTTPError(400, "Too many headers")
+
+        body = b""
+        if method == "POST":
+            if "content-length" not in headers:
+                raise HTTPError(411, "Content-Length is required")
+            try:
+                length = int(headers["content-length"])
+            except ValueError:
+                raise HTTPError(400, "Invalid Content-Length")
+            if length > self.max_upload:
+                raise HTTPError(413, f"Request body exceeds {self.max_upload} bytes")
+            body = await reader.readexactly(length)
+        return headers, body
+
+    async def _respond(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload: Dict[str, object],
+        close: bool = False,
+    ) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+        ]
+        if status == 503:
+            head.append("Retry-After: 1")
+        if close:
+            head.append("Connection: close")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def _dispatch(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        url = urlsplit(target)
+        try:
+            if url.path == "/health":
+                if method != "GET":
+                    raise HTTPError(405, "Use GET")
+                return 200, self.health()
+            if url.path != "/analyze":
+                raise HTTPError(404, f"No such endpoint: {url.path}")
+            if method != "POST":
+                raise HTTPError(405, "Use POST")
+            return await self._analyze_request(parse_qs(url.query), headers, body)
+        except HTTPError as e:
+            self.stats["errors"] += 1
+            return e.status, {"error": {"type": "HTTPError", "message": str(e)}}
+
+    async def _analyze_request(self, query: Dict[str, list], headers: Dict[str, str], body: bytes):
+        remove_after = False
+        if headers.get("content-type", "").startswith("application/json"):
+            try:
+                request = json.loads(body)
+                path = request["path"]
+            except (ValueError, KeyError, TypeError):
+                raise HTTPError(400, 'Expected a JSON object with a "path"')
+            name = request.get("name") or path
+            backend = request.get("backend")
+            include_imports = bool(request.get("include_imports"))
+        else:
+            name = headers.get("x-file-name", "upload")
+            backend = query.get("backend", [None])[0]
+            include_imports = query.get("include_imports", ["0"])[0] in ("1", "true")
+            fd, path = tempfile.mkstemp(prefix="exeplain-", suffix=".bin")
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            remove_after = True
+        if backend is not None and backend not in BACKENDS:
+            if remove_after:
+                os.unlink(path)
+            raise HTTPError(400, f"Unknown backend {backend!r}")
+
+        if self.stats["waiting"] >= self.max_queue:
+            if remove_after:
+                os.unlink(path)
+            self.stats["rejected"] += 1
+            return 503, {"error": {"type": "Busy", "message": "Server is at capacity; retry later"}}
+
+        self.stats["waiting"] += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.stats["waiting"] -= 1
+        self.stats["inflight"] += 1
+        try:
+            future = asyncio.wrap_future(
+                self._pool.submit(_analyze, path, name, backend, include_imports, remove_after)
+            )
+        except BaseException:
+            self._release_slot()
+            raise
+        future.add_done_callback(self._release_slot)
+        try:
+            status, payload = await asyncio.shield(future)
+        except AnalysisTimeout as e:
+            status, payload = 504, {"file": name, "error": {"type": "Timeout", "message": str(e)}}
+        except WorkerCrashed as e:
+            status, payload = 500, {"file": name, "error": {"type": "WorkerCrashed", "message": str(e)}}
+        finally:
+            if remove_after and future.done() and os.path.exists(path):
+                # The worker was killed before it could remove the upload.
+                os.unlink(path)
+
+        if status == 200:
+            self.stats["served"] += 1
+        elif status == 504:
+            self.stats["timeouts"] += 1
+        else:
+            self.stats["errors"] += 1
+        return status, payload
+
+    def _release_slot(self, _future: Optional[asyncio.Future] = None) -> None:
+        self.stats["inflight"] -= 1
+        self._slots.release()
+
+    def health(self) -> Dict[str, object]:
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            "uptime": time.monotonic() - self._started,
+            **self.stats,
+        }
+
+
+async def serve(
+    server: AnalysisServer,
+    socket_path: Optional[str] = None,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    ready: Optional[asyncio.Event] = None,
+) -> None:
+    """Run `server` on a Unix socket (default) or TCP host:port until cancelled."""
+    await server.start_pool()
+    try:
+        if port is not None:
+            listener = await asyncio.start_server(server.handle_connection, host or "127.0.0.1", port)
+        else:
+            socket_path = socket_path or DEFAULT_SOCKET
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            listener = await asyncio.start_unix_server(server.handle_connection, socket_path)
+        if ready is not None:
+            ready.set()
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.shutdown()
+        if port is None and socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.server",
+        description="Serve PE import analysis over local HTTP with pre-warmed workers.",
+    )
+    parser.add_argument("--socket", metavar="PATH", help=f"Unix socket to listen on (default: {DEFAULT_SOCKET}).")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP address to listen on with --port.")
+    parser.add_argument("--port", type=int, default=None, help="Listen on TCP instead of a Unix socket.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--max-inflight", type=int, default=None, help="Concurrent analyses (default: workers).")
+    parser.add_argument("--max-queue", type=int, default=64, help="Requests allowed to wait before 503 (default: 64).")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Per-request timeout in seconds.")
+    parser.add_argument("--read-timeout", type=float, default=DEFAULT_READ_TIMEOUT,
+                        help=f"Seconds a client has to send a request (default: {DEFAULT_READ_TIMEOUT:g}).")
+    parser.add_argument("--max-upload-mb", type=int, default=DEFAULT_MAX_UPLOAD // (1024 * 1024),
+                        help="Largest accepted upload in MiB.")
+    parser.add_argument("--backend", choices=BACKENDS, default=None, help="Default import parser backend.")
+    parser.add_argument("--cache", metavar="DB", help="Result cache shared by all workers.")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Size bound for the result cache in MiB.")
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.max_inflight is not None and args.max_inflight < 1:
+        parser.error("--max-inflight must be at least 1")
+    if args.timeout <= 0:
+        parser.error("--timeout must be positive")
+    if args.read_timeout <= 0:
+        parser.error("--read-timeout must be positive")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    server = AnalysisServer(
+        workers=args.workers,
+        max_inflight=args.max_inflight,
+        max_queue=args.max_queue,
+        timeout=args.timeout,
+        max_upload=args.max_upload_mb * 1024 * 1024,
+        cache_path=args.cache,
+        cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+        backend=args.backend,
+        read_timeout=args.read_timeout,
+    )
+    where = f"{args.host}:{args.port}" if args.port is not None else (args.socket or DEFAULT_SOCKET)
+    print(f"[INFO] Serving on {where} with {server.workers} workers.", file=sys.stderr)
+    try:
+        asyncio.run(serve(server, socket_path=args.socket, host=args.host, port=args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
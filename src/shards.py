@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from .batch import analyze_path, scan_files
+from .cache import DEFAULT_MAX_BYTES, ResultCache
+from .report import RecordWriter
+
+# Sharded scans for corpora too large for one machine. The input list is
+# split into `count` shards by a hash of each path relative to the scan root
+# (see shard_key), so every node that enumerates the same inputs agrees on
+# the split without talking to the others, even when the corpus is mounted
+# at a different place on each node. Nodes share one directory: each shard is written to
+# shard-III-of-NNN.partial (one line per finished input) and renamed to
+# .ndjson when complete. A shard being written is held with an exclusive
+# flock, so concurrent nodes skip it; a node that dies leaves its .partial
+# behind and the next run resumes it from the last complete line. merge
+# combines the completed shards into the normal batch output.
+
+FORMAT = "1"
+SETTINGS_FILE = "shards.json"
+
+
+class ShardError(Exception):
+    """A shard directory that does not match the requested layout."""
+    pass
+
+
+def shard_key(path: str, root: Optional[str] = None) -> str:
+    """
+    The canonical form of an input path that shards are assigned by: the
+    path relative to the scan `root` (default: the current directory),
+    normalized and with "/" separators. "/mnt/a/x.exe" under root "/mnt/a"
+    and "x.exe" or "./x.exe" under root "." have the same key.
+    """
+    relative = os.path.relpath(os.path.abspath(path), os.path.abspath(root or os.curdir))
+    return relative.replace(os.sep, "/")
+
+
+def shard_of(path: str, count: int, root: Optional[str] = None) -> int:
+    """
+    The shard (0 .. count - 1) an input path belongs to: a hash of its
+    shard_key, so stable across runs, machines and mount points.
+    """
+    digest = hashlib.sha256(shard_key(path, root).encode("utf-8", "surrogateescape")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def shard_name(index: int, count: int, suffix: str = "ndjson") -> str:
+    width = len(str(count - 1))
+    return f"shard-{index:0{width}d}-of-{count}.{suffix}"
+
+
+def open_shard_dir(directory: str | Path, count: Optional[int] = None) -> int:
+    """
+    Create (or check) a shard directory and return its shard count.
+
+    The count is fixed by the first run in `directory` (recorded in
+    shards.json); later runs may omit it but cannot change it.
+
+    Raises:
+        ShardError: if `count` differs from the directory's, or neither is set.
+    """
+    directory = Path(directory)
+    settings_path = directory / SETTINGS_FILE
+    if count is not None:
+        if count < 1:
+            raise ShardError("Shard count must be at least 1")
+        directory.mkdir(parents=True, exist_ok=True)
+        try:
+            fd = os.open(settings_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"format": FORMAT, "count": count}, f)
+            return count
+    try:
+        with open(settings_path, encoding="utf-8") as f:
+            settings = json.load(f)
+    except FileNotFoundError:
+        raise ShardError(f"{directory} is not a shard directory (no {SETTINGS_FILE}; start it with a shard count)")
+    except ValueError as e:
+        raise ShardError(f"Cannot read {settings_path}: {e}")
+    if settings.get("format") != FORMAT:
+        raise ShardError(f"Unsupported shard directory format: {settings.get('format')!r}")
+    if count is not None and count != settings["count"]:
+        raise ShardError(f"{directory} holds {settings['count']} shards, not {count}")
+    return settings["count"]
+
+
+def analyze_shard_item(path: str, cache: Optional[ResultCache] = None, **options: object) -> List[Dict[str, object]]:
+    """
+    scan_files worker for shards: all of one input's records (content
+    hashed, see batch.analyze_path) as a single {"input", "records"} line,
+    so an input is either wholly in a partial file or not at all.
+    """
+    return [{"input": path, "records": analyze_path(path, cache, content_hash=True, **options)}]
+
+
+def _failed_shard_item(path: str, error: Dict[str, str]) -> List[Dict[str, object]]:
+    """The line for an input whose worker was killed or died (see batch.scan_files)."""
+    return [{"input": path, "records": [{"file": path, "error": error}]}]
+
+
+def _lock(f) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _resume(f, root: Optional[str] = None) -> set:
+    """
+    The shard keys of the inputs already finished in an open .partial file,
+    as the node that wrote each line saw them (lines without a "key" are
+    keyed relative to `root`). A torn last line (the previous writer died
+    mid-write) is cut off.
+    """
+    f.seek(0)
+    done = set()
+    good = 0
+    for line in f:
+        if not line.endswith(b"\n"):
+            break
+        try:
+            finished = json.loads(line)
+            done.add(finished.get("key") or shard_key(finished["input"], root))
+        except (ValueError, KeyError):
+            break
+        good += len(line)
+    f.truncate(good)
+    f.seek(good)
+    return done
+
+
+def run_shard(
+    directory: str | Path,
+    index: int,
+    count: int,
+    paths: Iterable[str],
+    workers: Optional[int] = None,
+    chunksize: int = 8,
+    cache_path: Optional[str] = None,
+    cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    options: Optional[Dict[str, object]] = None,
+    max_memory: Optional[int] = None,
+    root: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> Optional[Dict[str, object]]:
+    """
+    Analyze the inputs of shard `index` (those of `paths` for which
+    shard_of is `index`, relative to the scan `root`), resuming a partial
+    result if there is one. Each line of the result records its input's
+    shard_key as "key", and inputs are recognized by it, so another node
+    (with its own root) may resume it.
+
+    Returns a summary (files, ok, errors, cache_hits, truncated, resumed
+    inputs, seconds), or None if the shard is already complete or another
+    process holds it. The other arguments are as for batch.scan_files.
+    """
+    directory = Path(directory)
+    final = directory / shard_name(index, count)
+    partial = directory / shard_name(index, count, "partial")
+    if final.exists():
+        return None
+
+    start = time.perf_counter()
+    with open(partial, "a+b") as f:
+        if not _lock(f):
+            return None
+        if final.exists():
+            # Finished (and renamed) between our check and the lock; `partial`
+            # is a fresh empty file we created.
+            partial.unlink(missing_ok=True)
+            return None
+        done = _resume(f, root)
+        todo = [
+            path for path in paths
+            if shard_of(path, count, root) == index and shard_key(path, root) not in done
+        ]
+
+        summary = {"shard": index, "files": 0, "ok": 0, "errors": 0, "cache_hits": 0, "truncated": 0,
+                   "resumed": len(done)}
+        lines = scan_files(
+            todo,
+            workers=workers,
+            chunksize=chunksize,
+            cache_path=cache_path,
+            cache_max_bytes=cache_max_bytes,
+            options=options,
+            max_memory=max_memory,
+            analyze=analyze_shard_item,
+            timeout=timeout,
+            failed=_failed_shard_item,
+        )
+        for line in lines:
+            key = shard_key(line["input"], root)
+            if key in done:
+                continue
+            done.add(key)
+            line = {"key": key, **line}
+            for record in line["records"]:
+                summary["files"] += 1
+                summary["errors"] += "error" in record
+                summary["cache_hits"] += bool(record.get("cached"))
+                summary["truncated"] += bool(record.get("truncated"))
+            # One write per input, flushed, so a crash loses at most a torn line.
+            f.write(json.dumps(line).encode("utf-8") + b"\n")
+            f.flush()
+        os.fsync(f.fileno())
+        if fcntl is not None:
+            # Renamed while still locked, so no other process can claim it in between.
+            os.replace(partial, final)
+    if fcntl is None:
+        os.replace(partial, final)
+
+    summary["ok"] = summary["files"] - summary["errors"]
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def run_shards(
+    directory: str | Path,
+    paths: Iterable[str],
+    count: Optional[int] = None,
+    shards: Optional[Sequence[int]] = None,
+    **scan_options: object,
+) -> List[Dict[str, object]]:
+    """
+    Work through `shards` (default: every shard) of the scan in `directory`,
+    skipping complete ones and ones another process is working on, and
+    return the summaries of the shards this call ran. Several processes or
+    nodes can call this on the same directory and inputs at once.
+    `scan_options` are passed to run_shard.
+
+    Raises:
+        ShardError: as open_shard_dir, or for a shard index out of range.
+    """
+    count = open_shard_dir(directory, count)
+    if shards is None:
+        shards = range(count)
+    for index in shards:
+        if not 0 <= index < count:
+            raise ShardError(f"Shard {index} out of range for {count} shards")
+    paths = list(paths)
+    summaries = []
+    for index in shards:
+        summary = run_shard(directory, index, count, paths, **scan_options)
+        if summary is not None:
+            summaries.append(summary)
+    return summaries
+
+
+def shard_status(directory: str | Path) -> Dict[str, List[int]]:
+    """{"complete": [...], "partial": [...], "missing": [...]} shard indexes."""
+    directory = Path(directory)
+    count = open_shard_dir(directory)
+    status = {"complete": [], "partial": [], "missing": []}
+    for index in range(count):
+        if (directory / shard_name(index, count)).exists():
+            status["complete"].append(index)
+        elif (directory / shard_name(index, count, "partial")).exists():
+            status["partial"].append(index)
+        else:
+            status["missing"].append(index)
+    return status
+
+
+def merge_shards(directory: str | Path, writer: RecordWriter) -> Dict[str, object]:
+    """
+    Write the records of every complete shard in `directory` to `writer`,
+    in shard order, keeping only the first record for each content hash
+    (the same file found under several paths or in several archives).
+    Error records have no hash and are all kept.
+
+    Returns a run summary like batch.run_batch's, plus the number of
+    duplicates dropped and the indexes of shards that are not complete
+    (and were not merged).
+    """
+    start = time.perf_counter()
+    directory = Path(directory)
+    status = shard_status(directory)
+    count = len(status["complete"]) + len(status["partial"]) + len(status["missing"])
+    seen = set()
+    summary = {"files": 0, "ok": 0, "errors": 0, "cache_hits": 0, "truncated": 0, "duplicates": 0}
+
+    for index in status["complete"]:
+        with open(directory / shard_name(index, count), encoding="utf-8") as f:
+            for line in f:
+                for record in json.loads(line)["records"]:
+                    digest = record.get("sha256")
+                    if digest is not None:
+                        if digest in seen:
+                            summary["duplicates"] += 1
+                            continue
+                        seen.add(digest)
+                    summary["files"] += 1
+                    summary["errors"] += "error" in record
+                    summary["cache_hits"] += bool(record.get("cached"))
+                    summary["truncated"] += bool(record.get("truncated"))
+                    writer.write(record)
+
+    elapsed = time.perf_counter() - start
+    summary["ok"] = summary["files"] - summary["errors"]
+    summary["incomplete"] = status["partial"] + status["missing"]
+    summary["seconds"] = elapsed
+    summary["files_per_second"] = summary["files"] / elapsed if elapsed > 0 else 0.0
+    return summary
+
+
+def format_shard_summary(summary: Dict[str, object]) -> str:
+    resumed = f", {summary['resumed']} inputs resumed" if summary["resumed"] else ""
+    truncated = f", {summary['truncated']} truncated" if summary["truncated"] else ""
+    return (
+        f"[INFO] Shard {summary['shard']}: {summary['files']} files ({summary['ok']} ok, "
+        f"{summary['errors']} errors, {summary['cache_hits']} from cache{truncated}{resumed}) "
+        f"in {summary['seconds']:.2f}s."
+    )
@@ -0,0 +1,445 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import struct
+import sys
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .pe_parser import BACKENDS, PEParseError, get_imports
+from .cache import file_sha256
+
+# MinHash parameters: NUM_PERM hash functions split into BANDS bands of
+# NUM_PERM // BANDS rows. Two files become LSH candidates when any band
+# matches, which happens with probability 1 - (1 - J**rows)**bands for
+# Jaccard similarity J (about 50% at J = 0.5 with the defaults).
+NUM_PERM = 64
+BANDS = 16
+SEED = 1
+
+_MERSENNE_61 = (1 << 61) - 1
+_INDEX_FORMAT = "1"
+
+# imphash drops these extensions from DLL names (same as pefile).
+_IMPHASH_EXTENSIONS = ("ocx", "sys", "dll")
+
+
+def _dll_stem(dll: str) -> str:
+    name = dll.lower()
+    stem, _, ext = name.rpartition(".")
+    return stem if stem and ext in _IMPHASH_EXTENSIONS else name
+
+
+def _func_token(func: str) -> str:
+    # get_imports reports unresolved ordinals as ORDINAL_<n>; imphash uses ord<n>.
+    if func.startswith("ORDINAL_") and func[8:].isdigit():
+        return f"ord{func[8:]}"
+    return func.lower()
+
+
+def imphash(imports: Dict[str, List[str]]) -> str:
+    """
+    Import hash over a get_imports() result: MD5 of the comma-joined
+    "dll.function" entries, lowercased, with .dll/.ocx/.sys dropped.
+
+    Matches pefile's get_imphash() except that descriptors for the same DLL
+    are merged (get_imports groups by DLL name). Returns "" with no imports.
+    """
+    entries = [
+        f"{_dll_stem(dll)}.{_func_token(func)}"
+        for dll, funcs in imports.items()
+        for func in funcs
+    ]
+    if not entries:
+        return ""
+    return hashlib.md5(",".join(entries).encode("utf-8")).hexdigest()
+
+
+def import_tokens(imports: Dict[str, List[str]]) -> Set[str]:
+    """The set of "dll!function" tokens (lowercased) that similarity is measured on."""
+    return {
+        f"{dll.lower()}!{_func_token(func)}"
+        for dll, funcs in imports.items()
+        for func in funcs
+    }
+
+
+def _permutations(num_perm: int, seed: int) -> List[Tuple[int, int]]:
+    rng = random.Random(seed)
+    return [(rng.randrange(1, _MERSENNE_61), rng.randrange(0, _MERSENNE_61)) for _ in range(num_perm)]
+
+
+def _token_hash(token: str) -> int:
+    # A process-independent 64-bit hash (str hash() is salted per process).
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def minhash(
+    tokens: Iterable[str],
+    num_perm: int = NUM_PERM,
+    seed: int = SEED,
+) -> List[int]:
+    """
+    MinHash signature of a token set: for each of `num_perm` universal hash
+    functions (a*x + b mod 2**61 - 1), the minimum over all tokens.
+
+    The fraction of equal positions in two signatures estimates the Jaccard
+    similarity of the sets. An empty set has an empty signature.
+    """
+    hashes = [_token_hash(t) for t in set(tokens)]
+    if not hashes:
+        return []
+    p = _MERSENNE_61
+    return [min((a * x + b) % p for x in hashes) for a, b in _permutations(num_perm, seed)]
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """Exact Jaccard similarity of two sets (0.0 for two empty sets)."""
+    if not a and not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _band_keys(signature: List[int], bands: int) -> List[int]:
+    """One signed 64-bit bucket key per band (SQLite integers are signed)."""
+    rows = len(signature) // bands
+    keys = []
+    for band in range(bands):
+        chunk = struct.pack(f"<{rows}Q", *signature[band * rows:(band + 1) * rows])
+        digest = hashlib.blake2b(chunk, digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+
+class SimilarityIndex:
+    """
+    Persistent near-duplicate index over import sets (SQLite).
+
+    Each entry stores its imphash and "dll!function" tokens; its MinHash
+    signature is split into bands whose hashes go into an indexed bucket
+    table. A query looks up its own imphash and band buckets, so only
+    entries sharing a bucket are compared (exact Jaccard on their tokens),
+    and the cost does not grow with the size of the corpus. Entries are keyed
+    by file path; re-adding a path replaces its entry, and adding an
+    unchanged file (same SHA-256) is a no-op, so the index can be updated
+    incrementally.
+
+    Raises:
+        ValueError: if an existing index was built with other MinHash
+            parameters.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        num_perm: int = NUM_PERM,
+        bands: int = BANDS,
+        seed: int = SEED,
+    ):
+        if bands < 1 or num_perm % bands:
+            raise ValueError("num_perm must be a positive multiple of bands")
+        self.path = Path(path)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.seed = seed
+
+        self._conn = sqlite3.connect(str(self.path), timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " id INTEGER PRIMARY KEY,"
+                " file TEXT UNIQUE NOT NULL,"
+                " sha256 TEXT,"
+                " imphash TEXT NOT NULL,"
+                " tokens BLOB NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_imphash ON entries(imphash)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS bands ("
+                " band INTEGER NOT NULL,"
+                " bucket INTEGER NOT NULL,"
+                " entry INTEGER NOT NULL,"
+                " PRIMARY KEY (band, bucket, entry)) WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS bands_entry ON bands(entry)")
+
+            params = {"format": _INDEX_FORMAT, "num_perm": str(num_perm), "bands": str(bands), "seed": str(seed)}
+            stored = dict(self._conn.execute("SELECT key, value FROM meta"))
+            if not stored:
+                self._conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", params.items())
+        if stored and stored != params:
+            self._conn.close()
+            raise ValueError(f"Index {self.path} was built with different parameters: {stored}")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "SimilarityIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def sha256_of(self, file: str) -> Optional[str]:
+        """The SHA-256 recorded for an indexed path, or None if it is not indexed."""
+        row = self._conn.execute("SELECT sha256 FROM entries WHERE file = ?", (file,)).fetchone()
+        return row[0] if row else None
+
+    def add(
+        self,
+        file: str,
+        imports: Dict[str, List[str]],
+        sha256: Optional[str] = None,
+        signature: Optional[List[int]] = None,
+    ) -> None:
+        """
+        Add (or replace) the entry for `file`.
+
+        `signature` may be passed when it was already computed (e.g. by a
+        worker process) with this index's parameters.
+        """
+        tokens = import_tokens(imports)
+        if signature is None:
+            signature = minhash(tokens, self.num_perm, self.seed)
+        payload = zlib.compress(json.dumps(sorted(tokens), separators=(",", ":")).encode("utf-8"))
+
+        with self._conn:
+            self._delete(file)
+            cur = self._conn.execute(
+                "INSERT INTO entries (file, sha256, imphash, tokens) VALUES (?, ?, ?, ?)",
+                (file, sha256, imphash(imports), payload),
+            )
+            if signature:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO bands (band, bucket, entry) VALUES (?, ?, ?)",
+                    [(band, key, cur.lastrowid) for band, key in enumerate(_band_keys(signature, self.bands))],
+                )
+
+    def remove(self, file: str) -> bool:
+        """Drop the entry for `file`; returns whether it existed."""
+        with self._conn:
+            return self._delete(file)
+
+    def _delete(self, file: str) -> bool:
+        row = self._conn.execute("SELECT id FROM entries WHERE file = ?", (file,)).fetchone()
+        if row is None:
+            return False
+        self._conn.execute("DELETE FROM bands WHERE entry = ?", row)
+        self._conn.execute("DELETE FROM entries WHERE id = ?", row)
+        return True
+
+    def query(
+        self,
+        imports: Dict[str, List[str]],
+        k: int = 10,
+        min_jaccard: float = 0.0,
+    ) -> List[Dict[str, object]]:
+        """
+        Return up to `k` indexed files most similar to `imports`.
+
+        Returns a list, best first:
+        [{"file": ..., "jaccard": 0.93, "imphash_match": False}, ...]
+        """
+        tokens = import_tokens(imports)
+        digest = imphash(imports)
+        signature = minhash(tokens, self.num_perm, self.seed)
+
+        candidates: Set[int] = set()
+        if digest:
+            candidates.update(
+                row[0] for row in self._conn.execute("SELECT id FROM entries WHERE imphash = ?", (digest,))
+            )
+        for band, key in enumerate(_band_keys(signature, self.bands) if signature else ()):
+            candidates.update(
+                row[0] for row in self._conn.execute(
+                    "SELECT entry FROM bands WHERE band = ? AND bucket = ?", (band, key)
+                )
+            )
+
+        results: List[Dict[str, object]] = []
+        for entry_id in candidates:
+            file, entry_imphash, payload = self._conn.execute(
+                "SELECT file, imphash, tokens FROM entries WHERE id = ?", (entry_id,)
+            ).fetchone()
+            score = jaccard(tokens, set(json.loads(zlib.decompress(payload))))
+            if score >= min_jaccard:
+                results.append({
+                    "file": file,
+                    "jaccard": score,
+                    "imphash_match": bool(digest) and entry_imphash == digest,
+                })
+
+        results.sort(key=lambda r: (-r["jaccard"], r["file"]))
+        return results[:k]
+
+
+# Per-process settings for pool workers, set up by _init_worker.
+_worker_settings: Dict[str, object] = {}
+
+
+def _init_worker(settings: Dict[str, object]) -> None:
+    global _worker_settings
+    _worker_settings = settings
+
+
+def _failed(path: str, e: Exception) -> Dict[str, object]:
+    # Same split as batch.analyze_file: expected failures keep their message,
+    # anything else (OSError included) is reported as unexpected.
+    if isinstance(e, (FileNotFoundError, PEParseError)):
+        return {"file": path, "error": f"{type(e).__name__}: {e}"}
+    return {"file": path, "error": f"{type(e).__name__}: Unexpected error: {e}"}
+
+
+def _hash(path: str) -> Dict[str, object]:
+    """SHA-256 of one file (runs in workers)."""
+    try:
+        return {"file": path, "sha256": file_sha256(path)}
+    except Exception as e:
+        return _failed(path, e)
+
+
+def _prepare(item: Tuple[str, str]) -> Dict[str, object]:
+    """Parse one changed file and compute what SimilarityIndex.add needs (runs in workers)."""
+    path, sha256 = item
+    settings = _worker_settings
+    try:
+        imports = get_imports(path, backend=settings["backend"])
+        signature = minhash(import_tokens(imports), settings["num_perm"], settings["seed"])
+    except Exception as e:
+        return _failed(path, e)
+    return {"file": path, "sha256": sha256, "imports": imports, "signature": signature}
+
+
+def add_files(
+    index: SimilarityIndex,
+    paths: Iterable[str],
+    workers: Optional[int] = None,
+    backend: Optional[str] = None,
+) -> Iterator[Dict[str, object]]:
+    """
+    Parse files (in a process pool) and add them to `index` incrementally.
+
+    Files are hashed first; those whose SHA-256 matches their indexed entry
+    (compared here, not in the workers) are skipped, and only the others
+    are parsed. A file that cannot be read or parsed becomes an error
+    record. Yields one progress record per file:
+    {"file", "added"|"skipped"|"error"}.
+    """
+    settings = {"backend": backend, "num_perm": index.num_perm, "seed": index.seed}
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(settings)
+        pool = None
+        imap = map
+    else:
+        pool = multiprocessing.Pool(processes=workers, initializer=_init_worker, initargs=(settings,))
+
+        def imap(func, items):
+            return pool.imap_unordered(func, items, chunksize=8)
+
+    try:
+        changed: List[Tuple[str, str]] = []
+        for item in imap(_hash, paths):
+            if "error" in item:
+                yield item
+            elif item["sha256"] == index.sha256_of(item["file"]):
+                yield {"file": item["file"], "skipped": True}
+            else:
+                changed.append((item["file"], item["sha256"]))
+
+        for item in imap(_prepare, changed):
+            if "error" in item:
+                yield item
+                continue
+            index.add(item["file"], item["imports"], sha256=item["sha256"], signature=item["signature"])
+            yield {"file": item["file"], "added": True}
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def main(argv: List[str] | None = None) -> int:
+    from .batch import iter_input_files
+
+    parser = argparse.ArgumentParser(
+        prog="python -m src.similarity",
+        description="Build and query a near-duplicate index of PE import sets.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Add files to the index (incrementally).")
+    build.add_argument("index", help="Index database file (created if missing).")
+    build.add_argument("paths", nargs="*", metavar="path", help="Files, directories or glob patterns.")
+    build.add_argument("--files-from", metavar="FILE", help="Read more paths from FILE ('-' for stdin).")
+    build.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    build.add_argument("--backend", choices=BACKENDS, default=None, help="Import parser backend.")
+
+    query = sub.add_parser("query", help="Find indexed files with similar imports.")
+    query.add_argument("index", help="Index database file.")
+    query.add_argument("path", help="PE file to look up.")
+    query.add_argument("-k", "--top-k", type=int, default=10, help="Number of neighbors (default: 10).")
+    query.add_argument("--min-jaccard", type=float, default=0.0, help="Drop neighbors below this similarity.")
+    query.add_argument("--json", action="store_true", help="Output results in JSON format.")
+    query.add_argument("--backend", choices=BACKENDS, default=None, help="Import parser backend.")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        if not args.paths and args.files_from is None:
+            parser.error("at least one path (or --files-from) is required")
+        if args.workers is not None and args.workers < 1:
+            parser.error("--workers must be at least 1")
+        counts = {"added": 0, "skipped": 0, "error": 0}
+        with SimilarityIndex(args.index) as index:
+            for item in add_files(index, iter_input_files(args.paths, args.files_from), args.workers, args.backend):
+                if "error" in item:
+                    counts["error"] += 1
+                    print(f"[ERROR] {item['error']}", file=sys.stderr)
+                else:
+                    counts["skipped" if item.get("skipped") else "added"] += 1
+            total = len(index)
+        print(
+            f"[INFO] Indexed {counts['added']} files ({counts['skipped']} unchanged, "
+            f"{counts['error']} errors); index holds {total} files.",
+            file=sys.stderr,
+        )
+        return 0
+
+    try:
+        imports = get_imports(args.path, backend=args.backend)
+    except (FileNotFoundError, PEParseError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    if not Path(args.index).is_file():
+        print(f"[ERROR] Index not found: {args.index}", file=sys.stderr)
+        return 1
+    with SimilarityIndex(args.index) as index:
+        neighbors = index.query(imports, k=args.top_k, min_jaccard=args.min_jaccard)
+
+    if args.json:
+        print(json.dumps({"file": args.path, "imphash": imphash(imports), "neighbors": neighbors}, indent=2))
+    elif not neighbors:
+        print("No similar files found.")
+    else:
+        for n in neighbors:
+            marker = "  (imphash match)" if n["imphash_match"] else ""
+            print(f"{n['jaccard']:.3f}  {n['file']}{marker}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,540 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import struct
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+# An import is either a function name or an ordinal number.
+ImportSpec = Union[str, int]
+
+FILE_ALIGNMENT = 0x200
+SECTION_ALIGNMENT = 0x1000
+IMAGE_BASE = 0x400000
+
+_DOS_HEADER_SIZE = 0x40
+_FILE_HEADER_SIZE = 20
+_SECTION_HEADER_SIZE = 40
+_NUM_DATA_DIRECTORIES = 16
+
+_MACHINE_I386 = 0x14C
+_MACHINE_AMD64 = 0x8664
+_OPTIONAL_MAGIC_PE32 = 0x10B
+_OPTIONAL_MAGIC_PE32_PLUS = 0x20B
+
+_SCN_CODE = 0x60000020       # CODE | EXECUTE | READ
+_SCN_DATA = 0xC0000040       # INITIALIZED_DATA | READ | WRITE
+_SCN_RDATA = 0x40000040      # INITIALIZED_DATA | READ
+
+
+def _align(value: int, alignment: int) -> int:
+    return (value + alignment - 1) // alignment * alignment
+
+
+def build_import_section(
+    imports: Dict[str, Sequence[ImportSpec]],
+    base_rva: int,
+    pe32_plus: bool = False,
+) -> Tuple[bytes, int, int, int, int]:
+    """
+    Lay out an import directory (descriptors, ILT, IAT, hint/name table and
+    DLL names) as it would sit in a section starting at `base_rva`.
+
+    Returns:
+        (section_bytes, import_dir_rva, import_dir_size, iat_rva, iat_size)
+    """
+    thunk_size = 8 if pe32_plus else 4
+    ordinal_flag = 1 << 63 if pe32_plus else 1 << 31
+    thunk_fmt = "<Q" if pe32_plus else "<I"
+
+    dlls = list(imports.items())
+    desc_size = (len(dlls) + 1) * 20
+
+    # First pass: compute offsets (relative to the section start)
+    ilt_offsets: List[int] = []
+    offset = desc_size
+    for _, funcs in dlls:
+        ilt_offsets.append(offset)
+        offset += (len(funcs) + 1) * thunk_size
+
+    iat_start = offset
+    iat_offsets: List[int] = []
+    for _, funcs in dlls:
+        iat_offsets.append(offset)
+        offset += (len(funcs) + 1) * thunk_size
+    iat_size = offset - iat_start
+
+    hint_name_offsets: Dict[str, int] = {}
+    hint_names = bytearray()
+    for _, funcs in dlls:
+        for func in funcs:
+            if isinstance(func, str) and func not in hint_name_offsets:
+                hint_name_offsets[func] = offset + len(hint_names)
+                entry = struct.pack("<H", 0) + func.encode("ascii") + b"\0"
+                if len(entry) % 2:
+                    entry += b"\0"
+                hint_names += entry
+    offset += len(hint_names)
+
+    dll_name_offsets: List[int] = []
+    dll_names = bytearray()
+    for dll, _ in dlls:
+        dll_name_offsets.append(offset + len(dll_names))
+        dll_names += dll.encode("ascii") + b"\0"
+    offset += len(dll_names)
+
+    # Second pass: write everything
+    data = bytearray(offset)
+    for i, (dll, funcs) in enumerate(dlls):
+        struct.pack_into(
+            "<IIIII",
+            data,
+            i * 20,
+            base_rva + ilt_offsets[i],    # OriginalFirstThunk
+            0,                            # TimeDateStamp
+            0,                            # ForwarderChain
+            base_rva + dll_name_offsets[i],
+            base_rva + iat_offsets[i],    # FirstThunk
+        )
+        for j, func in enumerate(funcs):
+            if isinstance(func, int):
+                thunk = ordinal_flag | (func & 0xFFFF)
+            else:
+                thunk = base_rva + hint_name_offsets[func]
+            struct.pack_into(thunk_fmt, data, ilt_offsets[i] + j * thunk_size, thunk)
+            struct.pack_into(thunk_fmt, data, iat_offsets[i] + j * thunk_size, thunk)
+
+    names_start = iat_start + iat_size
+    data[names_start:names_start + len(hint_names)] = hint_names
+    names_start += len(hint_names)
+    data[names_start:names_start + len(dll_names)] = dll_names
+
+    return bytes(data), base_rva, desc_size, base_rva + iat_start, iat_size
+
+
+def build_export_section(
+    dll: str,
+    exports: Dict[int, str],
+    base_rva: int,
+    function_rva: int,
+) -> Tuple[bytes, int, int]:
+    """
+    Lay out an export directory for `dll` exporting `exports` ({ordinal:
+    name}, all pointing at `function_rva`) as it would sit in a section
+    starting at `base_rva`.
+
+    Returns:
+        (section_bytes, export_dir_rva, export_dir_size)
+    """
+    base = min(exports, default=1)
+    count = max(exports, default=0) - base + 1
+    named = sorted(exports.items(), key=lambda item: item[1])
+
+    addresses = 40
+    names = addresses + 4 * count
+    ordinals = names + 4 * len(named)
+    strings = bytearray(dll.encode("ascii") + b"\0")
+    strings_start = ordinals + 2 * len(named)
+    data = bytearray(strings_start)
+    struct.pack_into("<IIHHIIIIIII", data, 0, 0, 0, 0, 0, base_rva + strings_start, base, count, len(named),
+                     base_rva + addresses, base_rva + names, base_rva + ordinals)
+    for ordinal in exports:
+        struct.pack_into("<I", data, addresses + 4 * (ordinal - base), function_rva)
+    for i, (ordinal, name) in enumerate(named):
+        struct.pack_into("<I", data, names + 4 * i, base_rva + strings_start + len(strings))
+        struct.pack_into("<H", data, ordinals + 2 * i, ordinal - base)
+        strings += name.encode("ascii") + b"\0"
+    data += strings
+    return bytes(data), base_rva, len(data)
+
+
+def build_pe(
+    imports: Dict[str, Sequence[ImportSpec]],
+    pe32_plus: bool = False,
+    extra_sections: int = 0,
+    extra_section_data: Optional[bytes] = None,
+    min_size: int = 0,
+    exports: Optional[Tuple[str, Dict[int, str]]] = None,
+) -> bytes:
+    """
+    Build a minimal but valid PE32 (or PE32+) image with the given imports.
+
+    Args:
+        imports: DLL name -> list of function names or ordinals.
+        pe32_plus: Build a 64-bit (PE32+) image instead of PE32.
+        extra_sections: Number of additional data sections to append.
+        extra_section_data: Raw contents of each extra section (defaults to
+            one file-alignment block of zeros).
+        min_size: Pad the file with a zero-filled overlay (data after the
+            last section) up to at least this many bytes.
+        exports: (DLL name, {ordinal: function name}) for an export table,
+            placed in an .edata section after the extra sections.
+
+    Returns:
+        The file contents as bytes.
+    """
+    optional_size = 240 if pe32_plus else 224
+    num_sections = 2 + extra_sections + (exports is not None)
+    headers_size = _align(
+        _DOS_HEADER_SIZE + 4 + _FILE_HEADER_SIZE + optional_size
+        + num_sections * _SECTION_HEADER_SIZE,
+        FILE_ALIGNMENT,
+    )
+
+    text_rva = SECTION_ALIGNMENT
+    text_data = b"\xC3".ljust(FILE_ALIGNMENT, b"\0")  # ret
+    idata_rva = text_rva + SECTION_ALIGNMENT
+    idata_data, import_rva, import_size, iat_rva, iat_size = build_import_section(
+        imports, idata_rva, pe32_plus
+    )
+
+    sections: List[Tuple[bytes, int, bytes, int]] = [
+        (b".text", text_rva, text_data, _SCN_CODE),
+        (b".idata", idata_rva, idata_data, _SCN_RDATA),
+    ]
+    rva = _align(idata_rva + max(len(idata_data), 1), SECTION_ALIGNMENT)
+    filler = extra_section_data if extra_section_data is not None else bytes(FILE_ALIGNMENT)
+    for i in range(extra_sections):
+        sections.append((f".data{i}".encode("ascii"), rva, filler, _SCN_DATA))
+        rva = _align(rva + max(len(filler), 1), SECTION_ALIGNMENT)
+    if exports is not None:
+        edata_data, export_rva, export_size = build_export_section(*exports, rva, text_rva)
+        sections.append((b".edata", rva, edata_data, _SCN_RDATA))
+        rva = _align(rva + max(len(edata_data), 1), SECTION_ALIGNMENT)
+    size_of_image = rva
+
+    out = bytearray(headers_size)
+
+    # DOS header: "MZ" and e_lfanew
+    out[0:2] = b"MZ"
+    struct.pack_into("<I", out, 0x3C, _DOS_HEADER_SIZE)
+
+    # NT signature + file header
+    pe_offset = _DOS_HEADER_SIZE
+    out[pe_offset:pe_offset + 4] = b"PE\0\0"
+    struct.pack_into(
+        "<HHIIIHH",
+        out,
+        pe_offset + 4,
+        _MACHINE_AMD64 if pe32_plus else _MACHINE_I386,
+        num_sections,
+        0,                      # TimeDateStamp
+        0,                      # PointerToSymbolTable
+        0,                      # NumberOfSymbols
+        optional_size,
+        0x0022 if pe32_plus else 0x0102,  # EXECUTABLE_IMAGE | (LARGE_ADDRESS_AWARE or 32BIT_MACHINE)
+    )
+
+    # Optional header
+    opt = pe_offset + 4 + _FILE_HEADER_SIZE
+    struct.pack_into("<HBBIIIII", out, opt, _OPTIONAL_MAGIC_PE32_PLUS if pe32_plus else _OPTIONAL_MAGIC_PE32,
+                     14, 0, len(text_data), 0, 0, text_rva, text_rva)
+    if pe32_plus:
+        struct.pack_into("<Q", out, opt + 24, IMAGE_BASE)
+    else:
+        struct.pack_into("<II", out, opt + 24, idata_rva, IMAGE_BASE)
+    struct.pack_into(
+        "<IIHHHHHHIIIIHH",
+        out,
+        opt + 32,
+        SECTION_ALIGNMENT,
+        FILE_ALIGNMENT,
+        6, 0,                   # OS version
+        0, 0,                   # image version
+        6, 0,                   # subsystem version
+        0,                      # Win32VersionValue
+        size_of_image,
+        headers_size,
+        0,                      # CheckSum
+        3,                      # IMAGE_SUBSYSTEM_WINDOWS_CUI
+        0x8140,                 # DYNAMIC_BASE | NX_COMPAT | TERMINAL_SERVER_AWARE
+    )
+    if pe32_plus:
+        struct.pack_into("<QQQQII", out, opt + 72, 0x100000, 0x1000, 0x100000, 0x1000, 0, _NUM_DATA_DIRECTORIES)
+        data_dir = opt + 112
+    else:
+        struct.pack_into("<IIIIII", out, opt + 72, 0x100000, 0x1000, 0x100000, 0x1000, 0, _NUM_DATA_DIRECTORIES)
+        data_dir = opt + 96
+    if exports is not None:
+        struct.pack_into("<II", out, data_dir, export_rva, export_size)
+    if imports:
+        struct.pack_into("<II", out, data_dir + 1 * 8, import_rva, import_size)
+        struct.pack_into("<II", out, data_dir + 12 * 8, iat_rva, iat_size)
+
+    # Section table + raw data
+    section_table = opt + optional_size
+    raw_offset = headers_size
+    body = bytearray()
+    for i, (name, sec_rva, sec_data, characteristics) in enumerate(sections):
+        raw_size = _align(len(sec_data), FILE_ALIGNMENT)
+        struct.pack_into(
+            "<8sIIIIIIHHI",
+            out,
+            section_table + i * _SECTION_HEADER_SIZE,
+            name,
+            max(len(sec_data), 1),  # VirtualSize
+            sec_rva,
+            raw_size,
+            raw_offset + len(body),
+            0, 0, 0, 0,
+            characteristics,
+        )
+        body += sec_data.ljust(raw_size, b"\0")
+
+    return bytes(out + body).ljust(min_size, b"\0")
+
+
+# Import names drawn from by random_imports, so generated files exercise the
+# categorizer and the bundled rules rather than only unknown names.
+COMMON_IMPORTS: Dict[str, List[str]] = {
+    "KERNEL32.dll": [
+        "CreateFileW", "ReadFile", "WriteFile", "CloseHandle", "DeleteFileW", "CopyFileW",
+        "OpenProcess", "VirtualAllocEx", "WriteProcessMemory", "CreateRemoteThread",
+        "CreateProcessW", "WinExec", "GetProcAddress", "LoadLibraryW", "GetModuleHandleW",
+        "HeapAlloc", "HeapFree", "GetLastError", "Sleep", "ExitProcess",
+    ],
+    "ADVAPI32.dll": [
+        "RegOpenKeyExW", "RegCreateKeyExW", "RegSetValueExW", "RegDeleteValueW", "RegCloseKey",
+        "CryptAcquireContextW", "CryptEncrypt", "CryptDecrypt", "OpenProcessToken",
+    ],
+    "WS2_32.dll": ["socket", "connect", "send", "recv", "WSAStartup", "closesocket", "bind", "listen"],
+    "WININET.dll": ["InternetOpenW", "InternetOpenUrlW", "InternetReadFile", "InternetCloseHandle"],
+    "SHELL32.dll": ["ShellExecuteW", "SHGetFolderPathW"],
+    "USER32.dll": ["MessageBoxW", "CreateWindowExW", "GetMessageW", "DispatchMessageW"],
+    "urlmon.dll": ["URLDownloadToFileW"],
+    "msvcrt.dll": ["malloc", "free", "memcpy", "strlen", "_initterm", "__getmainargs"],
+}
+
+# Ways generate_corpus / malform can break a valid image. Each targets a
+# different check in the parsers.
+MALFORMATIONS = (
+    "truncated",                # cut somewhere after the DOS header
+    "bad_dos_magic",            # no "MZ"
+    "bad_nt_signature",         # no "PE\0\0" at e_lfanew
+    "bad_e_lfanew",             # e_lfanew points past the end of the file
+    "too_many_sections",        # NumberOfSections = 0xFFFF
+    "import_rva_out_of_range",  # import directory outside the image
+    "corrupt_import_section",   # random bytes written over .idata
+    "invalid_dll_name",         # a non-ASCII byte in a DLL name
+)
+
+_E_LFANEW_OFFSET = 0x3C
+
+
+def random_imports(
+    rng: random.Random,
+    num_dlls: int,
+    imports_per_dll: int,
+    ordinal_ratio: float = 0.0,
+) -> Dict[str, List[ImportSpec]]:
+    """
+    Random import table: `num_dlls` DLLs with `imports_per_dll` imports each.
+
+    Names come from COMMON_IMPORTS first and are topped up with unique
+    made-up names; about `ordinal_ratio` of the imports are by ordinal.
+    DLLs beyond the COMMON_IMPORTS ones get generated names.
+    """
+    dll_names = list(COMMON_IMPORTS)
+    rng.shuffle(dll_names)
+    dll_names += [f"SYNTH{i}.dll" for i in range(max(0, num_dlls - len(dll_names)))]
+
+    imports: Dict[str, List[ImportSpec]] = {}
+    for dll in dll_names[:num_dlls]:
+        known = COMMON_IMPORTS.get(dll, [])
+        names = rng.sample(known, min(len(known), imports_per_dll))
+        names += [f"{dll.split('.')[0].title()}Func{i}" for i in range(imports_per_dll - len(names))]
+        imports[dll] = [
+            rng.randint(1, 2000) if rng.random() < ordinal_ratio else name
+            for name in names
+        ]
+    return imports
+
+
+def _pe_layout(data: bytes) -> Tuple[int, int, int]:
+    """(optional header offset, data directory offset, section table offset) of a build_pe image."""
+    pe_offset = struct.unpack_from("<I", data, _E_LFANEW_OFFSET)[0]
+    optional_size = struct.unpack_from("<H", data, pe_offset + 20)[0]
+    opt = pe_offset + 4 + _FILE_HEADER_SIZE
+    pe32_plus = struct.unpack_from("<H", data, opt)[0] == _OPTIONAL_MAGIC_PE32_PLUS
+    return opt, opt + (112 if pe32_plus else 96), opt + optional_size
+
+
+def malform(data: bytes, kind: str, rng: random.Random) -> bytes:
+    """
+    Break a build_pe image in the way named by `kind` (see MALFORMATIONS).
+
+    Raises:
+        ValueError: if `kind` is unknown.
+    """
+    out = bytearray(data)
+    opt, data_dir, section_table = _pe_layout(data)
+    pe_offset = struct.unpack_from("<I", data, _E_LFANEW_OFFSET)[0]
+
+    if kind == "truncated":
+        del out[rng.randrange(_DOS_HEADER_SIZE, len(out)):]
+    elif kind == "bad_dos_magic":
+        out[0:2] = b"ZM"
+    elif kind == "bad_nt_signature":
+        out[pe_offset:pe_offset + 4] = b"PX\0\0"
+    elif kind == "bad_e_lfanew":
+        struct.pack_into("<I", out, _E_LFANEW_OFFSET, len(out) + rng.randrange(1, 0x10000))
+    elif kind == "too_many_sections":
+        struct.pack_into("<H", out, pe_offset + 6, 0xFFFF)
+    elif kind == "import_rva_out_of_range":
+        struct.pack_into("<I", out, data_dir + 8, 0x7FFF0000 + rng.randrange(0x10000))
+    elif kind == "corrupt_import_section":
+        # .idata is always the second section
+        raw_size, raw_offset = struct.unpack_from("<II", out, section_table + _SECTION_HEADER_SIZE + 16)
+        for _ in range(rng.randint(1, 16)):
+            out[raw_offset + rng.randrange(raw_size)] = rng.randrange(256)
+    elif kind == "invalid_dll_name":
+        # A non-ASCII byte inserted into the last DLL name. Names are the
+        # last thing in .idata (the second section), so the name can grow
+        # into the section's padding.
+        import_rva = struct.unpack_from("<I", out, data_dir + 8)[0]
+        header = section_table + _SECTION_HEADER_SIZE
+        va = struct.unpack_from("<I", out, header + 12)[0]
+        raw_size, raw_offset = struct.unpack_from("<II", out, header + 16)
+        desc = raw_offset + import_rva - va
+        while struct.unpack_from("<I", out, desc + 20 + 12)[0]:
+            desc += 20
+        name_offset = raw_offset + struct.unpack_from("<I", out, desc + 12)[0] - va
+        end = out.index(b"\0", name_offset)
+        at = name_offset + rng.randrange(end - name_offset)
+        if end + 1 < raw_offset + raw_size:
+            out[at:end + 1] = bytes([rng.randrange(0x80, 0x100)]) + out[at:end]
+        else:
+            out[at] = rng.randrange(0x80, 0x100)
+    else:
+        raise ValueError(f"Unknown malformation {kind!r}; expected one of {', '.join(MALFORMATIONS)}")
+    return bytes(out)
+
+
+def generate_corpus(
+    out_dir: str | Path,
+    count: int,
+    seed: int = 0,
+    dlls: Tuple[int, int] = (1, 8),
+    imports_per_dll: Tuple[int, int] = (1, 40),
+    ordinal_ratio: float = 0.05,
+    sections: Tuple[int, int] = (0, 3),
+    file_size: Tuple[int, int] = (0, 0),
+    pe32_plus_ratio: float = 0.5,
+    malformed_ratio: float = 0.0,
+) -> List[Dict[str, object]]:
+    """
+    Write `count` generated PE files to `out_dir`.
+
+    Range arguments are inclusive (low, high) bounds drawn from per file;
+    `sections` counts extra data sections and `file_size` is a minimum size
+    reached with overlay padding (0 = no padding). About `malformed_ratio`
+    of the files are broken with a random MALFORMATIONS entry. The same
+    arguments and seed always produce the same corpus.
+
+    Returns:
+        One record per file: {"file", "pe32_plus", "dlls", "imports",
+        "ordinals", "extra_sections", "size", "malformed"}, where
+        "malformed" is the malformation name or None.
+    """
+    rng = random.Random(seed)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    records: List[Dict[str, object]] = []
+    for i in range(count):
+        imports = random_imports(
+            rng, rng.randint(*dlls), rng.randint(*imports_per_dll), ordinal_ratio
+        )
+        pe32_plus = rng.random() < pe32_plus_ratio
+        extra = rng.randint(*sections)
+        data = build_pe(imports, pe32_plus=pe32_plus, extra_sections=extra, min_size=rng.randint(*file_size))
+
+        kind = rng.choice(MALFORMATIONS) if rng.random() < malformed_ratio else None
+        if kind is not None:
+            data = malform(data, kind, rng)
+        path = out_dir / (f"malformed-{kind}-{i:06d}.exe" if kind else f"sample-{i:06d}.exe")
+        path.write_bytes(data)
+
+        funcs = [f for names in imports.values() for f in names]
+        records.append({
+            "file": str(path),
+            "pe32_plus": pe32_plus,
+            "dlls": len(imports),
+            "imports": len(funcs),
+            "ordinals": sum(isinstance(f, int) for f in funcs),
+            "extra_sections": extra,
+            "size": len(data),
+            "malformed": kind,
+        })
+    return records
+
+
+def _int_range(text: str) -> Tuple[int, int]:
+    """Parse "N" or "LOW-HIGH" into an inclusive range."""
+    low, _, high = text.partition("-")
+    try:
+        bounds = (int(low), int(high or low))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected N or LOW-HIGH, got {text!r}") from None
+    if bounds[0] < 0 or bounds[0] > bounds[1]:
+        raise argparse.ArgumentTypeError(f"invalid range {text!r}")
+    return bounds
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.synthetic",
+        description="Generate a corpus of synthetic PE files (optionally with malformed variants).",
+    )
+    parser.add_argument("out_dir", help="Directory to write the files to (created if missing).")
+    parser.add_argument("--count", type=int, default=100, help="Number of files (default: 100).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+    parser.add_argument("--dlls", type=_int_range, default=(1, 8), metavar="N|LOW-HIGH",
+                        help="Imported DLLs per file (default: 1-8).")
+    parser.add_argument("--imports-per-dll", type=_int_range, default=(1, 40), metavar="N|LOW-HIGH",
+                        help="Imports per DLL (default: 1-40).")
+    parser.add_argument("--ordinal-ratio", type=float, default=0.05,
+                        help="Fraction of imports by ordinal only (default: 0.05).")
+    parser.add_argument("--sections", type=_int_range, default=(0, 3), metavar="N|LOW-HIGH",
+                        help="Extra data sections per file (default: 0-3).")
+    parser.add_argument("--file-size", type=_int_range, default=(0, 0), metavar="N|LOW-HIGH",
+                        help="Minimum file size in bytes, reached with overlay padding (default: none).")
+    parser.add_argument("--pe32-plus-ratio", type=float, default=0.5,
+                        help="Fraction of 64-bit (PE32+) files (default: 0.5).")
+    parser.add_argument("--malformed-ratio", type=float, default=0.0,
+                        help=f"Fraction of deliberately broken files ({', '.join(MALFORMATIONS)}).")
+    parser.add_argument("--manifest", metavar="FILE",
+                        help="Write one JSON record per generated file to FILE.")
+    args = parser.parse_args(argv)
+
+    records = generate_corpus(
+        args.out_dir,
+        args.count,
+        seed=args.seed,
+        dlls=args.dlls,
+        imports_per_dll=args.imports_per_dll,
+        ordinal_ratio=args.ordinal_ratio,
+        sections=args.sections,
+        file_size=args.file_size,
+        pe32_plus_ratio=args.pe32_plus_ratio,
+        malformed_ratio=args.malformed_ratio,
+    )
+    if args.manifest:
+        with open(args.manifest, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    malformed = sum(r["malformed"] is not None for r in records)
+    print(
+        f"[INFO] Wrote {len(records)} files ({malformed} malformed, "
+        f"{sum(r['size'] for r in records) / 1e6:.1f} MB) to {args.out_dir}.",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+
+from src.apistrings import STRING_DLL, scan_api_strings, scan_buffer, with_string_apis
+from src.batch import analyze_file
+from src.pipeline import run_pipeline
+from src.synthetic import build_pe
+
+LOADER = {"KERNEL32.dll": ["LoadLibraryA", "GetProcAddress", "CreateFileW"]}
+STRINGS = (
+    b"\x00VirtualAllocEx\x00WriteProcessMemory\x00Sleep\x00\x00"
+    + "CreateRemoteThread\x00".encode("utf-16-le")
+    + b"\x00failed to send data\x00xconnect\x00InternetOpenUrlW\x00"
+)
+
+
+def test_scan_buffer_finds_delimited_names_in_both_encodings():
+    names = scan_buffer(b"\x00\x00" + STRINGS + b"\x00CreateFileW\x00VirtualAllocEx\x00")
+    assert names == ["VirtualAllocEx", "WriteProcessMemory", "InternetOpenUrlW", "CreateFileW", "CreateRemoteThread"]
+
+
+def test_imported_names_are_excluded(tmp_path):
+    path = tmp_path / "loader.exe"
+    path.write_bytes(build_pe(LOADER, extra_sections=1, extra_section_data=STRINGS))
+
+    names = scan_api_strings(str(path), exclude=LOADER)
+
+    assert "CreateFileW" not in names
+    assert {"VirtualAllocEx", "WriteProcessMemory", "CreateRemoteThread"} <= set(names)
+    assert with_string_apis(LOADER, []) is LOADER
+    assert with_string_apis(LOADER, names)[STRING_DLL] == names
+
+
+def test_scan_covers_section_data_only(tmp_path):
+    data = build_pe(LOADER, extra_sections=1, extra_section_data=STRINGS)
+    overlay = b"\x00WinExec\x00\x00" + "RegSetValueExW\x00".encode("utf-16-le")
+
+    names = scan_api_strings(data + overlay, exclude=LOADER)
+
+    assert {"VirtualAllocEx", "CreateRemoteThread"} <= set(names)
+    assert "WinExec" not in names and "RegSetValueExW" not in names
+    assert {"WinExec", "RegSetValueExW"} <= set(scan_buffer(data + overlay))
+
+
+def test_scan_buffer_ranges_keep_edge_strings():
+    data = b"\x00CreateFileW\x00junk\x00VirtualAllocEx\x00"
+    assert scan_buffer(data, ranges=[(1, 12)]) == ["CreateFileW"]
+    assert scan_buffer(data, ranges=[(18, 32)]) == ["VirtualAllocEx"]
+
+
+def test_pipeline_counts_string_referenced_apis(tmp_path):
+    path = tmp_path / "loader.exe"
+    data = build_pe(LOADER, extra_sections=1, extra_section_data=STRINGS)
+    path.write_bytes(data)
+
+    static = run_pipeline(path, backend="raw")
+    assert not static["capabilities"]["process_injection"]["present"]
+    assert "string_apis" not in static
+
+    result = run_pipeline(path, backend="raw", scan_strings=True)
+    assert result["imports"] == static["imports"]
+    assert result["capabilities"]["process_injection"]["count"] == 3
+    assert "CreateRemoteThread" in result["string_apis"]
+
+    record = analyze_file("loader.exe", data=data, backend="raw", scan_strings=True)
+    assert record["string_referenced_apis"] == result["string_apis"]
+    assert record["imported_dlls"] == list(static["imports"])
+
+
+def test_single_file_reports_include_string_referenced_apis(tmp_path, capsys):
+    from src.main import main
+
+    path = tmp_path / "loader.exe"
+    path.write_bytes(build_pe(LOADER, extra_sections=1, extra_section_data=STRINGS))
+    record = analyze_file(str(path), backend="raw", scan_strings=True)
+
+    assert main([str(path), "--backend", "raw", "--scan-strings", "--json"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["string_referenced_apis"] == record["string_referenced_apis"]
+
+    assert main([str(path), "--backend", "raw", "--scan-strings"]) == 0
+    text = capsys.readouterr().out
+    assert "== String-Referenced APIs ==" in text and "CreateRemoteThread" in text
@@ -45,3 +45,28 @@ def test_notepad_has_imports():
         # Skip test if notepad.exe not found
         import pytest
         pytest.skip("notepad.exe not found")
+
+
+def test_get_imports_missing_file(tmp_path):
+    """A path that does not exist raises FileNotFoundError."""
+    import pytest
+
+    with pytest.raises(FileNotFoundError):
+        get_imports(tmp_path / "missing.exe")
+
+
+def test_get_imports_rejects_non_pe(tmp_path):
+    """Empty files and non-PE data raise PEParseError instead of crashing."""
+    import pytest
+    from src.pe_parser import PEParseError
+
+    empty = tmp_path / "empty.exe"
+    empty.write_bytes(b"")
+    garbage = tmp_path / "garbage.exe"
+    garbage.write_bytes(b"not a PE file" * 100)
+
+    for path in (empty, garbage):
+        with pytest.raises(PEParseError):
+            get_imports(path)
+        with pytest.raises(PEParseError):
+            load_pe(path)
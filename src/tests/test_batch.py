@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import io
+import json
+
+from src.batch import iter_input_files, run_batch
+from src.report import HTMLTableWriter, JSONArrayWriter, NDJSONWriter
+
+
+def test_iter_input_files_expands_dirs_and_globs(tmp_path):
+    """Directories recurse, globs expand and file lists are read line by line."""
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.exe").write_bytes(b"x")
+    (tmp_path / "sub" / "b.dll").write_bytes(b"x")
+    listing = tmp_path / "list.txt"
+    listing.write_text(str(tmp_path / "a.exe") + "\n\n")
+
+    from_dir = list(iter_input_files([str(tmp_path / "sub")]))
+    from_glob = list(iter_input_files([str(tmp_path / "**" / "*.dll")]))
+    from_list = list(iter_input_files([], files_from=str(listing)))
+
+    assert from_dir == [str(tmp_path / "sub" / "b.dll")]
+    assert from_glob == [str(tmp_path / "sub" / "b.dll")]
+    assert from_list == [str(tmp_path / "a.exe")]
+
+
+def test_run_batch_records_errors_without_aborting(tmp_path):
+    """Bad and missing files become error records; the run still completes."""
+    bad = tmp_path / "bad.exe"
+    bad.write_bytes(b"MZ garbage")
+    out = io.StringIO()
+
+    summary = run_batch([str(bad), str(tmp_path / "missing.exe")], NDJSONWriter(out), workers=1)
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r["error"]["type"] for r in records] == ["PEParseError", "FileNotFoundError"]
+    assert summary["files"] == 2 and summary["errors"] == 2 and summary["ok"] == 0
+
+
+def test_record_writers_stream_valid_output():
+    """The JSON array is valid for 0 and n records; HTML rows are escaped."""
+    records = [{"file": "<a>.exe", "error": {"type": "PEParseError", "message": "bad"}}] * 3
+
+    empty = io.StringIO()
+    JSONArrayWriter(empty).close()
+    assert json.loads(empty.getvalue()) == []
+
+    out = io.StringIO()
+    with JSONArrayWriter(out) as writer:
+        for record in records:
+            writer.write(record)
+    assert json.loads(out.getvalue()) == records
+
+    page = io.StringIO()
+    with HTMLTableWriter(page, chunk_rows=2) as writer:
+        for record in records:
+            writer.write(record)
+    text = page.getvalue()
+    assert text.count("<tbody>") == 2 and "&lt;a&gt;.exe" in text and text.rstrip().endswith("</html>")
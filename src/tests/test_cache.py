@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from src import cache as cache_mod
+from src.cache import ResultCache, file_sha256
+from src.pipeline import run_pipeline
+from src.synthetic import build_pe
+
+
+def test_cache_hits_misses_and_lru_eviction(tmp_path):
+    """Lookups are counted and the least recently used entry is evicted first."""
+    db = tmp_path / "cache.db"
+    payload = {"imports": {"KERNEL32.DLL": ["ReadFile"] * 50}, "pattern_ids": []}
+
+    with ResultCache(db) as cache:
+        assert cache.get("a") is None
+        cache.put("a", payload)
+        assert cache.get("a") == payload
+        entry_size = cache.stats()["bytes"]
+
+    with ResultCache(db, max_bytes=2 * entry_size) as cache:
+        cache.put("b", payload)
+        cache.get("a")  # "b" is now the least recently used entry
+        cache.put("c", payload)
+        assert cache.get("b") is None
+        assert cache.get("a") == payload
+        stats = cache.stats()
+        assert stats["entries"] == 2 and stats["evictions"] == 1
+        assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+def test_cache_scoped_by_rules_fingerprint(tmp_path, monkeypatch):
+    """Runs with different rule tables share a cache without clearing each other's entries."""
+    db = tmp_path / "cache.db"
+    with ResultCache(db) as cache:
+        cache.put("a", {"pattern_ids": []})
+
+    with monkeypatch.context() as patch:
+        patch.setitem(cache_mod.API_CATEGORIES, "newapi", "network")
+        with ResultCache(db) as cache:
+            assert cache.get("a") is None
+            cache.put("a", {"pattern_ids": ["other"]})
+            assert cache.stats()["entries"] == 2
+
+    with ResultCache(db) as cache:
+        assert cache.get("a") == {"pattern_ids": []}
+
+
+def test_cache_key_covers_backend_and_caps(tmp_path):
+    path = tmp_path / "a.exe"
+    path.write_bytes(build_pe({"KERNEL32.dll": ["CreateFileW", "ReadFile"]}))
+
+    with ResultCache(tmp_path / "cache.db") as cache:
+        runs = [
+            {"backend": "raw"},
+            {"backend": "pefile"},
+            {"backend": "raw", "max_descriptors": 4},
+            {"backend": "raw", "max_imports_per_dll": 8},
+        ]
+        assert [run_pipeline(path, cache, **options)["cached"] for options in runs] == [False] * 4
+        assert [run_pipeline(path, cache, **options)["cached"] for options in runs] == [True] * 4
+        assert cache.stats()["entries"] == 4
+
+
+def test_file_sha256(tmp_path):
+    sample = tmp_path / "sample.bin"
+    sample.write_bytes(b"abc")
+    assert file_sha256(sample) == "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from src.categorize import ApiDictionary, categorize_imports, load_api_dictionary
+
+
+def test_suffix_folding_and_wildcards():
+    """A/W/Ex variants fold to their base entry; exact entries win over folding."""
+    dictionary = ApiDictionary(
+        {"createfile": "file_io", "virtualallocex": "process_injection", "urldownloadtofile": ["network", "file_io"]},
+        {"internet*": "network"},
+    )
+
+    assert dictionary.categories_of("CreateFileW") == ("file_io",)
+    assert dictionary.categories_of("CreateFileExA") == ("file_io",)
+    assert dictionary.categories_of("_CreateFile") == ("file_io",)
+    assert dictionary.categories_of("VirtualAllocEx") == ("process_injection",)
+    assert dictionary.categories_of("VirtualAlloc") == ("unknown",)
+    assert dictionary.categories_of("InternetReadFile") == ("network",)
+    assert dictionary.categories_of("createfilew") == ("unknown",)
+
+    categorized = categorize_imports({"URLMON.DLL": ["URLDownloadToFileW"]}, dictionary)
+    assert categorized == {"network": ["URLDownloadToFileW"], "file_io": ["URLDownloadToFileW"]}
+
+
+def test_serialized_table_round_trip(tmp_path):
+    dictionary = ApiDictionary({"send": "network", "cryptencrypt": "crypto"}, {"winhttp*": "network"})
+    path = tmp_path / "apis.json"
+    dictionary.save(path)
+    loaded = load_api_dictionary(path)
+
+    imports = {"X.DLL": ["send", "CryptEncrypt", "WinHttpOpen", "Other"]}
+    assert categorize_imports(imports, loaded) == categorize_imports(imports, dictionary)
+    assert loaded.to_dict() == dictionary.to_dict()
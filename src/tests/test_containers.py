@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import io
+import json
+import tarfile
+import zipfile
+
+from src.batch import run_batch
+from src.containers import iter_container
+from src.report import NDJSONWriter
+from src.synthetic import build_pe
+
+
+def _tar_gz(members):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def _sample_archive(tmp_path):
+    pe = build_pe({"KERNEL32.dll": ["CreateFileW", "WriteFile"]})
+    nested = _tar_gz({"bin/inner.dll": build_pe({"WS2_32.dll": ["connect"]}), "README": b"text"})
+    path = tmp_path / "intake.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("a.exe", pe)
+        archive.writestr("notes.txt", b"not a PE" * 100)
+        archive.writestr("nested.tar.gz", nested)
+        archive.writestr("big.exe", b"MZ" + bytes(4096))
+    return path
+
+
+def test_iter_container_finds_nested_members_and_applies_size_limit(tmp_path):
+    path = _sample_archive(tmp_path)
+
+    members = {m.name: m for m in iter_container(str(path), max_member_bytes=2048)}
+
+    assert set(members) == {f"{path}!a.exe", f"{path}!nested.tar.gz!bin/inner.dll", f"{path}!big.exe"}
+    assert members[f"{path}!a.exe"].data[:2] == b"MZ"
+    assert members[f"{path}!big.exe"].data is None and "2048" in members[f"{path}!big.exe"].error
+
+
+def test_run_batch_analyzes_archive_members_from_memory(tmp_path):
+    path = _sample_archive(tmp_path)
+    broken = tmp_path / "broken.zip"
+    broken.write_bytes(b"PK\x03\x04 truncated")
+    out = io.StringIO()
+
+    summary = run_batch(
+        [str(path), str(broken)],
+        NDJSONWriter(out),
+        workers=1,
+        options={"backend": "raw", "archives": True, "max_member_bytes": 2048},
+    )
+
+    records = {r["file"]: r for r in map(json.loads, out.getvalue().splitlines())}
+    assert records[f"{path}!a.exe"]["total_imports"] == 2
+    assert records[f"{path}!nested.tar.gz!bin/inner.dll"]["imported_dlls"] == ["WS2_32.DLL"]
+    assert records[f"{path}!big.exe"]["error"]["type"] == "ContainerError"
+    assert records[str(broken)]["error"]["type"] == "ContainerError"
+    assert summary["files"] == 4 and summary["errors"] == 2
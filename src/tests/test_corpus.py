@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.corpus import Corpus, CorpusWriter, export_files  # noqa: E402
+from src.synthetic import build_pe  # noqa: E402
+
+FILES = {
+    "a.exe": {"WS2_32.dll": ["connect", "send"], "ADVAPI32.dll": ["RegSetValueExW"]},
+    "b.exe": {"WS2_32.dll": ["connect"], "KERNEL32.dll": ["MysteryFunc"]},
+    "c.exe": {"ADVAPI32.dll": ["RegSetValueExW"], "KERNEL32.dll": ["MysteryFunc", "CreateFileW"]},
+    "d.exe": {},
+}
+
+
+def _corpus(tmp_path):
+    with CorpusWriter(tmp_path / "corpus") as writer:
+        for name, imports in FILES.items():
+            writer.add(name, imports)
+    return Corpus(tmp_path / "corpus")
+
+
+def test_intersection_and_exclusion_queries(tmp_path):
+    corpus = _corpus(tmp_path)
+    names = lambda ids: [corpus.files[i] for i in ids]  # noqa: E731
+
+    assert names(corpus.files_with_all(["WS2_32!connect", "advapi32.dll!RegSetValueExW"])) == ["a.exe"]
+    assert names(corpus.files_with_all(["connect"], without=["send"])) == ["b.exe"]
+    assert names(corpus.files_with_all(["NoSuchApi"])) == []
+    assert corpus.file_apis(2) == ["ADVAPI32!RegSetValueExW", "KERNEL32!MysteryFunc", "KERNEL32!CreateFileW"]
+
+
+def test_frequency_and_top_k(tmp_path):
+    corpus = _corpus(tmp_path)
+
+    assert corpus.top_apis(2) == [("WS2_32!connect", 2), ("ADVAPI32!RegSetValueExW", 2)]
+    assert corpus.top_apis(5, category="unknown") == [("KERNEL32!MysteryFunc", 2)]
+    assert corpus.top_apis(5, dll="ws2_32.dll") == [("WS2_32!connect", 2), ("WS2_32!send", 1)]
+    among = corpus.files_with_all(["KERNEL32!MysteryFunc"])
+    assert corpus.top_apis(1, files=among) == [("KERNEL32!MysteryFunc", 2)]
+    assert int(corpus.frequencies().sum()) == len(corpus.indices) == 8
+
+
+def test_export_files_from_pe_samples(tmp_path):
+    paths = []
+    for name, imports in FILES.items():
+        if imports:
+            (tmp_path / name).write_bytes(build_pe(imports))
+            paths.append(str(tmp_path / name))
+    (tmp_path / "bad.exe").write_bytes(b"MZ nope")
+
+    errors = list(export_files(tmp_path / "corpus", paths + [str(tmp_path / "bad.exe")], workers=1, backend="raw"))
+
+    corpus = Corpus(tmp_path / "corpus")
+    assert len(errors) == 1 and len(corpus) == 3
+    assert len(corpus.files_with_all(["WS2_32!connect"])) == 2
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from src.batch import run_batch
+from src.dashboard import DashboardError, DashboardWriter, main, read_page, render_index, write_dashboard
+from src.main import main as cli_main
+from src.report import NDJSONWriter
+from src.synthetic import build_pe
+
+
+def _record(i: int) -> dict:
+    if i % 10 == 9:
+        return {"file": f"bad{i}.exe", "error": {"type": "PEParseError", "message": "Not a valid PE file"}}
+    capabilities = {
+        "network": {"present": i % 2 == 0, "description": "Network I/O", "count": 2, "examples": ["connect"]},
+        "crypto": {"present": i % 3 == 0, "description": "Cryptography", "count": 1, "examples": ["CryptEncrypt"]},
+    }
+    patterns = ["downloader"] if i % 6 == 0 else []
+    return {
+        "file": f"f{i}.exe",
+        "total_imports": i,
+        "imported_dlls": ["KERNEL32.DLL", "WS2_32.DLL"],
+        "capabilities": capabilities,
+        "detected_patterns": patterns,
+        "pattern_descriptions": {pid: "Downloads and runs a payload" for pid in patterns},
+    }
+
+
+def _rows(directory, facet: str, pages: int) -> list:
+    return [row for page in range(pages) for row in read_page(directory, facet, page)]
+
+
+def test_facets_partition_rows_into_pages(tmp_path):
+    records = [_record(i) for i in range(25)]
+    meta = write_dashboard(tmp_path / "dash", records, page_rows=4)
+
+    assert meta["rows"] == 25 and meta["errors"] == 2
+    assert [c["name"] for c in meta["capabilities"]] == ["network", "crypto"]
+    assert meta["patterns"] == [{"name": "downloader", "description": "Downloads and runs a payload", "files": 5}]
+    assert meta["facets"]["all"] == {"rows": 25, "pages": 7}
+    assert json.loads((tmp_path / "dash" / "meta.json").read_text()) == meta
+    assert "<script>" in (tmp_path / "dash" / "index.html").read_text()
+
+    rows = _rows(tmp_path / "dash", "all", 7)
+    assert [row[0] for row in rows] == list(range(25))
+    assert rows[6] == [6, "f6.exe", 6, 2, [0, 1], [0], None]
+    assert rows[9][6] == "PEParseError: Not a valid PE file"
+
+    network = _rows(tmp_path / "dash", "c0", meta["facets"]["c0"]["pages"])
+    assert [row[1] for row in network] == [f"f{i}.exe" for i in range(25) if i % 2 == 0 and i % 10 != 9]
+    assert [row[0] for row in _rows(tmp_path / "dash", "errors", 1)] == [9, 19]
+
+    # Drill-down: a row id locates its full record.
+    assert read_page(tmp_path / "dash", "records", 13 // 4)[13 % 4] == records[13]
+
+
+def test_writer_replaces_dashboards_only(tmp_path):
+    write_dashboard(tmp_path / "dash", [_record(i) for i in range(30)], page_rows=5)
+    meta = write_dashboard(tmp_path / "dash", [_record(1)], page_rows=5)
+    assert meta["rows"] == 1
+    assert sorted(p.name for p in (tmp_path / "dash" / "data" / "all").iterdir()) == ["00000.json.gz"]
+
+    (tmp_path / "other").mkdir()
+    (tmp_path / "other" / "keep.txt").write_text("x")
+    with pytest.raises(DashboardError):
+        DashboardWriter(tmp_path / "other")
+
+
+def test_writer_keeps_foreign_meta_json(tmp_path):
+    other = tmp_path / "other"
+    (other / "data").mkdir(parents=True)
+    (other / "data" / "keep.txt").write_text("x")
+    for meta in ('{"format": "0"}', "[]", "not json"):
+        (other / "meta.json").write_text(meta)
+        with pytest.raises(DashboardError):
+            DashboardWriter(other)
+    assert (other / "data" / "keep.txt").exists()
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_filter_scan_keeps_counts_not_rows():
+    # Run the page's rowsOf on fake driver pages: every third row matches.
+    script = render_index("t")
+    js = script[script.index("function facetRows"):script.index("function names(")]
+    rows = [[i, "f", 0, 0, [0], [0] if i % 3 == 0 else [], None] for i in range(60)]
+    pages = [rows[i:i + 4] for i in range(0, 60, 4)]
+    program = (
+        "let meta = {page_rows: 4, facets: {c0: {rows: 60}, p0: {rows: 100}}}; let scan = null;\n"
+        f"const PAGES = {json.dumps(pages)};\n"
+        "async function load(facet, n) { return PAGES[n]; }\n"
+        "function filters() { return ['p0', 'c0']; }\n"
+        + js +
+        "(async () => { const out = [];\n"
+        "  for (const n of [0, 1, 4, 5, 1]) { const r = await rowsOf(n); out.push([r.rows.map((x) => x[0]), r.total, r.exact]); }\n"
+        "  console.log(JSON.stringify({out: out, counts: scan.counts.length})); })();\n"
+    )
+    result = json.loads(subprocess.run(["node", "-e", program], capture_output=True, text=True, check=True).stdout)
+    assert result["out"] == [
+        [[0, 3, 6, 9], 4, False],
+        [[12, 15, 18, 21], 8, False],
+        [[48, 51, 54, 57], 20, True],
+        [[], 20, True],
+        [[12, 15, 18, 21], 20, True],
+    ]
+    assert result["counts"] == len(pages) + 1
+
+
+def test_batch_and_ndjson_sources_agree(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    imports = {"WS2_32.dll": ["socket", "connect", "send", "recv"], "KERNEL32.dll": ["CreateFileW"]}
+    for i in range(3):
+        (tmp_path / f"{i}.exe").write_bytes(build_pe(imports, min_size=1000 + i))
+    (tmp_path / "broken.exe").write_bytes(b"MZ nope")
+    paths = sorted(str(p.name) for p in tmp_path.glob("*.exe"))
+
+    assert cli_main(paths + ["--dashboard", "live", "--workers", "1"]) == 0
+    with open("results.ndjson", "w") as out:
+        run_batch(paths, NDJSONWriter(out), workers=1)
+    assert main(["offline", "results.ndjson"]) == 0
+
+    live = json.loads((tmp_path / "live" / "meta.json").read_text())
+    offline = json.loads((tmp_path / "offline" / "meta.json").read_text())
+    assert live["rows"] == 4 and live["errors"] == 1
+    assert live["capabilities"] == offline["capabilities"] and all(c["files"] == 3 for c in live["capabilities"])
+    assert sorted(map(str, read_page("live", "all", 0))) == sorted(map(str, read_page("offline", "all", 0)))
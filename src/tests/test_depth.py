@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import json
+import struct
+
+import pytest
+
+from src.batch import analyze_file
+from src.depth import analyzers_for, required_directories, run_analyzers
+from src.pe_parser import _pefile
+from src.pipeline import run_pipeline
+from src.profiling import StageProfile
+from src.synthetic import build_pe
+
+IMPORTS = {"KERNEL32.dll": ["CreateFileW", "ReadFile", "CloseHandle"]}
+EXPORTS = ("helper.dll", {1: "Start", 2: "Stop", 7: "Configure"})
+DELAYED = ("WININET.dll", ["InternetOpenA", "InternetOpenUrlA", "InternetReadFile"])
+BLOB_SIZE = 0x400
+
+
+def _directories_blob(rva: int, offset: int) -> tuple:
+    """
+    Delay-import, resource and bound-import directories laid out at `rva`
+    (file `offset`). Returns (bytes, {directory index: (rva, size)}).
+    """
+    blob = bytearray(BLOB_SIZE)
+
+    # Delay imports at +0: descriptor, terminator, INT, IAT, names
+    dll, funcs = DELAYED
+    int_at, iat_at, names_at = 0x40, 0x60, 0x80
+    struct.pack_into("<8I", blob, 0, 1, rva + 0xF0, 0, rva + iat_at, rva + int_at, 0, 0, 0)
+    at = names_at
+    for i, func in enumerate(funcs):
+        struct.pack_into("<I", blob, int_at + 4 * i, rva + at)
+        struct.pack_into("<I", blob, iat_at + 4 * i, rva + at)
+        entry = b"\0\0" + func.encode() + b"\0"
+        blob[at:at + len(entry)] = entry
+        at += len(entry) + len(entry) % 2
+    blob[0xF0:0xF0 + len(dll) + 1] = dll.encode() + b"\0"
+
+    # Resources at +0x100: a named "CONFIG" type and RCDATA holding a PE
+    res = 0x100
+
+    def directory(off, entries):
+        struct.pack_into("<IIHHHH", blob, res + off, 0, 0, 0, 0,
+                         sum(1 for name, _ in entries if name & 0x80000000),
+                         sum(1 for name, _ in entries if not name & 0x80000000))
+        for i, (name, target) in enumerate(entries):
+            struct.pack_into("<II", blob, res + off + 16 + 8 * i, name, target)
+
+    sub = 0x80000000
+    directory(0x00, [(sub | 0xE0, sub | 0x20), (10, sub | 0x50)])
+    directory(0x20, [(1, sub | 0x38)])
+    directory(0x38, [(0x409, 0xA0)])
+    directory(0x50, [(1, sub | 0x70), (2, sub | 0x88)])
+    directory(0x70, [(0x409, 0xB0)])
+    directory(0x88, [(0x407, 0xC0)])
+    struct.pack_into("<II", blob, res + 0xA0, rva + res + 0x100, 12)
+    struct.pack_into("<II", blob, res + 0xB0, rva + res + 0x110, 64)
+    struct.pack_into("<II", blob, res + 0xC0, rva + res + 0x150, 16)
+    struct.pack_into("<H", blob, res + 0xE0, 6)
+    blob[res + 0xE2:res + 0xEE] = "CONFIG".encode("utf-16-le")
+    blob[res + 0x100:res + 0x10C] = b"key=value\r\n\0"
+    blob[res + 0x110:res + 0x114] = b"MZ\x90\0"
+
+    # Bound imports at +0x300, located by file offset
+    bound = 0x300
+    struct.pack_into("<IHH", blob, bound, 0x12345678, 24, 1)
+    struct.pack_into("<IHH", blob, bound + 8, 0x23456789, 37, 0)
+    blob[bound + 24:bound + 47] = b"KERNEL32.dll\0NTDLL.DLL\0"
+
+    return bytes(blob), {13: (rva, 64), 2: (rva + res, 0x200), 11: (offset + bound, 48)}
+
+
+def _set_directories(data: bytes, directories: dict) -> bytes:
+    image = bytearray(data)
+    pe_offset, = struct.unpack_from("<I", image, 0x3C)
+    for index, (rva, size) in directories.items():
+        struct.pack_into("<II", image, pe_offset + 24 + 96 + 8 * index, rva, size)
+    return bytes(image)
+
+
+def _extra_section(data: bytes) -> tuple:
+    """(RVA, file offset) of the first extra section."""
+    pe_offset, = struct.unpack_from("<I", data, 0x3C)
+    optional_size, = struct.unpack_from("<H", data, pe_offset + 20)
+    rva, _raw_size, offset = struct.unpack_from("<III", data, pe_offset + 24 + optional_size + 2 * 40 + 12)
+    return rva, offset
+
+
+@pytest.fixture(scope="module")
+def sample() -> bytes:
+    layout = build_pe(IMPORTS, extra_sections=1, extra_section_data=bytes(BLOB_SIZE), exports=EXPORTS)
+    blob, directories = _directories_blob(*_extra_section(layout))
+    data = build_pe(IMPORTS, extra_sections=1, extra_section_data=blob, exports=EXPORTS)
+    return _set_directories(data, directories)
+
+
+def test_depths_declare_directories():
+    assert analyzers_for("imports") == []
+    assert [a.name for a in analyzers_for("standard")] == ["delay_imports", "exports"]
+    assert required_directories(analyzers_for("full")) == [0, 2, 11, 13]
+    with pytest.raises(ValueError):
+        analyzers_for("deep")
+
+
+def test_full_depth_analyzers(sample):
+    profile = StageProfile()
+    results = run_analyzers(sample, analyzers_for("full"), profile=profile)
+
+    assert results["exports"] == {"dll": "helper.dll", "named": 3,
+                                  "names": ["Start", "Stop", "Configure"], "truncated": False}
+    assert results["delay_imports"] == {"WININET.DLL": DELAYED[1]}
+    assert results["bound_imports"] == [
+        {"dll": "KERNEL32.dll", "timestamp": 0x12345678, "forwarders": ["NTDLL.DLL"]},
+    ]
+    resources = results["resources"]
+    assert resources["types"] == {"CONFIG": {"count": 1, "bytes": 12}, "RCDATA": {"count": 2, "bytes": 80}}
+    assert resources["languages"] == ["0x0407", "0x0409"]
+    assert resources["embedded_pe"] == 1 and resources["largest"] == {"type": "RCDATA", "bytes": 64}
+    assert set(profile.timings) == {"headers", "delay_imports", "exports", "bound_imports", "resources"}
+
+    # Same structures as pefile sees them
+    pe = _pefile().PE(data=sample)
+    assert [imp.name.decode() for imp in pe.DIRECTORY_ENTRY_DELAY_IMPORT[0].imports] == DELAYED[1]
+    assert [entry.name.decode() for entry in pe.DIRECTORY_ENTRY_BOUND_IMPORT] == ["KERNEL32.dll"]
+    assert len(pe.DIRECTORY_ENTRY_RESOURCE.entries) == 2
+
+
+def test_absent_directories_are_skipped():
+    profile = StageProfile()
+    results = run_analyzers(build_pe(IMPORTS), analyzers_for("full"), profile=profile)
+    assert results == dict.fromkeys(["delay_imports", "exports", "bound_imports", "resources"])
+    assert set(profile.timings) == {"headers"}
+
+
+@pytest.mark.parametrize("backend", ["raw", "pefile"])
+def test_pipeline_depth(tmp_path, sample, backend):
+    path = tmp_path / "sample.exe"
+    path.write_bytes(sample)
+
+    default = run_pipeline(path, backend=backend)
+    assert "exports" not in default and not default["capabilities"]["network"]["present"]
+
+    standard = run_pipeline(path, backend=backend, depth="standard")
+    assert standard["imports"] == default["imports"]
+    assert standard["exports"]["named"] == 3 and "resources" not in standard
+    # Delay-loaded WinINet calls count towards the capabilities
+    # (InternetReadFile is not in the default table).
+    assert standard["capabilities"]["network"]["count"] == 2
+
+    record = analyze_file(str(path), data=sample, backend=backend, depth="full")
+    assert record["resources"]["entries"] == 3 and record["delay_imports"] == standard["delay_imports"]
+
+
+@pytest.mark.parametrize("backend", ["raw", "pefile"])
+def test_pipeline_maps_and_parses_once(tmp_path, sample, backend, monkeypatch):
+    import src.pe_parser as pe_parser
+    import src.pe_reader as pe_reader
+
+    path = tmp_path / "sample.exe"
+    path.write_bytes(sample)
+    calls = {"map": 0, "headers": 0}
+
+    def counted(name, func):
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(pe_parser, "_open_mapping", counted("map", pe_parser._open_mapping))
+    monkeypatch.setattr(pe_reader, "_parse_headers", counted("headers", pe_reader._parse_headers))
+    result = run_pipeline(path, backend=backend, depth="full", scan_strings=True, packing=True)
+
+    assert result["resources"]["entries"] == 3
+    assert calls == {"map": 1, "headers": 1 if backend == "raw" else 0}
+
+
+@pytest.mark.parametrize("pe32_plus", [False, True])
+def test_image_from_pefile_matches_headers(sample, pe32_plus):
+    from src.pe_reader import _image_from_pefile, _parse_headers
+
+    data = sample if not pe32_plus else build_pe(IMPORTS, pe32_plus=True, extra_sections=2, exports=EXPORTS)
+    ours, theirs = _parse_headers(data), _image_from_pefile(_pefile().PE(data=data, fast_load=True), data)
+    for field in ("size", "pe32_plus", "image_base", "sections", "directories"):
+        assert getattr(theirs, field) == getattr(ours, field), field
+
+
+@pytest.mark.parametrize("backend", ["raw", "pefile"])
+def test_delay_imports_follow_the_caps(tmp_path, sample, backend):
+    path = tmp_path / "sample.exe"
+    path.write_bytes(sample)
+
+    result = run_pipeline(path, backend=backend, depth="standard", max_imports_per_dll=2)
+    assert result["delay_imports"] == {"WININET.DLL": DELAYED[1][:2]}
+    assert result["truncated"] and result["truncated_by"] == ["max_imports_per_dll"]
+
+    result = run_pipeline(path, backend=backend, depth="standard", max_descriptors=0)
+    assert result["delay_imports"] == {} and result["imports"] == {}
+    assert result["truncated_by"] == ["max_descriptors"]
+
+
+def test_string_scan_keeps_delay_imports(tmp_path, sample):
+    from src.model import FileResult
+
+    path = tmp_path / "sample.exe"
+    path.write_bytes(sample)
+    result = run_pipeline(path, depth="standard", scan_strings=True)
+    # The delay-imported names are left out of the string scan, so they
+    # must stay in what is categorized.
+    assert result["capabilities"]["network"]["count"] == 2
+    assert FileResult.from_pipeline("sample.exe", result).categorized() == result["categorized"]
+
+
+def test_single_file_reports_include_analyzers(tmp_path, sample, capsys):
+    from src.main import main
+
+    path = tmp_path / "sample.exe"
+    path.write_bytes(sample)
+    record = analyze_file(str(path), backend="raw", depth="full")
+
+    assert main([str(path), "--backend", "raw", "--depth", "full", "--json"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    for name in ("exports", "delay_imports", "bound_imports", "resources"):
+        assert report[name] == record[name]
+    assert report["capabilities"]["network"]["count"] == record["capabilities"]["network"]["count"]
+
+    assert main([str(path), "--backend", "raw", "--depth", "imports", "--json"]) == 0
+    assert "exports" not in json.loads(capsys.readouterr().out)
+
+    assert main([str(path), "--backend", "raw", "--depth", "full"]) == 0
+    text = capsys.readouterr().out
+    assert "== Delay-Load Imports ==" in text and "- WININET.DLL: InternetOpenA" in text
+    assert "== Resources ==" in text
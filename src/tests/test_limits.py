@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import io
+import json
+import os
+import signal
+import time
+
+import pytest
+
+import src.batch
+import src.pipeline
+from src.batch import run_batch
+from src.limits import AnalysisTimeout, SupervisedPool, WorkerCrashed
+from src.main import main
+from src.pe_parser import get_imports
+from src.report import NDJSONWriter
+from src.synthetic import build_pe
+
+
+@pytest.mark.parametrize("backend", ["pefile", "raw"])
+def test_import_caps_mark_result_truncated(tmp_path, backend):
+    path = tmp_path / "many.exe"
+    path.write_bytes(build_pe({
+        "KERNEL32.dll": ["CreateFileW", "ReadFile", "WriteFile", "CloseHandle"],
+        "USER32.dll": ["MessageBoxW"],
+        "WS2_32.dll": ["connect", "send"],
+    }))
+
+    full = get_imports(path, backend=backend, max_descriptors=3, max_imports_per_dll=4)
+    assert not full.truncated and len(full) == 3
+
+    capped = get_imports(path, backend=backend, max_descriptors=2, max_imports_per_dll=2)
+    assert capped.truncated and set(capped.truncated_by) == {"max_descriptors", "max_imports_per_dll"}
+    assert capped == {"KERNEL32.DLL": ["CreateFileW", "ReadFile"], "USER32.DLL": ["MessageBoxW"]}
+
+
+@pytest.mark.parametrize("backend", ["pefile", "raw"])
+def test_symbol_limit_truncation_is_reported_by_cause(tmp_path, capsys, backend):
+    path = tmp_path / "huge.exe"
+    path.write_bytes(build_pe({f"LIB{i}.dll": [f"Func{j}" for j in range(1000)] for i in range(10)}))
+
+    imports = get_imports(path, backend=backend)
+    assert imports.truncated_by == ("symbol_limit",)
+
+    cache = str(tmp_path / "cache.db")
+    for _ in range(2):
+        assert main([str(path), "--json", "--backend", backend, "--cache", cache]) == 0
+        assert "truncated by the parser's limit on import entries" in capsys.readouterr().err
+
+
+def _sleep_in_c(seconds):
+    # With SIGALRM blocked not even an alarm gets in, as in a long C call.
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def _die(code):
+    os._exit(code)
+
+
+def test_supervised_pool_kills_and_replaces_overrunning_workers():
+    with SupervisedPool(1, timeout=0.2) as pool:
+        first = pool.submit(os.getpid).result(10)
+        start = time.perf_counter()
+        with pytest.raises(AnalysisTimeout):
+            pool.submit(_sleep_in_c, 30).result(10)
+        assert time.perf_counter() - start < 5
+
+        with pytest.raises(WorkerCrashed):
+            pool.submit(_die, 3).result(10)
+
+        replacement = pool.submit(os.getpid).result(10)
+        assert replacement != first
+
+
+def test_run_batch_turns_timeouts_into_error_records(tmp_path, monkeypatch):
+    slow = tmp_path / "slow.exe"
+    fast = tmp_path / "fast.exe"
+    for path in (slow, fast):
+        path.write_bytes(build_pe({"KERNEL32.dll": ["ReadFile"]}))
+    run_pipeline = src.batch.run_pipeline
+
+    def stall(path, *args, **kwargs):
+        if path.endswith("slow.exe"):
+            _sleep_in_c(30)
+        return run_pipeline(path, *args, **kwargs)
+
+    # Forked workers pick up the patched function by name.
+    monkeypatch.setattr(src.batch, "run_pipeline", stall)
+    out = io.StringIO()
+    summary = run_batch([str(slow), str(fast)], NDJSONWriter(out), workers=1, timeout=0.5)
+
+    records = {record["file"]: record for record in map(json.loads, out.getvalue().splitlines())}
+    assert records[str(slow)]["error"]["type"] == "AnalysisTimeout"
+    assert "error" not in records[str(fast)]
+    assert summary["errors"] == 1 and summary["seconds"] < 10
+
+
+def test_run_batch_reports_truncation_and_memory_capped_workers(tmp_path):
+    path = tmp_path / "a.exe"
+    path.write_bytes(build_pe({"KERNEL32.dll": ["CreateFileW", "ReadFile", "WriteFile"]}))
+    out = io.StringIO()
+
+    summary = run_batch(
+        [str(path)],
+        NDJSONWriter(out),
+        workers=1,
+        options={"backend": "raw", "max_imports_per_dll": 1},
+        max_memory=4 * 2**30,
+    )
+
+    record = json.loads(out.getvalue())
+    assert record["truncated"] is True and "error" not in record
+    assert record["truncated_by"] == ["max_imports_per_dll"]
+    assert summary["truncated"] == 1
+
+
+def test_single_file_limits_apply_to_a_worker_not_the_caller(tmp_path, monkeypatch, capsys):
+    resource = pytest.importorskip("resource")
+    path = tmp_path / "a.exe"
+    path.write_bytes(build_pe({"KERNEL32.dll": ["ReadFile"]}))
+    before = resource.getrlimit(resource.RLIMIT_AS)
+
+    assert main([str(path), "--json", "--timeout", "30", "--max-memory-mb", "4096"]) == 0
+    assert json.loads(capsys.readouterr().out)["file"] == str(path)
+    assert resource.getrlimit(resource.RLIMIT_AS) == before
+
+    monkeypatch.setattr(src.pipeline, "run_pipeline", lambda *args, **kwargs: _sleep_in_c(30))
+    start = time.perf_counter()
+    assert main([str(path), "--timeout", "0.5"]) == 1
+    assert "Analysis exceeded 0.5s" in capsys.readouterr().err
+    assert time.perf_counter() - start < 10
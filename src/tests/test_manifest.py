@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import io
+import json
+import os
+
+from src import manifest as manifest_mod
+from src.manifest import Manifest, rescan, watch
+from src.report import NDJSONWriter
+from src.synthetic import build_pe
+
+NETWORK = {"WS2_32.dll": ["socket", "connect", "send"]}
+FILES = {"KERNEL32.dll": ["CreateFileW", "WriteFile"]}
+
+
+def _rescan(db, root, **kwargs):
+    out = io.StringIO()
+    with Manifest(db) as manifest:
+        summary = rescan(manifest, [str(root)], NDJSONWriter(out), workers=1, options={"backend": "raw"}, **kwargs)
+    return summary, {r["file"]: r for r in map(json.loads, out.getvalue().splitlines())}
+
+
+def test_rescan_reports_only_changes(tmp_path):
+    root = tmp_path / "tree"
+    root.mkdir()
+    for name in ("a.exe", "b.exe", "c.exe"):
+        (root / name).write_bytes(build_pe(FILES))
+    db = tmp_path / "manifest.db"
+
+    summary, diffs = _rescan(db, root)
+    assert summary["added"] == 3 and set(diffs[str(root / "a.exe")]["capabilities"]["added"]) >= {"file_io"}
+
+    (root / "a.exe").write_bytes(build_pe(NETWORK))
+    (root / "b.exe").unlink()
+    os.utime(root / "c.exe", ns=(1, 1))  # new mtime, same contents
+    (root / "d.exe").write_bytes(build_pe(FILES))
+
+    summary, diffs = _rescan(db, root)
+    a = diffs[str(root / "a.exe")]
+    assert a["change"] == "modified"
+    assert "network" in a["capabilities"]["added"] and "file_io" in a["capabilities"]["removed"]
+    assert diffs[str(root / "b.exe")]["change"] == "deleted"
+    assert diffs[str(root / "d.exe")]["change"] == "added"
+    assert str(root / "c.exe") not in diffs
+    assert (summary["modified"], summary["deleted"], summary["added"], summary["touched"]) == (1, 1, 1, 1)
+
+    summary, diffs = _rescan(db, root)
+    assert diffs == {} and summary["unchanged"] == 3
+
+
+def test_rule_change_reanalyzes_everything(tmp_path, monkeypatch):
+    root = tmp_path / "tree"
+    root.mkdir()
+    (root / "a.exe").write_bytes(build_pe(FILES))
+    db = tmp_path / "manifest.db"
+    _rescan(db, root)
+
+    monkeypatch.setattr(manifest_mod, "rules_fingerprint", lambda: "new rules")
+    summary, diffs = _rescan(db, root)
+    assert summary["modified"] == 1 and diffs[str(root / "a.exe")]["capabilities"] == {"added": [], "removed": []}
+
+
+def test_watch_polling_picks_up_new_files(tmp_path):
+    root = tmp_path / "tree"
+    root.mkdir()
+    summaries = []
+
+    def on_summary(summary):
+        summaries.append(summary)
+        if len(summaries) == 1:
+            (root / "late.exe").write_bytes(build_pe(NETWORK))
+
+    out = io.StringIO()
+    with Manifest(tmp_path / "manifest.db") as manifest:
+        watch(
+            manifest, [str(root)], NDJSONWriter(out),
+            interval=0.01, poll=True, on_summary=on_summary,
+            should_stop=lambda: len(summaries) >= 2, workers=1,
+        )
+
+    assert [json.loads(line)["change"] for line in out.getvalue().splitlines()] == ["added"]
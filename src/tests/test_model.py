@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+import random
+import sys
+
+import pytest
+
+from src.analyze import describe_patterns
+from src.batch import analyze_file
+from src.model import FileResult
+from src.pipeline import run_pipeline
+from src.report import build_report_data
+from src.synthetic import build_pe, random_imports
+
+
+def _named(imports):
+    return {dll: [f"ORDINAL_{f}" if isinstance(f, int) else f for f in funcs] for dll, funcs in imports.items()}
+
+
+def test_compact_result_reproduces_pipeline_output(tmp_path):
+    rng = random.Random(3)
+    for i in range(20):
+        path = tmp_path / f"{i}.exe"
+        path.write_bytes(build_pe(random_imports(rng, rng.randint(1, 6), rng.randint(1, 30), ordinal_ratio=0.1)))
+        result = run_pipeline(path, backend="raw")
+
+        compact = FileResult.from_pipeline(str(path), result)
+
+        assert compact.imports() == result["imports"]
+        assert list(compact.categorized().items()) == list(result["categorized"].items())
+        assert compact.capabilities() == result["capabilities"]
+        expected = build_report_data(str(path), result["imports"], result["capabilities"],
+                                     describe_patterns(result["pattern_ids"]))
+        assert json.dumps(compact.report_data()) == json.dumps(expected)
+
+
+@pytest.mark.parametrize("options", [
+    {"max_imports_per_dll": 3},
+    {"scan_strings": True, "packing": True, "depth": "full"},
+])
+def test_compact_record_matches_batch_record(tmp_path, options):
+    rng = random.Random(5)
+    for i in range(10):
+        path = tmp_path / f"{i}.exe"
+        imports = random_imports(rng, rng.randint(1, 6), rng.randint(1, 10))
+        path.write_bytes(build_pe(imports, extra_section_data=b"VirtualAllocEx\0WinExec\0" * 8, extra_sections=1))
+        result = run_pipeline(path, backend="raw", **options)
+
+        compact = FileResult.from_pipeline(str(path), result)
+
+        assert list(compact.categorized().items()) == list(result["categorized"].items())
+        record = analyze_file(str(path), backend="raw", **options)
+        assert json.dumps(compact.report_data()) == json.dumps(record)
+        assert compact.truncated == result["truncated"]
+
+
+def test_names_are_shared_between_results():
+    imports = _named(random_imports(random.Random(0), 3, 10))
+    copies = [json.loads(json.dumps(imports)) for _ in range(2)]
+
+    a, b = (FileResult.from_imports(f"{i}.exe", table, ["pid"]) for i, table in enumerate(copies))
+
+    assert all(x is y for x, y in zip(a.funcs, b.funcs))
+    assert all(x is y for x, y in zip(a.dlls, b.dlls))
+    assert a.funcs[0] is sys.intern(a.funcs[0])
+    assert not hasattr(a, "__dict__")
+
+
+def test_category_count_and_empty_imports():
+    result = FileResult.from_imports("a.exe", {"WS2_32.dll": ["connect", "send"], "KERNEL32.dll": ["Sleep"]}, [])
+    assert result.category_count("network") == 2
+    assert result.category_count("no-such-category") == 0
+    assert result.total_imports() == 3
+
+    empty = FileResult.from_imports("b.exe", {}, [])
+    assert empty.imports() == {} and empty.categorized() == {}
+    assert empty.report_data()["total_imports"] == 0
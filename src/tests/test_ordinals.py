@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import pytest
+
+from src import ordinals
+from src.ordinals import OrdinalIndex, build_index, default_ordinal_index, main, tables_from_dlls
+from src.pe_parser import get_imports
+from src.pe_reader import read_exports
+from src.synthetic import build_pe
+
+MFC_EXPORTS = {256: "??0CWnd@@QAE@XZ", 1200: "AfxGetApp", 3: "AfxWinMain"}
+CLIENT = {"MFC42.DLL": [1200, 256, 7], "WS2_32.dll": [4, 23]}
+
+
+@pytest.fixture
+def active_index(monkeypatch):
+    """Point the default index at a file for the duration of a test."""
+
+    def activate(path):
+        monkeypatch.setattr(ordinals, "ORDINAL_INDEX_PATH", str(path))
+        default_ordinal_index.cache_clear()
+
+    yield activate
+    default_ordinal_index.cache_clear()
+
+
+def test_bundled_index_names_winsock_ordinals():
+    index = default_ordinal_index()
+    assert index.lookup("WS2_32.dll", 4) == "connect"
+    assert index.lookup("wsock32", 3) == "closesocket"
+    assert index.lookup("ws2_32.dll", 0xFFFF) is None
+    assert index.lookup("mfc42.dll", 1200) is None
+
+
+def test_build_round_trips_and_overrides(tmp_path):
+    path = tmp_path / "ord.bin"
+    tables = {"MFC42.DLL": MFC_EXPORTS, "mfc42": {3: "Renamed"}, "empty.dll": {}}
+
+    assert build_index(tables, path) == 3
+
+    index = OrdinalIndex(path)
+    assert index.tables() == {"mfc42": {**MFC_EXPORTS, 3: "Renamed"}}
+    assert index.lookup("Mfc42.Dll", 256) == "??0CWnd@@QAE@XZ"
+    assert index.knows("MFC42") and not index.knows("ws2_32")
+
+
+def test_tables_from_dll_export_tables(tmp_path):
+    dll = tmp_path / "mfc42.dll"
+    dll.write_bytes(build_pe({"KERNEL32.dll": ["Sleep"]}, exports=("MFC42.DLL", MFC_EXPORTS)))
+
+    assert sorted(read_exports(dll.read_bytes())[1]) == sorted(MFC_EXPORTS.items())
+    assert tables_from_dlls([str(dll)]) == {"mfc42.dll": MFC_EXPORTS}
+    assert read_exports(build_pe({"KERNEL32.dll": ["Sleep"]})) == (None, [])
+
+
+@pytest.mark.parametrize("backend", ["raw", "pefile"])
+def test_imports_resolved_from_extended_index(tmp_path, active_index, backend, capsys):
+    dll = tmp_path / "mfc42.dll"
+    dll.write_bytes(build_pe({"KERNEL32.dll": ["Sleep"]}, exports=("MFC42.DLL", MFC_EXPORTS)))
+    client = build_pe(CLIENT)
+
+    assert get_imports(client, backend=backend)["MFC42.DLL"] == ["ORDINAL_1200", "ORDINAL_256", "ORDINAL_7"]
+
+    path = tmp_path / "extended.bin"
+    assert main(["build", str(path), str(dll)]) == 0
+    active_index(path)
+
+    imports = get_imports(client, backend=backend)
+    assert imports["MFC42.DLL"] == ["AfxGetApp", "??0CWnd@@QAE@XZ", "ord7"]
+    assert imports["WS2_32.DLL"] == ["connect", "socket"]
+
+    assert main(["lookup", "mfc42", "1200"]) == 0
+    assert capsys.readouterr().out == "AfxGetApp\n"
+    assert main(["lookup", "mfc42", "7"]) == 1
+
+
+def test_cache_fingerprint_follows_index(tmp_path, active_index):
+    from src.cache import rules_fingerprint
+
+    before = rules_fingerprint()
+    path = tmp_path / "ord.bin"
+    build_index({"mfc42": MFC_EXPORTS}, path)
+    active_index(path)
+    assert rules_fingerprint() != before
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not.bin"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        OrdinalIndex(path).lookup("ws2_32", 1)
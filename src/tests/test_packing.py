@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import json
+import random
+import struct
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.packing import analyze_packing, range_entropy, range_stats, read_section_table
+from src.pipeline import run_pipeline
+from src.synthetic import build_pe
+
+IMPORTS = {"KERNEL32.dll": ["CreateFileW", "ReadFile", "WriteFile", "CloseHandle", "Sleep",
+                            "GetLastError", "HeapAlloc", "HeapFree", "ExitProcess"]}
+
+
+def _retitle_section(data: bytes, index: int, name: bytes, characteristics: int) -> bytes:
+    """Rename section `index` and replace its flags."""
+    image = bytearray(data)
+    pe_offset, = struct.unpack_from("<I", image, 0x3C)
+    optional_size, = struct.unpack_from("<H", image, pe_offset + 20)
+    at = pe_offset + 24 + optional_size + index * 40
+    image[at:at + 8] = name.ljust(8, b"\0")
+    struct.pack_into("<I", image, at + 36, characteristics)
+    return bytes(image)
+
+
+def test_plain_image_is_not_packed():
+    data = build_pe(IMPORTS, extra_sections=1, extra_section_data=b"hello world " * 400)
+
+    packing = analyze_packing(data, IMPORTS)
+
+    assert packing["verdict"] == "not_packed" and packing["packer"] is None
+    assert [s["name"] for s in packing["sections"]] == [s.name for s in read_section_table(data)[1]]
+    assert all(0 <= s["entropy"] < 4 for s in packing["sections"])
+
+
+def test_packer_section_and_random_code_are_packed():
+    payload = random.Random(1).randbytes(256 * 1024)
+    data = build_pe({"KERNEL32.dll": ["LoadLibraryA", "GetProcAddress"]}, extra_sections=1, extra_section_data=payload)
+    data = _retitle_section(data, 2, b"UPX1", 0xE0000020)  # code, RWX
+
+    packing = analyze_packing(data, {"KERNEL32.dll": ["LoadLibraryA", "GetProcAddress"]}, window=16 * 1024)
+
+    assert packing["verdict"] == "packed" and packing["packer"] == "UPX"
+    upx = packing["sections"][2]
+    assert upx["flags"] == "RWX" and upx["entropy"] > 7.9 and upx["max_window_entropy"] > 7.9
+    assert any("only 2 imports" in indicator for indicator in packing["indicators"])
+
+
+def test_large_ranges_are_sampled():
+    data = random.Random(2).randbytes(1024 * 1024)
+    whole, highest, sampled = range_entropy(data, 0, len(data), window=4096, max_windows=16)
+    assert sampled and whole > 7.9 and highest > 7.9
+    assert range_entropy(bytes(10000), 0, 10000) == (0.0, 0.0, False)
+
+
+def test_ranges_match_whole_range_entropy():
+    rng = random.Random(7)
+    data = bytes(rng.randrange(256) for _ in range(50000)) + bytes(30000) + b"MZ" * 10000
+    ranges = [(0, 50000), (50000, 80000), (80000, 100000), (100000, 100000)]
+    stats, _whole = range_stats(data, ranges, window=4096, max_windows=4)
+
+    assert stats == [range_entropy(data, start, end, 4096, 4) for start, end in ranges]
+    assert stats[1][:2] == (0.0, 0.0) and stats[3] == (0.0, 0.0, False)
+    # Unsampled, the ranges together are the whole buffer.
+    whole = range_stats(data, ranges, window=4096, max_windows=100)[1]
+    assert whole == pytest.approx(range_entropy(data, 0, len(data), 4096, 100)[0])
+
+
+def test_window_views_are_released_on_error(tmp_path, monkeypatch):
+    import mmap
+
+    path = tmp_path / "data.bin"
+    path.write_bytes(bytes(range(256)) * 64)
+
+    def failing(*args, **kwargs):
+        raise MemoryError
+
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    monkeypatch.setattr(np, "bincount", failing)
+    with pytest.raises(MemoryError):
+        range_stats(mapped, [(0, len(mapped))], window=4096)
+    mapped.close()  # BufferError if a view were still exported
+
+
+def test_pipeline_adds_packed_capability(tmp_path):
+    path = tmp_path / "a.exe"
+    path.write_bytes(build_pe(IMPORTS, min_size=100000))
+
+    result = run_pipeline(path, backend="raw", packing=True)
+
+    assert result["packing"]["overlay"]["size"] > 0
+    assert result["capabilities"]["packed"]["present"] is False
+    assert "packed" not in run_pipeline(path, backend="raw")["capabilities"]
+
+
+def test_single_file_reports_include_packing(tmp_path, capsys):
+    from src.main import main
+
+    path = tmp_path / "a.exe"
+    path.write_bytes(build_pe(IMPORTS, min_size=100000))
+    packing = run_pipeline(path, backend="raw", packing=True)["packing"]
+
+    assert main([str(path), "--backend", "raw", "--packing", "--json"]) == 0
+    assert json.loads(capsys.readouterr().out)["packing"] == json.loads(json.dumps(packing))
+
+    assert main([str(path), "--backend", "raw", "--packing"]) == 0
+    text = capsys.readouterr().out
+    assert "== Packing Analysis ==" in text and f"- verdict: {packing['verdict']}" in text
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from src.pe_parser import PEParseError, get_imports
+from src.synthetic import build_pe, malform
+
+DLL_NAMES = ["KERNEL32.dll", "ADVAPI32.dll", "user32.dll", "WS2_32.dll", "MFC42.DLL", "msvcrt.dll"]
+
+
+def _random_imports(rng: random.Random):
+    imports = {}
+    for dll in rng.sample(DLL_NAMES, rng.randint(1, len(DLL_NAMES))):
+        funcs = []
+        for i in range(rng.randint(1, 40)):
+            if rng.random() < 0.2:
+                funcs.append(rng.randint(1, 600))
+            else:
+                funcs.append(f"Func{dll[:3]}{rng.randint(0, 500)}_{i}")
+        imports[dll] = funcs
+    return imports
+
+
+def _both_backends(path):
+    results = []
+    for backend in ("pefile", "raw"):
+        try:
+            results.append(get_imports(path, backend=backend))
+        except PEParseError:
+            results.append(PEParseError)
+    return results
+
+
+def _corpus(rng: random.Random, count: int):
+    for i in range(count):
+        data = bytearray(build_pe(_random_imports(rng), pe32_plus=bool(i % 2), extra_sections=rng.randint(0, 3)))
+        if i % 3 == 1:
+            # Corrupt a few bytes in the headers / import section
+            for _ in range(rng.randint(1, 8)):
+                data[rng.randrange(0x40, min(len(data), 0x2000))] = rng.randrange(256)
+        elif i % 3 == 2:
+            del data[rng.randrange(0x80, len(data)):]
+        yield i, bytes(data)
+
+
+def test_raw_backend_matches_pefile_on_generated_corpus(tmp_path):
+    """Differential check: the raw reader and pefile agree on every sample."""
+    rng = random.Random(1234)
+    for i, data in _corpus(rng, 90):
+        path = tmp_path / f"sample{i}.exe"
+        path.write_bytes(data)
+        expected, actual = _both_backends(path)
+        assert actual == expected, f"sample {i} differs"
+
+
+@pytest.mark.parametrize("dlls,per_dll", [(10, 1000), (5, 3000), (300, 30), (0x1001, 1)])
+def test_raw_backend_matches_pefile_on_large_tables(tmp_path, dlls, per_dll):
+    """Tables past pefile's MAX_IMPORT_SYMBOLS are cut at the same entry."""
+    imports = {f"LIB{i}.dll": [f"Func{j}" for j in range(per_dll)] for i in range(dlls)}
+    for pe32_plus in (False, True):
+        path = tmp_path / f"large{int(pe32_plus)}.exe"
+        path.write_bytes(build_pe(imports, pe32_plus=pe32_plus))
+        expected, actual = _both_backends(path)
+        assert actual == expected
+
+
+def test_ordinals_of_invalid_dll_names_match_pefile(tmp_path):
+    """Ordinals are looked up under the sanitized "*invalid*" name, as pefile does."""
+    rng = random.Random(21)
+    for i in range(8):
+        data = build_pe({"KERNEL32.dll": ["Sleep"], "WS2_32.dll": [4, 23, "WSAStartup"]}, pe32_plus=bool(i % 2))
+        path = tmp_path / f"invalid{i}.exe"
+        path.write_bytes(malform(data, "invalid_dll_name", rng))
+        expected, actual = _both_backends(path)
+        assert actual == expected, f"sample {i} differs"
+        assert actual["*INVALID*"] == ["ORDINAL_4", "ORDINAL_23", "WSAStartup"]
+
+
+def test_raw_backend_pe32_plus_and_ordinals(tmp_path):
+    path = tmp_path / "x64.exe"
+    path.write_bytes(build_pe({"KERNEL32.dll": ["CreateFileW", 7], "MFC42.DLL": [1234]}, pe32_plus=True))
+
+    assert get_imports(path, backend="raw") == {
+        "KERNEL32.DLL": ["CreateFileW", "ORDINAL_7"],
+        "MFC42.DLL": ["ORDINAL_1234"],
+    }
+
+
+def test_unknown_backend_rejected(tmp_path):
+    path = tmp_path / "a.exe"
+    path.write_bytes(build_pe({"KERNEL32.dll": ["ReadFile"]}))
+    with pytest.raises(ValueError):
+        get_imports(path, backend="nope")
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import zipfile
+
+from src.batch import run_batch
+from src.pipeline import run_pipeline
+from src.profiling import ProfileAggregator, StageProfile, profile_files, write_profile
+from src.report import NDJSONWriter
+from src.synthetic import build_pe
+
+
+def test_pipeline_records_stages_and_counters(tmp_path):
+    path = tmp_path / "a.exe"
+    path.write_bytes(build_pe({"KERNEL32.dll": ["CreateFileW", "ReadFile"], "WS2_32.dll": ["connect"]}))
+    profile = StageProfile()
+
+    run_pipeline(path, backend="raw", profile=profile)
+
+    assert set(profile.timings) == {"get_imports", "categorize_imports", "compute_capabilities", "detect_patterns"}
+    assert profile.counters == {"file_bytes": path.stat().st_size, "dlls": 2, "imports": 3}
+
+
+def test_aggregator_percentiles_and_slowest():
+    aggregator = ProfileAggregator(keep_slowest=2)
+    for i in range(1, 101):
+        aggregator.add(f"{i}.exe", {"stages": {"get_imports": float(i)}, "counters": {"imports": 2}})
+
+    summary = aggregator.summary()
+    stats = summary["stages"]["get_imports"]
+    assert (stats["p50_ms"], stats["p95_ms"], stats["p99_ms"], stats["max_ms"]) == (50.0, 95.0, 99.0, 100.0)
+    assert summary["counters"] == {"imports": 200}
+    assert [entry["file"] for entry in summary["slowest"]] == ["100.exe", "99.exe"]
+
+    out = io.StringIO()
+    write_profile(summary, out, "csv")
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert rows[0] == ["scope", "name", "metric", "value"]
+    assert ["stage", "get_imports", "p95_ms", "95.0"] in rows
+
+
+def test_run_batch_profile_keeps_records_clean(tmp_path):
+    """Profiles go to the aggregator, never into the written records."""
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"{i}.exe"
+        path.write_bytes(build_pe({"KERNEL32.dll": ["VirtualAlloc"] * (i + 1)}))
+        paths.append(str(path))
+    out = io.StringIO()
+    aggregator = ProfileAggregator(keep_slowest=1)
+
+    run_batch(paths, NDJSONWriter(out), workers=1, options={"backend": "raw"}, profile=aggregator)
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert all("_profile" not in record for record in records)
+    summary = aggregator.summary()
+    assert summary["files"] == 3 and summary["stages"]["write"]["count"] == 3
+    assert summary["counters"]["imports"] == 6
+
+    hooks = profile_files([summary["slowest"][0]["file"]], backend="raw", top=5)
+    assert hooks[0]["peak_alloc_bytes"] > 0 and len(hooks[0]["top_functions"]) == 5
+
+
+def test_profile_files_uses_run_options_and_reports_errors(tmp_path):
+    sample = build_pe({"KERNEL32.dll": ["VirtualAlloc"]})
+    archive = tmp_path / "samples.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("inner/a.exe", sample)
+    member = f"{archive}!inner/a.exe"
+    missing = str(tmp_path / "gone.exe")
+
+    hooks = profile_files([member, missing, f"{archive}!nope.exe"], top=500, backend="raw", scan_strings=True)
+
+    assert hooks[0]["file"] == member and hooks[0]["peak_alloc_bytes"] > 0
+    assert any("scan_api_strings" in entry["function"] for entry in hooks[0]["top_functions"])
+    assert hooks[1] == {"file": missing, "error": {"type": "FileNotFoundError", "message": f"File not found: {missing}"}}
+    assert hooks[2]["error"]["type"] == "FileNotFoundError"
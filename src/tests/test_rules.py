@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import pytest
+
+from src.analyze import describe_patterns, detect_patterns
+from src.categorize import categorize_imports
+from src import rules
+from src.rules import compile_rules, load_rules
+
+
+def test_bundled_rules_detect_injection_combo():
+    """The bundled rules keep the original three patterns and their order."""
+    imports = {
+        "KERNEL32.DLL": ["OpenProcess", "VirtualAllocEx", "WriteProcessMemory", "CreateFileW"],
+        "ADVAPI32.DLL": ["RegSetValueExW"],
+    }
+    categorized = categorize_imports(imports)
+
+    assert detect_patterns(categorized, imports) == ["process_injection_combo", "registry_persistence"]
+    assert describe_patterns(["process_injection_combo"])[0][1].startswith("Process injection combo")
+
+
+def test_rule_conditions():
+    """API subsets, any-of counts, DLLs and category counts all have to hold."""
+    ruleset = compile_rules([
+        {"id": "needs_dll", "apis": ["send"], "dlls": ["ws2_32"]},
+        {"id": "two_of", "any_apis": ["ReadFile", "WriteFile", "DeleteFileW"], "min_any": 2},
+        {"id": "chatty", "min_counts": {"network": 3}},
+        {"id": "big", "min_imports": 5, "description": "Many imports"},
+    ])
+    imports = {"WS2_32.dll": ["send", "recv"], "KERNEL32.DLL": ["ReadFile", "WriteFile"]}
+    categorized = categorize_imports(imports)
+
+    assert ruleset.match(categorized, imports) == ["needs_dll", "two_of"]
+    assert ruleset.match(categorized) == ["two_of"]
+
+    imports["WS2_32.dll"].append("connect")
+    imports["KERNEL32.DLL"].append("CloseHandle")
+    assert ruleset.match(categorize_imports(imports), imports) == ["needs_dll", "two_of", "chatty", "big"]
+    assert describe_patterns(["big"], ruleset) == [("big", "Many imports")]
+
+
+@pytest.mark.parametrize("rule", [
+    {"description": "no id"},
+    {"id": "empty"},
+    {"id": "typo", "api": ["send"]},
+    {"id": "too_many", "any_apis": ["send"], "min_any": 2},
+])
+def test_malformed_rules_are_rejected(rule):
+    with pytest.raises(ValueError):
+        compile_rules([rule])
+
+
+def test_load_rules_requires_a_list(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text('{"id": "x"}')
+    with pytest.raises(ValueError):
+        load_rules(path)
+    with pytest.raises(FileNotFoundError):
+        load_rules(tmp_path / "missing.json")
+
+
+def test_default_ruleset_compiles_without_cache_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    path = tmp_path / "rules.json"
+    path.write_text('[{"id": "net", "description": "Network", "categories": ["network"]}]')
+    monkeypatch.setattr(rules, "DEFAULT_RULES_PATH", path)
+    rules.default_ruleset.cache_clear()
+    try:
+        assert rules.default_ruleset().ids == ["net"]
+    finally:
+        rules.default_ruleset.cache_clear()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["rules.json"]
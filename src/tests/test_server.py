@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from src.client import _connect, http_request
+from src import server as server_mod
+from src.server import AnalysisServer, serve
+from src.synthetic import build_pe
+
+
+@contextmanager
+def _running(socket_path, **options):
+    """Run an analysis server on a Unix socket in a background thread."""
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    tasks = []
+
+    async def run() -> None:
+        started = asyncio.Event()
+        server = AnalysisServer(**options)
+        tasks.append(asyncio.ensure_future(serve(server, socket_path=socket_path, ready=started)))
+        await started.wait()
+        ready.set()
+        try:
+            await tasks[0]
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=lambda: loop.run_until_complete(run()), daemon=True)
+    thread.start()
+    assert ready.wait(30)
+    try:
+        yield socket_path
+    finally:
+        loop.call_soon_threadsafe(tasks[0].cancel)
+        thread.join(30)
+        loop.close()
+
+
+@pytest.fixture
+def server_socket(tmp_path):
+    """Run an analysis server with one warm worker on a Unix socket."""
+    with _running(str(tmp_path / "server.sock"), workers=1, max_queue=4) as socket_path:
+        yield socket_path
+
+
+def _request(socket_path, method, target, body=b"", headers=None):
+    with _connect(socket_path, None, 30) as sock:
+        return http_request(sock, method, target, body, headers)
+
+
+def test_server_analyzes_paths_and_uploads(server_socket, tmp_path):
+    sample = tmp_path / "sample.exe"
+    sample.write_bytes(build_pe({"KERNEL32.dll": ["CreateFileW"], "WS2_32.dll": ["connect"]}))
+
+    request = json.dumps({"path": str(sample), "name": "sample.exe", "include_imports": True}).encode()
+    status, report = _request(server_socket, "POST", "/analyze", request, {"Content-Type": "application/json"})
+    assert status == 200
+    assert report["file"] == "sample.exe" and report["imports"]["WS2_32.DLL"] == ["connect"]
+    assert "network_and_file_io" in report["detected_patterns"]
+
+    status, upload = _request(
+        server_socket, "POST", "/analyze", sample.read_bytes(),
+        {"Content-Type": "application/octet-stream", "X-File-Name": "sample.exe"},
+    )
+    assert status == 200 and upload["detected_patterns"] == report["detected_patterns"]
+
+    status, error = _request(server_socket, "POST", "/analyze", b"not a PE", {"X-File-Name": "junk.bin"})
+    assert status == 422 and error["error"]["message"] == "Not a valid PE file: junk.bin"
+
+    assert _request(server_socket, "GET", "/nope")[0] == 404
+    status, health = _request(server_socket, "GET", "/health")
+    assert status == 200 and health["served"] == 2 and health["inflight"] == 0
+
+
+def _slow_analyze(path, name, *args):
+    if name == "slow.exe":
+        time.sleep(30)
+    return 200, {"file": name, "pid": os.getpid()}
+
+
+def test_timed_out_worker_is_killed_and_replaced(tmp_path, monkeypatch):
+    # Forked workers pick up the patched function by name.
+    monkeypatch.setattr(server_mod, "_analyze", _slow_analyze)
+    with _running(str(tmp_path / "server.sock"), workers=1, timeout=0.2) as socket_path:
+        def analyze(name):
+            request = json.dumps({"path": "x.exe", "name": name}).encode()
+            return _request(socket_path, "POST", "/analyze", request, {"Content-Type": "application/json"})
+
+        status, first = analyze("fast.exe")
+        assert status == 200
+        start = time.perf_counter()
+        status, _ = analyze("slow.exe")
+        assert status == 504 and time.perf_counter() - start < 5
+        health = _request(socket_path, "GET", "/health")[1]
+        assert health["inflight"] == 0 and health["timeouts"] == 1
+
+        status, second = analyze("fast.exe")
+        assert status == 200 and second["pid"] != first["pid"]
+
+
+def test_slow_client_gets_request_timeout(tmp_path):
+    with _running(str(tmp_path / "server.sock"), workers=1, read_timeout=0.2) as socket_path:
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.settimeout(10)
+            sock.connect(socket_path)
+            sock.sendall(b"POST /analyze HTTP/1.1\r\nContent-Length: 100\r\n\r\npartial")
+            response = b""
+            while chunk := sock.recv(4096):
+                response += chunk
+        assert response.startswith(b"HTTP/1.1 408 Request Timeout")
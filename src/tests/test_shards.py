@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import io
+import json
+import multiprocessing
+import shutil
+from pathlib import Path
+
+import pytest
+
+from src.batch import run_batch
+from src.report import NDJSONWriter
+from src.shards import ShardError, merge_shards, open_shard_dir, run_shards, shard_key, shard_name, shard_of, shard_status
+from src.synthetic import build_pe
+
+TABLES = [
+    {"WS2_32.dll": ["socket", "connect", "send"]},
+    {"KERNEL32.dll": ["CreateFileW", "WriteFile"]},
+    {"ADVAPI32.dll": ["RegOpenKeyExW", "RegSetValueExW"], "KERNEL32.dll": ["Sleep"]},
+]
+
+
+def _corpus(tmp_path, monkeypatch, count=12):
+    # Relative paths, so the shard split is the same on every run.
+    monkeypatch.chdir(tmp_path)
+    root = Path("corpus")
+    root.mkdir()
+    paths = []
+    for i in range(count):
+        path = root / f"{i}.exe"
+        # The last three files repeat the first three's contents under new names.
+        unique = i if i < count - 3 else i - (count - 3)
+        path.write_bytes(build_pe(TABLES[i % len(TABLES)], min_size=4096 + 512 * unique))
+        paths.append(str(path))
+    (root / "bad.exe").write_bytes(b"not a PE")
+    paths.append(str(root / "bad.exe"))
+    return paths
+
+
+def _merge(directory):
+    out = io.StringIO()
+    summary = merge_shards(directory, NDJSONWriter(out))
+    return summary, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def _node(directory, paths):
+    run_shards(directory, paths, count=4, workers=1, options={"backend": "raw"})
+
+
+def test_shard_of_is_stable_and_spreads():
+    names = [f"/corpus/{i}.exe" for i in range(1000)]
+    assert [shard_of(name, 8, "/") for name in names] == [shard_of(name, 8, "/") for name in names]
+    assert shard_of("/corpus/0.exe", 8, "/") == 3  # fixed across versions and machines
+    counts = [sum(shard_of(name, 8, "/") == i for name in names) for i in range(8)]
+    assert min(counts) > 80
+
+
+def test_shard_key_ignores_mount_point(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert shard_key("/mnt/a/corpus/0.exe", "/mnt/a") == shard_key("/data/corpus/0.exe", "/data") == "corpus/0.exe"
+    assert shard_key("./corpus//0.exe") == shard_key(str(tmp_path / "corpus" / "0.exe")) == "corpus/0.exe"
+    assert shard_of("/mnt/a/corpus/0.exe", 8, "/mnt/a/") == shard_of("corpus/0.exe", 8)
+
+
+def test_concurrent_nodes_then_merge_matches_batch(tmp_path, monkeypatch):
+    paths = _corpus(tmp_path, monkeypatch)
+    directory = tmp_path / "shards"
+    open_shard_dir(directory, 4)
+
+    nodes = [multiprocessing.Process(target=_node, args=(directory, paths)) for _ in range(3)]
+    for node in nodes:
+        node.start()
+    for node in nodes:
+        node.join()
+    assert shard_status(directory)["complete"] == [0, 1, 2, 3]
+
+    summary, records = _merge(directory)
+    out = io.StringIO()
+    run_batch(paths, NDJSONWriter(out), workers=1, options={"backend": "raw"})
+    expected = {r["file"]: r for r in map(json.loads, out.getvalue().splitlines())}
+
+    assert summary["duplicates"] == 3 and summary["incomplete"] == []
+    assert summary["files"] == len(records) == len(paths) - 3
+    assert len({r["sha256"] for r in records}) == len(records)
+    for record in records:
+        record.pop("sha256", None)
+        assert record == expected[record["file"]]
+
+
+def test_interrupted_shard_resumes(tmp_path, monkeypatch):
+    paths = _corpus(tmp_path, monkeypatch)
+    directory = tmp_path / "shards"
+    run_shards(directory, paths, count=2, shards=[0], workers=1, options={"backend": "raw"})
+
+    # Simulate a node killed mid-write: drop the last input and tear the one before.
+    final = directory / shard_name(0, 2)
+    lines = final.read_bytes().splitlines(keepends=True)
+    final.unlink()
+    (directory / shard_name(0, 2, "partial")).write_bytes(b"".join(lines[:-2]) + lines[-2][:10])
+
+    summary, _ = _merge(directory)
+    assert summary["incomplete"] == [0, 1]
+
+    (summary,) = run_shards(directory, paths, shards=[0], workers=1, options={"backend": "raw"})
+    assert summary["resumed"] == len(lines) - 2
+    assert summary["files"] == 2
+    assert final.read_bytes().count(b"\n") == len(lines)
+
+    assert run_shards(directory, paths, shards=[0], workers=1) == []
+    run_shards(directory, paths, workers=1, options={"backend": "raw"})
+    summary, records = _merge(directory)
+    assert summary["incomplete"] == [] and len(records) == len(paths) - 3
+
+
+def test_shard_resumes_on_a_node_with_another_root(tmp_path, monkeypatch):
+    node_a, node_b = tmp_path / "a", tmp_path / "b"
+    node_a.mkdir()
+    paths = [str(node_a / path) for path in _corpus(node_a, monkeypatch)]
+    directory = tmp_path / "shards"
+    run_shards(directory, paths, count=1, workers=1, options={"backend": "raw"}, root=str(node_a))
+
+    final = directory / shard_name(0, 1)
+    lines = final.read_bytes().splitlines(keepends=True)
+    final.unlink()
+    (directory / shard_name(0, 1, "partial")).write_bytes(b"".join(lines[:-2]))
+    assert json.loads(lines[0])["key"].startswith("corpus/")
+
+    # The same corpus mounted elsewhere on the resuming node.
+    shutil.copytree(node_a / "corpus", node_b / "corpus")
+    moved = [path.replace(str(node_a), str(node_b)) for path in paths]
+    (summary,) = run_shards(directory, moved, workers=1, options={"backend": "raw"}, root=str(node_b))
+    assert summary["resumed"] == len(lines) - 2 and summary["files"] == 2
+    assert final.read_bytes().count(b"\n") == len(lines)
+
+
+def test_shard_count_is_fixed(tmp_path):
+    with pytest.raises(ShardError):
+        run_shards(tmp_path / "shards", [])
+    open_shard_dir(tmp_path / "shards", 3)
+    with pytest.raises(ShardError):
+        open_shard_dir(tmp_path / "shards", 4)
+    with pytest.raises(ShardError):
+        run_shards(tmp_path / "shards", [], shards=[3])
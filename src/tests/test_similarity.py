@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import pytest
+
+from src import similarity
+from src.similarity import SimilarityIndex, add_files, imphash, jaccard, import_tokens, minhash
+from src.synthetic import build_pe
+
+
+def _imports(n: int, start: int = 0):
+    return {"KERNEL32.dll": [f"Func{i}" for i in range(start, start + n)], "USER32.dll": ["MessageBoxW"]}
+
+
+def test_imphash_format():
+    """Lowercase dll stem + function, ordinals as ord<n>, MD5 of the joined list."""
+    import hashlib
+
+    imports = {"KERNEL32.dll": ["CreateFileW"], "WS2_32.dll": ["ORDINAL_115"]}
+    expected = hashlib.md5(b"kernel32.createfilew,ws2_32.ord115").hexdigest()
+    assert imphash(imports) == expected
+    assert imphash({}) == ""
+
+
+def test_minhash_estimates_jaccard():
+    a, b = import_tokens(_imports(100)), import_tokens(_imports(100, start=20))
+    sig_a, sig_b = minhash(a, num_perm=256), minhash(b, num_perm=256)
+    estimate = sum(x == y for x, y in zip(sig_a, sig_b)) / 256
+    assert abs(estimate - jaccard(a, b)) < 0.15
+
+
+def test_index_query_and_incremental_updates(tmp_path):
+    db = tmp_path / "index.db"
+    with SimilarityIndex(db) as index:
+        index.add("same.exe", _imports(40))
+        index.add("close.exe", _imports(40, start=2))
+        index.add("far.exe", _imports(40, start=1000))
+
+        neighbors = index.query(_imports(40), k=2)
+        assert [n["file"] for n in neighbors] == ["same.exe", "close.exe"]
+        assert neighbors[0]["jaccard"] == 1.0 and neighbors[0]["imphash_match"]
+
+        index.add("same.exe", _imports(40, start=2000))  # replaced, not duplicated
+        assert len(index) == 3
+        assert [n["file"] for n in index.query(_imports(40), k=5)] == ["close.exe"]
+        assert index.remove("close.exe") and not index.remove("close.exe")
+
+    with SimilarityIndex(db) as index:
+        assert len(index) == 2
+    with pytest.raises(ValueError):
+        SimilarityIndex(db, num_perm=32, bands=8)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_add_files_skips_unchanged_and_reports_errors(tmp_path, monkeypatch, workers):
+    good, flaky = tmp_path / "good.exe", tmp_path / "flaky.exe"
+    good.write_bytes(build_pe(_imports(10)))
+    flaky.write_bytes(build_pe(_imports(5)))
+    (tmp_path / "bad.exe").write_bytes(b"not a PE")
+    paths = [str(good), str(flaky), str(tmp_path / "bad.exe"), str(tmp_path / "missing.exe")]
+
+    parse = similarity.get_imports
+
+    def get_imports(path, backend=None):
+        if path == str(flaky):
+            raise OSError(5, "Input/output error")
+        return parse(path, backend=backend)
+
+    # Forked pool workers inherit the patch.
+    monkeypatch.setattr(similarity, "get_imports", get_imports)
+    with SimilarityIndex(tmp_path / "index.db") as index:
+        first = {item["file"]: item for item in add_files(index, paths, workers=workers, backend="raw")}
+        second = {item["file"]: item for item in add_files(index, paths, workers=workers, backend="raw")}
+        assert len(index) == 1
+
+    assert first[str(good)] == {"file": str(good), "added": True}
+    assert second[str(good)] == {"file": str(good), "skipped": True}
+    assert first[str(flaky)]["error"] == "OSError: Unexpected error: [Errno 5] Input/output error"
+    assert first[str(tmp_path / "bad.exe")]["error"].startswith("PEParseError")
+    assert first[str(tmp_path / "missing.exe")]["error"].startswith("FileNotFoundError")
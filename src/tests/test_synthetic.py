@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from src.pe_parser import PEParseError, get_imports
+from src.synthetic import MALFORMATIONS, build_pe, generate_corpus, malform
+
+
+def test_generated_corpus_parses_as_described(tmp_path):
+    records = generate_corpus(tmp_path / "a", 30, seed=7, ordinal_ratio=0.2, file_size=(4096, 8192))
+
+    for record in records:
+        imports = get_imports(record["file"], backend="raw")
+        assert len(imports) == record["dlls"]
+        assert sum(len(funcs) for funcs in imports.values()) == record["imports"]
+        assert record["size"] >= 4096 and record["malformed"] is None
+
+    again = generate_corpus(tmp_path / "b", 30, seed=7, ordinal_ratio=0.2, file_size=(4096, 8192))
+    for first, second in zip(records, again):
+        assert open(first["file"], "rb").read() == open(second["file"], "rb").read()
+
+
+@pytest.mark.parametrize("kind", MALFORMATIONS)
+def test_malformed_variants_fail_cleanly(tmp_path, kind):
+    """Both backends either reject a broken file or agree on what they read."""
+    rng = random.Random(kind)
+    for i in range(5):
+        path = tmp_path / f"{kind}{i}.exe"
+        data = build_pe({"KERNEL32.dll": ["CreateFileW", "ReadFile", 12]}, pe32_plus=bool(i % 2))
+        path.write_bytes(malform(data, kind, rng))
+
+        results = []
+        for backend in ("pefile", "raw"):
+            try:
+                results.append(get_imports(path, backend=backend))
+            except PEParseError:
+                results.append(PEParseError)
+        assert results[0] == results[1]
+
+    with pytest.raises(ValueError):
+        malform(data, "nope", rng)